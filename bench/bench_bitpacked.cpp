@@ -0,0 +1,181 @@
+// Compares writing and reading many small records field by field (what the
+// generator emitted before adjacent fixed-size fields were coalesced) against
+// the coalesced `TelemetrySampleDataType` and its `bitpacked` twin
+// `BitpackedTelemetrySampleDataType`: encoded size and encode/decode time.
+//
+// Build (from repo root):
+//     g++ -std=c++20 -O2 -Igen bench/bench_bitpacked.cpp -o bench_bitpacked
+//     cl /std:c++20 /O2 /EHsc /Igen bench\bench_bitpacked.cpp
+#include <chrono>
+#include <cstdio>
+#include <vector>
+#include "TelemetrySampleDataType.hstruct.h"
+#include "BitpackedTelemetrySampleDataType.hstruct.h"
+
+
+static constexpr size_t k_record_count{ 100000 };
+static constexpr size_t k_sample_count{ 64 };
+static constexpr size_t k_repetitions{ 10 };
+
+
+template<typename Func>
+double time_seconds(Func&& func)
+{
+    auto start{ std::chrono::steady_clock::now() };
+    for (size_t r = 0; r < k_repetitions; r++)
+    {
+        func();
+    }
+    auto end{ std::chrono::steady_clock::now() };
+    return std::chrono::duration<double>(end - start).count() / k_repetitions;
+}
+
+// One `write_elem`/`read_elem` per field.
+void per_field_write(TelemetrySampleDataType& record, SerialBuffer& sb)
+{
+    sb.write_elem(&record.timestamp, sizeof(uint64_t));
+    sb.write_elem(&record.is_online, sizeof(bool));
+    sb.write_elem(&record.is_charging, sizeof(bool));
+    sb.write_elem(&record.has_fault, sizeof(bool));
+    sb.write_elem(&record.is_moving, sizeof(bool));
+    sb.write_elem(&record.door_open, sizeof(bool));
+    sb.write_elem(&record.lights_on, sizeof(bool));
+    sb.write_elem(&record.brakes_engaged, sizeof(bool));
+    sb.write_elem(&record.wipers_on, sizeof(bool));
+    sb.write_elem(&record.heater_on, sizeof(bool));
+    sb.write_elem(&record.speed, sizeof(float_t));
+    sb.write_elem(&record.sensor_id, sizeof(uint16_t));
+    sb.write_elem(&record.is_calibrated, sizeof(bool));
+    size_t label__str_length{ record.label.length() };
+    sb.write_elem(&label__str_length, sizeof(size_t));
+    sb.write_elem(record.label.data(), sizeof(char) * label__str_length);
+    sb.write_bulk(record.channel_active.data(), sizeof(bool), 12);
+    size_t sample_valid__list_count{ record.sample_valid.size() };
+    sb.write_elem(&sample_valid__list_count, sizeof(size_t));
+    for (size_t i = 0; i < sample_valid__list_count; i++)
+    {
+        bool sample_valid__elem{ record.sample_valid[i] };
+        sb.write_elem(&sample_valid__elem, sizeof(bool));
+    }
+    size_t readings__list_count{ record.readings.size() };
+    sb.write_elem(&readings__list_count, sizeof(size_t));
+    sb.write_bulk(record.readings.data(), sizeof(uint32_t), readings__list_count);
+}
+
+void per_field_read(TelemetrySampleDataType& record, SerialBuffer& sb)
+{
+    record.timestamp = *reinterpret_cast<const uint64_t*>(sb.read_elem(sizeof(uint64_t)));
+    record.is_online = *reinterpret_cast<const bool*>(sb.read_elem(sizeof(bool)));
+    record.is_charging = *reinterpret_cast<const bool*>(sb.read_elem(sizeof(bool)));
+    record.has_fault = *reinterpret_cast<const bool*>(sb.read_elem(sizeof(bool)));
+    record.is_moving = *reinterpret_cast<const bool*>(sb.read_elem(sizeof(bool)));
+    record.door_open = *reinterpret_cast<const bool*>(sb.read_elem(sizeof(bool)));
+    record.lights_on = *reinterpret_cast<const bool*>(sb.read_elem(sizeof(bool)));
+    record.brakes_engaged = *reinterpret_cast<const bool*>(sb.read_elem(sizeof(bool)));
+    record.wipers_on = *reinterpret_cast<const bool*>(sb.read_elem(sizeof(bool)));
+    record.heater_on = *reinterpret_cast<const bool*>(sb.read_elem(sizeof(bool)));
+    record.speed = *reinterpret_cast<const float_t*>(sb.read_elem(sizeof(float_t)));
+    record.sensor_id = *reinterpret_cast<const uint16_t*>(sb.read_elem(sizeof(uint16_t)));
+    record.is_calibrated = *reinterpret_cast<const bool*>(sb.read_elem(sizeof(bool)));
+    size_t label__str_length{
+        *reinterpret_cast<const size_t*>(sb.read_elem(sizeof(size_t)))
+    };
+    record.label = std::string{ reinterpret_cast<const char*>(sb.read_elem(sizeof(char) * label__str_length)), label__str_length };
+    sb.read_bulk(record.channel_active.data(), sizeof(bool), 12);
+    size_t sample_valid__list_count{
+        *reinterpret_cast<const size_t*>(sb.read_elem(sizeof(size_t)))
+    };
+    record.sample_valid.clear();
+    record.sample_valid.reserve(sample_valid__list_count);
+    for (size_t i = 0; i < sample_valid__list_count; i++)
+    {
+        record.sample_valid.emplace_back(*reinterpret_cast<const bool*>(sb.read_elem(sizeof(bool))));
+    }
+    size_t readings__list_count{
+        *reinterpret_cast<const size_t*>(sb.read_elem(sizeof(size_t)))
+    };
+    record.readings.resize(readings__list_count);
+    sb.read_bulk(record.readings.data(), sizeof(uint32_t), readings__list_count);
+}
+
+template<typename Record>
+std::vector<Record> make_records()
+{
+    std::vector<Record> records(k_record_count);
+    for (size_t i = 0; i < k_record_count; i++)
+    {
+        Record& record{ records[i] };
+        record.timestamp = 1700000000000 + i;
+        record.is_online = true;
+        record.has_fault = i % 97 == 0;
+        record.is_moving = i % 2 == 0;
+        record.lights_on = i % 3 == 0;
+        record.speed = static_cast<float>(i % 120);
+        record.sensor_id = static_cast<uint16_t>(i);
+        record.is_calibrated = true;
+        record.label = "unit";
+        for (size_t c = 0; c < 12; c++)
+        {
+            record.channel_active[c] = (i + c) % 4 != 0;
+        }
+        record.sample_valid.resize(k_sample_count);
+        for (size_t s = 0; s < k_sample_count; s++)
+        {
+            record.sample_valid[s] = (i + s) % 7 != 0;
+        }
+        record.readings = { 1, 2, 3, 4 };
+    }
+    return records;
+}
+
+template<typename Record, typename WriteFunc, typename ReadFunc>
+void run(const char* label, std::vector<Record>& records, WriteFunc&& write, ReadFunc&& read, uint64_t& checksum)
+{
+    SerialBuffer sb;
+    sb.mode = SerialBuffer::SBM_WRITE;
+    double write_seconds{ time_seconds([&]() {
+        sb.clear();
+        for (Record& record : records)
+        {
+            write(record, sb);
+        }
+    }) };
+    std::vector<uint8_t> bytes{ sb.buffer };
+
+    Record record{};
+    double read_seconds{ time_seconds([&]() {
+        SerialBuffer read_sb;
+        read_sb.attach_read_view(bytes);
+        for (size_t i = 0; i < records.size(); i++)
+        {
+            read(record, read_sb);
+            checksum += record.sample_valid[i % k_sample_count];
+        }
+    }) };
+
+    std::printf("%-12s %10zu bytes %10.3f ms write %10.3f ms read\n", label, bytes.size(), write_seconds * 1000.0, read_seconds * 1000.0);
+}
+
+
+int main()
+{
+    std::vector<TelemetrySampleDataType> plain_records{ make_records<TelemetrySampleDataType>() };
+    std::vector<BitpackedTelemetrySampleDataType> bitpacked_records{ make_records<BitpackedTelemetrySampleDataType>() };
+
+    uint64_t checksum{ 0 };
+    run("per field", plain_records,
+        [](TelemetrySampleDataType& r, SerialBuffer& sb) { per_field_write(r, sb); },
+        [](TelemetrySampleDataType& r, SerialBuffer& sb) { per_field_read(r, sb); },
+        checksum);
+    run("coalesced", plain_records,
+        [](TelemetrySampleDataType& r, SerialBuffer& sb) { r.write_data_to_serial_buffer(sb); },
+        [](TelemetrySampleDataType& r, SerialBuffer& sb) { r.read_data_from_serial_buffer(sb); },
+        checksum);
+    run("bitpacked", bitpacked_records,
+        [](BitpackedTelemetrySampleDataType& r, SerialBuffer& sb) { r.write_data_to_serial_buffer(sb); },
+        [](BitpackedTelemetrySampleDataType& r, SerialBuffer& sb) { r.read_data_from_serial_buffer(sb); },
+        checksum);
+
+    // Keep results observable so the loops aren't optimized away.
+    return checksum > 0 ? 0 : 1;
+}
@@ -0,0 +1,121 @@
+// Compares sending a `SampleDataType` every frame in full against sending a
+// `write_delta` from the previous frame, when only a few fields and list
+// elements change between frames: bytes per frame and encode/decode time.
+//
+// Build (from repo root):
+//     g++ -std=c++20 -O2 -Igen bench/bench_delta.cpp -o bench_delta
+//     cl /std:c++20 /O2 /EHsc /Igen bench\bench_delta.cpp
+#include <chrono>
+#include <cstdio>
+#include <string>
+#include <vector>
+#include "SampleDataType.hstruct.h"
+
+
+static constexpr size_t k_list_count{ 2000 };
+static constexpr size_t k_frame_count{ 200 };
+
+
+// Advances the state by one frame: a few scalars and a few list elements.
+void step(SampleDataType& state, size_t frame)
+{
+    state.id = static_cast<uint16_t>(frame);
+    state.slider_pos = static_cast<float>(frame) * 0.01f;
+    state.ipv4_addresses[(frame * 7) % k_list_count] = static_cast<uint32_t>(frame);
+    state.children_objs[(frame * 13) % k_list_count].stride_bytes = frame;
+    state.banana_indexes[frame % 8] = static_cast<uint32_t>(frame);
+}
+
+std::vector<SampleDataType> make_frames()
+{
+    SampleDataType state{};
+    state.name = "frame state";
+    state.tokens.resize(k_list_count);
+    state.ipv4_addresses.resize(k_list_count);
+    state.children_objs.resize(k_list_count);
+    for (size_t i = 0; i < k_list_count; i++)
+    {
+        state.tokens[i] = "token number " + std::to_string(i);
+        state.ipv4_addresses[i] = static_cast<uint32_t>(i);
+        state.children_objs[i].name = "child object number " + std::to_string(i);
+    }
+
+    std::vector<SampleDataType> frames;
+    frames.reserve(k_frame_count);
+    for (size_t frame = 0; frame < k_frame_count; frame++)
+    {
+        step(state, frame);
+        frames.push_back(state);
+    }
+    return frames;
+}
+
+template<typename Func>
+double time_seconds(Func&& func)
+{
+    auto start{ std::chrono::steady_clock::now() };
+    func();
+    auto end{ std::chrono::steady_clock::now() };
+    return std::chrono::duration<double>(end - start).count();
+}
+
+
+int main()
+{
+    std::vector<SampleDataType> frames{ make_frames() };
+
+    // Every frame in full.
+    std::vector<std::vector<uint8_t>> full_messages(k_frame_count);
+    double full_write{ time_seconds([&]() {
+        for (size_t f = 1; f < k_frame_count; f++)
+        {
+            SerialBuffer sb;
+            sb.mode = SerialBuffer::SBM_WRITE;
+            frames[f].write_data_to_serial_buffer(sb);
+            full_messages[f] = std::move(sb.buffer);
+        }
+    }) };
+    SampleDataType full_receiver{ frames[0] };
+    double full_read{ time_seconds([&]() {
+        for (size_t f = 1; f < k_frame_count; f++)
+        {
+            SerialBuffer sb;
+            sb.attach_read_view(full_messages[f]);
+            full_receiver.read_data_from_serial_buffer(sb);
+        }
+    }) };
+
+    // Every frame as a delta from the one before.
+    std::vector<std::vector<uint8_t>> delta_messages(k_frame_count);
+    double delta_write{ time_seconds([&]() {
+        for (size_t f = 1; f < k_frame_count; f++)
+        {
+            SerialBuffer sb;
+            sb.mode = SerialBuffer::SBM_WRITE;
+            frames[f].write_delta(frames[f - 1], sb);
+            delta_messages[f] = std::move(sb.buffer);
+        }
+    }) };
+    SampleDataType delta_receiver{ frames[0] };
+    double delta_read{ time_seconds([&]() {
+        for (size_t f = 1; f < k_frame_count; f++)
+        {
+            SerialBuffer sb;
+            sb.attach_read_view(delta_messages[f]);
+            delta_receiver.apply_delta(sb);
+        }
+    }) };
+
+    if (!(delta_receiver == frames.back()) || !(full_receiver == frames.back()))
+    {
+        std::printf("Receivers don't match the last frame!\n");
+        return 1;
+    }
+
+    size_t messages{ k_frame_count - 1 };
+    std::printf("full:   %10zu bytes/frame %10.3f us write %10.3f us read\n", full_messages.back().size(),
+                full_write * 1e6 / messages, full_read * 1e6 / messages);
+    std::printf("delta:  %10zu bytes/frame %10.3f us write %10.3f us read\n", delta_messages.back().size(),
+                delta_write * 1e6 / messages, delta_read * 1e6 / messages);
+    return 0;
+}
@@ -0,0 +1,103 @@
+// Compares passing a small `SampleDataType` through a file
+// (`serialize_dump`/`serialize_load`) against the in-memory entry points
+// (`serialize_to`/`serialize_into`/`deserialize_from`) reusing their
+// buffers, as a request handler would.
+//
+// Build (from repo root):
+//     g++ -std=c++20 -O2 -Igen bench/bench_in_memory.cpp -o bench_in_memory
+//     cl /std:c++20 /O2 /EHsc /Igen bench\bench_in_memory.cpp
+#include <chrono>
+#include <cstdio>
+#include <cstdlib>
+#include <new>
+#include <string>
+#include "SampleDataType.hstruct.h"
+
+
+static constexpr size_t k_repetitions{ 20000 };
+
+// Kept out of line: once GCC inlines only one of them, it sees `malloc` or
+// `free` paired with `operator new`/`delete` and warns
+// (-Wmismatched-new-delete).
+#if defined(__GNUC__) && !defined(__clang__)
+#define BENCH_NOINLINE __attribute__((noinline))
+#else
+#define BENCH_NOINLINE
+#endif
+
+// Counts every global heap allocation.
+static size_t g_allocation_count{ 0 };
+
+BENCH_NOINLINE void* operator new(size_t size)
+{
+    g_allocation_count++;
+    if (void* memory{ std::malloc(size == 0 ? 1 : size) })
+    {
+        return memory;
+    }
+    throw std::bad_alloc{};
+}
+
+BENCH_NOINLINE void operator delete(void* memory) noexcept
+{
+    std::free(memory);
+}
+
+BENCH_NOINLINE void operator delete(void* memory, size_t) noexcept
+{
+    std::free(memory);
+}
+
+
+template<typename Func>
+void report(const char* label, Func&& func)
+{
+    func();  // Warm up, so buffers have grown to fit.
+    size_t allocations{ g_allocation_count };
+    auto start{ std::chrono::steady_clock::now() };
+    for (size_t r = 0; r < k_repetitions; r++)
+    {
+        func();
+    }
+    auto end{ std::chrono::steady_clock::now() };
+    allocations = g_allocation_count - allocations;
+    double ns{ std::chrono::duration<double, std::nano>(end - start).count() / k_repetitions };
+    std::printf("%-24s %10.1f ns %10.2f allocations per round trip\n", label, ns, static_cast<double>(allocations) / k_repetitions);
+}
+
+
+int main()
+{
+    SampleDataType source{};
+    source.name = "request";
+    source.tokens = { "GET", "/index.html", "HTTP/1.1" };
+    source.children_objs.resize(4);
+
+    uint64_t checksum{ 0 };
+    std::string fname{ "bench_in_memory.bin" };
+    report("dump + load (file)", [&]() {
+        source.serialize_dump(fname);
+        SampleDataType record;
+        record.serialize_load(fname);
+        checksum += record.tokens.size();
+    });
+
+    std::vector<uint8_t> bytes;
+    SampleDataType record;
+    report("serialize_to + from", [&]() {
+        source.serialize_to(bytes);
+        record.deserialize_from(bytes);
+        checksum += record.tokens.size();
+    });
+
+    std::vector<uint8_t> fixed(source.serialized_size() + SchemaHeader::k_size);
+    report("serialize_into + from", [&]() {
+        size_t size{ source.serialize_into(fixed) };
+        record.deserialize_from({ fixed.data(), size });
+        checksum += record.tokens.size();
+    });
+    std::remove(fname.c_str());
+
+    // Keep results observable so the loops aren't optimized away.
+    return checksum == 3 * 3 * (k_repetitions + 1) ? 0 : 1;
+}
@@ -0,0 +1,67 @@
+// Compares a full `read_data_from_serial_buffer` against `_lazy::attach` when
+// only a top-level scalar is needed from a record with large `lazy` fields.
+//
+// Build (from repo root):
+//     g++ -std=c++20 -O2 -Igen bench/bench_lazy.cpp -o bench_lazy
+//     cl /std:c++20 /O2 /EHsc /Igen bench\bench_lazy.cpp
+#include <chrono>
+#include <cstdio>
+#include <string>
+#include "LazySampleDataType.hstruct.h"
+
+
+static constexpr size_t k_child_count{ 100000 };
+static constexpr size_t k_repetitions{ 100 };
+
+
+template<typename Func>
+double time_seconds(Func&& func)
+{
+    auto start{ std::chrono::steady_clock::now() };
+    for (size_t r = 0; r < k_repetitions; r++)
+    {
+        func();
+    }
+    auto end{ std::chrono::steady_clock::now() };
+    return std::chrono::duration<double>(end - start).count() / k_repetitions;
+}
+
+
+int main()
+{
+    LazySampleDataType source{};
+    source.memory_pos = 42;
+    source.ipv4_addresses.resize(k_child_count);
+    source.children_objs.resize(k_child_count);
+    for (size_t i = 0; i < k_child_count; i++)
+    {
+        source.ipv4_addresses[i] = static_cast<uint32_t>(i);
+        source.children_objs[i].name = "child " + std::to_string(i);
+    }
+
+    SerialBuffer sb;
+    sb.mode = SerialBuffer::SBM_WRITE;
+    source.write_data_to_serial_buffer(sb);
+    std::span<const uint8_t> bytes{ sb.buffer };
+
+    uint64_t checksum{ 0 };
+    double full_seconds{ time_seconds([&]() {
+        SerialBuffer read_sb;
+        read_sb.attach_read_view(bytes);
+        LazySampleDataType record;
+        record.read_data_from_serial_buffer(read_sb);
+        checksum += record.memory_pos;
+    }) };
+    double lazy_seconds{ time_seconds([&]() {
+        LazySampleDataType_lazy record;
+        record.attach(bytes);
+        checksum += record.memory_pos;
+    }) };
+
+    std::printf("record size:  %zu bytes\n", bytes.size());
+    std::printf("full decode:  %10.3f us\n", full_seconds * 1e6);
+    std::printf("lazy attach:  %10.3f us\n", lazy_seconds * 1e6);
+
+    // Keep results observable so the loops aren't optimized away.
+    return checksum == 2 * k_repetitions * source.memory_pos ? 0 : 1;
+}
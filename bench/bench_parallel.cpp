@@ -0,0 +1,93 @@
+// Compares writing and reading a large `parallel` list of structs on the
+// calling thread (`parallel_threshold` past the element count) against
+// spreading it over the hardware threads (default threshold).
+//
+// Build (from repo root):
+//     g++ -std=c++20 -O2 -pthread -Igen bench/bench_parallel.cpp -o bench_parallel
+//     cl /std:c++20 /O2 /EHsc /Igen bench\bench_parallel.cpp
+#include <chrono>
+#include <cstdint>
+#include <cstdio>
+#include <string>
+#include <thread>
+#include "ParallelSampleDataType.hstruct.h"
+
+
+static constexpr size_t k_child_count{ 500000 };
+static constexpr size_t k_repetitions{ 10 };
+
+
+template<typename Func>
+double time_seconds(Func&& func)
+{
+    auto start{ std::chrono::steady_clock::now() };
+    for (size_t r = 0; r < k_repetitions; r++)
+    {
+        func();
+    }
+    auto end{ std::chrono::steady_clock::now() };
+    return std::chrono::duration<double>(end - start).count() / k_repetitions;
+}
+
+std::vector<uint8_t> write_record(ParallelSampleDataType& record, size_t parallel_threshold)
+{
+    SerialBuffer sb;
+    sb.mode = SerialBuffer::SBM_WRITE;
+    sb.parallel_threshold = parallel_threshold;
+    sb.reserve(record.serialized_size());
+    record.write_data_to_serial_buffer(sb);
+    return std::move(sb.buffer);
+}
+
+void read_record(std::span<const uint8_t> bytes, size_t parallel_threshold, ParallelSampleDataType& record)
+{
+    SerialBuffer sb;
+    sb.attach_read_view(bytes);
+    sb.parallel_threshold = parallel_threshold;
+    record.read_data_from_serial_buffer(sb);
+}
+
+
+int main()
+{
+    ParallelSampleDataType source{};
+    source.name = "parallel";
+    source.children_objs.resize(k_child_count);
+    for (size_t i = 0; i < k_child_count; i++)
+    {
+        source.children_objs[i].name = "child object number " + std::to_string(i);
+        source.children_objs[i].stride_bytes = i;
+    }
+
+    std::vector<uint8_t> serial_bytes{ write_record(source, SIZE_MAX) };
+    std::vector<uint8_t> parallel_bytes{ write_record(source, SerialBuffer::k_default_parallel_threshold) };
+    if (serial_bytes != parallel_bytes)
+    {
+        std::printf("Serial and parallel writes differ!\n");
+        return 1;
+    }
+
+    double serial_write{ time_seconds([&]() { write_record(source, SIZE_MAX); }) };
+    double parallel_write{ time_seconds([&]() { write_record(source, SerialBuffer::k_default_parallel_threshold); }) };
+
+    uint64_t checksum{ 0 };
+    double serial_read{ time_seconds([&]() {
+        ParallelSampleDataType record;
+        read_record(serial_bytes, SIZE_MAX, record);
+        checksum += record.children_objs.back().stride_bytes;
+    }) };
+    double parallel_read{ time_seconds([&]() {
+        ParallelSampleDataType record;
+        read_record(serial_bytes, SerialBuffer::k_default_parallel_threshold, record);
+        checksum += record.children_objs.back().stride_bytes;
+    }) };
+
+    std::printf("record size:     %zu bytes, %u hardware threads\n", serial_bytes.size(), std::thread::hardware_concurrency());
+    std::printf("serial write:    %10.3f ms\n", serial_write * 1000.0);
+    std::printf("parallel write:  %10.3f ms\n", parallel_write * 1000.0);
+    std::printf("serial read:     %10.3f ms\n", serial_read * 1000.0);
+    std::printf("parallel read:   %10.3f ms\n", parallel_read * 1000.0);
+
+    // Keep results observable so the loops aren't optimized away.
+    return checksum == 2 * k_repetitions * (k_child_count - 1) ? 0 : 1;
+}
@@ -0,0 +1,142 @@
+// Compares deserializing `SampleDataType` (every string and vector on the
+// heap) against `PmrSampleDataType` (same fields and wire format, `pmr`)
+// loaded into a reused `std::pmr::monotonic_buffer_resource`.
+//
+// Build (from repo root):
+//     g++ -std=c++20 -O2 -Igen bench/bench_pmr.cpp -o bench_pmr
+//     cl /std:c++20 /O2 /EHsc /Igen bench\bench_pmr.cpp
+#include <chrono>
+#include <cstdio>
+#include <cstdlib>
+#include <new>
+#include <string>
+#include "SampleDataType.hstruct.h"
+#include "PmrSampleDataType.hstruct.h"
+
+
+static constexpr size_t k_token_count{ 100000 };
+static constexpr size_t k_child_count{ 50000 };
+static constexpr size_t k_repetitions{ 20 };
+
+// Counts every global heap allocation.
+static size_t g_allocation_count{ 0 };
+
+void* operator new(size_t size)
+{
+    g_allocation_count++;
+    if (void* memory{ std::malloc(size == 0 ? 1 : size) })
+    {
+        return memory;
+    }
+    throw std::bad_alloc{};
+}
+
+void operator delete(void* memory) noexcept
+{
+    std::free(memory);
+}
+
+void operator delete(void* memory, size_t) noexcept
+{
+    std::free(memory);
+}
+
+// Counts the allocations an arena makes from its upstream resource (which
+// uses the aligned `operator new` overloads).
+struct CountingResource : std::pmr::memory_resource
+{
+    size_t allocation_count{ 0 };
+
+    void* do_allocate(size_t bytes, size_t alignment) override
+    {
+        allocation_count++;
+        return std::pmr::new_delete_resource()->allocate(bytes, alignment);
+    }
+
+    void do_deallocate(void* memory, size_t bytes, size_t alignment) override
+    {
+        std::pmr::new_delete_resource()->deallocate(memory, bytes, alignment);
+    }
+
+    bool do_is_equal(const std::pmr::memory_resource& other) const noexcept override
+    {
+        return this == &other;
+    }
+};
+
+
+template<typename Func>
+double time_seconds(Func&& func)
+{
+    auto start{ std::chrono::steady_clock::now() };
+    for (size_t r = 0; r < k_repetitions; r++)
+    {
+        func();
+    }
+    auto end{ std::chrono::steady_clock::now() };
+    return std::chrono::duration<double>(end - start).count() / k_repetitions;
+}
+
+void report(const char* label, double seconds, size_t allocations)
+{
+    std::printf("%-16s %10.3f ms %12zu allocations per load\n", label, seconds * 1000.0, allocations / k_repetitions);
+}
+
+
+int main()
+{
+    // Strings longer than the small string buffer, so each one allocates.
+    SampleDataType source{};
+    source.name = "A name that doesn't fit in the small string buffer.";
+    source.tokens.resize(k_token_count);
+    for (size_t i = 0; i < k_token_count; i++)
+    {
+        source.tokens[i] = "token number " + std::to_string(i) + " of the list";
+    }
+    source.children_objs.resize(k_child_count);
+    for (size_t i = 0; i < k_child_count; i++)
+    {
+        source.children_objs[i].name = "child object number " + std::to_string(i);
+        source.children_objs[i].stride_bytes = i;
+    }
+
+    SerialBuffer sb;
+    sb.mode = SerialBuffer::SBM_WRITE;
+    source.write_data_to_serial_buffer(sb);
+    std::span<const uint8_t> bytes{ sb.buffer };
+
+    uint64_t checksum{ 0 };
+    size_t heap_allocations{ g_allocation_count };
+    double heap_seconds{ time_seconds([&]() {
+        SerialBuffer read_sb;
+        read_sb.attach_read_view(bytes);
+        SampleDataType record;
+        record.read_data_from_serial_buffer(read_sb);
+        checksum += record.children_objs.back().stride_bytes;
+    }) };
+    heap_allocations = g_allocation_count - heap_allocations;
+
+    // The arena keeps its memory between loads, `release` frees everything
+    // allocated from it at once.
+    CountingResource upstream;
+    std::pmr::monotonic_buffer_resource arena{ &upstream };
+    size_t arena_allocations{ g_allocation_count };
+    double arena_seconds{ time_seconds([&]() {
+        SerialBuffer read_sb;
+        read_sb.attach_read_view(bytes);
+        {
+            PmrSampleDataType record{ &arena };
+            record.read_data_from_serial_buffer(read_sb);
+            checksum += record.children_objs.back().stride_bytes;
+        }
+        arena.release();
+    }) };
+    arena_allocations = g_allocation_count - arena_allocations + upstream.allocation_count;
+
+    std::printf("record size:     %zu bytes\n", bytes.size());
+    report("heap load", heap_seconds, heap_allocations);
+    report("arena load", arena_seconds, arena_allocations);
+
+    // Keep results observable so the loops aren't optimized away.
+    return checksum == 2 * k_repetitions * (k_child_count - 1) ? 0 : 1;
+}
@@ -0,0 +1,107 @@
+// Compares the per-element primitive list serialization that the generator
+// used to emit against the bulk `write_bulk`/`read_bulk` path.
+//
+// Build (from repo root):
+//     g++ -std=c++20 -O2 -Igen bench/bench_primitive_arrays.cpp -o bench_primitive_arrays
+//     cl /std:c++20 /O2 /EHsc /Igen bench\bench_primitive_arrays.cpp
+#include <chrono>
+#include <cstdio>
+#include <vector>
+#include "serial_buffer.h"
+
+
+static constexpr size_t k_elem_count{ 1 << 22 };
+static constexpr size_t k_repetitions{ 10 };
+
+
+template<typename Func>
+double time_seconds(Func&& func)
+{
+    auto start{ std::chrono::steady_clock::now() };
+    for (size_t r = 0; r < k_repetitions; r++)
+    {
+        func();
+    }
+    auto end{ std::chrono::steady_clock::now() };
+    return std::chrono::duration<double>(end - start).count() / k_repetitions;
+}
+
+void per_element_write(std::vector<uint32_t>& values, SerialBuffer& sb)
+{
+    size_t values__list_count{ values.size() };
+    sb.write_elem(&values__list_count, sizeof(size_t));
+    for (size_t i = 0; i < values__list_count; i++)
+    {
+        sb.write_elem(&values[i], sizeof(uint32_t));
+    }
+}
+
+void per_element_read(std::vector<uint32_t>& values, SerialBuffer& sb)
+{
+    size_t values__list_count{
+        *reinterpret_cast<const size_t*>(sb.read_elem(sizeof(size_t)))
+    };
+    values.clear();
+    values.reserve(values__list_count);
+    for (size_t i = 0; i < values__list_count; i++)
+    {
+        values.emplace_back(*reinterpret_cast<const uint32_t*>(sb.read_elem(sizeof(uint32_t))));
+    }
+}
+
+void bulk_write(std::vector<uint32_t>& values, SerialBuffer& sb)
+{
+    size_t values__list_count{ values.size() };
+    sb.write_elem(&values__list_count, sizeof(size_t));
+    sb.write_bulk(values.data(), sizeof(uint32_t), values__list_count);
+}
+
+void bulk_read(std::vector<uint32_t>& values, SerialBuffer& sb)
+{
+    size_t values__list_count{
+        *reinterpret_cast<const size_t*>(sb.read_elem(sizeof(size_t)))
+    };
+    values.resize(values__list_count);
+    sb.read_bulk(values.data(), sizeof(uint32_t), values__list_count);
+}
+
+void report(const char* label, double seconds)
+{
+    double megabytes{ (k_elem_count * sizeof(uint32_t)) / (1024.0 * 1024.0) };
+    std::printf("%-20s %10.3f ms %10.1f MB/s\n", label, seconds * 1000.0, megabytes / seconds);
+}
+
+
+int main()
+{
+    std::vector<uint32_t> source(k_elem_count);
+    for (size_t i = 0; i < k_elem_count; i++)
+    {
+        source[i] = static_cast<uint32_t>(i * 2654435761u);
+    }
+    std::vector<uint32_t> dest;
+
+    SerialBuffer sb;
+    report("per-element write", time_seconds([&]() {
+        sb.buffer.clear();
+        sb.mode = SerialBuffer::SBM_WRITE;
+        per_element_write(source, sb);
+    }));
+    report("bulk write", time_seconds([&]() {
+        sb.buffer.clear();
+        sb.mode = SerialBuffer::SBM_WRITE;
+        bulk_write(source, sb);
+    }));
+
+    report("per-element read", time_seconds([&]() {
+        sb.attach_read_view(sb.buffer);
+        per_element_read(dest, sb);
+    }));
+    report("bulk read", time_seconds([&]() {
+        sb.attach_read_view(sb.buffer);
+        bulk_read(dest, sb);
+    }));
+
+    // Keep results observable so the loops aren't optimized away.
+    return (dest == source) ? 0 : 1;
+}
@@ -0,0 +1,145 @@
+// Compares the fixed-width wire format against `varint` fields: encoded size
+// and encode/decode throughput for typical (mostly small) integers.
+//
+// Build (from repo root):
+//     g++ -std=c++20 -O2 -Igen bench/bench_varint.cpp -o bench_varint
+//     cl /std:c++20 /O2 /EHsc /Igen bench\bench_varint.cpp
+#include <chrono>
+#include <cstdio>
+#include <vector>
+#include "serial_buffer.h"
+
+
+static constexpr size_t k_elem_count{ 1 << 22 };
+static constexpr size_t k_repetitions{ 10 };
+
+
+template<typename Func>
+double time_seconds(Func&& func)
+{
+    auto start{ std::chrono::steady_clock::now() };
+    for (size_t r = 0; r < k_repetitions; r++)
+    {
+        func();
+    }
+    auto end{ std::chrono::steady_clock::now() };
+    return std::chrono::duration<double>(end - start).count() / k_repetitions;
+}
+
+// What the generator emits for `uint64[]` and `int64[]`.
+void fixed_write(const std::vector<uint64_t>& unsigned_values, const std::vector<int64_t>& signed_values, SerialBuffer& sb)
+{
+    size_t unsigned_values__list_count{ unsigned_values.size() };
+    sb.write_elem(&unsigned_values__list_count, sizeof(size_t));
+    sb.write_bulk(unsigned_values.data(), sizeof(uint64_t), unsigned_values__list_count);
+    size_t signed_values__list_count{ signed_values.size() };
+    sb.write_elem(&signed_values__list_count, sizeof(size_t));
+    sb.write_bulk(signed_values.data(), sizeof(int64_t), signed_values__list_count);
+}
+
+void fixed_read(std::vector<uint64_t>& unsigned_values, std::vector<int64_t>& signed_values, SerialBuffer& sb)
+{
+    size_t unsigned_values__list_count{
+        *reinterpret_cast<const size_t*>(sb.read_elem(sizeof(size_t)))
+    };
+    unsigned_values.resize(unsigned_values__list_count);
+    sb.read_bulk(unsigned_values.data(), sizeof(uint64_t), unsigned_values__list_count);
+    size_t signed_values__list_count{
+        *reinterpret_cast<const size_t*>(sb.read_elem(sizeof(size_t)))
+    };
+    signed_values.resize(signed_values__list_count);
+    sb.read_bulk(signed_values.data(), sizeof(int64_t), signed_values__list_count);
+}
+
+// What the generator emits for `varint uint64[]` and `varint int64[]`.
+void varint_write(const std::vector<uint64_t>& unsigned_values, const std::vector<int64_t>& signed_values, SerialBuffer& sb)
+{
+    size_t unsigned_values__list_count{ unsigned_values.size() };
+    sb.write_varint(unsigned_values__list_count);
+    for (size_t i = 0; i < unsigned_values__list_count; i++)
+    {
+        sb.write_varint(unsigned_values[i]);
+    }
+    size_t signed_values__list_count{ signed_values.size() };
+    sb.write_varint(signed_values__list_count);
+    for (size_t i = 0; i < signed_values__list_count; i++)
+    {
+        sb.write_varint(zigzag_encode(signed_values[i]));
+    }
+}
+
+void varint_read(std::vector<uint64_t>& unsigned_values, std::vector<int64_t>& signed_values, SerialBuffer& sb)
+{
+    size_t unsigned_values__list_count{ sb.read_varint() };
+    unsigned_values.clear();
+    unsigned_values.reserve(unsigned_values__list_count);
+    for (size_t i = 0; i < unsigned_values__list_count; i++)
+    {
+        unsigned_values.emplace_back(static_cast<uint64_t>(sb.read_varint()));
+    }
+    size_t signed_values__list_count{ sb.read_varint() };
+    signed_values.clear();
+    signed_values.reserve(signed_values__list_count);
+    for (size_t i = 0; i < signed_values__list_count; i++)
+    {
+        signed_values.emplace_back(static_cast<int64_t>(zigzag_decode(sb.read_varint())));
+    }
+}
+
+void report(const char* label, double seconds)
+{
+    double megabytes{ (2 * k_elem_count * sizeof(uint64_t)) / (1024.0 * 1024.0) };
+    std::printf("%-16s %10.3f ms %10.1f MB/s (in-memory size)\n", label, seconds * 1000.0, megabytes / seconds);
+}
+
+
+int main()
+{
+    // Mostly small values with the occasional large one, like ids, counts
+    // and deltas tend to be.
+    std::vector<uint64_t> unsigned_source(k_elem_count);
+    std::vector<int64_t> signed_source(k_elem_count);
+    uint64_t state{ 88172645463325252ull };
+    for (size_t i = 0; i < k_elem_count; i++)
+    {
+        state ^= state << 13;
+        state ^= state >> 7;
+        state ^= state << 17;
+        uint64_t magnitude{ (i % 64 == 0) ? state : state % 1000 };
+        unsigned_source[i] = magnitude;
+        signed_source[i] = (state & 1) ? -static_cast<int64_t>(magnitude % 100000) : static_cast<int64_t>(magnitude % 100000);
+    }
+    std::vector<uint64_t> unsigned_dest;
+    std::vector<int64_t> signed_dest;
+
+    SerialBuffer fixed_sb;
+    SerialBuffer varint_sb;
+    report("fixed write", time_seconds([&]() {
+        fixed_sb.buffer.clear();
+        fixed_sb.mode = SerialBuffer::SBM_WRITE;
+        fixed_write(unsigned_source, signed_source, fixed_sb);
+    }));
+    report("varint write", time_seconds([&]() {
+        varint_sb.buffer.clear();
+        varint_sb.mode = SerialBuffer::SBM_WRITE;
+        varint_write(unsigned_source, signed_source, varint_sb);
+    }));
+
+    report("fixed read", time_seconds([&]() {
+        fixed_sb.attach_read_view(fixed_sb.buffer);
+        fixed_read(unsigned_dest, signed_dest, fixed_sb);
+    }));
+    bool fixed_ok{ unsigned_dest == unsigned_source && signed_dest == signed_source };
+    report("varint read", time_seconds([&]() {
+        varint_sb.attach_read_view(varint_sb.buffer);
+        varint_read(unsigned_dest, signed_dest, varint_sb);
+    }));
+    bool varint_ok{ unsigned_dest == unsigned_source && signed_dest == signed_source };
+
+    std::printf("fixed size:  %zu bytes\n", fixed_sb.buffer.size());
+    std::printf("varint size: %zu bytes (%.1f%%)\n", varint_sb.buffer.size(),
+                100.0 * varint_sb.buffer.size() / fixed_sb.buffer.size());
+
+    // Keep results observable so the loops aren't optimized away.
+    return (fixed_ok && varint_ok) ? 0 : 1;
+}
@@ -1,18 +1,406 @@
+import json
+import math
+import mmap
+import struct
+import sys
 from argparse import ArgumentParser
-from dataclasses import dataclass
-from enum import Enum
+from typing import Callable, Dict, List, Optional, TextIO, Tuple
 
-# Arg parser.
-parser = ArgumentParser()
-parser.add_argument("-f", "--hstruct-file", dest="hstruct_fname", required=True,
-                    help="input .hstruct file to use as schema")
-parser.add_argument("-b", "--bin-file", dest="bin_fname", required=True,
-                    help="input binary file to convert to JSON")
-args = parser.parse_args()
+from hstruct_compression import CompressedReader, is_compressed
+from hstruct_records import RecordFileReader, is_record_file
+from hstruct_schema import (
+    LENGTH_BYTE_SIZE,
+    LENGTH_STRUCT,
+    LIST_CHUNK_ELEM_COUNT,
+    OFFSET_TABLE_ENTRY_BYTE_SIZE,
+    SCHEMA_HEADER_FORMAT,
+    SCHEMA_HEADER_MAGIC,
+    DataType,
+    SchemaIR,
+    StructLayout,
+    bit_byte_count,
+    field_is_bit_flag,
+    field_varint_elems,
+    field_varint_is_signed,
+    load_schema_ir,
+    primitive_run_struct,
+    struct_is_packed,
+    zigzag_decode,
+)
 
+# Numpy is optional. Without it primitive lists are unpacked with `struct`.
+try:
+    import numpy
+except ImportError:
+    numpy = None
 
-def main():
-    pass
+
+# Output is flushed to the file handle in pieces of roughly this size.
+OUTPUT_FLUSH_BYTES = 1 << 20
+
+INDENTATION = "    "
+
+SCHEMA_HEADER_STRUCT = struct.Struct(SCHEMA_HEADER_FORMAT)
+
+
+def float_to_json(value: float) -> str:
+    # Matches `json.dumps`, which spells out non-finite floats.
+    return repr(value) if math.isfinite(value) else json.dumps(value)
+
+
+def primitive_to_json_func(field_type: DataType) -> Callable:
+    if field_type.struct_format == '?':
+        return lambda value: 'true' if value else 'false'
+    if field_type.struct_format == 'f':
+        return float_to_json
+    return str
+
+
+class JsonStreamDecoder:
+
+    def __init__(self, ir: SchemaIR, data, out: TextIO):
+        self.layouts = ir.layouts
+        self.out = out
+        self.pending: List[str] = []
+        self.pending_bytes = 0
+        self.attach(data)
+
+    def attach(self, data):
+        # `data` is the serialized bytes, or a `CompressedReader` whose chunks
+        # get decompressed as decoding reaches them. Either way positions are
+        # offsets into the uncompressed bytes, and `self.data` holds the ones
+        # from `self.base` on that are currently available.
+        if isinstance(data, CompressedReader):
+            self.reader = data
+            self.size = data.uncompressed_size
+            self.data = b""
+            self.window_chunks: Dict[int, bytes] = {}
+        else:
+            self.reader = None
+            self.size = len(data)
+            self.data = data
+        self.base = 0
+
+    # Output.
+    def emit(self, text: str):
+        self.pending.append(text)
+        self.pending_bytes += len(text)
+        if self.pending_bytes >= OUTPUT_FLUSH_BYTES:
+            self.flush()
+
+    def flush(self):
+        self.out.write("".join(self.pending))
+        self.pending.clear()
+        self.pending_bytes = 0
+
+    # Reading.
+    def check_bounds(self, pos: int, num_bytes: int):
+        # Also makes `[pos, pos + num_bytes)` available in `self.data`.
+        if self.base <= pos and pos + num_bytes <= self.base + len(self.data):
+            return
+        assert pos + num_bytes <= self.size, \
+            f"Binary file is truncated: wanted {num_bytes} bytes at offset {pos}, file is {self.size} bytes."
+        if num_bytes > 0:
+            self.load_window(pos, num_bytes)
+
+    def load_window(self, pos: int, num_bytes: int):
+        # Only the chunks the bytes are in stay decompressed, so memory use
+        # is bounded by the chunk size and the largest single value.
+        first = self.reader.chunk_index_for_offset(pos)
+        last = self.reader.chunk_index_for_offset(pos + num_bytes - 1)
+        self.window_chunks = {i: self.window_chunks.get(i) or self.reader.read_chunk(i) for i in range(first, last + 1)}
+        self.data = self.window_chunks[first] if first == last else b"".join(self.window_chunks.values())
+        self.base = first * self.reader.chunk_size
+
+    def read_varint(self, pos: int) -> Tuple[int, int]:
+        value = 0
+        shift = 0
+        while True:
+            self.check_bounds(pos, 1)
+            byte = self.data[pos - self.base]
+            pos += 1
+            value |= (byte & 0x7f) << shift
+            if byte < 0x80:
+                return value, pos
+            shift += 7
+            assert shift < 64, f"Varint longer than 10 bytes at offset {pos}."
+
+    def read_length(self, field_type: DataType, pos: int) -> Tuple[int, int]:
+        # Returns the length and the position right after it.
+        if field_type.is_varint:
+            return self.read_varint(pos)
+        self.check_bounds(pos, LENGTH_BYTE_SIZE)
+        return LENGTH_STRUCT.unpack_from(self.data, pos - self.base)[0], pos + LENGTH_BYTE_SIZE
+
+    def read_varint_value(self, field_type: DataType, pos: int) -> Tuple[int, int]:
+        value, pos = self.read_varint(pos)
+        if field_varint_is_signed(field_type):
+            value = zigzag_decode(value)
+        return value, pos
+
+    def unpack_bits(self, pos: int, count: int) -> List[bool]:
+        # Bitpacked bools, lowest bit first.
+        self.check_bounds(pos, bit_byte_count(count))
+        start = pos - self.base
+        bits = int.from_bytes(self.data[start : start + bit_byte_count(count)], "little")
+        return [(bits >> i) & 1 == 1 for i in range(count)]
+
+    def unpack_primitive_run(self, field_type: DataType, pos: int, count: int) -> List:
+        self.check_bounds(pos, field_type.byte_size * count)
+        if numpy is not None and count > 1:
+            dtype = numpy.dtype(f"<{field_type.struct_format}")
+            return numpy.frombuffer(self.data, dtype=dtype, count=count, offset=pos - self.base).tolist()
+        return list(primitive_run_struct(field_type.struct_format, count).unpack_from(self.data, pos - self.base))
+
+    # Decoding. Each method writes the JSON for one value and returns the
+    # position right after it in the binary data.
+    def decode_primitive_list(self, field_type: DataType, pos: int, count: int) -> int:
+        to_json = primitive_to_json_func(field_type)
+        self.emit("[")
+        remaining = count
+        first = True
+        while remaining > 0:
+            chunk_count = min(remaining, LIST_CHUNK_ELEM_COUNT)
+            values = self.unpack_primitive_run(field_type, pos, chunk_count)
+            if not first:
+                self.emit(", ")
+            self.emit(", ".join(map(to_json, values)))
+            pos += field_type.byte_size * chunk_count
+            remaining -= chunk_count
+            first = False
+        self.emit("]")
+        return pos
+
+    def decode_varint_list(self, field_type: DataType, pos: int, count: int) -> int:
+        self.emit("[")
+        for start in range(0, count, LIST_CHUNK_ELEM_COUNT):
+            values = []
+            for _ in range(min(count - start, LIST_CHUNK_ELEM_COUNT)):
+                value, pos = self.read_varint_value(field_type, pos)
+                values.append(value)
+            if start > 0:
+                self.emit(", ")
+            self.emit(", ".join(map(str, values)))
+        self.emit("]")
+        return pos
+
+    def decode_string(self, field_type: DataType, pos: int) -> int:
+        str_length, pos = self.read_length(field_type, pos)
+        self.check_bounds(pos, str_length)
+        start = pos - self.base
+        text = self.data[start : start + str_length].decode("utf-8", errors="surrogateescape")
+        self.emit(json.dumps(text))
+        return pos + str_length
+
+    def decode_single(self, field_type: DataType, pos: int, indent: int, nested: Dict[str, StructLayout]) -> int:
+        if field_type.is_string:
+            return self.decode_string(field_type, pos)
+        if field_varint_elems(field_type):
+            value, pos = self.read_varint_value(field_type, pos)
+            self.emit(str(value))
+            return pos
+        if field_type.is_builtin_primitive:
+            value = self.unpack_primitive_run(field_type, pos, 1)[0]
+            self.emit(primitive_to_json_func(field_type)(value))
+            return pos + field_type.byte_size
+        # `nested` has the layouts of the enclosing struct's nested structs,
+        # which are older ones in older files. A struct nesting itself is
+        # always in its current layout.
+        layout = nested.get(field_type.type_name) or self.layouts[field_type.type_name]
+        return self.decode_struct(layout, pos, indent)
+
+    def decode_field(self, field_type: DataType, pos: int, indent: int, nested: Dict[str, StructLayout]) -> int:
+        if field_type.is_lazy:
+            # Byte size prefix, checked against what the field decodes to.
+            self.check_bounds(pos, LENGTH_BYTE_SIZE)
+            lazy_size = LENGTH_STRUCT.unpack_from(self.data, pos - self.base)[0]
+            pos += LENGTH_BYTE_SIZE
+            end_pos = self.decode_field_value(field_type, pos, indent, nested)
+            assert end_pos - pos == lazy_size, \
+                f"Lazy field at offset {pos} is {end_pos - pos} bytes, but its size prefix says {lazy_size}."
+            return end_pos
+        return self.decode_field_value(field_type, pos, indent, nested)
+
+    def decode_field_value(self, field_type: DataType, pos: int, indent: int, nested: Dict[str, StructLayout]) -> int:
+        if not field_type.is_list_of_type:
+            return self.decode_single(field_type, pos, indent, nested)
+
+        count = field_type.list_count
+        if count == -1:
+            count, pos = self.read_length(field_type, pos)
+
+        if field_varint_elems(field_type):
+            return self.decode_varint_list(field_type, pos, count)
+        if field_type.is_bitpacked:
+            values = self.unpack_bits(pos, count)
+            self.emit(f"[{', '.join('true' if value else 'false' for value in values)}]")
+            return pos + bit_byte_count(count)
+        if field_type.byte_size > 0:
+            return self.decode_primitive_list(field_type, pos, count)
+
+        # List of strings or HStructs.
+        if field_type.is_parallel:
+            # Element offset table, checked against what each element decodes to.
+            table_pos = pos
+            self.check_bounds(table_pos, count * OFFSET_TABLE_ENTRY_BYTE_SIZE)
+            pos += count * OFFSET_TABLE_ENTRY_BYTE_SIZE
+            elems_start = pos
+        if count == 0:
+            self.emit("[]")
+            return pos
+        elem_pad = INDENTATION * (indent + 1)
+        self.emit("[\n")
+        for i in range(count):
+            if i > 0:
+                self.emit(",\n")
+            self.emit(elem_pad)
+            pos = self.decode_single(field_type, pos, indent + 1, nested)
+            if field_type.is_parallel:
+                entry_pos = table_pos + i * OFFSET_TABLE_ENTRY_BYTE_SIZE
+                self.check_bounds(entry_pos, OFFSET_TABLE_ENTRY_BYTE_SIZE)
+                elem_end = LENGTH_STRUCT.unpack_from(self.data, entry_pos - self.base)[0]
+                assert pos - elems_start == elem_end, \
+                    f"Element {i} at offset {elems_start} ends at {pos - elems_start}, but its offset table says {elem_end}."
+        self.emit(f"\n{INDENTATION * indent}]")
+        return pos
+
+    def decode_struct(self, layout: StructLayout, pos: int, indent: int) -> int:
+        if struct_is_packed(layout.struct):
+            return self.decode_packed_struct(layout, pos, indent)
+
+        member_pad = INDENTATION * (indent + 1)
+        self.emit("{\n")
+        first = True
+        for group in layout.runs:
+            # Adjacent bitpacked bools share their bytes.
+            if field_is_bit_flag(group[0].field_type):
+                flags = self.unpack_bits(pos, len(group))
+                pos += bit_byte_count(len(group))
+            for i, member in enumerate(group):
+                if not first:
+                    self.emit(",\n")
+                first = False
+                self.emit(f"{member_pad}{json.dumps(member.field_name)}: ")
+                if field_is_bit_flag(member.field_type):
+                    self.emit("true" if flags[i] else "false")
+                else:
+                    pos = self.decode_field(member.field_type, pos, indent + 1, layout.nested_layouts)
+        self.emit(f"\n{INDENTATION * indent}}}")
+        return pos
+
+    def decode_packed_struct(self, layout: StructLayout, pos: int, indent: int) -> int:
+        # Packed structs are stored fixed-size fields first, so use the
+        # offsets/offset table to emit the fields in declaration order.
+        record_start = pos
+        offsets, fixed_size, table_count = layout.packed_offsets, layout.fixed_size, layout.table_count
+        self.check_bounds(record_start, fixed_size + table_count * OFFSET_TABLE_ENTRY_BYTE_SIZE)
+        table = primitive_run_struct('Q', table_count).unpack_from(self.data, record_start + fixed_size - self.base)
+
+        member_pad = INDENTATION * (indent + 1)
+        self.emit("{\n")
+        slot = 0
+        for i, member in enumerate(layout.struct.members):
+            if i > 0:
+                self.emit(",\n")
+            self.emit(f"{member_pad}{json.dumps(member.field_name)}: ")
+            if member.field_name in offsets:
+                field_pos = record_start + offsets[member.field_name]
+            else:
+                # Variable-size fields are in the table in declaration order.
+                field_pos = record_start + table[slot]
+                slot += 1
+            self.decode_field(member.field_type, field_pos, indent + 1, layout.nested_layouts)
+        self.emit(f"\n{INDENTATION * indent}}}")
+
+        if table_count == 0:
+            return record_start + fixed_size
+        return record_start + table[-1]
+
+
+def open_binary_data(f):
+    # Empty files can't be mmapped.
+    if f.seek(0, 2) == 0:
+        return b""
+    return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def layout_for_fingerprint(ir: SchemaIR, fingerprint: int) -> StructLayout:
+    # The current layout of the root struct or the older one the data was
+    # written with (a `previous` layout, or nested structs in theirs). Files
+    # in an older layout are converted as they are, with the older fields.
+    for layout in ir.root_layouts:
+        if layout.fingerprint == fingerprint:
+            return layout
+    raise AssertionError(f"Binary file was written with schema 0x{fingerprint:016x}, which isn't "
+                         f"`{ir.root_name}` or one of its `previous` layouts.")
+
+
+def decode_record_file(decoder: JsonStreamDecoder, ir: SchemaIR, fname: str):
+    # Writes the records as one JSON array.
+    with RecordFileReader(fname) as reader:
+        root_layout = layout_for_fingerprint(ir, reader.schema_fingerprint)
+        decoder.attach(reader.data)
+        decoder.emit("[")
+        for i in range(len(reader)):
+            start, end = reader.record_range(i)
+            decoder.emit(",\n" if i > 0 else "\n")
+            decoder.emit(INDENTATION)
+            end_pos = decoder.decode_struct(root_layout, start, 1)
+            assert end_pos == end, \
+                f"Record {i} doesn't match schema: {end - end_pos} trailing bytes after `{ir.root_name}`."
+        decoder.emit("\n]\n" if len(reader) > 0 else "]\n")
+        decoder.flush()
+        decoder.attach(b"")
+
+
+def parse_args(argv: Optional[List[str]] = None):
+    parser = ArgumentParser()
+    parser.add_argument("-f", "--hstruct-file", dest="hstruct_fname", required=True,
+                        help="input .hstruct file to use as schema")
+    parser.add_argument("-b", "--bin-file", dest="bin_fname", required=True,
+                        help="input binary file to convert to JSON")
+    parser.add_argument("-o", "--json-file", dest="json_fname", default=None,
+                        help="output JSON file (defaults to stdout)")
+    return parser.parse_args(argv)
+
+
+def convert_bin_to_json(ir: SchemaIR, bin_fname: str, out: TextIO):
+    with open(bin_fname, "rb") as bin_file:
+        data = open_binary_data(bin_file)
+        if is_record_file(data):
+            if isinstance(data, mmap.mmap):
+                data.close()
+            decode_record_file(JsonStreamDecoder(ir, b"", out), ir, bin_fname)
+            return
+        # Compressed dumps (`serialize_dump(fname, SerialCodec::zlib)` or
+        # `json_to_bin.py --compress`) are decompressed a chunk at a time.
+        decoder = JsonStreamDecoder(ir, CompressedReader(data) if is_compressed(data) else data, out)
+        has_header = decoder.size >= SCHEMA_HEADER_STRUCT.size
+        if has_header:
+            decoder.check_bounds(0, SCHEMA_HEADER_STRUCT.size)
+        assert has_header and bytes(decoder.data[:len(SCHEMA_HEADER_MAGIC)]) == SCHEMA_HEADER_MAGIC, \
+            "Binary file has no schema header, it wasn't written by `serialize_dump` or `json_to_bin.py`."
+        fingerprint = SCHEMA_HEADER_STRUCT.unpack_from(decoder.data, 0)[1]
+        root_layout = layout_for_fingerprint(ir, fingerprint)
+        end_pos = decoder.decode_struct(root_layout, SCHEMA_HEADER_STRUCT.size, 0)
+        decoder.emit("\n")
+        decoder.flush()
+        assert end_pos == decoder.size, \
+            f"Binary file doesn't match schema: {decoder.size - end_pos} trailing bytes after `{ir.root_name}`."
+        if isinstance(data, mmap.mmap):
+            data.close()
+
+
+def main(argv: Optional[List[str]] = None):
+    args = parse_args(argv)
+    ir = load_schema_ir(args.hstruct_fname)
+
+    out = sys.stdout if args.json_fname is None else open(args.json_fname, "w", encoding="utf-8")
+    try:
+        convert_bin_to_json(ir, args.bin_fname, out)
+    finally:
+        if out is not sys.stdout:
+            out.close()
 
 if __name__ == '__main__':
     main()
@@ -0,0 +1,292 @@
+import json
+import multiprocessing
+import os
+import signal
+import socket
+import socketserver
+import sys
+import threading
+import time
+from argparse import ArgumentParser
+from collections import OrderedDict
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from bin_to_json import convert_bin_to_json
+from hstruct_compression import DEFAULT_CHUNK_SIZE
+from hstruct_schema import SchemaIR, load_schema_ir, refresh_source_stamps
+from json_to_bin import StructEncoder, compile_struct_encoder, convert_json_to_bin
+
+# Long-running `bin_to_json.py`/`json_to_bin.py`. Jobs come in as one JSON
+# object per line, on stdin or over a Unix socket (one stream of jobs per
+# connection):
+#     {"id": 1, "op": "json_to_bin", "schema": "structs/SampleDataType.hstruct",
+#      "input": "dump.json", "output": "dump.bin"}
+#     {"id": 2, "op": "bin_to_json", "schema": "structs/SampleDataType.hstruct",
+#      "input": "dump.bin", "output": "dump.json"}
+# `json_to_bin` jobs also take the converter's options: "input" can be a
+# list, "output" defaults to the input with a .bin suffix, plus "ndjson",
+# "compress", "chunk_size" and "records". Every job gets one result line
+# back, in completion order, carrying its "id":
+#     {"id": 1, "ok": true, "outputs": ["dump.bin"], "seconds": 0.0012}
+#     {"id": 2, "ok": false, "error": "AssertionError: Binary file is truncated: ..."}
+JOB_OPS = ["bin_to_json", "json_to_bin"]
+
+# Compiled schemas each worker keeps around.
+DEFAULT_SCHEMA_CACHE_SIZE = 32
+
+# Jobs read ahead of the workers, per worker. Past that, reading more jobs
+# waits for results, so a huge job stream doesn't pile up in memory.
+PENDING_JOBS_PER_WORKER = 4
+
+
+@dataclass
+class CompiledSchema:
+    ir: SchemaIR
+    encoder: StructEncoder
+    fingerprint: int
+
+
+class SchemaCache:
+    # Least recently used compiled schemas, keyed by resolved `.hstruct`
+    # path. Entries are checked against their sources on every use, so
+    # editing a schema while the server runs picks up the new one.
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self.entries: OrderedDict[str, CompiledSchema] = OrderedDict()
+
+    def get(self, hstruct_fname: str) -> CompiledSchema:
+        key = str(Path(hstruct_fname).resolve())
+        entry = self.entries.get(key)
+        if entry is not None and refresh_source_stamps(entry.ir) is not None:
+            self.entries.move_to_end(key)
+            return entry
+
+        ir = load_schema_ir(key)
+        entry = CompiledSchema(ir, compile_struct_encoder(ir.layouts, ir.root_name), ir.layouts[ir.root_name].fingerprint)
+        self.entries[key] = entry
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+        return entry
+
+
+# Per worker (process, or the one thread without `-j`).
+schema_cache: Optional[SchemaCache] = None
+
+
+def init_worker(cache_size: int):
+    global schema_cache
+    schema_cache = SchemaCache(cache_size)
+
+
+def job_inputs(job: Dict) -> List[str]:
+    inputs = job.get("input")
+    if isinstance(inputs, str):
+        inputs = [inputs]
+    assert isinstance(inputs, list) and len(inputs) > 0 and all(isinstance(fname, str) for fname in inputs), \
+        "`input` must be a file name or a list of them."
+    return inputs
+
+
+def run_conversion(job: Dict) -> List[str]:
+    op = job.get("op")
+    assert op in JOB_OPS, f"Unknown op: {op}. Expected one of {JOB_OPS}."
+    assert isinstance(job.get("schema"), str), "`schema` must be an .hstruct file name."
+    compiled = schema_cache.get(job["schema"])
+    inputs = job_inputs(job)
+    output = job.get("output")
+    assert output is None or isinstance(output, str), "`output` must be a file name."
+
+    if op == "bin_to_json":
+        # Results share the output stream, so JSON always goes to a file.
+        assert len(inputs) == 1, "`bin_to_json` converts one file per job."
+        assert output is not None, "`bin_to_json` jobs need an `output` file."
+        with open(output, "w", encoding="utf-8") as out:
+            convert_bin_to_json(compiled.ir, inputs[0], out)
+        return [output]
+
+    return convert_json_to_bin(compiled.encoder, compiled.fingerprint, inputs, output,
+                               bool(job.get("ndjson", False)), job.get("compress"),
+                               int(job.get("chunk_size", DEFAULT_CHUNK_SIZE)), bool(job.get("records", False)))
+
+
+def error_result(job_id, error: BaseException) -> Dict:
+    return {"id": job_id, "ok": False, "error": f"{type(error).__name__}: {error}"}
+
+
+def run_job(job: Dict) -> Dict:
+    # Runs in a worker. Failures are reported, never raised, so one bad job
+    # doesn't take the others down with it.
+    start = time.perf_counter()
+    try:
+        outputs = run_conversion(job)
+    except Exception as e:
+        return error_result(job.get("id"), e)
+    return {"id": job.get("id"), "ok": True, "outputs": outputs, "seconds": round(time.perf_counter() - start, 6)}
+
+
+class JobRunner:
+    # Hands jobs to the worker pool and their results to `respond` as they
+    # finish.
+
+    def __init__(self, jobs: int, cache_size: int):
+        # Without `-j` jobs still run off the reading thread, so results
+        # stream back while more jobs are read. Worker processes are spawned
+        # rather than forked, as the socket server forks them from one of
+        # its connection threads.
+        if jobs > 1:
+            self.executor: Executor = ProcessPoolExecutor(max_workers=jobs, mp_context=multiprocessing.get_context("spawn"),
+                                                          initializer=init_worker, initargs=(cache_size,))
+        else:
+            self.executor = ThreadPoolExecutor(max_workers=1, initializer=init_worker, initargs=(cache_size,))
+        self.slots = threading.BoundedSemaphore(jobs * PENDING_JOBS_PER_WORKER)
+        self.job_count = 0
+        self.count_lock = threading.Lock()
+
+    def submit(self, line: str, respond: Callable[[Dict], None]) -> Optional[Future]:
+        # Returns a future that completes once the job's result has been
+        # passed to `respond`, or None if the line wasn't a job at all.
+        with self.count_lock:
+            self.job_count += 1
+            job_number = self.job_count
+        try:
+            job = json.loads(line)
+            assert isinstance(job, dict), "A job must be a JSON object."
+        except (ValueError, AssertionError) as e:
+            respond(error_result(None, e))
+            return None
+        # Jobs without an id are answered with a running job number.
+        job.setdefault("id", job_number)
+
+        self.slots.acquire()
+        answered: Future = Future()
+
+        def done(future: Future):
+            self.slots.release()
+            try:
+                result = future.result()
+            except Exception as e:
+                # The job never ran to completion, e.g. a worker process died.
+                result = error_result(job["id"], e)
+            try:
+                respond(result)
+            finally:
+                answered.set_result(None)
+
+        self.executor.submit(run_job, job).add_done_callback(done)
+        return answered
+
+    def close(self):
+        self.executor.shutdown(wait=True)
+
+
+def line_writer(stream, lock: threading.Lock) -> Callable[[Dict], None]:
+    # Results come from worker callbacks, one whole line at a time.
+    def respond(result: Dict):
+        with lock:
+            stream.write(json.dumps(result) + "\n")
+            stream.flush()
+    return respond
+
+
+def serve_stdin(runner: JobRunner):
+    # Runs until stdin closes and every job read has been answered.
+    respond = line_writer(sys.stdout, threading.Lock())
+    for line in sys.stdin:
+        if len(line.strip()) > 0:
+            runner.submit(line, respond)
+
+
+class JobConnectionHandler(socketserver.StreamRequestHandler):
+    # One client connection. The connection stays open until the client
+    # shuts down its side and every job it sent has been answered.
+
+    def handle(self):
+        lock = threading.Lock()
+
+        def respond(result: Dict):
+            with lock:
+                try:
+                    self.wfile.write((json.dumps(result) + "\n").encode())
+                    self.wfile.flush()
+                except OSError:
+                    # Client went away, its jobs still finish.
+                    pass
+
+        futures: List[Future] = []
+        for raw_line in self.rfile:
+            line = raw_line.decode("utf-8", errors="replace")
+            if len(line.strip()) > 0:
+                future = self.server.runner.submit(line, respond)
+                if future is not None:
+                    futures.append(future)
+        wait(futures)
+
+
+class JobServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, socket_fname: str, runner: JobRunner):
+        self.runner = runner
+        super().__init__(socket_fname, JobConnectionHandler)
+
+
+def remove_stale_socket(socket_fname: str):
+    # A socket file nobody listens on is left over from a killed server.
+    if not os.path.exists(socket_fname):
+        return
+    probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        probe.connect(socket_fname)
+    except ConnectionRefusedError:
+        os.remove(socket_fname)
+        return
+    finally:
+        probe.close()
+    raise AssertionError(f"Another server is already listening on {socket_fname}.")
+
+
+def serve_socket(runner: JobRunner, socket_fname: str):
+    # Runs until interrupted or terminated.
+    remove_stale_socket(socket_fname)
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    server = JobServer(socket_fname, runner)
+    try:
+        print(f"Serving conversion jobs on {socket_fname}.", file=sys.stderr)
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        os.remove(socket_fname)
+
+
+def main():
+    # Arg parser.
+    parser = ArgumentParser(description="Runs bin_to_json/json_to_bin conversion jobs, one JSON object per line, "
+                                        "keeping compiled schemas cached between jobs.")
+    parser.add_argument("-s", "--socket", dest="socket_fname", default=None,
+                        help="listen on this Unix socket instead of reading jobs from stdin")
+    parser.add_argument("-j", "--jobs", dest="jobs", type=int, default=1,
+                        help="worker processes (0 uses every core, default: 1)")
+    parser.add_argument("--cache-size", dest="cache_size", type=int, default=DEFAULT_SCHEMA_CACHE_SIZE,
+                        help=f"compiled schemas each worker keeps (default: {DEFAULT_SCHEMA_CACHE_SIZE})")
+    args = parser.parse_args()
+    assert args.cache_size > 0, f"Invalid cache size: {args.cache_size}"
+
+    jobs = args.jobs if args.jobs > 0 else (os.cpu_count() or 1)
+    runner = JobRunner(jobs, args.cache_size)
+    try:
+        if args.socket_fname is None:
+            serve_stdin(runner)
+        else:
+            serve_socket(runner, args.socket_fname)
+    finally:
+        runner.close()
+
+if __name__ == '__main__':
+    main()
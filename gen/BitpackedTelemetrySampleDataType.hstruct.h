@@ -0,0 +1,586 @@
+/*
+ *    ____   _____   _   _   _____   ____       _      _____   _____   ____       ____    ___    ____    _____ 
+ *   / ___| | ____| | \ | | | ____| |  _ \     / \    |_   _| | ____| |  _ \     / ___|  / _ \  |  _ \  | ____|
+ *  | |  _  |  _|   |  \| | |  _|   | |_) |   / _ \     | |   |  _|   | | | |   | |     | | | | | | | | |  _|  
+ *  | |_| | | |___  | |\  | | |___  |  _ <   / ___ \    | |   | |___  | |_| |   | |___  | |_| | | |_| | | |___ 
+ *   \____| |_____| |_| \_| |_____| |_| \_\ /_/   \_\   |_|   |_____| |____/     \____|  \___/  |____/  |_____|
+ *
+ */
+#pragma once
+
+#include "hstruct_ifc.h"
+
+
+struct BitpackedTelemetrySampleDataType : public HStruct_ifc
+{
+    uint64_t timestamp;
+    bool is_online;
+    bool is_charging;
+    bool has_fault;
+    bool is_moving;
+    bool door_open;
+    bool lights_on;
+    bool brakes_engaged;
+    bool wipers_on;
+    bool heater_on;
+    float_t speed;
+    uint16_t sensor_id;
+    bool is_calibrated;
+    std::string label;
+    std::array<bool, 12> channel_active;
+    std::vector<bool> sample_valid;
+    std::vector<uint32_t> readings;
+
+    // Hash of the wire layout, written into the header of dumped files.
+    static constexpr uint64_t k_schema_fingerprint{ 0xf9434aab71bcd428ull };
+
+    static constexpr size_t k_fixed_serialized_size{ 19 + 2 * sizeof(size_t) };
+
+    size_t serialized_size() const override
+    {
+        size_t size{ k_fixed_serialized_size };
+        size += label.length();
+        size += varint_size(sample_valid.size());
+        size += (sample_valid.size() + 7) / 8;
+        size += readings.size() * sizeof(uint32_t);
+        return size;
+    }
+
+    void serialize_dump(const std::string& fname, SerialCodec codec = SerialCodec::none) override
+    {
+        SerialBuffer sb;
+        sb.mode = SerialBuffer::SBM_WRITE;
+        size_t expected_size{ SchemaHeader::k_size + serialized_size() };
+        sb.reserve(expected_size);
+        SchemaHeader::write(sb, k_schema_fingerprint);
+        write_data_to_serial_buffer(sb);
+        assert(sb.buffer.size() == expected_size);
+        if (!sb.save_buffer_to_disk(fname, codec))
+        {
+            throw std::runtime_error{ "Can't write " + fname };
+        }
+    }
+
+    void serialize_load(const std::string& fname) override
+    {
+        SerialBuffer sb;
+        if (!sb.load_buffer_from_disk(fname))
+        {
+            throw std::runtime_error{ "Can't read " + fname };
+        }
+        if (!read_file_from_serial_buffer(sb))
+        {
+            throw std::runtime_error{ "Wrong schema or truncated data, expected BitpackedTelemetrySampleDataType: " + fname };
+        }
+    }
+
+    void serialize_load_mmap(const std::string& fname) override
+    {
+        MappedFile file;
+        if (!file.open(fname))
+        {
+            throw std::runtime_error{ "Can't map " + fname };
+        }
+        SerialBuffer sb;
+        if (!sb.attach_file_view(file.view()))
+        {
+            throw std::runtime_error{ "Can't decompress " + fname };
+        }
+        if (!read_file_from_serial_buffer(sb))
+        {
+            throw std::runtime_error{ "Wrong schema or truncated data, expected BitpackedTelemetrySampleDataType: " + fname };
+        }
+    }
+
+    void serialize_dump_streamed(const std::string& fname, size_t window_bytes = SerialBuffer::k_default_window_bytes) override
+    {
+        std::ofstream file{ fname.c_str(), std::ios::out | std::ios::trunc | std::ios::binary };
+        if (!file.is_open())
+        {
+            throw std::runtime_error{ "Can't write " + fname };
+        }
+        SerialBuffer sb;
+        sb.attach_write_stream(file, window_bytes);
+        SchemaHeader::write(sb, k_schema_fingerprint);
+        write_data_to_serial_buffer(sb);
+        if (!sb.flush_write_stream())
+        {
+            throw std::runtime_error{ "Can't write " + fname };
+        }
+    }
+
+    void serialize_load_streamed(const std::string& fname, size_t window_bytes = SerialBuffer::k_default_window_bytes) override
+    {
+        std::ifstream file{ fname.c_str(), std::ios::in | std::ios::binary };
+        if (!file.is_open())
+        {
+            throw std::runtime_error{ "Can't read " + fname };
+        }
+        uint8_t header[CompressedContainer::k_fixed_header_size]{};
+        file.read(reinterpret_cast<char*>(header), sizeof(header));
+        if (CompressedContainer::is_container({ header, static_cast<size_t>(file.gcount()) }))
+        {
+            serialize_load(fname);
+            return;
+        }
+        file.clear();
+        file.seekg(0);
+        SerialBuffer sb;
+        sb.attach_read_stream(file, window_bytes);
+        if (!read_file_from_serial_buffer(sb))
+        {
+            throw std::runtime_error{ "Wrong schema or truncated data, expected BitpackedTelemetrySampleDataType: " + fname };
+        }
+    }
+
+    void serialize_to(std::vector<uint8_t>& out) override
+    {
+        SerialBuffer sb;
+        sb.buffer.swap(out);
+        sb.clear();
+        sb.mode = SerialBuffer::SBM_WRITE;
+        size_t expected_size{ SchemaHeader::k_size + serialized_size() };
+        sb.reserve(expected_size);
+        SchemaHeader::write(sb, k_schema_fingerprint);
+        write_data_to_serial_buffer(sb);
+        assert(sb.buffer.size() == expected_size);
+        out.swap(sb.buffer);
+    }
+
+    size_t serialize_into(std::span<uint8_t> out) override
+    {
+        size_t expected_size{ SchemaHeader::k_size + serialized_size() };
+        if (expected_size > out.size())
+        {
+            return 0;
+        }
+        SerialBuffer& sb{ SerialBuffer::thread_scratch() };
+        sb.clear();
+        sb.mode = SerialBuffer::SBM_WRITE;
+        sb.reserve(expected_size);
+        SchemaHeader::write(sb, k_schema_fingerprint);
+        write_data_to_serial_buffer(sb);
+        assert(sb.buffer.size() == expected_size);
+        std::memcpy(out.data(), sb.buffer.data(), expected_size);
+        return expected_size;
+    }
+
+    bool deserialize_from(std::span<const uint8_t> bytes) override
+    {
+        SerialBuffer sb;
+        if (!sb.attach_file_view(bytes) || !read_file_from_serial_buffer(sb))
+        {
+            return false;
+        }
+        return sb.buffer_position == sb.read_view.size();
+    }
+
+    void write_data_to_serial_buffer(SerialBuffer& sb) override
+    {
+        sb.write_elem(&timestamp, sizeof(uint64_t));
+
+        std::array<uint8_t, 2> is_online__run{};
+        is_online__run[0] |= static_cast<uint8_t>(is_online << 0);
+        is_online__run[0] |= static_cast<uint8_t>(is_charging << 1);
+        is_online__run[0] |= static_cast<uint8_t>(has_fault << 2);
+        is_online__run[0] |= static_cast<uint8_t>(is_moving << 3);
+        is_online__run[0] |= static_cast<uint8_t>(door_open << 4);
+        is_online__run[0] |= static_cast<uint8_t>(lights_on << 5);
+        is_online__run[0] |= static_cast<uint8_t>(brakes_engaged << 6);
+        is_online__run[0] |= static_cast<uint8_t>(wipers_on << 7);
+        is_online__run[1] |= static_cast<uint8_t>(heater_on << 0);
+        sb.write_bulk(is_online__run.data(), 1, 2);
+
+        std::array<uint8_t, 6> speed__run;
+        std::memcpy(speed__run.data() + 0, &speed, sizeof(float_t));
+        std::memcpy(speed__run.data() + 4, &sensor_id, sizeof(uint16_t));
+        sb.write_bulk(speed__run.data(), 1, 6);
+
+        sb.write_elem(&is_calibrated, sizeof(bool));
+        size_t label__str_length{ label.length() };
+        sb.write_elem(&label__str_length, sizeof(size_t));
+        sb.write_elem(label.data(), sizeof(char) * label__str_length);
+
+        sb.write_bits(channel_active, 12);
+
+        size_t sample_valid__list_count{ sample_valid.size() };
+        sb.write_varint(sample_valid__list_count);
+        sb.write_bits(sample_valid, sample_valid__list_count);
+
+        size_t readings__list_count{ readings.size() };
+        sb.write_elem(&readings__list_count, sizeof(size_t));
+        sb.write_bulk(readings.data(), sizeof(uint32_t), readings__list_count);
+    }
+
+    void read_data_from_serial_buffer(SerialBuffer& sb) override
+    {
+        timestamp = sb.read_value<uint64_t>();
+
+        const uint8_t* is_online__run{ static_cast<const uint8_t*>(sb.read_elem(2)) };
+        is_online = ((is_online__run[0] >> 0) & 1) != 0;
+        is_charging = ((is_online__run[0] >> 1) & 1) != 0;
+        has_fault = ((is_online__run[0] >> 2) & 1) != 0;
+        is_moving = ((is_online__run[0] >> 3) & 1) != 0;
+        door_open = ((is_online__run[0] >> 4) & 1) != 0;
+        lights_on = ((is_online__run[0] >> 5) & 1) != 0;
+        brakes_engaged = ((is_online__run[0] >> 6) & 1) != 0;
+        wipers_on = ((is_online__run[0] >> 7) & 1) != 0;
+        heater_on = ((is_online__run[1] >> 0) & 1) != 0;
+
+        const uint8_t* speed__run{ static_cast<const uint8_t*>(sb.read_elem(6)) };
+        std::memcpy(&speed, speed__run + 0, sizeof(float_t));
+        std::memcpy(&sensor_id, speed__run + 4, sizeof(uint16_t));
+
+        is_calibrated = sb.read_value<bool>();
+        size_t label__str_length{ sb.read_value<size_t>() };
+        label = std::string{ reinterpret_cast<const char*>(sb.read_elem(sizeof(char) * label__str_length)), label__str_length };
+
+        sb.read_bits(channel_active, 12);
+
+        size_t sample_valid__list_count{ sb.read_varint() };
+        sb.read_bits(sample_valid, sample_valid__list_count);
+
+        size_t readings__list_count{ sb.read_value<size_t>() };
+        sb.check_list_count(readings__list_count, sizeof(uint32_t));
+        readings.resize(readings__list_count);
+        sb.read_bulk(readings.data(), sizeof(uint32_t), readings__list_count);
+    }
+
+    // Reads a dumped file's header and the data after it. Files written in a
+    // `previous` layout (or with nested structs in theirs) get migrated. Fails
+    // on any other schema.
+    bool read_file_from_serial_buffer(SerialBuffer& sb)
+    {
+        uint64_t fingerprint{ 0 };
+        if (!SchemaHeader::read(sb, fingerprint))
+        {
+            return false;
+        }
+        if (fingerprint == k_schema_fingerprint)
+        {
+            read_data_from_serial_buffer(sb);
+            return true;
+        }
+        return false;
+    }
+
+    bool operator==(const BitpackedTelemetrySampleDataType& other) const
+    {
+        return timestamp == other.timestamp
+            && is_online == other.is_online
+            && is_charging == other.is_charging
+            && has_fault == other.has_fault
+            && is_moving == other.is_moving
+            && door_open == other.door_open
+            && lights_on == other.lights_on
+            && brakes_engaged == other.brakes_engaged
+            && wipers_on == other.wipers_on
+            && heater_on == other.heater_on
+            && speed == other.speed
+            && sensor_id == other.sensor_id
+            && is_calibrated == other.is_calibrated
+            && label == other.label
+            && channel_active == other.channel_active
+            && sample_valid == other.sample_valid
+            && readings == other.readings;
+    }
+
+    // Writes only what changed since `prev`, for `apply_delta` on a copy of
+    // `prev` to catch up with. Not a file: there's no schema header.
+    void write_delta(const BitpackedTelemetrySampleDataType& prev, SerialBuffer& sb)
+    {
+        std::array<uint8_t, 3> delta__mask{};
+        delta__mask[0] |= static_cast<uint8_t>((timestamp != prev.timestamp) << 0);
+        delta__mask[0] |= static_cast<uint8_t>((is_online != prev.is_online) << 1);
+        delta__mask[0] |= static_cast<uint8_t>((is_charging != prev.is_charging) << 2);
+        delta__mask[0] |= static_cast<uint8_t>((has_fault != prev.has_fault) << 3);
+        delta__mask[0] |= static_cast<uint8_t>((is_moving != prev.is_moving) << 4);
+        delta__mask[0] |= static_cast<uint8_t>((door_open != prev.door_open) << 5);
+        delta__mask[0] |= static_cast<uint8_t>((lights_on != prev.lights_on) << 6);
+        delta__mask[0] |= static_cast<uint8_t>((brakes_engaged != prev.brakes_engaged) << 7);
+        delta__mask[1] |= static_cast<uint8_t>((wipers_on != prev.wipers_on) << 0);
+        delta__mask[1] |= static_cast<uint8_t>((heater_on != prev.heater_on) << 1);
+        delta__mask[1] |= static_cast<uint8_t>((speed != prev.speed) << 2);
+        delta__mask[1] |= static_cast<uint8_t>((sensor_id != prev.sensor_id) << 3);
+        delta__mask[1] |= static_cast<uint8_t>((is_calibrated != prev.is_calibrated) << 4);
+        delta__mask[1] |= static_cast<uint8_t>((label != prev.label) << 5);
+        delta__mask[1] |= static_cast<uint8_t>((channel_active != prev.channel_active) << 6);
+        delta__mask[1] |= static_cast<uint8_t>((sample_valid != prev.sample_valid) << 7);
+        delta__mask[2] |= static_cast<uint8_t>((readings != prev.readings) << 0);
+        sb.write_bulk(delta__mask.data(), 1, 3);
+
+        if (((delta__mask[0] >> 0) & 1) != 0)
+        {
+            sb.write_elem(&timestamp, sizeof(uint64_t));
+        }
+
+        if (((delta__mask[0] >> 1) & 1) != 0)
+        {
+            sb.write_elem(&is_online, sizeof(bool));
+        }
+
+        if (((delta__mask[0] >> 2) & 1) != 0)
+        {
+            sb.write_elem(&is_charging, sizeof(bool));
+        }
+
+        if (((delta__mask[0] >> 3) & 1) != 0)
+        {
+            sb.write_elem(&has_fault, sizeof(bool));
+        }
+
+        if (((delta__mask[0] >> 4) & 1) != 0)
+        {
+            sb.write_elem(&is_moving, sizeof(bool));
+        }
+
+        if (((delta__mask[0] >> 5) & 1) != 0)
+        {
+            sb.write_elem(&door_open, sizeof(bool));
+        }
+
+        if (((delta__mask[0] >> 6) & 1) != 0)
+        {
+            sb.write_elem(&lights_on, sizeof(bool));
+        }
+
+        if (((delta__mask[0] >> 7) & 1) != 0)
+        {
+            sb.write_elem(&brakes_engaged, sizeof(bool));
+        }
+
+        if (((delta__mask[1] >> 0) & 1) != 0)
+        {
+            sb.write_elem(&wipers_on, sizeof(bool));
+        }
+
+        if (((delta__mask[1] >> 1) & 1) != 0)
+        {
+            sb.write_elem(&heater_on, sizeof(bool));
+        }
+
+        if (((delta__mask[1] >> 2) & 1) != 0)
+        {
+            sb.write_elem(&speed, sizeof(float_t));
+        }
+
+        if (((delta__mask[1] >> 3) & 1) != 0)
+        {
+            sb.write_elem(&sensor_id, sizeof(uint16_t));
+        }
+
+        if (((delta__mask[1] >> 4) & 1) != 0)
+        {
+            sb.write_elem(&is_calibrated, sizeof(bool));
+        }
+
+        if (((delta__mask[1] >> 5) & 1) != 0)
+        {
+            size_t label__str_length{ label.length() };
+            sb.write_elem(&label__str_length, sizeof(size_t));
+            sb.write_elem(label.data(), sizeof(char) * label__str_length);
+        }
+
+        if (((delta__mask[1] >> 6) & 1) != 0)
+        {
+            sb.write_bits(channel_active, 12);
+        }
+
+        if (((delta__mask[1] >> 7) & 1) != 0)
+        {
+            size_t sample_valid__list_count{ sample_valid.size() };
+            sb.write_varint(sample_valid__list_count);
+            sb.write_bits(sample_valid, sample_valid__list_count);
+        }
+
+        if (((delta__mask[2] >> 0) & 1) != 0)
+        {
+            size_t readings__list_count{ readings.size() };
+            sb.write_elem(&readings__list_count, sizeof(size_t));
+            write_delta_runs(sb, readings, prev.readings, [&](size_t i) {
+                sb.write_elem(&readings[i], sizeof(uint32_t));
+            });
+        }
+    }
+
+    // Applies a `write_delta` to the `prev` it was written against.
+    void apply_delta(SerialBuffer& sb)
+    {
+        std::array<uint8_t, 3> delta__mask;
+        sb.read_bulk(delta__mask.data(), 1, 3);
+
+        if (((delta__mask[0] >> 0) & 1) != 0)
+        {
+            timestamp = sb.read_value<uint64_t>();
+        }
+
+        if (((delta__mask[0] >> 1) & 1) != 0)
+        {
+            is_online = sb.read_value<bool>();
+        }
+
+        if (((delta__mask[0] >> 2) & 1) != 0)
+        {
+            is_charging = sb.read_value<bool>();
+        }
+
+        if (((delta__mask[0] >> 3) & 1) != 0)
+        {
+            has_fault = sb.read_value<bool>();
+        }
+
+        if (((delta__mask[0] >> 4) & 1) != 0)
+        {
+            is_moving = sb.read_value<bool>();
+        }
+
+        if (((delta__mask[0] >> 5) & 1) != 0)
+        {
+            door_open = sb.read_value<bool>();
+        }
+
+        if (((delta__mask[0] >> 6) & 1) != 0)
+        {
+            lights_on = sb.read_value<bool>();
+        }
+
+        if (((delta__mask[0] >> 7) & 1) != 0)
+        {
+            brakes_engaged = sb.read_value<bool>();
+        }
+
+        if (((delta__mask[1] >> 0) & 1) != 0)
+        {
+            wipers_on = sb.read_value<bool>();
+        }
+
+        if (((delta__mask[1] >> 1) & 1) != 0)
+        {
+            heater_on = sb.read_value<bool>();
+        }
+
+        if (((delta__mask[1] >> 2) & 1) != 0)
+        {
+            speed = sb.read_value<float_t>();
+        }
+
+        if (((delta__mask[1] >> 3) & 1) != 0)
+        {
+            sensor_id = sb.read_value<uint16_t>();
+        }
+
+        if (((delta__mask[1] >> 4) & 1) != 0)
+        {
+            is_calibrated = sb.read_value<bool>();
+        }
+
+        if (((delta__mask[1] >> 5) & 1) != 0)
+        {
+            size_t label__str_length{ sb.read_value<size_t>() };
+            label = std::string{ reinterpret_cast<const char*>(sb.read_elem(sizeof(char) * label__str_length)), label__str_length };
+        }
+
+        if (((delta__mask[1] >> 6) & 1) != 0)
+        {
+            sb.read_bits(channel_active, 12);
+        }
+
+        if (((delta__mask[1] >> 7) & 1) != 0)
+        {
+            size_t sample_valid__list_count{ sb.read_varint() };
+            sb.read_bits(sample_valid, sample_valid__list_count);
+        }
+
+        if (((delta__mask[2] >> 0) & 1) != 0)
+        {
+            size_t readings__list_count{ sb.read_value<size_t>() };
+            if (readings__list_count > readings.size())
+            {
+                sb.check_list_count(readings__list_count - readings.size(), sizeof(uint32_t));
+            }
+            readings.resize(readings__list_count);
+            read_delta_runs(sb, readings, [&](size_t i) {
+                readings[i] = sb.read_value<uint32_t>();
+            });
+        }
+    }
+};
+
+
+// Read-only view of a serialized `BitpackedTelemetrySampleDataType`. Strings and primitive
+// lists point into the serialized bytes, which must outlive the view.
+struct BitpackedTelemetrySampleDataType_view
+{
+    uint64_t timestamp;
+    bool is_online;
+    bool is_charging;
+    bool has_fault;
+    bool is_moving;
+    bool door_open;
+    bool lights_on;
+    bool brakes_engaged;
+    bool wipers_on;
+    bool heater_on;
+    float_t speed;
+    uint16_t sensor_id;
+    bool is_calibrated;
+    std::string_view label;
+    std::array<bool, 12> channel_active;
+    std::vector<bool> sample_valid;
+    UnalignedSpan<uint32_t> readings;
+
+    void attach(std::span<const uint8_t> bytes)
+    {
+        SerialBuffer sb;
+        sb.attach_read_view(bytes);
+        read_view_from_serial_buffer(sb);
+    }
+
+    // Same as `attach`, for the bytes of a whole raw `serialize_dump`ed file.
+    // Fails if the file was written with a different schema.
+    bool attach_file(std::span<const uint8_t> bytes)
+    {
+        SerialBuffer sb;
+        sb.attach_read_view(bytes);
+        uint64_t fingerprint{ 0 };
+        if (!SchemaHeader::read(sb, fingerprint) || fingerprint != BitpackedTelemetrySampleDataType::k_schema_fingerprint)
+        {
+            return false;
+        }
+        read_view_from_serial_buffer(sb);
+        return true;
+    }
+
+    void read_view_from_serial_buffer(SerialBuffer& sb)
+    {
+        timestamp = sb.read_value<uint64_t>();
+
+        const uint8_t* is_online__run{ static_cast<const uint8_t*>(sb.read_elem(2)) };
+        is_online = ((is_online__run[0] >> 0) & 1) != 0;
+        is_charging = ((is_online__run[0] >> 1) & 1) != 0;
+        has_fault = ((is_online__run[0] >> 2) & 1) != 0;
+        is_moving = ((is_online__run[0] >> 3) & 1) != 0;
+        door_open = ((is_online__run[0] >> 4) & 1) != 0;
+        lights_on = ((is_online__run[0] >> 5) & 1) != 0;
+        brakes_engaged = ((is_online__run[0] >> 6) & 1) != 0;
+        wipers_on = ((is_online__run[0] >> 7) & 1) != 0;
+        heater_on = ((is_online__run[1] >> 0) & 1) != 0;
+
+        const uint8_t* speed__run{ static_cast<const uint8_t*>(sb.read_elem(6)) };
+        std::memcpy(&speed, speed__run + 0, sizeof(float_t));
+        std::memcpy(&sensor_id, speed__run + 4, sizeof(uint16_t));
+
+        is_calibrated = sb.read_value<bool>();
+        size_t label__str_length{ sb.read_value<size_t>() };
+        label = std::string_view{ reinterpret_cast<const char*>(sb.read_elem(sizeof(char) * label__str_length)), label__str_length };
+
+        sb.read_bits(channel_active, 12);
+
+        size_t sample_valid__list_count{ sb.read_varint() };
+        sb.read_bits(sample_valid, sample_valid__list_count);
+
+        size_t readings__list_count{ sb.read_value<size_t>() };
+        sb.check_list_count(readings__list_count, sizeof(uint32_t));
+        readings = UnalignedSpan<uint32_t>{ static_cast<const uint8_t*>(sb.read_elem(sizeof(uint32_t) * readings__list_count)), readings__list_count };
+    }
+};
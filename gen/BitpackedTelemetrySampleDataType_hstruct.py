@@ -0,0 +1,132 @@
+#    ____   _____   _   _   _____   ____       _      _____   _____   ____       ____    ___    ____    _____
+#   / ___| | ____| | \ | | | ____| |  _ \     / \    |_   _| | ____| |  _ \     / ___|  / _ \  |  _ \  | ____|
+#  | |  _  |  _|   |  \| | |  _|   | |_) |   / _ \     | |   |  _|   | | | |   | |     | | | | | | | | |  _|
+#  | |_| | | |___  | |\  | | |___  |  _ <   / ___ \    | |   | |___  | |_| |   | |___  | |_| | | |_| | | |___
+#   \____| |_____| |_| \_| |_____| |_| \_\ /_/   \_\   |_|   |_____| |____/     \____|  \___/  |____/  |_____|
+#
+# Python twin of `BitpackedTelemetrySampleDataType.hstruct.h`. Reads and writes the same binary format.
+import struct
+import sys
+from array import array
+from typing import List, Tuple
+
+try:
+    from .hstruct_runtime import _FILE_HEADER, _FILE_MAGIC, _array_typecode, _varint_size, _pack_string, _unpack_string, _string_size, _pack_array, _unpack_array, _pack_bits, _unpack_bits, _pack_bit_list, _unpack_bit_list
+except ImportError:
+    from hstruct_runtime import _FILE_HEADER, _FILE_MAGIC, _array_typecode, _varint_size, _pack_string, _unpack_string, _string_size, _pack_array, _unpack_array, _pack_bits, _unpack_bits, _pack_bit_list, _unpack_bit_list
+
+
+class BitpackedTelemetrySampleDataType:
+    __slots__ = (
+        'timestamp',
+        'is_online',
+        'is_charging',
+        'has_fault',
+        'is_moving',
+        'door_open',
+        'lights_on',
+        'brakes_engaged',
+        'wipers_on',
+        'heater_on',
+        'speed',
+        'sensor_id',
+        'is_calibrated',
+        'label',
+        'channel_active',
+        'sample_valid',
+        'readings',
+    )
+
+    SCHEMA_FINGERPRINT = 0xf9434aab71bcd428
+
+    _RUN_0 = struct.Struct('<Q')
+    _RUN_1 = struct.Struct('<fH')
+    _TYPECODE_readings = _array_typecode('I')
+
+    def __init__(self):
+        self.timestamp = 0
+        self.is_online = False
+        self.is_charging = False
+        self.has_fault = False
+        self.is_moving = False
+        self.door_open = False
+        self.lights_on = False
+        self.brakes_engaged = False
+        self.wipers_on = False
+        self.heater_on = False
+        self.speed = 0.0
+        self.sensor_id = 0
+        self.is_calibrated = False
+        self.label = ''
+        self.channel_active = [False] * 12
+        self.sample_valid = []
+        self.readings = array(self._TYPECODE_readings)
+
+    def serialized_size(self) -> int:
+        size = 17
+        size += _string_size(self.label)
+        size += 2
+        size += _varint_size(len(self.sample_valid)) + (len(self.sample_valid) + 7) // 8
+        size += 8 + 4 * len(self.readings)
+        return size
+
+    def pack_into(self, buf, offset: int = 0) -> int:
+        pos = offset
+        self._RUN_0.pack_into(buf, pos, self.timestamp)
+        pos += 8
+        pos = _pack_bits(buf, pos, (self.is_online, self.is_charging, self.has_fault, self.is_moving, self.door_open, self.lights_on, self.brakes_engaged, self.wipers_on, self.heater_on))
+        self._RUN_1.pack_into(buf, pos, self.speed, self.sensor_id)
+        pos += 6
+        pos = _pack_bits(buf, pos, (self.is_calibrated,))
+        pos = _pack_string(buf, pos, self.label)
+        assert len(self.channel_active) == 12, '`channel_active` must have 12 elements.'
+        pos = _pack_bits(buf, pos, self.channel_active)
+        pos = _pack_bit_list(buf, pos, self.sample_valid, True)
+        pos = _pack_array(buf, pos, self.readings, self._TYPECODE_readings)
+        return pos
+
+    @classmethod
+    def unpack_from(cls, buf, offset: int = 0) -> Tuple['BitpackedTelemetrySampleDataType', int]:
+        self = cls.__new__(cls)
+        view = memoryview(buf)
+        pos = offset
+        (self.timestamp,) = cls._RUN_0.unpack_from(view, pos)
+        pos += 8
+        (self.is_online, self.is_charging, self.has_fault, self.is_moving, self.door_open, self.lights_on, self.brakes_engaged, self.wipers_on, self.heater_on), pos = _unpack_bits(view, pos, 9)
+        (self.speed, self.sensor_id,) = cls._RUN_1.unpack_from(view, pos)
+        pos += 6
+        (self.is_calibrated,), pos = _unpack_bits(view, pos, 1)
+        self.label, pos = _unpack_string(view, pos)
+        self.channel_active, pos = _unpack_bits(view, pos, 12)
+        self.sample_valid, pos = _unpack_bit_list(view, pos, True)
+        self.readings, pos = _unpack_array(view, pos, cls._TYPECODE_readings)
+        return self, pos
+
+    def to_bytes(self) -> bytearray:
+        buf = bytearray(self.serialized_size())
+        end = self.pack_into(buf)
+        assert end == len(buf), f'Packed {end} bytes but measured {len(buf)}.'
+        return buf
+
+    @classmethod
+    def from_bytes(cls, buf) -> 'BitpackedTelemetrySampleDataType':
+        obj, end = cls.unpack_from(buf)
+        assert end == len(buf), f'{len(buf) - end} trailing bytes after `BitpackedTelemetrySampleDataType`.'
+        return obj
+
+    def to_file_bytes(self) -> bytearray:
+        buf = bytearray(_FILE_HEADER.size + self.serialized_size())
+        _FILE_HEADER.pack_into(buf, 0, _FILE_MAGIC, self.SCHEMA_FINGERPRINT)
+        end = self.pack_into(buf, _FILE_HEADER.size)
+        assert end == len(buf), f'Packed {end} bytes but measured {len(buf)}.'
+        return buf
+
+    @classmethod
+    def from_file_bytes(cls, buf) -> 'BitpackedTelemetrySampleDataType':
+        magic, fingerprint = _FILE_HEADER.unpack_from(buf, 0)
+        assert magic == _FILE_MAGIC, 'No schema header, not a dumped file.'
+        assert fingerprint == cls.SCHEMA_FINGERPRINT, \
+            f'File was written with schema 0x{fingerprint:016x}, `BitpackedTelemetrySampleDataType` is 0x{cls.SCHEMA_FINGERPRINT:016x}.'
+        obj, end = cls.unpack_from(buf, _FILE_HEADER.size)
+        assert end == len(buf), f'{len(buf) - end} trailing bytes after `BitpackedTelemetrySampleDataType`.'
+        return obj
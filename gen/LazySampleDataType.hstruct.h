@@ -0,0 +1,910 @@
+/*
+ *    ____   _____   _   _   _____   ____       _      _____   _____   ____       ____    ___    ____    _____ 
+ *   / ___| | ____| | \ | | | ____| |  _ \     / \    |_   _| | ____| |  _ \     / ___|  / _ \  |  _ \  | ____|
+ *  | |  _  |  _|   |  \| | |  _|   | |_) |   / _ \     | |   |  _|   | | | |   | |     | | | | | | | | |  _|  
+ *  | |_| | | |___  | |\  | | |___  |  _ <   / ___ \    | |   | |___  | |_| |   | |___  | |_| | | |_| | | |___ 
+ *   \____| |_____| |_| \_| |_____| |_| \_\ /_/   \_\   |_|   |_____| |____/     \____|  \___/  |____/  |_____|
+ *
+ */
+#pragma once
+
+#include "hstruct_ifc.h"
+#include "OtherSampleDataType.hstruct.h"
+
+
+struct LazySampleDataType : public HStruct_ifc
+{
+    bool is_enabled;
+    uint16_t id;
+    uint64_t memory_pos;
+    float_t slider_pos;
+    std::string name;
+    std::array<uint32_t, 8> banana_indexes;
+    std::vector<std::string> tokens;
+    std::vector<uint32_t> ipv4_addresses;
+    std::vector<int64_t> deltas;
+    OtherSampleDataType parent_obj;
+    std::vector<OtherSampleDataType> children_objs;
+    std::array<OtherSampleDataType, 2> banana_objs;
+
+    // Hash of the wire layout, written into the header of dumped files.
+    static constexpr uint64_t k_schema_fingerprint{ 0x0de9e244563d6770ull };
+
+    static constexpr size_t k_fixed_serialized_size{ 47 + 9 * sizeof(size_t) };
+
+    size_t serialized_size() const override
+    {
+        size_t size{ k_fixed_serialized_size };
+        size += name.length();
+        for (const auto& elem : tokens)
+        {
+            size += sizeof(size_t) + elem.length();
+        }
+        size += ipv4_addresses.size() * sizeof(uint32_t);
+        size += varint_size(deltas.size());
+        for (const auto& elem : deltas)
+        {
+            size += varint_size(zigzag_encode(elem));
+        }
+        size += parent_obj.serialized_size();
+        for (const auto& elem : children_objs)
+        {
+            size += elem.serialized_size();
+        }
+        for (const auto& elem : banana_objs)
+        {
+            size += elem.serialized_size();
+        }
+        return size;
+    }
+
+    void serialize_dump(const std::string& fname, SerialCodec codec = SerialCodec::none) override
+    {
+        SerialBuffer sb;
+        sb.mode = SerialBuffer::SBM_WRITE;
+        size_t expected_size{ SchemaHeader::k_size + serialized_size() };
+        sb.reserve(expected_size);
+        SchemaHeader::write(sb, k_schema_fingerprint);
+        write_data_to_serial_buffer(sb);
+        assert(sb.buffer.size() == expected_size);
+        if (!sb.save_buffer_to_disk(fname, codec))
+        {
+            throw std::runtime_error{ "Can't write " + fname };
+        }
+    }
+
+    void serialize_load(const std::string& fname) override
+    {
+        SerialBuffer sb;
+        if (!sb.load_buffer_from_disk(fname))
+        {
+            throw std::runtime_error{ "Can't read " + fname };
+        }
+        if (!read_file_from_serial_buffer(sb))
+        {
+            throw std::runtime_error{ "Wrong schema or truncated data, expected LazySampleDataType: " + fname };
+        }
+    }
+
+    void serialize_load_mmap(const std::string& fname) override
+    {
+        MappedFile file;
+        if (!file.open(fname))
+        {
+            throw std::runtime_error{ "Can't map " + fname };
+        }
+        SerialBuffer sb;
+        if (!sb.attach_file_view(file.view()))
+        {
+            throw std::runtime_error{ "Can't decompress " + fname };
+        }
+        if (!read_file_from_serial_buffer(sb))
+        {
+            throw std::runtime_error{ "Wrong schema or truncated data, expected LazySampleDataType: " + fname };
+        }
+    }
+
+    void serialize_dump_streamed(const std::string& fname, size_t window_bytes = SerialBuffer::k_default_window_bytes) override
+    {
+        std::ofstream file{ fname.c_str(), std::ios::out | std::ios::trunc | std::ios::binary };
+        if (!file.is_open())
+        {
+            throw std::runtime_error{ "Can't write " + fname };
+        }
+        SerialBuffer sb;
+        sb.attach_write_stream(file, window_bytes);
+        SchemaHeader::write(sb, k_schema_fingerprint);
+        write_data_to_serial_buffer(sb);
+        if (!sb.flush_write_stream())
+        {
+            throw std::runtime_error{ "Can't write " + fname };
+        }
+    }
+
+    void serialize_load_streamed(const std::string& fname, size_t window_bytes = SerialBuffer::k_default_window_bytes) override
+    {
+        std::ifstream file{ fname.c_str(), std::ios::in | std::ios::binary };
+        if (!file.is_open())
+        {
+            throw std::runtime_error{ "Can't read " + fname };
+        }
+        uint8_t header[CompressedContainer::k_fixed_header_size]{};
+        file.read(reinterpret_cast<char*>(header), sizeof(header));
+        if (CompressedContainer::is_container({ header, static_cast<size_t>(file.gcount()) }))
+        {
+            serialize_load(fname);
+            return;
+        }
+        file.clear();
+        file.seekg(0);
+        SerialBuffer sb;
+        sb.attach_read_stream(file, window_bytes);
+        if (!read_file_from_serial_buffer(sb))
+        {
+            throw std::runtime_error{ "Wrong schema or truncated data, expected LazySampleDataType: " + fname };
+        }
+    }
+
+    void serialize_to(std::vector<uint8_t>& out) override
+    {
+        SerialBuffer sb;
+        sb.buffer.swap(out);
+        sb.clear();
+        sb.mode = SerialBuffer::SBM_WRITE;
+        size_t expected_size{ SchemaHeader::k_size + serialized_size() };
+        sb.reserve(expected_size);
+        SchemaHeader::write(sb, k_schema_fingerprint);
+        write_data_to_serial_buffer(sb);
+        assert(sb.buffer.size() == expected_size);
+        out.swap(sb.buffer);
+    }
+
+    size_t serialize_into(std::span<uint8_t> out) override
+    {
+        size_t expected_size{ SchemaHeader::k_size + serialized_size() };
+        if (expected_size > out.size())
+        {
+            return 0;
+        }
+        SerialBuffer& sb{ SerialBuffer::thread_scratch() };
+        sb.clear();
+        sb.mode = SerialBuffer::SBM_WRITE;
+        sb.reserve(expected_size);
+        SchemaHeader::write(sb, k_schema_fingerprint);
+        write_data_to_serial_buffer(sb);
+        assert(sb.buffer.size() == expected_size);
+        std::memcpy(out.data(), sb.buffer.data(), expected_size);
+        return expected_size;
+    }
+
+    bool deserialize_from(std::span<const uint8_t> bytes) override
+    {
+        SerialBuffer sb;
+        if (!sb.attach_file_view(bytes) || !read_file_from_serial_buffer(sb))
+        {
+            return false;
+        }
+        return sb.buffer_position == sb.read_view.size();
+    }
+
+    void write_data_to_serial_buffer(SerialBuffer& sb) override
+    {
+        std::array<uint8_t, 15> is_enabled__run;
+        std::memcpy(is_enabled__run.data() + 0, &is_enabled, sizeof(bool));
+        std::memcpy(is_enabled__run.data() + 1, &id, sizeof(uint16_t));
+        std::memcpy(is_enabled__run.data() + 3, &memory_pos, sizeof(uint64_t));
+        std::memcpy(is_enabled__run.data() + 11, &slider_pos, sizeof(float_t));
+        sb.write_bulk(is_enabled__run.data(), 1, 15);
+
+        size_t name__str_length{ name.length() };
+        sb.write_elem(&name__str_length, sizeof(size_t));
+        sb.write_elem(name.data(), sizeof(char) * name__str_length);
+
+        sb.write_bulk(banana_indexes.data(), sizeof(uint32_t), 8);
+
+        size_t tokens__lazy_position{ sb.write_position() };
+        size_t tokens__lazy_size{ 0 };
+        sb.write_elem(&tokens__lazy_size, sizeof(size_t));
+        size_t tokens__list_count{ tokens.size() };
+        sb.write_elem(&tokens__list_count, sizeof(size_t));
+        for (size_t i = 0; i < tokens__list_count; i++)
+        {
+            size_t tokens__str_length{ tokens[i].length() };
+            sb.write_elem(&tokens__str_length, sizeof(size_t));
+            sb.write_elem(tokens[i].data(), sizeof(char) * tokens__str_length);
+        }
+        tokens__lazy_size = sb.write_position() - tokens__lazy_position - sizeof(size_t);
+        sb.patch_bulk(tokens__lazy_position, &tokens__lazy_size, sizeof(size_t), 1);
+
+        size_t ipv4_addresses__lazy_position{ sb.write_position() };
+        size_t ipv4_addresses__lazy_size{ 0 };
+        sb.write_elem(&ipv4_addresses__lazy_size, sizeof(size_t));
+        size_t ipv4_addresses__list_count{ ipv4_addresses.size() };
+        sb.write_elem(&ipv4_addresses__list_count, sizeof(size_t));
+        sb.write_bulk(ipv4_addresses.data(), sizeof(uint32_t), ipv4_addresses__list_count);
+        ipv4_addresses__lazy_size = sb.write_position() - ipv4_addresses__lazy_position - sizeof(size_t);
+        sb.patch_bulk(ipv4_addresses__lazy_position, &ipv4_addresses__lazy_size, sizeof(size_t), 1);
+
+        size_t deltas__lazy_position{ sb.write_position() };
+        size_t deltas__lazy_size{ 0 };
+        sb.write_elem(&deltas__lazy_size, sizeof(size_t));
+        size_t deltas__list_count{ deltas.size() };
+        sb.write_varint(deltas__list_count);
+        for (size_t i = 0; i < deltas__list_count; i++)
+        {
+            sb.write_varint(zigzag_encode(deltas[i]));
+        }
+        deltas__lazy_size = sb.write_position() - deltas__lazy_position - sizeof(size_t);
+        sb.patch_bulk(deltas__lazy_position, &deltas__lazy_size, sizeof(size_t), 1);
+
+        parent_obj.write_data_to_serial_buffer(sb);
+
+        size_t children_objs__lazy_position{ sb.write_position() };
+        size_t children_objs__lazy_size{ 0 };
+        sb.write_elem(&children_objs__lazy_size, sizeof(size_t));
+        size_t children_objs__list_count{ children_objs.size() };
+        sb.write_elem(&children_objs__list_count, sizeof(size_t));
+        for (size_t i = 0; i < children_objs__list_count; i++)
+        {
+            children_objs[i].write_data_to_serial_buffer(sb);
+        }
+        children_objs__lazy_size = sb.write_position() - children_objs__lazy_position - sizeof(size_t);
+        sb.patch_bulk(children_objs__lazy_position, &children_objs__lazy_size, sizeof(size_t), 1);
+
+        size_t banana_objs__lazy_position{ sb.write_position() };
+        size_t banana_objs__lazy_size{ 0 };
+        sb.write_elem(&banana_objs__lazy_size, sizeof(size_t));
+        for (size_t i = 0; i < 2; i++)
+        {
+            banana_objs[i].write_data_to_serial_buffer(sb);
+        }
+        banana_objs__lazy_size = sb.write_position() - banana_objs__lazy_position - sizeof(size_t);
+        sb.patch_bulk(banana_objs__lazy_position, &banana_objs__lazy_size, sizeof(size_t), 1);
+    }
+
+    void read_data_from_serial_buffer(SerialBuffer& sb) override
+    {
+        const uint8_t* is_enabled__run{ static_cast<const uint8_t*>(sb.read_elem(15)) };
+        std::memcpy(&is_enabled, is_enabled__run + 0, sizeof(bool));
+        std::memcpy(&id, is_enabled__run + 1, sizeof(uint16_t));
+        std::memcpy(&memory_pos, is_enabled__run + 3, sizeof(uint64_t));
+        std::memcpy(&slider_pos, is_enabled__run + 11, sizeof(float_t));
+
+        size_t name__str_length{ sb.read_value<size_t>() };
+        name = std::string{ reinterpret_cast<const char*>(sb.read_elem(sizeof(char) * name__str_length)), name__str_length };
+
+        sb.read_bulk(banana_indexes.data(), sizeof(uint32_t), 8);
+
+        sb.read_elem(sizeof(size_t));  // Byte size prefix is only needed for skipping.
+        size_t tokens__list_count{ sb.read_value<size_t>() };
+        sb.check_list_count(tokens__list_count, sizeof(size_t));
+        tokens.clear();
+        tokens.reserve(tokens__list_count);
+        for (size_t i = 0; i < tokens__list_count; i++)
+        {
+            size_t tokens__str_length{ sb.read_value<size_t>() };
+            tokens.emplace_back(reinterpret_cast<const char*>(sb.read_elem(sizeof(char) * tokens__str_length)), tokens__str_length);
+        }
+
+        sb.read_elem(sizeof(size_t));  // Byte size prefix is only needed for skipping.
+        size_t ipv4_addresses__list_count{ sb.read_value<size_t>() };
+        sb.check_list_count(ipv4_addresses__list_count, sizeof(uint32_t));
+        ipv4_addresses.resize(ipv4_addresses__list_count);
+        sb.read_bulk(ipv4_addresses.data(), sizeof(uint32_t), ipv4_addresses__list_count);
+
+        sb.read_elem(sizeof(size_t));  // Byte size prefix is only needed for skipping.
+        size_t deltas__list_count{ sb.read_varint() };
+        sb.check_list_count(deltas__list_count, 1);
+        deltas.clear();
+        deltas.reserve(deltas__list_count);
+        for (size_t i = 0; i < deltas__list_count; i++)
+        {
+            deltas.emplace_back(static_cast<int64_t>(zigzag_decode(sb.read_varint())));
+        }
+
+        parent_obj.read_data_from_serial_buffer(sb);
+
+        sb.read_elem(sizeof(size_t));  // Byte size prefix is only needed for skipping.
+        size_t children_objs__list_count{ sb.read_value<size_t>() };
+        sb.check_list_count(children_objs__list_count, OtherSampleDataType::k_fixed_serialized_size);
+        children_objs.clear();
+        children_objs.reserve(children_objs__list_count);
+        for (size_t i = 0; i < children_objs__list_count; i++)
+        {
+            children_objs.emplace_back(OtherSampleDataType{});
+            children_objs.back().read_data_from_serial_buffer(sb);
+        }
+
+        sb.read_elem(sizeof(size_t));  // Byte size prefix is only needed for skipping.
+        for (size_t i = 0; i < 2; i++)
+        {
+            banana_objs[i].read_data_from_serial_buffer(sb);
+        }
+    }
+
+    // Reads a dumped file's header and the data after it. Files written in a
+    // `previous` layout (or with nested structs in theirs) get migrated. Fails
+    // on any other schema.
+    bool read_file_from_serial_buffer(SerialBuffer& sb)
+    {
+        uint64_t fingerprint{ 0 };
+        if (!SchemaHeader::read(sb, fingerprint))
+        {
+            return false;
+        }
+        if (fingerprint == k_schema_fingerprint)
+        {
+            read_data_from_serial_buffer(sb);
+            return true;
+        }
+        if (fingerprint == 0xc84a8ad64acaeabaull)
+        {
+            read_previous_c84a8ad64acaeaba_from_serial_buffer(sb);
+            return true;
+        }
+        return false;
+    }
+
+    // Reads the older layout with fingerprint 0xc84a8ad64acaeaba field by field.
+    // That's the current layout with `OtherSampleDataType` in an older layout.
+    // Fields it doesn't have are left at their defaults.
+    void read_previous_c84a8ad64acaeaba_from_serial_buffer(SerialBuffer& sb)
+    {
+        *this = LazySampleDataType{};
+        is_enabled = sb.read_value<bool>();
+        id = sb.read_value<uint16_t>();
+        memory_pos = sb.read_value<uint64_t>();
+        slider_pos = sb.read_value<float_t>();
+
+        size_t name__str_length{ sb.read_value<size_t>() };
+        name = std::string{ reinterpret_cast<const char*>(sb.read_elem(sizeof(char) * name__str_length)), name__str_length };
+
+        sb.read_bulk(banana_indexes.data(), sizeof(uint32_t), 8);
+
+        sb.read_elem(sizeof(size_t));  // Byte size prefix is only needed for skipping.
+        size_t tokens__list_count{ sb.read_value<size_t>() };
+        sb.check_list_count(tokens__list_count, sizeof(size_t));
+        tokens.clear();
+        tokens.reserve(tokens__list_count);
+        for (size_t i = 0; i < tokens__list_count; i++)
+        {
+            size_t tokens__str_length{ sb.read_value<size_t>() };
+            tokens.emplace_back(reinterpret_cast<const char*>(sb.read_elem(sizeof(char) * tokens__str_length)), tokens__str_length);
+        }
+
+        sb.read_elem(sizeof(size_t));  // Byte size prefix is only needed for skipping.
+        size_t ipv4_addresses__list_count{ sb.read_value<size_t>() };
+        sb.check_list_count(ipv4_addresses__list_count, sizeof(uint32_t));
+        ipv4_addresses.resize(ipv4_addresses__list_count);
+        sb.read_bulk(ipv4_addresses.data(), sizeof(uint32_t), ipv4_addresses__list_count);
+
+        sb.read_elem(sizeof(size_t));  // Byte size prefix is only needed for skipping.
+        size_t deltas__list_count{ sb.read_varint() };
+        sb.check_list_count(deltas__list_count, 1);
+        deltas.clear();
+        deltas.reserve(deltas__list_count);
+        for (size_t i = 0; i < deltas__list_count; i++)
+        {
+            deltas.emplace_back(static_cast<int64_t>(zigzag_decode(sb.read_varint())));
+        }
+
+        parent_obj.read_previous_793d713eb978678a_from_serial_buffer(sb);
+
+        sb.read_elem(sizeof(size_t));  // Byte size prefix is only needed for skipping.
+        size_t children_objs__list_count{ sb.read_value<size_t>() };
+        sb.check_list_count(children_objs__list_count, 1);
+        children_objs.clear();
+        children_objs.reserve(children_objs__list_count);
+        for (size_t i = 0; i < children_objs__list_count; i++)
+        {
+            children_objs.emplace_back(OtherSampleDataType{});
+            children_objs.back().read_previous_793d713eb978678a_from_serial_buffer(sb);
+        }
+
+        sb.read_elem(sizeof(size_t));  // Byte size prefix is only needed for skipping.
+        for (size_t i = 0; i < 2; i++)
+        {
+            banana_objs[i].read_previous_793d713eb978678a_from_serial_buffer(sb);
+        }
+    }
+
+    bool operator==(const LazySampleDataType& other) const
+    {
+        return is_enabled == other.is_enabled
+            && id == other.id
+            && memory_pos == other.memory_pos
+            && slider_pos == other.slider_pos
+            && name == other.name
+            && banana_indexes == other.banana_indexes
+            && tokens == other.tokens
+            && ipv4_addresses == other.ipv4_addresses
+            && deltas == other.deltas
+            && parent_obj == other.parent_obj
+            && children_objs == other.children_objs
+            && banana_objs == other.banana_objs;
+    }
+
+    // Writes only what changed since `prev`, for `apply_delta` on a copy of
+    // `prev` to catch up with. Not a file: there's no schema header.
+    void write_delta(const LazySampleDataType& prev, SerialBuffer& sb)
+    {
+        std::array<uint8_t, 2> delta__mask{};
+        delta__mask[0] |= static_cast<uint8_t>((is_enabled != prev.is_enabled) << 0);
+        delta__mask[0] |= static_cast<uint8_t>((id != prev.id) << 1);
+        delta__mask[0] |= static_cast<uint8_t>((memory_pos != prev.memory_pos) << 2);
+        delta__mask[0] |= static_cast<uint8_t>((slider_pos != prev.slider_pos) << 3);
+        delta__mask[0] |= static_cast<uint8_t>((name != prev.name) << 4);
+        delta__mask[0] |= static_cast<uint8_t>((banana_indexes != prev.banana_indexes) << 5);
+        delta__mask[0] |= static_cast<uint8_t>((tokens != prev.tokens) << 6);
+        delta__mask[0] |= static_cast<uint8_t>((ipv4_addresses != prev.ipv4_addresses) << 7);
+        delta__mask[1] |= static_cast<uint8_t>((deltas != prev.deltas) << 0);
+        delta__mask[1] |= static_cast<uint8_t>((parent_obj != prev.parent_obj) << 1);
+        delta__mask[1] |= static_cast<uint8_t>((children_objs != prev.children_objs) << 2);
+        delta__mask[1] |= static_cast<uint8_t>((banana_objs != prev.banana_objs) << 3);
+        sb.write_bulk(delta__mask.data(), 1, 2);
+
+        if (((delta__mask[0] >> 0) & 1) != 0)
+        {
+            sb.write_elem(&is_enabled, sizeof(bool));
+        }
+
+        if (((delta__mask[0] >> 1) & 1) != 0)
+        {
+            sb.write_elem(&id, sizeof(uint16_t));
+        }
+
+        if (((delta__mask[0] >> 2) & 1) != 0)
+        {
+            sb.write_elem(&memory_pos, sizeof(uint64_t));
+        }
+
+        if (((delta__mask[0] >> 3) & 1) != 0)
+        {
+            sb.write_elem(&slider_pos, sizeof(float_t));
+        }
+
+        if (((delta__mask[0] >> 4) & 1) != 0)
+        {
+            size_t name__str_length{ name.length() };
+            sb.write_elem(&name__str_length, sizeof(size_t));
+            sb.write_elem(name.data(), sizeof(char) * name__str_length);
+        }
+
+        if (((delta__mask[0] >> 5) & 1) != 0)
+        {
+            write_delta_elems(sb, banana_indexes, prev.banana_indexes, [&](size_t i) {
+                sb.write_elem(&banana_indexes[i], sizeof(uint32_t));
+            });
+        }
+
+        if (((delta__mask[0] >> 6) & 1) != 0)
+        {
+            size_t tokens__list_count{ tokens.size() };
+            sb.write_elem(&tokens__list_count, sizeof(size_t));
+            write_delta_runs(sb, tokens, prev.tokens, [&](size_t i) {
+                size_t tokens__str_length{ tokens[i].length() };
+                sb.write_elem(&tokens__str_length, sizeof(size_t));
+                sb.write_elem(tokens[i].data(), sizeof(char) * tokens__str_length);
+            });
+        }
+
+        if (((delta__mask[0] >> 7) & 1) != 0)
+        {
+            size_t ipv4_addresses__list_count{ ipv4_addresses.size() };
+            sb.write_elem(&ipv4_addresses__list_count, sizeof(size_t));
+            write_delta_runs(sb, ipv4_addresses, prev.ipv4_addresses, [&](size_t i) {
+                sb.write_elem(&ipv4_addresses[i], sizeof(uint32_t));
+            });
+        }
+
+        if (((delta__mask[1] >> 0) & 1) != 0)
+        {
+            size_t deltas__list_count{ deltas.size() };
+            sb.write_varint(deltas__list_count);
+            write_delta_runs(sb, deltas, prev.deltas, [&](size_t i) {
+                sb.write_varint(zigzag_encode(deltas[i]));
+            });
+        }
+
+        if (((delta__mask[1] >> 1) & 1) != 0)
+        {
+            parent_obj.write_delta(prev.parent_obj, sb);
+        }
+
+        if (((delta__mask[1] >> 2) & 1) != 0)
+        {
+            size_t children_objs__list_count{ children_objs.size() };
+            sb.write_elem(&children_objs__list_count, sizeof(size_t));
+            write_delta_runs(sb, children_objs, prev.children_objs, [&](size_t i) {
+                if (i < prev.children_objs.size())
+                {
+                    children_objs[i].write_delta(prev.children_objs[i], sb);
+                }
+                else
+                {
+                    children_objs[i].write_delta(OtherSampleDataType{}, sb);
+                }
+            });
+        }
+
+        if (((delta__mask[1] >> 3) & 1) != 0)
+        {
+            write_delta_elems(sb, banana_objs, prev.banana_objs, [&](size_t i) {
+                banana_objs[i].write_delta(prev.banana_objs[i], sb);
+            });
+        }
+    }
+
+    // Applies a `write_delta` to the `prev` it was written against.
+    void apply_delta(SerialBuffer& sb)
+    {
+        std::array<uint8_t, 2> delta__mask;
+        sb.read_bulk(delta__mask.data(), 1, 2);
+
+        if (((delta__mask[0] >> 0) & 1) != 0)
+        {
+            is_enabled = sb.read_value<bool>();
+        }
+
+        if (((delta__mask[0] >> 1) & 1) != 0)
+        {
+            id = sb.read_value<uint16_t>();
+        }
+
+        if (((delta__mask[0] >> 2) & 1) != 0)
+        {
+            memory_pos = sb.read_value<uint64_t>();
+        }
+
+        if (((delta__mask[0] >> 3) & 1) != 0)
+        {
+            slider_pos = sb.read_value<float_t>();
+        }
+
+        if (((delta__mask[0] >> 4) & 1) != 0)
+        {
+            size_t name__str_length{ sb.read_value<size_t>() };
+            name = std::string{ reinterpret_cast<const char*>(sb.read_elem(sizeof(char) * name__str_length)), name__str_length };
+        }
+
+        if (((delta__mask[0] >> 5) & 1) != 0)
+        {
+            read_delta_elems(sb, banana_indexes, [&](size_t i) {
+                banana_indexes[i] = sb.read_value<uint32_t>();
+            });
+        }
+
+        if (((delta__mask[0] >> 6) & 1) != 0)
+        {
+            size_t tokens__list_count{ sb.read_value<size_t>() };
+            if (tokens__list_count > tokens.size())
+            {
+                sb.check_list_count(tokens__list_count - tokens.size(), sizeof(size_t));
+            }
+            tokens.resize(tokens__list_count);
+            read_delta_runs(sb, tokens, [&](size_t i) {
+                size_t tokens__str_length{ sb.read_value<size_t>() };
+                tokens[i] = std::string{ reinterpret_cast<const char*>(sb.read_elem(sizeof(char) * tokens__str_length)), tokens__str_length };
+            });
+        }
+
+        if (((delta__mask[0] >> 7) & 1) != 0)
+        {
+            size_t ipv4_addresses__list_count{ sb.read_value<size_t>() };
+            if (ipv4_addresses__list_count > ipv4_addresses.size())
+            {
+                sb.check_list_count(ipv4_addresses__list_count - ipv4_addresses.size(), sizeof(uint32_t));
+            }
+            ipv4_addresses.resize(ipv4_addresses__list_count);
+            read_delta_runs(sb, ipv4_addresses, [&](size_t i) {
+                ipv4_addresses[i] = sb.read_value<uint32_t>();
+            });
+        }
+
+        if (((delta__mask[1] >> 0) & 1) != 0)
+        {
+            size_t deltas__list_count{ sb.read_varint() };
+            if (deltas__list_count > deltas.size())
+            {
+                sb.check_list_count(deltas__list_count - deltas.size(), 1);
+            }
+            deltas.resize(deltas__list_count);
+            read_delta_runs(sb, deltas, [&](size_t i) {
+                deltas[i] = static_cast<int64_t>(zigzag_decode(sb.read_varint()));
+            });
+        }
+
+        if (((delta__mask[1] >> 1) & 1) != 0)
+        {
+            parent_obj.apply_delta(sb);
+        }
+
+        if (((delta__mask[1] >> 2) & 1) != 0)
+        {
+            size_t children_objs__list_count{ sb.read_value<size_t>() };
+            if (children_objs__list_count > children_objs.size())
+            {
+                sb.check_list_count(children_objs__list_count - children_objs.size(), 1);
+            }
+            children_objs.resize(children_objs__list_count);
+            read_delta_runs(sb, children_objs, [&](size_t i) {
+                children_objs[i].apply_delta(sb);
+            });
+        }
+
+        if (((delta__mask[1] >> 3) & 1) != 0)
+        {
+            read_delta_elems(sb, banana_objs, [&](size_t i) {
+                banana_objs[i].apply_delta(sb);
+            });
+        }
+    }
+};
+
+
+// Read-only view of a serialized `LazySampleDataType`. Strings and primitive
+// lists point into the serialized bytes, which must outlive the view.
+struct LazySampleDataType_view
+{
+    bool is_enabled;
+    uint16_t id;
+    uint64_t memory_pos;
+    float_t slider_pos;
+    std::string_view name;
+    UnalignedSpan<uint32_t> banana_indexes;
+    std::vector<std::string_view> tokens;
+    UnalignedSpan<uint32_t> ipv4_addresses;
+    std::vector<int64_t> deltas;
+    OtherSampleDataType_view parent_obj;
+    std::vector<OtherSampleDataType_view> children_objs;
+    std::array<OtherSampleDataType_view, 2> banana_objs;
+
+    void attach(std::span<const uint8_t> bytes)
+    {
+        SerialBuffer sb;
+        sb.attach_read_view(bytes);
+        read_view_from_serial_buffer(sb);
+    }
+
+    // Same as `attach`, for the bytes of a whole raw `serialize_dump`ed file.
+    // Fails if the file was written with a different schema.
+    bool attach_file(std::span<const uint8_t> bytes)
+    {
+        SerialBuffer sb;
+        sb.attach_read_view(bytes);
+        uint64_t fingerprint{ 0 };
+        if (!SchemaHeader::read(sb, fingerprint) || fingerprint != LazySampleDataType::k_schema_fingerprint)
+        {
+            return false;
+        }
+        read_view_from_serial_buffer(sb);
+        return true;
+    }
+
+    void read_view_from_serial_buffer(SerialBuffer& sb)
+    {
+        const uint8_t* is_enabled__run{ static_cast<const uint8_t*>(sb.read_elem(15)) };
+        std::memcpy(&is_enabled, is_enabled__run + 0, sizeof(bool));
+        std::memcpy(&id, is_enabled__run + 1, sizeof(uint16_t));
+        std::memcpy(&memory_pos, is_enabled__run + 3, sizeof(uint64_t));
+        std::memcpy(&slider_pos, is_enabled__run + 11, sizeof(float_t));
+
+        size_t name__str_length{ sb.read_value<size_t>() };
+        name = std::string_view{ reinterpret_cast<const char*>(sb.read_elem(sizeof(char) * name__str_length)), name__str_length };
+
+        banana_indexes = UnalignedSpan<uint32_t>{ static_cast<const uint8_t*>(sb.read_elem(sizeof(uint32_t) * 8)), 8 };
+
+        sb.read_elem(sizeof(size_t));  // Byte size prefix is only needed for skipping.
+        size_t tokens__list_count{ sb.read_value<size_t>() };
+        sb.check_list_count(tokens__list_count, sizeof(size_t));
+        tokens.resize(tokens__list_count);
+        for (size_t i = 0; i < tokens__list_count; i++)
+        {
+            size_t tokens__str_length{ sb.read_value<size_t>() };
+            tokens[i] = std::string_view{ reinterpret_cast<const char*>(sb.read_elem(sizeof(char) * tokens__str_length)), tokens__str_length };
+        }
+
+        sb.read_elem(sizeof(size_t));  // Byte size prefix is only needed for skipping.
+        size_t ipv4_addresses__list_count{ sb.read_value<size_t>() };
+        sb.check_list_count(ipv4_addresses__list_count, sizeof(uint32_t));
+        ipv4_addresses = UnalignedSpan<uint32_t>{ static_cast<const uint8_t*>(sb.read_elem(sizeof(uint32_t) * ipv4_addresses__list_count)), ipv4_addresses__list_count };
+
+        sb.read_elem(sizeof(size_t));  // Byte size prefix is only needed for skipping.
+        size_t deltas__list_count{ sb.read_varint() };
+        sb.check_list_count(deltas__list_count, 1);
+        deltas.resize(deltas__list_count);
+        for (size_t i = 0; i < deltas__list_count; i++)
+        {
+            deltas[i] = static_cast<int64_t>(zigzag_decode(sb.read_varint()));
+        }
+
+        parent_obj.read_view_from_serial_buffer(sb);
+
+        sb.read_elem(sizeof(size_t));  // Byte size prefix is only needed for skipping.
+        size_t children_objs__list_count{ sb.read_value<size_t>() };
+        sb.check_list_count(children_objs__list_count, OtherSampleDataType::k_fixed_serialized_size);
+        children_objs.resize(children_objs__list_count);
+        for (size_t i = 0; i < children_objs__list_count; i++)
+        {
+            children_objs[i].read_view_from_serial_buffer(sb);
+        }
+
+        sb.read_elem(sizeof(size_t));  // Byte size prefix is only needed for skipping.
+        for (size_t i = 0; i < 2; i++)
+        {
+            banana_objs[i].read_view_from_serial_buffer(sb);
+        }
+    }
+};
+
+
+// Lazily decoded `LazySampleDataType`. `attach` decodes the eager fields and
+// skips over the `lazy` ones, which get decoded on first access. The
+// serialized bytes must outlive it.
+struct LazySampleDataType_lazy
+{
+    bool is_enabled;
+    uint16_t id;
+    uint64_t memory_pos;
+    float_t slider_pos;
+    std::string name;
+    std::array<uint32_t, 8> banana_indexes;
+    std::span<const uint8_t> tokens__bytes;
+    std::optional<std::vector<std::string>> tokens__value;
+    std::span<const uint8_t> ipv4_addresses__bytes;
+    std::optional<std::vector<uint32_t>> ipv4_addresses__value;
+    std::span<const uint8_t> deltas__bytes;
+    std::optional<std::vector<int64_t>> deltas__value;
+    OtherSampleDataType parent_obj;
+    std::span<const uint8_t> children_objs__bytes;
+    std::optional<std::vector<OtherSampleDataType>> children_objs__value;
+    std::span<const uint8_t> banana_objs__bytes;
+    std::optional<std::array<OtherSampleDataType, 2>> banana_objs__value;
+
+    void attach(std::span<const uint8_t> bytes)
+    {
+        SerialBuffer sb;
+        sb.attach_read_view(bytes);
+        read_lazy_from_serial_buffer(sb);
+    }
+
+    // Same as `attach`, for the bytes of a whole raw `serialize_dump`ed file.
+    // Fails if the file was written with a different schema.
+    bool attach_file(std::span<const uint8_t> bytes)
+    {
+        SerialBuffer sb;
+        sb.attach_read_view(bytes);
+        uint64_t fingerprint{ 0 };
+        if (!SchemaHeader::read(sb, fingerprint) || fingerprint != LazySampleDataType::k_schema_fingerprint)
+        {
+            return false;
+        }
+        read_lazy_from_serial_buffer(sb);
+        return true;
+    }
+
+    void read_lazy_from_serial_buffer(SerialBuffer& sb)
+    {
+        const uint8_t* is_enabled__run{ static_cast<const uint8_t*>(sb.read_elem(15)) };
+        std::memcpy(&is_enabled, is_enabled__run + 0, sizeof(bool));
+        std::memcpy(&id, is_enabled__run + 1, sizeof(uint16_t));
+        std::memcpy(&memory_pos, is_enabled__run + 3, sizeof(uint64_t));
+        std::memcpy(&slider_pos, is_enabled__run + 11, sizeof(float_t));
+
+        size_t name__str_length{ sb.read_value<size_t>() };
+        name = std::string{ reinterpret_cast<const char*>(sb.read_elem(sizeof(char) * name__str_length)), name__str_length };
+
+        sb.read_bulk(banana_indexes.data(), sizeof(uint32_t), 8);
+
+        size_t tokens__lazy_size{ sb.read_value<size_t>() };
+        tokens__bytes = { reinterpret_cast<const uint8_t*>(sb.read_elem(tokens__lazy_size)), tokens__lazy_size };
+        tokens__value.reset();
+
+        size_t ipv4_addresses__lazy_size{ sb.read_value<size_t>() };
+        ipv4_addresses__bytes = { reinterpret_cast<const uint8_t*>(sb.read_elem(ipv4_addresses__lazy_size)), ipv4_addresses__lazy_size };
+        ipv4_addresses__value.reset();
+
+        size_t deltas__lazy_size{ sb.read_value<size_t>() };
+        deltas__bytes = { reinterpret_cast<const uint8_t*>(sb.read_elem(deltas__lazy_size)), deltas__lazy_size };
+        deltas__value.reset();
+
+        parent_obj.read_data_from_serial_buffer(sb);
+
+        size_t children_objs__lazy_size{ sb.read_value<size_t>() };
+        children_objs__bytes = { reinterpret_cast<const uint8_t*>(sb.read_elem(children_objs__lazy_size)), children_objs__lazy_size };
+        children_objs__value.reset();
+
+        size_t banana_objs__lazy_size{ sb.read_value<size_t>() };
+        banana_objs__bytes = { reinterpret_cast<const uint8_t*>(sb.read_elem(banana_objs__lazy_size)), banana_objs__lazy_size };
+        banana_objs__value.reset();
+    }
+
+    const std::vector<std::string>& tokens()
+    {
+        if (!tokens__value)
+        {
+            SerialBuffer sb;
+            sb.attach_read_view(tokens__bytes);
+            auto& tokens{ tokens__value.emplace() };
+            size_t tokens__list_count{ sb.read_value<size_t>() };
+            sb.check_list_count(tokens__list_count, sizeof(size_t));
+            tokens.clear();
+            tokens.reserve(tokens__list_count);
+            for (size_t i = 0; i < tokens__list_count; i++)
+            {
+                size_t tokens__str_length{ sb.read_value<size_t>() };
+                tokens.emplace_back(reinterpret_cast<const char*>(sb.read_elem(sizeof(char) * tokens__str_length)), tokens__str_length);
+            }
+        }
+        return *tokens__value;
+    }
+
+    const std::vector<uint32_t>& ipv4_addresses()
+    {
+        if (!ipv4_addresses__value)
+        {
+            SerialBuffer sb;
+            sb.attach_read_view(ipv4_addresses__bytes);
+            auto& ipv4_addresses{ ipv4_addresses__value.emplace() };
+            size_t ipv4_addresses__list_count{ sb.read_value<size_t>() };
+            sb.check_list_count(ipv4_addresses__list_count, sizeof(uint32_t));
+            ipv4_addresses.resize(ipv4_addresses__list_count);
+            sb.read_bulk(ipv4_addresses.data(), sizeof(uint32_t), ipv4_addresses__list_count);
+        }
+        return *ipv4_addresses__value;
+    }
+
+    const std::vector<int64_t>& deltas()
+    {
+        if (!deltas__value)
+        {
+            SerialBuffer sb;
+            sb.attach_read_view(deltas__bytes);
+            auto& deltas{ deltas__value.emplace() };
+            size_t deltas__list_count{ sb.read_varint() };
+            sb.check_list_count(deltas__list_count, 1);
+            deltas.clear();
+            deltas.reserve(deltas__list_count);
+            for (size_t i = 0; i < deltas__list_count; i++)
+            {
+                deltas.emplace_back(static_cast<int64_t>(zigzag_decode(sb.read_varint())));
+            }
+        }
+        return *deltas__value;
+    }
+
+    const std::vector<OtherSampleDataType>& children_objs()
+    {
+        if (!children_objs__value)
+        {
+            SerialBuffer sb;
+            sb.attach_read_view(children_objs__bytes);
+            auto& children_objs{ children_objs__value.emplace() };
+            size_t children_objs__list_count{ sb.read_value<size_t>() };
+            sb.check_list_count(children_objs__list_count, OtherSampleDataType::k_fixed_serialized_size);
+            children_objs.clear();
+            children_objs.reserve(children_objs__list_count);
+            for (size_t i = 0; i < children_objs__list_count; i++)
+            {
+                children_objs.emplace_back(OtherSampleDataType{});
+                children_objs.back().read_data_from_serial_buffer(sb);
+            }
+        }
+        return *children_objs__value;
+    }
+
+    const std::array<OtherSampleDataType, 2>& banana_objs()
+    {
+        if (!banana_objs__value)
+        {
+            SerialBuffer sb;
+            sb.attach_read_view(banana_objs__bytes);
+            auto& banana_objs{ banana_objs__value.emplace() };
+            for (size_t i = 0; i < 2; i++)
+            {
+                banana_objs[i].read_data_from_serial_buffer(sb);
+            }
+        }
+        return *banana_objs__value;
+    }
+};
@@ -0,0 +1,177 @@
+#    ____   _____   _   _   _____   ____       _      _____   _____   ____       ____    ___    ____    _____
+#   / ___| | ____| | \ | | | ____| |  _ \     / \    |_   _| | ____| |  _ \     / ___|  / _ \  |  _ \  | ____|
+#  | |  _  |  _|   |  \| | |  _|   | |_) |   / _ \     | |   |  _|   | | | |   | |     | | | | | | | | |  _|
+#  | |_| | | |___  | |\  | | |___  |  _ <   / ___ \    | |   | |___  | |_| |   | |___  | |_| | | |_| | | |___
+#   \____| |_____| |_| \_| |_____| |_| \_\ /_/   \_\   |_|   |_____| |____/     \____|  \___/  |____/  |_____|
+#
+# Python twin of `LazySampleDataType.hstruct.h`. Reads and writes the same binary format.
+import struct
+import sys
+from array import array
+from typing import List, Tuple
+
+try:
+    from .hstruct_runtime import _LENGTH, _FILE_HEADER, _FILE_MAGIC, _array_typecode, _varint_size, _pack_varint, _unpack_varint, _pack_varints, _unpack_varints, _varints_size, _pack_string, _unpack_string, _string_size, _pack_array, _unpack_array
+except ImportError:
+    from hstruct_runtime import _LENGTH, _FILE_HEADER, _FILE_MAGIC, _array_typecode, _varint_size, _pack_varint, _unpack_varint, _pack_varints, _unpack_varints, _varints_size, _pack_string, _unpack_string, _string_size, _pack_array, _unpack_array
+try:
+    from .OtherSampleDataType_hstruct import OtherSampleDataType
+except ImportError:
+    from OtherSampleDataType_hstruct import OtherSampleDataType
+
+
+class LazySampleDataType:
+    __slots__ = (
+        'is_enabled',
+        'id',
+        'memory_pos',
+        'slider_pos',
+        'name',
+        'banana_indexes',
+        'tokens',
+        'ipv4_addresses',
+        'deltas',
+        'parent_obj',
+        'children_objs',
+        'banana_objs',
+    )
+
+    SCHEMA_FINGERPRINT = 0x0de9e244563d6770
+
+    _RUN_0 = struct.Struct('<?HQf')
+    _RUN_1 = struct.Struct('<8I')
+    _TYPECODE_ipv4_addresses = _array_typecode('I')
+
+    def __init__(self):
+        self.is_enabled = False
+        self.id = 0
+        self.memory_pos = 0
+        self.slider_pos = 0.0
+        self.name = ''
+        self.banana_indexes = [0] * 8
+        self.tokens = []
+        self.ipv4_addresses = array(self._TYPECODE_ipv4_addresses)
+        self.deltas = []
+        self.parent_obj = OtherSampleDataType()
+        self.children_objs = []
+        self.banana_objs = [OtherSampleDataType() for _ in range(2)]
+
+    def serialized_size(self) -> int:
+        size = 87
+        size += _string_size(self.name)
+        size += 8 + sum(_string_size(elem) for elem in self.tokens)
+        size += 8 + 4 * len(self.ipv4_addresses)
+        size += _varint_size(len(self.deltas)) + _varints_size(self.deltas, True)
+        size += self.parent_obj.serialized_size()
+        size += 8 + sum(elem.serialized_size() for elem in self.children_objs)
+        size += sum(elem.serialized_size() for elem in self.banana_objs)
+        return size
+
+    def pack_into(self, buf, offset: int = 0) -> int:
+        pos = offset
+        self._RUN_0.pack_into(buf, pos, self.is_enabled, self.id, self.memory_pos, self.slider_pos)
+        pos += 15
+        pos = _pack_string(buf, pos, self.name)
+        self._RUN_1.pack_into(buf, pos, *self.banana_indexes)
+        pos += 32
+        tokens__lazy_pos = pos
+        pos += 8
+        _LENGTH.pack_into(buf, pos, len(self.tokens))
+        pos += 8
+        for elem in self.tokens:
+            pos = _pack_string(buf, pos, elem)
+        _LENGTH.pack_into(buf, tokens__lazy_pos, pos - tokens__lazy_pos - 8)
+        ipv4_addresses__lazy_pos = pos
+        pos += 8
+        pos = _pack_array(buf, pos, self.ipv4_addresses, self._TYPECODE_ipv4_addresses)
+        _LENGTH.pack_into(buf, ipv4_addresses__lazy_pos, pos - ipv4_addresses__lazy_pos - 8)
+        deltas__lazy_pos = pos
+        pos += 8
+        pos = _pack_varint(buf, pos, len(self.deltas))
+        pos = _pack_varints(buf, pos, self.deltas, True)
+        _LENGTH.pack_into(buf, deltas__lazy_pos, pos - deltas__lazy_pos - 8)
+        pos = self.parent_obj.pack_into(buf, pos)
+        children_objs__lazy_pos = pos
+        pos += 8
+        _LENGTH.pack_into(buf, pos, len(self.children_objs))
+        pos += 8
+        for elem in self.children_objs:
+            pos = elem.pack_into(buf, pos)
+        _LENGTH.pack_into(buf, children_objs__lazy_pos, pos - children_objs__lazy_pos - 8)
+        banana_objs__lazy_pos = pos
+        pos += 8
+        assert len(self.banana_objs) == 2, '`banana_objs` must have 2 elements.'
+        for elem in self.banana_objs:
+            pos = elem.pack_into(buf, pos)
+        _LENGTH.pack_into(buf, banana_objs__lazy_pos, pos - banana_objs__lazy_pos - 8)
+        return pos
+
+    @classmethod
+    def unpack_from(cls, buf, offset: int = 0) -> Tuple['LazySampleDataType', int]:
+        self = cls.__new__(cls)
+        view = memoryview(buf)
+        pos = offset
+        (self.is_enabled, self.id, self.memory_pos, self.slider_pos,) = cls._RUN_0.unpack_from(view, pos)
+        pos += 15
+        self.name, pos = _unpack_string(view, pos)
+        values = cls._RUN_1.unpack_from(view, pos)
+        self.banana_indexes = list(values[0:8])
+        pos += 32
+        pos += 8
+        (count,) = _LENGTH.unpack_from(view, pos)
+        pos += 8
+        items = []
+        for _ in range(count):
+            item, pos = _unpack_string(view, pos)
+            items.append(item)
+        self.tokens = items
+        pos += 8
+        self.ipv4_addresses, pos = _unpack_array(view, pos, cls._TYPECODE_ipv4_addresses)
+        pos += 8
+        count, pos = _unpack_varint(view, pos)
+        self.deltas, pos = _unpack_varints(view, pos, count, True)
+        self.parent_obj, pos = OtherSampleDataType.unpack_from(view, pos)
+        pos += 8
+        (count,) = _LENGTH.unpack_from(view, pos)
+        pos += 8
+        items = []
+        for _ in range(count):
+            item, pos = OtherSampleDataType.unpack_from(view, pos)
+            items.append(item)
+        self.children_objs = items
+        pos += 8
+        items = []
+        for _ in range(2):
+            item, pos = OtherSampleDataType.unpack_from(view, pos)
+            items.append(item)
+        self.banana_objs = items
+        return self, pos
+
+    def to_bytes(self) -> bytearray:
+        buf = bytearray(self.serialized_size())
+        end = self.pack_into(buf)
+        assert end == len(buf), f'Packed {end} bytes but measured {len(buf)}.'
+        return buf
+
+    @classmethod
+    def from_bytes(cls, buf) -> 'LazySampleDataType':
+        obj, end = cls.unpack_from(buf)
+        assert end == len(buf), f'{len(buf) - end} trailing bytes after `LazySampleDataType`.'
+        return obj
+
+    def to_file_bytes(self) -> bytearray:
+        buf = bytearray(_FILE_HEADER.size + self.serialized_size())
+        _FILE_HEADER.pack_into(buf, 0, _FILE_MAGIC, self.SCHEMA_FINGERPRINT)
+        end = self.pack_into(buf, _FILE_HEADER.size)
+        assert end == len(buf), f'Packed {end} bytes but measured {len(buf)}.'
+        return buf
+
+    @classmethod
+    def from_file_bytes(cls, buf) -> 'LazySampleDataType':
+        magic, fingerprint = _FILE_HEADER.unpack_from(buf, 0)
+        assert magic == _FILE_MAGIC, 'No schema header, not a dumped file.'
+        assert fingerprint == cls.SCHEMA_FINGERPRINT, \
+            f'File was written with schema 0x{fingerprint:016x}, `LazySampleDataType` is 0x{cls.SCHEMA_FINGERPRINT:016x}.'
+        obj, end = cls.unpack_from(buf, _FILE_HEADER.size)
+        assert end == len(buf), f'{len(buf) - end} trailing bytes after `LazySampleDataType`.'
+        return obj
@@ -0,0 +1,84 @@
+#    ____   _____   _   _   _____   ____       _      _____   _____   ____       ____    ___    ____    _____
+#   / ___| | ____| | \ | | | ____| |  _ \     / \    |_   _| | ____| |  _ \     / ___|  / _ \  |  _ \  | ____|
+#  | |  _  |  _|   |  \| | |  _|   | |_) |   / _ \     | |   |  _|   | | | |   | |     | | | | | | | | |  _|
+#  | |_| | | |___  | |\  | | |___  |  _ <   / ___ \    | |   | |___  | |_| |   | |___  | |_| | | |_| | | |___
+#   \____| |_____| |_| \_| |_____| |_| \_\ /_/   \_\   |_|   |_____| |____/     \____|  \___/  |____/  |_____|
+#
+# Python twin of `OtherSampleDataType.hstruct.h`. Reads and writes the same binary format.
+import struct
+import sys
+from array import array
+from typing import List, Tuple
+
+try:
+    from .hstruct_runtime import _FILE_HEADER, _FILE_MAGIC, _pack_string, _unpack_string, _string_size
+except ImportError:
+    from hstruct_runtime import _FILE_HEADER, _FILE_MAGIC, _pack_string, _unpack_string, _string_size
+
+
+class OtherSampleDataType:
+    __slots__ = (
+        'name',
+        'is_enabled',
+        'stride_bytes',
+    )
+
+    SCHEMA_FINGERPRINT = 0x95d6183ea9b7d632
+
+    _RUN_0 = struct.Struct('<?Q')
+
+    def __init__(self):
+        self.name = ''
+        self.is_enabled = False
+        self.stride_bytes = 0
+
+    def serialized_size(self) -> int:
+        size = 9
+        size += _string_size(self.name)
+        return size
+
+    def pack_into(self, buf, offset: int = 0) -> int:
+        pos = offset
+        pos = _pack_string(buf, pos, self.name)
+        self._RUN_0.pack_into(buf, pos, self.is_enabled, self.stride_bytes)
+        pos += 9
+        return pos
+
+    @classmethod
+    def unpack_from(cls, buf, offset: int = 0) -> Tuple['OtherSampleDataType', int]:
+        self = cls.__new__(cls)
+        view = memoryview(buf)
+        pos = offset
+        self.name, pos = _unpack_string(view, pos)
+        (self.is_enabled, self.stride_bytes,) = cls._RUN_0.unpack_from(view, pos)
+        pos += 9
+        return self, pos
+
+    def to_bytes(self) -> bytearray:
+        buf = bytearray(self.serialized_size())
+        end = self.pack_into(buf)
+        assert end == len(buf), f'Packed {end} bytes but measured {len(buf)}.'
+        return buf
+
+    @classmethod
+    def from_bytes(cls, buf) -> 'OtherSampleDataType':
+        obj, end = cls.unpack_from(buf)
+        assert end == len(buf), f'{len(buf) - end} trailing bytes after `OtherSampleDataType`.'
+        return obj
+
+    def to_file_bytes(self) -> bytearray:
+        buf = bytearray(_FILE_HEADER.size + self.serialized_size())
+        _FILE_HEADER.pack_into(buf, 0, _FILE_MAGIC, self.SCHEMA_FINGERPRINT)
+        end = self.pack_into(buf, _FILE_HEADER.size)
+        assert end == len(buf), f'Packed {end} bytes but measured {len(buf)}.'
+        return buf
+
+    @classmethod
+    def from_file_bytes(cls, buf) -> 'OtherSampleDataType':
+        magic, fingerprint = _FILE_HEADER.unpack_from(buf, 0)
+        assert magic == _FILE_MAGIC, 'No schema header, not a dumped file.'
+        assert fingerprint == cls.SCHEMA_FINGERPRINT, \
+            f'File was written with schema 0x{fingerprint:016x}, `OtherSampleDataType` is 0x{cls.SCHEMA_FINGERPRINT:016x}.'
+        obj, end = cls.unpack_from(buf, _FILE_HEADER.size)
+        assert end == len(buf), f'{len(buf) - end} trailing bytes after `OtherSampleDataType`.'
+        return obj
@@ -0,0 +1,693 @@
+/*
+ *    ____   _____   _   _   _____   ____       _      _____   _____   ____       ____    ___    ____    _____ 
+ *   / ___| | ____| | \ | | | ____| |  _ \     / \    |_   _| | ____| |  _ \     / ___|  / _ \  |  _ \  | ____|
+ *  | |  _  |  _|   |  \| | |  _|   | |_) |   / _ \     | |   |  _|   | | | |   | |     | | | | | | | | |  _|  
+ *  | |_| | | |___  | |\  | | |___  |  _ <   / ___ \    | |   | |___  | |_| |   | |___  | |_| | | |_| | | |___ 
+ *   \____| |_____| |_| \_| |_____| |_| \_\ /_/   \_\   |_|   |_____| |____/     \____|  \___/  |____/  |_____|
+ *
+ */
+#pragma once
+
+#include "hstruct_ifc.h"
+#include "OtherSampleDataType.hstruct.h"
+
+
+struct PackedSampleDataType : public HStruct_ifc
+{
+    uint32_t complexity;
+    std::string name;
+    float_t slider_pos;
+    std::vector<uint32_t> ipv4_addresses;
+    std::array<uint32_t, 8> banana_indexes;
+    std::vector<std::string> tokens;
+    bool is_enabled;
+    OtherSampleDataType parent_obj;
+    std::vector<OtherSampleDataType> children_objs;
+
+    // Hash of the wire layout, written into the header of dumped files.
+    static constexpr uint64_t k_schema_fingerprint{ 0x4de12b716678079eull };
+
+    // Packed layout. Fixed-size fields sit at constant offsets from the start
+    // of the record, followed by a table of `uint64_t` offsets locating each
+    // variable-size field (plus the end of the record).
+    static constexpr size_t k_offset_complexity{ 0 };
+    static constexpr size_t k_offset_slider_pos{ 4 };
+    static constexpr size_t k_offset_banana_indexes{ 8 };
+    static constexpr size_t k_offset_is_enabled{ 40 };
+    static constexpr size_t k_packed_fixed_size{ 41 };
+    static constexpr size_t k_packed_offset_table_count{ 6 };
+    static constexpr size_t k_slot_name{ 0 };
+    static constexpr size_t k_slot_ipv4_addresses{ 1 };
+    static constexpr size_t k_slot_tokens{ 2 };
+    static constexpr size_t k_slot_parent_obj{ 3 };
+    static constexpr size_t k_slot_children_objs{ 4 };
+
+    static void check_packed_record(std::span<const uint8_t> record)
+    {
+        if (record.size() < k_packed_fixed_size + k_packed_offset_table_count * sizeof(uint64_t))
+        {
+            throw std::out_of_range{ "Packed record is truncated." };
+        }
+    }
+
+    static uint32_t peek_complexity(std::span<const uint8_t> record)
+    {
+        check_packed_record(record);
+        uint32_t value;
+        std::memcpy(&value, record.data() + k_offset_complexity, sizeof(uint32_t));
+        return value;
+    }
+
+    static float_t peek_slider_pos(std::span<const uint8_t> record)
+    {
+        check_packed_record(record);
+        float_t value;
+        std::memcpy(&value, record.data() + k_offset_slider_pos, sizeof(float_t));
+        return value;
+    }
+
+    static UnalignedSpan<uint32_t> peek_banana_indexes(std::span<const uint8_t> record)
+    {
+        check_packed_record(record);
+        return UnalignedSpan<uint32_t>{ record.data() + k_offset_banana_indexes, 8 };
+    }
+
+    static bool peek_is_enabled(std::span<const uint8_t> record)
+    {
+        check_packed_record(record);
+        bool value;
+        std::memcpy(&value, record.data() + k_offset_is_enabled, sizeof(bool));
+        return value;
+    }
+
+    // Encoded bytes of the variable-size field in `slot`.
+    static std::span<const uint8_t> peek_slot_bytes(std::span<const uint8_t> record, size_t slot)
+    {
+        check_packed_record(record);
+        uint64_t offsets[2];
+        std::memcpy(offsets, record.data() + k_packed_fixed_size + slot * sizeof(uint64_t), sizeof(offsets));
+        if (offsets[0] > offsets[1] || offsets[1] > record.size())
+        {
+            throw std::out_of_range{ "Packed offset table entry is out of range." };
+        }
+        return record.subspan(offsets[0], offsets[1] - offsets[0]);
+    }
+
+    static std::string_view peek_name(std::span<const uint8_t> record)
+    {
+        std::span<const uint8_t> bytes{ peek_slot_bytes(record, k_slot_name) };
+        if (bytes.size() < sizeof(size_t))
+        {
+            throw std::out_of_range{ "Packed field is truncated." };
+        }
+        return { reinterpret_cast<const char*>(bytes.data() + sizeof(size_t)), bytes.size() - sizeof(size_t) };
+    }
+
+    static UnalignedSpan<uint32_t> peek_ipv4_addresses(std::span<const uint8_t> record)
+    {
+        std::span<const uint8_t> bytes{ peek_slot_bytes(record, k_slot_ipv4_addresses) };
+        if (bytes.size() < sizeof(size_t))
+        {
+            throw std::out_of_range{ "Packed field is truncated." };
+        }
+        return UnalignedSpan<uint32_t>{ bytes.data() + sizeof(size_t), (bytes.size() - sizeof(size_t)) / sizeof(uint32_t) };
+    }
+
+    static std::span<const uint8_t> peek_tokens_bytes(std::span<const uint8_t> record)
+    {
+        return peek_slot_bytes(record, k_slot_tokens);
+    }
+
+    static std::span<const uint8_t> peek_parent_obj_bytes(std::span<const uint8_t> record)
+    {
+        return peek_slot_bytes(record, k_slot_parent_obj);
+    }
+
+    static std::span<const uint8_t> peek_children_objs_bytes(std::span<const uint8_t> record)
+    {
+        return peek_slot_bytes(record, k_slot_children_objs);
+    }
+
+    static constexpr size_t k_fixed_serialized_size{ 41 + 4 * sizeof(size_t) + k_packed_offset_table_count * sizeof(uint64_t) };
+
+    size_t serialized_size() const override
+    {
+        size_t size{ k_fixed_serialized_size };
+        size += name.length();
+        size += ipv4_addresses.size() * sizeof(uint32_t);
+        for (const auto& elem : tokens)
+        {
+            size += sizeof(size_t) + elem.length();
+        }
+        size += parent_obj.serialized_size();
+        for (const auto& elem : children_objs)
+        {
+            size += elem.serialized_size();
+        }
+        return size;
+    }
+
+    void serialize_dump(const std::string& fname, SerialCodec codec = SerialCodec::none) override
+    {
+        SerialBuffer sb;
+        sb.mode = SerialBuffer::SBM_WRITE;
+        size_t expected_size{ SchemaHeader::k_size + serialized_size() };
+        sb.reserve(expected_size);
+        SchemaHeader::write(sb, k_schema_fingerprint);
+        write_data_to_serial_buffer(sb);
+        assert(sb.buffer.size() == expected_size);
+        if (!sb.save_buffer_to_disk(fname, codec))
+        {
+            throw std::runtime_error{ "Can't write " + fname };
+        }
+    }
+
+    void serialize_load(const std::string& fname) override
+    {
+        SerialBuffer sb;
+        if (!sb.load_buffer_from_disk(fname))
+        {
+            throw std::runtime_error{ "Can't read " + fname };
+        }
+        if (!read_file_from_serial_buffer(sb))
+        {
+            throw std::runtime_error{ "Wrong schema or truncated data, expected PackedSampleDataType: " + fname };
+        }
+    }
+
+    void serialize_load_mmap(const std::string& fname) override
+    {
+        MappedFile file;
+        if (!file.open(fname))
+        {
+            throw std::runtime_error{ "Can't map " + fname };
+        }
+        SerialBuffer sb;
+        if (!sb.attach_file_view(file.view()))
+        {
+            throw std::runtime_error{ "Can't decompress " + fname };
+        }
+        if (!read_file_from_serial_buffer(sb))
+        {
+            throw std::runtime_error{ "Wrong schema or truncated data, expected PackedSampleDataType: " + fname };
+        }
+    }
+
+    void serialize_dump_streamed(const std::string& fname, size_t window_bytes = SerialBuffer::k_default_window_bytes) override
+    {
+        std::ofstream file{ fname.c_str(), std::ios::out | std::ios::trunc | std::ios::binary };
+        if (!file.is_open())
+        {
+            throw std::runtime_error{ "Can't write " + fname };
+        }
+        SerialBuffer sb;
+        sb.attach_write_stream(file, window_bytes);
+        SchemaHeader::write(sb, k_schema_fingerprint);
+        write_data_to_serial_buffer(sb);
+        if (!sb.flush_write_stream())
+        {
+            throw std::runtime_error{ "Can't write " + fname };
+        }
+    }
+
+    void serialize_load_streamed(const std::string& fname, size_t window_bytes = SerialBuffer::k_default_window_bytes) override
+    {
+        std::ifstream file{ fname.c_str(), std::ios::in | std::ios::binary };
+        if (!file.is_open())
+        {
+            throw std::runtime_error{ "Can't read " + fname };
+        }
+        uint8_t header[CompressedContainer::k_fixed_header_size]{};
+        file.read(reinterpret_cast<char*>(header), sizeof(header));
+        if (CompressedContainer::is_container({ header, static_cast<size_t>(file.gcount()) }))
+        {
+            serialize_load(fname);
+            return;
+        }
+        file.clear();
+        file.seekg(0);
+        SerialBuffer sb;
+        sb.attach_read_stream(file, window_bytes);
+        if (!read_file_from_serial_buffer(sb))
+        {
+            throw std::runtime_error{ "Wrong schema or truncated data, expected PackedSampleDataType: " + fname };
+        }
+    }
+
+    void serialize_to(std::vector<uint8_t>& out) override
+    {
+        SerialBuffer sb;
+        sb.buffer.swap(out);
+        sb.clear();
+        sb.mode = SerialBuffer::SBM_WRITE;
+        size_t expected_size{ SchemaHeader::k_size + serialized_size() };
+        sb.reserve(expected_size);
+        SchemaHeader::write(sb, k_schema_fingerprint);
+        write_data_to_serial_buffer(sb);
+        assert(sb.buffer.size() == expected_size);
+        out.swap(sb.buffer);
+    }
+
+    size_t serialize_into(std::span<uint8_t> out) override
+    {
+        size_t expected_size{ SchemaHeader::k_size + serialized_size() };
+        if (expected_size > out.size())
+        {
+            return 0;
+        }
+        SerialBuffer& sb{ SerialBuffer::thread_scratch() };
+        sb.clear();
+        sb.mode = SerialBuffer::SBM_WRITE;
+        sb.reserve(expected_size);
+        SchemaHeader::write(sb, k_schema_fingerprint);
+        write_data_to_serial_buffer(sb);
+        assert(sb.buffer.size() == expected_size);
+        std::memcpy(out.data(), sb.buffer.data(), expected_size);
+        return expected_size;
+    }
+
+    bool deserialize_from(std::span<const uint8_t> bytes) override
+    {
+        SerialBuffer sb;
+        if (!sb.attach_file_view(bytes) || !read_file_from_serial_buffer(sb))
+        {
+            return false;
+        }
+        return sb.buffer_position == sb.read_view.size();
+    }
+
+    void write_data_to_serial_buffer(SerialBuffer& sb) override
+    {
+        size_t record_start{ sb.write_position() };
+        std::array<uint8_t, 41> complexity__run;
+        std::memcpy(complexity__run.data() + 0, &complexity, sizeof(uint32_t));
+        std::memcpy(complexity__run.data() + 4, &slider_pos, sizeof(float_t));
+        std::memcpy(complexity__run.data() + 8, banana_indexes.data(), sizeof(uint32_t) * 8);
+        std::memcpy(complexity__run.data() + 40, &is_enabled, sizeof(bool));
+        sb.write_bulk(complexity__run.data(), 1, 41);
+
+        std::array<uint64_t, k_packed_offset_table_count> offset_table{};
+        size_t offset_table_position{ sb.write_position() };
+        sb.write_bulk(offset_table.data(), sizeof(uint64_t), k_packed_offset_table_count);
+
+        offset_table[k_slot_name] = sb.write_position() - record_start;
+        size_t name__str_length{ name.length() };
+        sb.write_elem(&name__str_length, sizeof(size_t));
+        sb.write_elem(name.data(), sizeof(char) * name__str_length);
+
+        offset_table[k_slot_ipv4_addresses] = sb.write_position() - record_start;
+        size_t ipv4_addresses__list_count{ ipv4_addresses.size() };
+        sb.write_elem(&ipv4_addresses__list_count, sizeof(size_t));
+        sb.write_bulk(ipv4_addresses.data(), sizeof(uint32_t), ipv4_addresses__list_count);
+
+        offset_table[k_slot_tokens] = sb.write_position() - record_start;
+        size_t tokens__list_count{ tokens.size() };
+        sb.write_elem(&tokens__list_count, sizeof(size_t));
+        for (size_t i = 0; i < tokens__list_count; i++)
+        {
+            size_t tokens__str_length{ tokens[i].length() };
+            sb.write_elem(&tokens__str_length, sizeof(size_t));
+            sb.write_elem(tokens[i].data(), sizeof(char) * tokens__str_length);
+        }
+
+        offset_table[k_slot_parent_obj] = sb.write_position() - record_start;
+        parent_obj.write_data_to_serial_buffer(sb);
+
+        offset_table[k_slot_children_objs] = sb.write_position() - record_start;
+        size_t children_objs__list_count{ children_objs.size() };
+        sb.write_elem(&children_objs__list_count, sizeof(size_t));
+        for (size_t i = 0; i < children_objs__list_count; i++)
+        {
+            children_objs[i].write_data_to_serial_buffer(sb);
+        }
+
+        offset_table[5] = sb.write_position() - record_start;
+        sb.patch_bulk(offset_table_position, offset_table.data(), sizeof(uint64_t), k_packed_offset_table_count);
+    }
+
+    void read_data_from_serial_buffer(SerialBuffer& sb) override
+    {
+        const uint8_t* complexity__run{ static_cast<const uint8_t*>(sb.read_elem(41)) };
+        std::memcpy(&complexity, complexity__run + 0, sizeof(uint32_t));
+        std::memcpy(&slider_pos, complexity__run + 4, sizeof(float_t));
+        std::memcpy(banana_indexes.data(), complexity__run + 8, sizeof(uint32_t) * 8);
+        std::memcpy(&is_enabled, complexity__run + 40, sizeof(bool));
+
+        // Offset table is only needed for in-place access.
+        sb.read_elem(sizeof(uint64_t) * PackedSampleDataType::k_packed_offset_table_count);
+
+        size_t name__str_length{ sb.read_value<size_t>() };
+        name = std::string{ reinterpret_cast<const char*>(sb.read_elem(sizeof(char) * name__str_length)), name__str_length };
+
+        size_t ipv4_addresses__list_count{ sb.read_value<size_t>() };
+        sb.check_list_count(ipv4_addresses__list_count, sizeof(uint32_t));
+        ipv4_addresses.resize(ipv4_addresses__list_count);
+        sb.read_bulk(ipv4_addresses.data(), sizeof(uint32_t), ipv4_addresses__list_count);
+
+        size_t tokens__list_count{ sb.read_value<size_t>() };
+        sb.check_list_count(tokens__list_count, sizeof(size_t));
+        tokens.clear();
+        tokens.reserve(tokens__list_count);
+        for (size_t i = 0; i < tokens__list_count; i++)
+        {
+            size_t tokens__str_length{ sb.read_value<size_t>() };
+            tokens.emplace_back(reinterpret_cast<const char*>(sb.read_elem(sizeof(char) * tokens__str_length)), tokens__str_length);
+        }
+
+        parent_obj.read_data_from_serial_buffer(sb);
+
+        size_t children_objs__list_count{ sb.read_value<size_t>() };
+        sb.check_list_count(children_objs__list_count, OtherSampleDataType::k_fixed_serialized_size);
+        children_objs.clear();
+        children_objs.reserve(children_objs__list_count);
+        for (size_t i = 0; i < children_objs__list_count; i++)
+        {
+            children_objs.emplace_back(OtherSampleDataType{});
+            children_objs.back().read_data_from_serial_buffer(sb);
+        }
+    }
+
+    // Reads a dumped file's header and the data after it. Files written in a
+    // `previous` layout (or with nested structs in theirs) get migrated. Fails
+    // on any other schema.
+    bool read_file_from_serial_buffer(SerialBuffer& sb)
+    {
+        uint64_t fingerprint{ 0 };
+        if (!SchemaHeader::read(sb, fingerprint))
+        {
+            return false;
+        }
+        if (fingerprint == k_schema_fingerprint)
+        {
+            read_data_from_serial_buffer(sb);
+            return true;
+        }
+        if (fingerprint == 0x6fd97a1e8f3d54b2ull)
+        {
+            read_previous_6fd97a1e8f3d54b2_from_serial_buffer(sb);
+            return true;
+        }
+        return false;
+    }
+
+    // Reads the older layout with fingerprint 0x6fd97a1e8f3d54b2 field by field.
+    // That's the current layout with `OtherSampleDataType` in an older layout.
+    // Fields it doesn't have are left at their defaults.
+    void read_previous_6fd97a1e8f3d54b2_from_serial_buffer(SerialBuffer& sb)
+    {
+        *this = PackedSampleDataType{};
+        complexity = sb.read_value<uint32_t>();
+        slider_pos = sb.read_value<float_t>();
+        sb.read_bulk(banana_indexes.data(), sizeof(uint32_t), 8);
+        is_enabled = sb.read_value<bool>();
+
+        // Offset table is only needed for in-place access.
+        sb.read_elem(sizeof(uint64_t) * 6);
+
+        size_t name__str_length{ sb.read_value<size_t>() };
+        name = std::string{ reinterpret_cast<const char*>(sb.read_elem(sizeof(char) * name__str_length)), name__str_length };
+
+        size_t ipv4_addresses__list_count{ sb.read_value<size_t>() };
+        sb.check_list_count(ipv4_addresses__list_count, sizeof(uint32_t));
+        ipv4_addresses.resize(ipv4_addresses__list_count);
+        sb.read_bulk(ipv4_addresses.data(), sizeof(uint32_t), ipv4_addresses__list_count);
+
+        size_t tokens__list_count{ sb.read_value<size_t>() };
+        sb.check_list_count(tokens__list_count, sizeof(size_t));
+        tokens.clear();
+        tokens.reserve(tokens__list_count);
+        for (size_t i = 0; i < tokens__list_count; i++)
+        {
+            size_t tokens__str_length{ sb.read_value<size_t>() };
+            tokens.emplace_back(reinterpret_cast<const char*>(sb.read_elem(sizeof(char) * tokens__str_length)), tokens__str_length);
+        }
+
+        parent_obj.read_previous_793d713eb978678a_from_serial_buffer(sb);
+
+        size_t children_objs__list_count{ sb.read_value<size_t>() };
+        sb.check_list_count(children_objs__list_count, 1);
+        children_objs.clear();
+        children_objs.reserve(children_objs__list_count);
+        for (size_t i = 0; i < children_objs__list_count; i++)
+        {
+            children_objs.emplace_back(OtherSampleDataType{});
+            children_objs.back().read_previous_793d713eb978678a_from_serial_buffer(sb);
+        }
+    }
+
+    bool operator==(const PackedSampleDataType& other) const
+    {
+        return complexity == other.complexity
+            && name == other.name
+            && slider_pos == other.slider_pos
+            && ipv4_addresses == other.ipv4_addresses
+            && banana_indexes == other.banana_indexes
+            && tokens == other.tokens
+            && is_enabled == other.is_enabled
+            && parent_obj == other.parent_obj
+            && children_objs == other.children_objs;
+    }
+
+    // Writes only what changed since `prev`, for `apply_delta` on a copy of
+    // `prev` to catch up with. Not a file: there's no schema header.
+    void write_delta(const PackedSampleDataType& prev, SerialBuffer& sb)
+    {
+        std::array<uint8_t, 2> delta__mask{};
+        delta__mask[0] |= static_cast<uint8_t>((complexity != prev.complexity) << 0);
+        delta__mask[0] |= static_cast<uint8_t>((name != prev.name) << 1);
+        delta__mask[0] |= static_cast<uint8_t>((slider_pos != prev.slider_pos) << 2);
+        delta__mask[0] |= static_cast<uint8_t>((ipv4_addresses != prev.ipv4_addresses) << 3);
+        delta__mask[0] |= static_cast<uint8_t>((banana_indexes != prev.banana_indexes) << 4);
+        delta__mask[0] |= static_cast<uint8_t>((tokens != prev.tokens) << 5);
+        delta__mask[0] |= static_cast<uint8_t>((is_enabled != prev.is_enabled) << 6);
+        delta__mask[0] |= static_cast<uint8_t>((parent_obj != prev.parent_obj) << 7);
+        delta__mask[1] |= static_cast<uint8_t>((children_objs != prev.children_objs) << 0);
+        sb.write_bulk(delta__mask.data(), 1, 2);
+
+        if (((delta__mask[0] >> 0) & 1) != 0)
+        {
+            sb.write_elem(&complexity, sizeof(uint32_t));
+        }
+
+        if (((delta__mask[0] >> 1) & 1) != 0)
+        {
+            size_t name__str_length{ name.length() };
+            sb.write_elem(&name__str_length, sizeof(size_t));
+            sb.write_elem(name.data(), sizeof(char) * name__str_length);
+        }
+
+        if (((delta__mask[0] >> 2) & 1) != 0)
+        {
+            sb.write_elem(&slider_pos, sizeof(float_t));
+        }
+
+        if (((delta__mask[0] >> 3) & 1) != 0)
+        {
+            size_t ipv4_addresses__list_count{ ipv4_addresses.size() };
+            sb.write_elem(&ipv4_addresses__list_count, sizeof(size_t));
+            write_delta_runs(sb, ipv4_addresses, prev.ipv4_addresses, [&](size_t i) {
+                sb.write_elem(&ipv4_addresses[i], sizeof(uint32_t));
+            });
+        }
+
+        if (((delta__mask[0] >> 4) & 1) != 0)
+        {
+            write_delta_elems(sb, banana_indexes, prev.banana_indexes, [&](size_t i) {
+                sb.write_elem(&banana_indexes[i], sizeof(uint32_t));
+            });
+        }
+
+        if (((delta__mask[0] >> 5) & 1) != 0)
+        {
+            size_t tokens__list_count{ tokens.size() };
+            sb.write_elem(&tokens__list_count, sizeof(size_t));
+            write_delta_runs(sb, tokens, prev.tokens, [&](size_t i) {
+                size_t tokens__str_length{ tokens[i].length() };
+                sb.write_elem(&tokens__str_length, sizeof(size_t));
+                sb.write_elem(tokens[i].data(), sizeof(char) * tokens__str_length);
+            });
+        }
+
+        if (((delta__mask[0] >> 6) & 1) != 0)
+        {
+            sb.write_elem(&is_enabled, sizeof(bool));
+        }
+
+        if (((delta__mask[0] >> 7) & 1) != 0)
+        {
+            parent_obj.write_delta(prev.parent_obj, sb);
+        }
+
+        if (((delta__mask[1] >> 0) & 1) != 0)
+        {
+            size_t children_objs__list_count{ children_objs.size() };
+            sb.write_elem(&children_objs__list_count, sizeof(size_t));
+            write_delta_runs(sb, children_objs, prev.children_objs, [&](size_t i) {
+                if (i < prev.children_objs.size())
+                {
+                    children_objs[i].write_delta(prev.children_objs[i], sb);
+                }
+                else
+                {
+                    children_objs[i].write_delta(OtherSampleDataType{}, sb);
+                }
+            });
+        }
+    }
+
+    // Applies a `write_delta` to the `prev` it was written against.
+    void apply_delta(SerialBuffer& sb)
+    {
+        std::array<uint8_t, 2> delta__mask;
+        sb.read_bulk(delta__mask.data(), 1, 2);
+
+        if (((delta__mask[0] >> 0) & 1) != 0)
+        {
+            complexity = sb.read_value<uint32_t>();
+        }
+
+        if (((delta__mask[0] >> 1) & 1) != 0)
+        {
+            size_t name__str_length{ sb.read_value<size_t>() };
+            name = std::string{ reinterpret_cast<const char*>(sb.read_elem(sizeof(char) * name__str_length)), name__str_length };
+        }
+
+        if (((delta__mask[0] >> 2) & 1) != 0)
+        {
+            slider_pos = sb.read_value<float_t>();
+        }
+
+        if (((delta__mask[0] >> 3) & 1) != 0)
+        {
+            size_t ipv4_addresses__list_count{ sb.read_value<size_t>() };
+            if (ipv4_addresses__list_count > ipv4_addresses.size())
+            {
+                sb.check_list_count(ipv4_addresses__list_count - ipv4_addresses.size(), sizeof(uint32_t));
+            }
+            ipv4_addresses.resize(ipv4_addresses__list_count);
+            read_delta_runs(sb, ipv4_addresses, [&](size_t i) {
+                ipv4_addresses[i] = sb.read_value<uint32_t>();
+            });
+        }
+
+        if (((delta__mask[0] >> 4) & 1) != 0)
+        {
+            read_delta_elems(sb, banana_indexes, [&](size_t i) {
+                banana_indexes[i] = sb.read_value<uint32_t>();
+            });
+        }
+
+        if (((delta__mask[0] >> 5) & 1) != 0)
+        {
+            size_t tokens__list_count{ sb.read_value<size_t>() };
+            if (tokens__list_count > tokens.size())
+            {
+                sb.check_list_count(tokens__list_count - tokens.size(), sizeof(size_t));
+            }
+            tokens.resize(tokens__list_count);
+            read_delta_runs(sb, tokens, [&](size_t i) {
+                size_t tokens__str_length{ sb.read_value<size_t>() };
+                tokens[i] = std::string{ reinterpret_cast<const char*>(sb.read_elem(sizeof(char) * tokens__str_length)), tokens__str_length };
+            });
+        }
+
+        if (((delta__mask[0] >> 6) & 1) != 0)
+        {
+            is_enabled = sb.read_value<bool>();
+        }
+
+        if (((delta__mask[0] >> 7) & 1) != 0)
+        {
+            parent_obj.apply_delta(sb);
+        }
+
+        if (((delta__mask[1] >> 0) & 1) != 0)
+        {
+            size_t children_objs__list_count{ sb.read_value<size_t>() };
+            if (children_objs__list_count > children_objs.size())
+            {
+                sb.check_list_count(children_objs__list_count - children_objs.size(), 1);
+            }
+            children_objs.resize(children_objs__list_count);
+            read_delta_runs(sb, children_objs, [&](size_t i) {
+                children_objs[i].apply_delta(sb);
+            });
+        }
+    }
+};
+
+
+// Read-only view of a serialized `PackedSampleDataType`. Strings and primitive
+// lists point into the serialized bytes, which must outlive the view.
+struct PackedSampleDataType_view
+{
+    uint32_t complexity;
+    std::string_view name;
+    float_t slider_pos;
+    UnalignedSpan<uint32_t> ipv4_addresses;
+    UnalignedSpan<uint32_t> banana_indexes;
+    std::vector<std::string_view> tokens;
+    bool is_enabled;
+    OtherSampleDataType_view parent_obj;
+    std::vector<OtherSampleDataType_view> children_objs;
+
+    void attach(std::span<const uint8_t> bytes)
+    {
+        SerialBuffer sb;
+        sb.attach_read_view(bytes);
+        read_view_from_serial_buffer(sb);
+    }
+
+    // Same as `attach`, for the bytes of a whole raw `serialize_dump`ed file.
+    // Fails if the file was written with a different schema.
+    bool attach_file(std::span<const uint8_t> bytes)
+    {
+        SerialBuffer sb;
+        sb.attach_read_view(bytes);
+        uint64_t fingerprint{ 0 };
+        if (!SchemaHeader::read(sb, fingerprint) || fingerprint != PackedSampleDataType::k_schema_fingerprint)
+        {
+            return false;
+        }
+        read_view_from_serial_buffer(sb);
+        return true;
+    }
+
+    void read_view_from_serial_buffer(SerialBuffer& sb)
+    {
+        const uint8_t* complexity__run{ static_cast<const uint8_t*>(sb.read_elem(41)) };
+        std::memcpy(&complexity, complexity__run + 0, sizeof(uint32_t));
+        std::memcpy(&slider_pos, complexity__run + 4, sizeof(float_t));
+        banana_indexes = UnalignedSpan<uint32_t>{ complexity__run + 8, 8 };
+        std::memcpy(&is_enabled, complexity__run + 40, sizeof(bool));
+
+        // Offset table is only needed for in-place access.
+        sb.read_elem(sizeof(uint64_t) * PackedSampleDataType::k_packed_offset_table_count);
+
+        size_t name__str_length{ sb.read_value<size_t>() };
+        name = std::string_view{ reinterpret_cast<const char*>(sb.read_elem(sizeof(char) * name__str_length)), name__str_length };
+
+        size_t ipv4_addresses__list_count{ sb.read_value<size_t>() };
+        sb.check_list_count(ipv4_addresses__list_count, sizeof(uint32_t));
+        ipv4_addresses = UnalignedSpan<uint32_t>{ static_cast<const uint8_t*>(sb.read_elem(sizeof(uint32_t) * ipv4_addresses__list_count)), ipv4_addresses__list_count };
+
+        size_t tokens__list_count{ sb.read_value<size_t>() };
+        sb.check_list_count(tokens__list_count, sizeof(size_t));
+        tokens.resize(tokens__list_count);
+        for (size_t i = 0; i < tokens__list_count; i++)
+        {
+            size_t tokens__str_length{ sb.read_value<size_t>() };
+            tokens[i] = std::string_view{ reinterpret_cast<const char*>(sb.read_elem(sizeof(char) * tokens__str_length)), tokens__str_length };
+        }
+
+        parent_obj.read_view_from_serial_buffer(sb);
+
+        size_t children_objs__list_count{ sb.read_value<size_t>() };
+        sb.check_list_count(children_objs__list_count, OtherSampleDataType::k_fixed_serialized_size);
+        children_objs.resize(children_objs__list_count);
+        for (size_t i = 0; i < children_objs__list_count; i++)
+        {
+            children_objs[i].read_view_from_serial_buffer(sb);
+        }
+    }
+};
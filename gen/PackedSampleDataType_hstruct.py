@@ -0,0 +1,147 @@
+#    ____   _____   _   _   _____   ____       _      _____   _____   ____       ____    ___    ____    _____
+#   / ___| | ____| | \ | | | ____| |  _ \     / \    |_   _| | ____| |  _ \     / ___|  / _ \  |  _ \  | ____|
+#  | |  _  |  _|   |  \| | |  _|   | |_) |   / _ \     | |   |  _|   | | | |   | |     | | | | | | | | |  _|
+#  | |_| | | |___  | |\  | | |___  |  _ <   / ___ \    | |   | |___  | |_| |   | |___  | |_| | | |_| | | |___
+#   \____| |_____| |_| \_| |_____| |_| \_\ /_/   \_\   |_|   |_____| |____/     \____|  \___/  |____/  |_____|
+#
+# Python twin of `PackedSampleDataType.hstruct.h`. Reads and writes the same binary format.
+import struct
+import sys
+from array import array
+from typing import List, Tuple
+
+try:
+    from .hstruct_runtime import _LENGTH, _FILE_HEADER, _FILE_MAGIC, _array_typecode, _pack_string, _unpack_string, _string_size, _pack_array, _unpack_array
+except ImportError:
+    from hstruct_runtime import _LENGTH, _FILE_HEADER, _FILE_MAGIC, _array_typecode, _pack_string, _unpack_string, _string_size, _pack_array, _unpack_array
+try:
+    from .OtherSampleDataType_hstruct import OtherSampleDataType
+except ImportError:
+    from OtherSampleDataType_hstruct import OtherSampleDataType
+
+
+class PackedSampleDataType:
+    __slots__ = (
+        'complexity',
+        'name',
+        'slider_pos',
+        'ipv4_addresses',
+        'banana_indexes',
+        'tokens',
+        'is_enabled',
+        'parent_obj',
+        'children_objs',
+    )
+
+    SCHEMA_FINGERPRINT = 0x4de12b716678079e
+
+    _RUN_0 = struct.Struct('<If8I?')
+    _OFFSET_TABLE = struct.Struct('<6Q')
+    _TYPECODE_ipv4_addresses = _array_typecode('I')
+
+    def __init__(self):
+        self.complexity = 0
+        self.name = ''
+        self.slider_pos = 0.0
+        self.ipv4_addresses = array(self._TYPECODE_ipv4_addresses)
+        self.banana_indexes = [0] * 8
+        self.tokens = []
+        self.is_enabled = False
+        self.parent_obj = OtherSampleDataType()
+        self.children_objs = []
+
+    def serialized_size(self) -> int:
+        size = 89
+        size += _string_size(self.name)
+        size += 8 + 4 * len(self.ipv4_addresses)
+        size += 8 + sum(_string_size(elem) for elem in self.tokens)
+        size += self.parent_obj.serialized_size()
+        size += 8 + sum(elem.serialized_size() for elem in self.children_objs)
+        return size
+
+    def pack_into(self, buf, offset: int = 0) -> int:
+        pos = offset
+        self._RUN_0.pack_into(buf, pos, self.complexity, self.slider_pos, *self.banana_indexes, self.is_enabled)
+        pos += 41
+        table_pos = pos
+        pos += 48
+        offsets = []
+        offsets.append(pos - offset)
+        pos = _pack_string(buf, pos, self.name)
+        offsets.append(pos - offset)
+        pos = _pack_array(buf, pos, self.ipv4_addresses, self._TYPECODE_ipv4_addresses)
+        offsets.append(pos - offset)
+        _LENGTH.pack_into(buf, pos, len(self.tokens))
+        pos += 8
+        for elem in self.tokens:
+            pos = _pack_string(buf, pos, elem)
+        offsets.append(pos - offset)
+        pos = self.parent_obj.pack_into(buf, pos)
+        offsets.append(pos - offset)
+        _LENGTH.pack_into(buf, pos, len(self.children_objs))
+        pos += 8
+        for elem in self.children_objs:
+            pos = elem.pack_into(buf, pos)
+        offsets.append(pos - offset)
+        self._OFFSET_TABLE.pack_into(buf, table_pos, *offsets)
+        return pos
+
+    @classmethod
+    def unpack_from(cls, buf, offset: int = 0) -> Tuple['PackedSampleDataType', int]:
+        self = cls.__new__(cls)
+        view = memoryview(buf)
+        pos = offset
+        values = cls._RUN_0.unpack_from(view, pos)
+        self.complexity = values[0]
+        self.slider_pos = values[1]
+        self.banana_indexes = list(values[2:10])
+        self.is_enabled = values[10]
+        pos += 41
+        pos += 48
+        self.name, pos = _unpack_string(view, pos)
+        self.ipv4_addresses, pos = _unpack_array(view, pos, cls._TYPECODE_ipv4_addresses)
+        (count,) = _LENGTH.unpack_from(view, pos)
+        pos += 8
+        items = []
+        for _ in range(count):
+            item, pos = _unpack_string(view, pos)
+            items.append(item)
+        self.tokens = items
+        self.parent_obj, pos = OtherSampleDataType.unpack_from(view, pos)
+        (count,) = _LENGTH.unpack_from(view, pos)
+        pos += 8
+        items = []
+        for _ in range(count):
+            item, pos = OtherSampleDataType.unpack_from(view, pos)
+            items.append(item)
+        self.children_objs = items
+        return self, pos
+
+    def to_bytes(self) -> bytearray:
+        buf = bytearray(self.serialized_size())
+        end = self.pack_into(buf)
+        assert end == len(buf), f'Packed {end} bytes but measured {len(buf)}.'
+        return buf
+
+    @classmethod
+    def from_bytes(cls, buf) -> 'PackedSampleDataType':
+        obj, end = cls.unpack_from(buf)
+        assert end == len(buf), f'{len(buf) - end} trailing bytes after `PackedSampleDataType`.'
+        return obj
+
+    def to_file_bytes(self) -> bytearray:
+        buf = bytearray(_FILE_HEADER.size + self.serialized_size())
+        _FILE_HEADER.pack_into(buf, 0, _FILE_MAGIC, self.SCHEMA_FINGERPRINT)
+        end = self.pack_into(buf, _FILE_HEADER.size)
+        assert end == len(buf), f'Packed {end} bytes but measured {len(buf)}.'
+        return buf
+
+    @classmethod
+    def from_file_bytes(cls, buf) -> 'PackedSampleDataType':
+        magic, fingerprint = _FILE_HEADER.unpack_from(buf, 0)
+        assert magic == _FILE_MAGIC, 'No schema header, not a dumped file.'
+        assert fingerprint == cls.SCHEMA_FINGERPRINT, \
+            f'File was written with schema 0x{fingerprint:016x}, `PackedSampleDataType` is 0x{cls.SCHEMA_FINGERPRINT:016x}.'
+        obj, end = cls.unpack_from(buf, _FILE_HEADER.size)
+        assert end == len(buf), f'{len(buf) - end} trailing bytes after `PackedSampleDataType`.'
+        return obj
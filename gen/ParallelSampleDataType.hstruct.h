@@ -0,0 +1,446 @@
+/*
+ *    ____   _____   _   _   _____   ____       _      _____   _____   ____       ____    ___    ____    _____ 
+ *   / ___| | ____| | \ | | | ____| |  _ \     / \    |_   _| | ____| |  _ \     / ___|  / _ \  |  _ \  | ____|
+ *  | |  _  |  _|   |  \| | |  _|   | |_) |   / _ \     | |   |  _|   | | | |   | |     | | | | | | | | |  _|  
+ *  | |_| | | |___  | |\  | | |___  |  _ <   / ___ \    | |   | |___  | |_| |   | |___  | |_| | | |_| | | |___ 
+ *   \____| |_____| |_| \_| |_____| |_| \_\ /_/   \_\   |_|   |_____| |____/     \____|  \___/  |____/  |_____|
+ *
+ */
+#pragma once
+
+#include "hstruct_ifc.h"
+#include "OtherSampleDataType.hstruct.h"
+
+
+struct ParallelSampleDataType : public HStruct_ifc
+{
+    bool is_enabled;
+    uint64_t memory_pos;
+    std::string name;
+    std::vector<uint32_t> ipv4_addresses;
+    OtherSampleDataType parent_obj;
+    std::vector<OtherSampleDataType> children_objs;
+
+    // Hash of the wire layout, written into the header of dumped files.
+    static constexpr uint64_t k_schema_fingerprint{ 0x56d1cc5e6a18cf0cull };
+
+    static constexpr size_t k_fixed_serialized_size{ 9 + 3 * sizeof(size_t) };
+
+    size_t serialized_size() const override
+    {
+        size_t size{ k_fixed_serialized_size };
+        size += name.length();
+        size += ipv4_addresses.size() * sizeof(uint32_t);
+        size += parent_obj.serialized_size();
+        size += children_objs.size() * sizeof(uint64_t);
+        for (const auto& elem : children_objs)
+        {
+            size += elem.serialized_size();
+        }
+        return size;
+    }
+
+    void serialize_dump(const std::string& fname, SerialCodec codec = SerialCodec::none) override
+    {
+        SerialBuffer sb;
+        sb.mode = SerialBuffer::SBM_WRITE;
+        size_t expected_size{ SchemaHeader::k_size + serialized_size() };
+        sb.reserve(expected_size);
+        SchemaHeader::write(sb, k_schema_fingerprint);
+        write_data_to_serial_buffer(sb);
+        assert(sb.buffer.size() == expected_size);
+        if (!sb.save_buffer_to_disk(fname, codec))
+        {
+            throw std::runtime_error{ "Can't write " + fname };
+        }
+    }
+
+    void serialize_load(const std::string& fname) override
+    {
+        SerialBuffer sb;
+        if (!sb.load_buffer_from_disk(fname))
+        {
+            throw std::runtime_error{ "Can't read " + fname };
+        }
+        if (!read_file_from_serial_buffer(sb))
+        {
+            throw std::runtime_error{ "Wrong schema or truncated data, expected ParallelSampleDataType: " + fname };
+        }
+    }
+
+    void serialize_load_mmap(const std::string& fname) override
+    {
+        MappedFile file;
+        if (!file.open(fname))
+        {
+            throw std::runtime_error{ "Can't map " + fname };
+        }
+        SerialBuffer sb;
+        if (!sb.attach_file_view(file.view()))
+        {
+            throw std::runtime_error{ "Can't decompress " + fname };
+        }
+        if (!read_file_from_serial_buffer(sb))
+        {
+            throw std::runtime_error{ "Wrong schema or truncated data, expected ParallelSampleDataType: " + fname };
+        }
+    }
+
+    void serialize_dump_streamed(const std::string& fname, size_t window_bytes = SerialBuffer::k_default_window_bytes) override
+    {
+        std::ofstream file{ fname.c_str(), std::ios::out | std::ios::trunc | std::ios::binary };
+        if (!file.is_open())
+        {
+            throw std::runtime_error{ "Can't write " + fname };
+        }
+        SerialBuffer sb;
+        sb.attach_write_stream(file, window_bytes);
+        SchemaHeader::write(sb, k_schema_fingerprint);
+        write_data_to_serial_buffer(sb);
+        if (!sb.flush_write_stream())
+        {
+            throw std::runtime_error{ "Can't write " + fname };
+        }
+    }
+
+    void serialize_load_streamed(const std::string& fname, size_t window_bytes = SerialBuffer::k_default_window_bytes) override
+    {
+        std::ifstream file{ fname.c_str(), std::ios::in | std::ios::binary };
+        if (!file.is_open())
+        {
+            throw std::runtime_error{ "Can't read " + fname };
+        }
+        uint8_t header[CompressedContainer::k_fixed_header_size]{};
+        file.read(reinterpret_cast<char*>(header), sizeof(header));
+        if (CompressedContainer::is_container({ header, static_cast<size_t>(file.gcount()) }))
+        {
+            serialize_load(fname);
+            return;
+        }
+        file.clear();
+        file.seekg(0);
+        SerialBuffer sb;
+        sb.attach_read_stream(file, window_bytes);
+        if (!read_file_from_serial_buffer(sb))
+        {
+            throw std::runtime_error{ "Wrong schema or truncated data, expected ParallelSampleDataType: " + fname };
+        }
+    }
+
+    void serialize_to(std::vector<uint8_t>& out) override
+    {
+        SerialBuffer sb;
+        sb.buffer.swap(out);
+        sb.clear();
+        sb.mode = SerialBuffer::SBM_WRITE;
+        size_t expected_size{ SchemaHeader::k_size + serialized_size() };
+        sb.reserve(expected_size);
+        SchemaHeader::write(sb, k_schema_fingerprint);
+        write_data_to_serial_buffer(sb);
+        assert(sb.buffer.size() == expected_size);
+        out.swap(sb.buffer);
+    }
+
+    size_t serialize_into(std::span<uint8_t> out) override
+    {
+        size_t expected_size{ SchemaHeader::k_size + serialized_size() };
+        if (expected_size > out.size())
+        {
+            return 0;
+        }
+        SerialBuffer& sb{ SerialBuffer::thread_scratch() };
+        sb.clear();
+        sb.mode = SerialBuffer::SBM_WRITE;
+        sb.reserve(expected_size);
+        SchemaHeader::write(sb, k_schema_fingerprint);
+        write_data_to_serial_buffer(sb);
+        assert(sb.buffer.size() == expected_size);
+        std::memcpy(out.data(), sb.buffer.data(), expected_size);
+        return expected_size;
+    }
+
+    bool deserialize_from(std::span<const uint8_t> bytes) override
+    {
+        SerialBuffer sb;
+        if (!sb.attach_file_view(bytes) || !read_file_from_serial_buffer(sb))
+        {
+            return false;
+        }
+        return sb.buffer_position == sb.read_view.size();
+    }
+
+    void write_data_to_serial_buffer(SerialBuffer& sb) override
+    {
+        std::array<uint8_t, 9> is_enabled__run;
+        std::memcpy(is_enabled__run.data() + 0, &is_enabled, sizeof(bool));
+        std::memcpy(is_enabled__run.data() + 1, &memory_pos, sizeof(uint64_t));
+        sb.write_bulk(is_enabled__run.data(), 1, 9);
+
+        size_t name__str_length{ name.length() };
+        sb.write_elem(&name__str_length, sizeof(size_t));
+        sb.write_elem(name.data(), sizeof(char) * name__str_length);
+
+        size_t ipv4_addresses__list_count{ ipv4_addresses.size() };
+        sb.write_elem(&ipv4_addresses__list_count, sizeof(size_t));
+        sb.write_bulk(ipv4_addresses.data(), sizeof(uint32_t), ipv4_addresses__list_count);
+
+        parent_obj.write_data_to_serial_buffer(sb);
+
+        size_t children_objs__list_count{ children_objs.size() };
+        sb.write_elem(&children_objs__list_count, sizeof(size_t));
+        write_parallel_list(sb, children_objs);
+    }
+
+    void read_data_from_serial_buffer(SerialBuffer& sb) override
+    {
+        const uint8_t* is_enabled__run{ static_cast<const uint8_t*>(sb.read_elem(9)) };
+        std::memcpy(&is_enabled, is_enabled__run + 0, sizeof(bool));
+        std::memcpy(&memory_pos, is_enabled__run + 1, sizeof(uint64_t));
+
+        size_t name__str_length{ sb.read_value<size_t>() };
+        name = std::string{ reinterpret_cast<const char*>(sb.read_elem(sizeof(char) * name__str_length)), name__str_length };
+
+        size_t ipv4_addresses__list_count{ sb.read_value<size_t>() };
+        sb.check_list_count(ipv4_addresses__list_count, sizeof(uint32_t));
+        ipv4_addresses.resize(ipv4_addresses__list_count);
+        sb.read_bulk(ipv4_addresses.data(), sizeof(uint32_t), ipv4_addresses__list_count);
+
+        parent_obj.read_data_from_serial_buffer(sb);
+
+        size_t children_objs__list_count{ sb.read_value<size_t>() };
+        sb.check_list_count(children_objs__list_count, sizeof(uint64_t) + OtherSampleDataType::k_fixed_serialized_size);
+        read_parallel_list(sb, children_objs, children_objs__list_count);
+    }
+
+    // Reads a dumped file's header and the data after it. Files written in a
+    // `previous` layout (or with nested structs in theirs) get migrated. Fails
+    // on any other schema.
+    bool read_file_from_serial_buffer(SerialBuffer& sb)
+    {
+        uint64_t fingerprint{ 0 };
+        if (!SchemaHeader::read(sb, fingerprint))
+        {
+            return false;
+        }
+        if (fingerprint == k_schema_fingerprint)
+        {
+            read_data_from_serial_buffer(sb);
+            return true;
+        }
+        if (fingerprint == 0x7a818d0de1b3b742ull)
+        {
+            read_previous_7a818d0de1b3b742_from_serial_buffer(sb);
+            return true;
+        }
+        return false;
+    }
+
+    // Reads the older layout with fingerprint 0x7a818d0de1b3b742 field by field.
+    // That's the current layout with `OtherSampleDataType` in an older layout.
+    // Fields it doesn't have are left at their defaults.
+    void read_previous_7a818d0de1b3b742_from_serial_buffer(SerialBuffer& sb)
+    {
+        *this = ParallelSampleDataType{};
+        is_enabled = sb.read_value<bool>();
+        memory_pos = sb.read_value<uint64_t>();
+
+        size_t name__str_length{ sb.read_value<size_t>() };
+        name = std::string{ reinterpret_cast<const char*>(sb.read_elem(sizeof(char) * name__str_length)), name__str_length };
+
+        size_t ipv4_addresses__list_count{ sb.read_value<size_t>() };
+        sb.check_list_count(ipv4_addresses__list_count, sizeof(uint32_t));
+        ipv4_addresses.resize(ipv4_addresses__list_count);
+        sb.read_bulk(ipv4_addresses.data(), sizeof(uint32_t), ipv4_addresses__list_count);
+
+        parent_obj.read_previous_793d713eb978678a_from_serial_buffer(sb);
+
+        size_t children_objs__list_count{ sb.read_value<size_t>() };
+        sb.check_list_count(children_objs__list_count, sizeof(uint64_t) + 1);
+        read_parallel_list(sb, children_objs, children_objs__list_count, [](auto& elem, SerialBuffer& elem_sb) { elem.read_previous_793d713eb978678a_from_serial_buffer(elem_sb); });
+    }
+
+    bool operator==(const ParallelSampleDataType& other) const
+    {
+        return is_enabled == other.is_enabled
+            && memory_pos == other.memory_pos
+            && name == other.name
+            && ipv4_addresses == other.ipv4_addresses
+            && parent_obj == other.parent_obj
+            && children_objs == other.children_objs;
+    }
+
+    // Writes only what changed since `prev`, for `apply_delta` on a copy of
+    // `prev` to catch up with. Not a file: there's no schema header.
+    void write_delta(const ParallelSampleDataType& prev, SerialBuffer& sb)
+    {
+        std::array<uint8_t, 1> delta__mask{};
+        delta__mask[0] |= static_cast<uint8_t>((is_enabled != prev.is_enabled) << 0);
+        delta__mask[0] |= static_cast<uint8_t>((memory_pos != prev.memory_pos) << 1);
+        delta__mask[0] |= static_cast<uint8_t>((name != prev.name) << 2);
+        delta__mask[0] |= static_cast<uint8_t>((ipv4_addresses != prev.ipv4_addresses) << 3);
+        delta__mask[0] |= static_cast<uint8_t>((parent_obj != prev.parent_obj) << 4);
+        delta__mask[0] |= static_cast<uint8_t>((children_objs != prev.children_objs) << 5);
+        sb.write_bulk(delta__mask.data(), 1, 1);
+
+        if (((delta__mask[0] >> 0) & 1) != 0)
+        {
+            sb.write_elem(&is_enabled, sizeof(bool));
+        }
+
+        if (((delta__mask[0] >> 1) & 1) != 0)
+        {
+            sb.write_elem(&memory_pos, sizeof(uint64_t));
+        }
+
+        if (((delta__mask[0] >> 2) & 1) != 0)
+        {
+            size_t name__str_length{ name.length() };
+            sb.write_elem(&name__str_length, sizeof(size_t));
+            sb.write_elem(name.data(), sizeof(char) * name__str_length);
+        }
+
+        if (((delta__mask[0] >> 3) & 1) != 0)
+        {
+            size_t ipv4_addresses__list_count{ ipv4_addresses.size() };
+            sb.write_elem(&ipv4_addresses__list_count, sizeof(size_t));
+            write_delta_runs(sb, ipv4_addresses, prev.ipv4_addresses, [&](size_t i) {
+                sb.write_elem(&ipv4_addresses[i], sizeof(uint32_t));
+            });
+        }
+
+        if (((delta__mask[0] >> 4) & 1) != 0)
+        {
+            parent_obj.write_delta(prev.parent_obj, sb);
+        }
+
+        if (((delta__mask[0] >> 5) & 1) != 0)
+        {
+            size_t children_objs__list_count{ children_objs.size() };
+            sb.write_elem(&children_objs__list_count, sizeof(size_t));
+            write_delta_runs(sb, children_objs, prev.children_objs, [&](size_t i) {
+                if (i < prev.children_objs.size())
+                {
+                    children_objs[i].write_delta(prev.children_objs[i], sb);
+                }
+                else
+                {
+                    children_objs[i].write_delta(OtherSampleDataType{}, sb);
+                }
+            });
+        }
+    }
+
+    // Applies a `write_delta` to the `prev` it was written against.
+    void apply_delta(SerialBuffer& sb)
+    {
+        std::array<uint8_t, 1> delta__mask;
+        sb.read_bulk(delta__mask.data(), 1, 1);
+
+        if (((delta__mask[0] >> 0) & 1) != 0)
+        {
+            is_enabled = sb.read_value<bool>();
+        }
+
+        if (((delta__mask[0] >> 1) & 1) != 0)
+        {
+            memory_pos = sb.read_value<uint64_t>();
+        }
+
+        if (((delta__mask[0] >> 2) & 1) != 0)
+        {
+            size_t name__str_length{ sb.read_value<size_t>() };
+            name = std::string{ reinterpret_cast<const char*>(sb.read_elem(sizeof(char) * name__str_length)), name__str_length };
+        }
+
+        if (((delta__mask[0] >> 3) & 1) != 0)
+        {
+            size_t ipv4_addresses__list_count{ sb.read_value<size_t>() };
+            if (ipv4_addresses__list_count > ipv4_addresses.size())
+            {
+                sb.check_list_count(ipv4_addresses__list_count - ipv4_addresses.size(), sizeof(uint32_t));
+            }
+            ipv4_addresses.resize(ipv4_addresses__list_count);
+            read_delta_runs(sb, ipv4_addresses, [&](size_t i) {
+                ipv4_addresses[i] = sb.read_value<uint32_t>();
+            });
+        }
+
+        if (((delta__mask[0] >> 4) & 1) != 0)
+        {
+            parent_obj.apply_delta(sb);
+        }
+
+        if (((delta__mask[0] >> 5) & 1) != 0)
+        {
+            size_t children_objs__list_count{ sb.read_value<size_t>() };
+            if (children_objs__list_count > children_objs.size())
+            {
+                sb.check_list_count(children_objs__list_count - children_objs.size(), 1);
+            }
+            children_objs.resize(children_objs__list_count);
+            read_delta_runs(sb, children_objs, [&](size_t i) {
+                children_objs[i].apply_delta(sb);
+            });
+        }
+    }
+};
+
+
+// Read-only view of a serialized `ParallelSampleDataType`. Strings and primitive
+// lists point into the serialized bytes, which must outlive the view.
+struct ParallelSampleDataType_view
+{
+    bool is_enabled;
+    uint64_t memory_pos;
+    std::string_view name;
+    UnalignedSpan<uint32_t> ipv4_addresses;
+    OtherSampleDataType_view parent_obj;
+    std::vector<OtherSampleDataType_view> children_objs;
+
+    void attach(std::span<const uint8_t> bytes)
+    {
+        SerialBuffer sb;
+        sb.attach_read_view(bytes);
+        read_view_from_serial_buffer(sb);
+    }
+
+    // Same as `attach`, for the bytes of a whole raw `serialize_dump`ed file.
+    // Fails if the file was written with a different schema.
+    bool attach_file(std::span<const uint8_t> bytes)
+    {
+        SerialBuffer sb;
+        sb.attach_read_view(bytes);
+        uint64_t fingerprint{ 0 };
+        if (!SchemaHeader::read(sb, fingerprint) || fingerprint != ParallelSampleDataType::k_schema_fingerprint)
+        {
+            return false;
+        }
+        read_view_from_serial_buffer(sb);
+        return true;
+    }
+
+    void read_view_from_serial_buffer(SerialBuffer& sb)
+    {
+        const uint8_t* is_enabled__run{ static_cast<const uint8_t*>(sb.read_elem(9)) };
+        std::memcpy(&is_enabled, is_enabled__run + 0, sizeof(bool));
+        std::memcpy(&memory_pos, is_enabled__run + 1, sizeof(uint64_t));
+
+        size_t name__str_length{ sb.read_value<size_t>() };
+        name = std::string_view{ reinterpret_cast<const char*>(sb.read_elem(sizeof(char) * name__str_length)), name__str_length };
+
+        size_t ipv4_addresses__list_count{ sb.read_value<size_t>() };
+        sb.check_list_count(ipv4_addresses__list_count, sizeof(uint32_t));
+        ipv4_addresses = UnalignedSpan<uint32_t>{ static_cast<const uint8_t*>(sb.read_elem(sizeof(uint32_t) * ipv4_addresses__list_count)), ipv4_addresses__list_count };
+
+        parent_obj.read_view_from_serial_buffer(sb);
+
+        size_t children_objs__list_count{ sb.read_value<size_t>() };
+        sb.check_list_count(children_objs__list_count, sizeof(uint64_t) + OtherSampleDataType::k_fixed_serialized_size);
+        sb.read_elem(sizeof(uint64_t) * children_objs__list_count);  // Element offset table is only needed for parallel reads.
+        children_objs.resize(children_objs__list_count);
+        for (size_t i = 0; i < children_objs__list_count; i++)
+        {
+            children_objs[i].read_view_from_serial_buffer(sb);
+        }
+    }
+};
@@ -0,0 +1,120 @@
+#    ____   _____   _   _   _____   ____       _      _____   _____   ____       ____    ___    ____    _____
+#   / ___| | ____| | \ | | | ____| |  _ \     / \    |_   _| | ____| |  _ \     / ___|  / _ \  |  _ \  | ____|
+#  | |  _  |  _|   |  \| | |  _|   | |_) |   / _ \     | |   |  _|   | | | |   | |     | | | | | | | | |  _|
+#  | |_| | | |___  | |\  | | |___  |  _ <   / ___ \    | |   | |___  | |_| |   | |___  | |_| | | |_| | | |___
+#   \____| |_____| |_| \_| |_____| |_| \_\ /_/   \_\   |_|   |_____| |____/     \____|  \___/  |____/  |_____|
+#
+# Python twin of `ParallelSampleDataType.hstruct.h`. Reads and writes the same binary format.
+import struct
+import sys
+from array import array
+from typing import List, Tuple
+
+try:
+    from .hstruct_runtime import _LENGTH, _FILE_HEADER, _FILE_MAGIC, _array_typecode, _pack_string, _unpack_string, _string_size, _pack_array, _unpack_array
+except ImportError:
+    from hstruct_runtime import _LENGTH, _FILE_HEADER, _FILE_MAGIC, _array_typecode, _pack_string, _unpack_string, _string_size, _pack_array, _unpack_array
+try:
+    from .OtherSampleDataType_hstruct import OtherSampleDataType
+except ImportError:
+    from OtherSampleDataType_hstruct import OtherSampleDataType
+
+
+class ParallelSampleDataType:
+    __slots__ = (
+        'is_enabled',
+        'memory_pos',
+        'name',
+        'ipv4_addresses',
+        'parent_obj',
+        'children_objs',
+    )
+
+    SCHEMA_FINGERPRINT = 0x56d1cc5e6a18cf0c
+
+    _RUN_0 = struct.Struct('<?Q')
+    _TYPECODE_ipv4_addresses = _array_typecode('I')
+
+    def __init__(self):
+        self.is_enabled = False
+        self.memory_pos = 0
+        self.name = ''
+        self.ipv4_addresses = array(self._TYPECODE_ipv4_addresses)
+        self.parent_obj = OtherSampleDataType()
+        self.children_objs = []
+
+    def serialized_size(self) -> int:
+        size = 9
+        size += _string_size(self.name)
+        size += 8 + 4 * len(self.ipv4_addresses)
+        size += self.parent_obj.serialized_size()
+        size += 8 + 8 * len(self.children_objs) + sum(elem.serialized_size() for elem in self.children_objs)
+        return size
+
+    def pack_into(self, buf, offset: int = 0) -> int:
+        pos = offset
+        self._RUN_0.pack_into(buf, pos, self.is_enabled, self.memory_pos)
+        pos += 9
+        pos = _pack_string(buf, pos, self.name)
+        pos = _pack_array(buf, pos, self.ipv4_addresses, self._TYPECODE_ipv4_addresses)
+        pos = self.parent_obj.pack_into(buf, pos)
+        _LENGTH.pack_into(buf, pos, len(self.children_objs))
+        pos += 8
+        children_objs__table_pos = pos
+        pos += 8 * len(self.children_objs)
+        children_objs__start = pos
+        children_objs__ends = []
+        for elem in self.children_objs:
+            pos = elem.pack_into(buf, pos)
+            children_objs__ends.append(pos - children_objs__start)
+        struct.pack_into(f'<{len(self.children_objs)}Q', buf, children_objs__table_pos, *children_objs__ends)
+        return pos
+
+    @classmethod
+    def unpack_from(cls, buf, offset: int = 0) -> Tuple['ParallelSampleDataType', int]:
+        self = cls.__new__(cls)
+        view = memoryview(buf)
+        pos = offset
+        (self.is_enabled, self.memory_pos,) = cls._RUN_0.unpack_from(view, pos)
+        pos += 9
+        self.name, pos = _unpack_string(view, pos)
+        self.ipv4_addresses, pos = _unpack_array(view, pos, cls._TYPECODE_ipv4_addresses)
+        self.parent_obj, pos = OtherSampleDataType.unpack_from(view, pos)
+        (count,) = _LENGTH.unpack_from(view, pos)
+        pos += 8
+        pos += 8 * count
+        items = []
+        for _ in range(count):
+            item, pos = OtherSampleDataType.unpack_from(view, pos)
+            items.append(item)
+        self.children_objs = items
+        return self, pos
+
+    def to_bytes(self) -> bytearray:
+        buf = bytearray(self.serialized_size())
+        end = self.pack_into(buf)
+        assert end == len(buf), f'Packed {end} bytes but measured {len(buf)}.'
+        return buf
+
+    @classmethod
+    def from_bytes(cls, buf) -> 'ParallelSampleDataType':
+        obj, end = cls.unpack_from(buf)
+        assert end == len(buf), f'{len(buf) - end} trailing bytes after `ParallelSampleDataType`.'
+        return obj
+
+    def to_file_bytes(self) -> bytearray:
+        buf = bytearray(_FILE_HEADER.size + self.serialized_size())
+        _FILE_HEADER.pack_into(buf, 0, _FILE_MAGIC, self.SCHEMA_FINGERPRINT)
+        end = self.pack_into(buf, _FILE_HEADER.size)
+        assert end == len(buf), f'Packed {end} bytes but measured {len(buf)}.'
+        return buf
+
+    @classmethod
+    def from_file_bytes(cls, buf) -> 'ParallelSampleDataType':
+        magic, fingerprint = _FILE_HEADER.unpack_from(buf, 0)
+        assert magic == _FILE_MAGIC, 'No schema header, not a dumped file.'
+        assert fingerprint == cls.SCHEMA_FINGERPRINT, \
+            f'File was written with schema 0x{fingerprint:016x}, `ParallelSampleDataType` is 0x{cls.SCHEMA_FINGERPRINT:016x}.'
+        obj, end = cls.unpack_from(buf, _FILE_HEADER.size)
+        assert end == len(buf), f'{len(buf) - end} trailing bytes after `ParallelSampleDataType`.'
+        return obj
@@ -0,0 +1,329 @@
+/*
+ *    ____   _____   _   _   _____   ____       _      _____   _____   ____       ____    ___    ____    _____ 
+ *   / ___| | ____| | \ | | | ____| |  _ \     / \    |_   _| | ____| |  _ \     / ___|  / _ \  |  _ \  | ____|
+ *  | |  _  |  _|   |  \| | |  _|   | |_) |   / _ \     | |   |  _|   | | | |   | |     | | | | | | | | |  _|  
+ *  | |_| | | |___  | |\  | | |___  |  _ <   / ___ \    | |   | |___  | |_| |   | |___  | |_| | | |_| | | |___ 
+ *   \____| |_____| |_| \_| |_____| |_| \_\ /_/   \_\   |_|   |_____| |____/     \____|  \___/  |____/  |_____|
+ *
+ */
+#pragma once
+
+#include "hstruct_ifc.h"
+
+
+struct PmrOtherSampleDataType : public HStruct_ifc
+{
+    std::pmr::string name;
+    bool is_enabled{};
+    uint64_t stride_bytes{};
+
+    // Strings, vectors and nested `pmr` structs allocate from the memory resource
+    // the struct was constructed with.
+    using allocator_type = std::pmr::polymorphic_allocator<std::byte>;
+
+    PmrOtherSampleDataType() : PmrOtherSampleDataType(allocator_type{}) {}
+    PmrOtherSampleDataType(const PmrOtherSampleDataType&) = default;
+    PmrOtherSampleDataType(PmrOtherSampleDataType&&) = default;
+    PmrOtherSampleDataType& operator=(const PmrOtherSampleDataType&) = default;
+    PmrOtherSampleDataType& operator=(PmrOtherSampleDataType&&) = default;
+
+    explicit PmrOtherSampleDataType(const allocator_type& allocator) :
+        name{ std::make_obj_using_allocator<std::pmr::string>(allocator) }
+    {
+    }
+
+    PmrOtherSampleDataType(const PmrOtherSampleDataType& other, const allocator_type& allocator) :
+        name{ std::make_obj_using_allocator<std::pmr::string>(allocator, other.name) },
+        is_enabled{ other.is_enabled },
+        stride_bytes{ other.stride_bytes }
+    {
+    }
+
+    PmrOtherSampleDataType(PmrOtherSampleDataType&& other, const allocator_type& allocator) :
+        name{ std::make_obj_using_allocator<std::pmr::string>(allocator, std::move(other.name)) },
+        is_enabled{ other.is_enabled },
+        stride_bytes{ other.stride_bytes }
+    {
+    }
+
+    // Hash of the wire layout, written into the header of dumped files.
+    static constexpr uint64_t k_schema_fingerprint{ 0x95d6183ea9b7d632ull };
+
+    static constexpr size_t k_fixed_serialized_size{ 9 + 1 * sizeof(size_t) };
+
+    size_t serialized_size() const override
+    {
+        size_t size{ k_fixed_serialized_size };
+        size += name.length();
+        return size;
+    }
+
+    void serialize_dump(const std::string& fname, SerialCodec codec = SerialCodec::none) override
+    {
+        SerialBuffer sb;
+        sb.mode = SerialBuffer::SBM_WRITE;
+        size_t expected_size{ SchemaHeader::k_size + serialized_size() };
+        sb.reserve(expected_size);
+        SchemaHeader::write(sb, k_schema_fingerprint);
+        write_data_to_serial_buffer(sb);
+        assert(sb.buffer.size() == expected_size);
+        if (!sb.save_buffer_to_disk(fname, codec))
+        {
+            throw std::runtime_error{ "Can't write " + fname };
+        }
+    }
+
+    void serialize_load(const std::string& fname) override
+    {
+        SerialBuffer sb;
+        if (!sb.load_buffer_from_disk(fname))
+        {
+            throw std::runtime_error{ "Can't read " + fname };
+        }
+        if (!read_file_from_serial_buffer(sb))
+        {
+            throw std::runtime_error{ "Wrong schema or truncated data, expected PmrOtherSampleDataType: " + fname };
+        }
+    }
+
+    void serialize_load_mmap(const std::string& fname) override
+    {
+        MappedFile file;
+        if (!file.open(fname))
+        {
+            throw std::runtime_error{ "Can't map " + fname };
+        }
+        SerialBuffer sb;
+        if (!sb.attach_file_view(file.view()))
+        {
+            throw std::runtime_error{ "Can't decompress " + fname };
+        }
+        if (!read_file_from_serial_buffer(sb))
+        {
+            throw std::runtime_error{ "Wrong schema or truncated data, expected PmrOtherSampleDataType: " + fname };
+        }
+    }
+
+    void serialize_dump_streamed(const std::string& fname, size_t window_bytes = SerialBuffer::k_default_window_bytes) override
+    {
+        std::ofstream file{ fname.c_str(), std::ios::out | std::ios::trunc | std::ios::binary };
+        if (!file.is_open())
+        {
+            throw std::runtime_error{ "Can't write " + fname };
+        }
+        SerialBuffer sb;
+        sb.attach_write_stream(file, window_bytes);
+        SchemaHeader::write(sb, k_schema_fingerprint);
+        write_data_to_serial_buffer(sb);
+        if (!sb.flush_write_stream())
+        {
+            throw std::runtime_error{ "Can't write " + fname };
+        }
+    }
+
+    void serialize_load_streamed(const std::string& fname, size_t window_bytes = SerialBuffer::k_default_window_bytes) override
+    {
+        std::ifstream file{ fname.c_str(), std::ios::in | std::ios::binary };
+        if (!file.is_open())
+        {
+            throw std::runtime_error{ "Can't read " + fname };
+        }
+        uint8_t header[CompressedContainer::k_fixed_header_size]{};
+        file.read(reinterpret_cast<char*>(header), sizeof(header));
+        if (CompressedContainer::is_container({ header, static_cast<size_t>(file.gcount()) }))
+        {
+            serialize_load(fname);
+            return;
+        }
+        file.clear();
+        file.seekg(0);
+        SerialBuffer sb;
+        sb.attach_read_stream(file, window_bytes);
+        if (!read_file_from_serial_buffer(sb))
+        {
+            throw std::runtime_error{ "Wrong schema or truncated data, expected PmrOtherSampleDataType: " + fname };
+        }
+    }
+
+    void serialize_to(std::vector<uint8_t>& out) override
+    {
+        SerialBuffer sb;
+        sb.buffer.swap(out);
+        sb.clear();
+        sb.mode = SerialBuffer::SBM_WRITE;
+        size_t expected_size{ SchemaHeader::k_size + serialized_size() };
+        sb.reserve(expected_size);
+        SchemaHeader::write(sb, k_schema_fingerprint);
+        write_data_to_serial_buffer(sb);
+        assert(sb.buffer.size() == expected_size);
+        out.swap(sb.buffer);
+    }
+
+    size_t serialize_into(std::span<uint8_t> out) override
+    {
+        size_t expected_size{ SchemaHeader::k_size + serialized_size() };
+        if (expected_size > out.size())
+        {
+            return 0;
+        }
+        SerialBuffer& sb{ SerialBuffer::thread_scratch() };
+        sb.clear();
+        sb.mode = SerialBuffer::SBM_WRITE;
+        sb.reserve(expected_size);
+        SchemaHeader::write(sb, k_schema_fingerprint);
+        write_data_to_serial_buffer(sb);
+        assert(sb.buffer.size() == expected_size);
+        std::memcpy(out.data(), sb.buffer.data(), expected_size);
+        return expected_size;
+    }
+
+    bool deserialize_from(std::span<const uint8_t> bytes) override
+    {
+        SerialBuffer sb;
+        if (!sb.attach_file_view(bytes) || !read_file_from_serial_buffer(sb))
+        {
+            return false;
+        }
+        return sb.buffer_position == sb.read_view.size();
+    }
+
+    void write_data_to_serial_buffer(SerialBuffer& sb) override
+    {
+        size_t name__str_length{ name.length() };
+        sb.write_elem(&name__str_length, sizeof(size_t));
+        sb.write_elem(name.data(), sizeof(char) * name__str_length);
+
+        std::array<uint8_t, 9> is_enabled__run;
+        std::memcpy(is_enabled__run.data() + 0, &is_enabled, sizeof(bool));
+        std::memcpy(is_enabled__run.data() + 1, &stride_bytes, sizeof(uint64_t));
+        sb.write_bulk(is_enabled__run.data(), 1, 9);
+    }
+
+    void read_data_from_serial_buffer(SerialBuffer& sb) override
+    {
+        size_t name__str_length{ sb.read_value<size_t>() };
+        name.assign(reinterpret_cast<const char*>(sb.read_elem(sizeof(char) * name__str_length)), name__str_length);
+
+        const uint8_t* is_enabled__run{ static_cast<const uint8_t*>(sb.read_elem(9)) };
+        std::memcpy(&is_enabled, is_enabled__run + 0, sizeof(bool));
+        std::memcpy(&stride_bytes, is_enabled__run + 1, sizeof(uint64_t));
+    }
+
+    // Reads a dumped file's header and the data after it. Files written in a
+    // `previous` layout (or with nested structs in theirs) get migrated. Fails
+    // on any other schema.
+    bool read_file_from_serial_buffer(SerialBuffer& sb)
+    {
+        uint64_t fingerprint{ 0 };
+        if (!SchemaHeader::read(sb, fingerprint))
+        {
+            return false;
+        }
+        if (fingerprint == k_schema_fingerprint)
+        {
+            read_data_from_serial_buffer(sb);
+            return true;
+        }
+        return false;
+    }
+
+    bool operator==(const PmrOtherSampleDataType& other) const
+    {
+        return name == other.name
+            && is_enabled == other.is_enabled
+            && stride_bytes == other.stride_bytes;
+    }
+
+    // Writes only what changed since `prev`, for `apply_delta` on a copy of
+    // `prev` to catch up with. Not a file: there's no schema header.
+    void write_delta(const PmrOtherSampleDataType& prev, SerialBuffer& sb)
+    {
+        std::array<uint8_t, 1> delta__mask{};
+        delta__mask[0] |= static_cast<uint8_t>((name != prev.name) << 0);
+        delta__mask[0] |= static_cast<uint8_t>((is_enabled != prev.is_enabled) << 1);
+        delta__mask[0] |= static_cast<uint8_t>((stride_bytes != prev.stride_bytes) << 2);
+        sb.write_bulk(delta__mask.data(), 1, 1);
+
+        if (((delta__mask[0] >> 0) & 1) != 0)
+        {
+            size_t name__str_length{ name.length() };
+            sb.write_elem(&name__str_length, sizeof(size_t));
+            sb.write_elem(name.data(), sizeof(char) * name__str_length);
+        }
+
+        if (((delta__mask[0] >> 1) & 1) != 0)
+        {
+            sb.write_elem(&is_enabled, sizeof(bool));
+        }
+
+        if (((delta__mask[0] >> 2) & 1) != 0)
+        {
+            sb.write_elem(&stride_bytes, sizeof(uint64_t));
+        }
+    }
+
+    // Applies a `write_delta` to the `prev` it was written against.
+    void apply_delta(SerialBuffer& sb)
+    {
+        std::array<uint8_t, 1> delta__mask;
+        sb.read_bulk(delta__mask.data(), 1, 1);
+
+        if (((delta__mask[0] >> 0) & 1) != 0)
+        {
+            size_t name__str_length{ sb.read_value<size_t>() };
+            name.assign(reinterpret_cast<const char*>(sb.read_elem(sizeof(char) * name__str_length)), name__str_length);
+        }
+
+        if (((delta__mask[0] >> 1) & 1) != 0)
+        {
+            is_enabled = sb.read_value<bool>();
+        }
+
+        if (((delta__mask[0] >> 2) & 1) != 0)
+        {
+            stride_bytes = sb.read_value<uint64_t>();
+        }
+    }
+};
+
+
+// Read-only view of a serialized `PmrOtherSampleDataType`. Strings and primitive
+// lists point into the serialized bytes, which must outlive the view.
+struct PmrOtherSampleDataType_view
+{
+    std::string_view name;
+    bool is_enabled;
+    uint64_t stride_bytes;
+
+    void attach(std::span<const uint8_t> bytes)
+    {
+        SerialBuffer sb;
+        sb.attach_read_view(bytes);
+        read_view_from_serial_buffer(sb);
+    }
+
+    // Same as `attach`, for the bytes of a whole raw `serialize_dump`ed file.
+    // Fails if the file was written with a different schema.
+    bool attach_file(std::span<const uint8_t> bytes)
+    {
+        SerialBuffer sb;
+        sb.attach_read_view(bytes);
+        uint64_t fingerprint{ 0 };
+        if (!SchemaHeader::read(sb, fingerprint) || fingerprint != PmrOtherSampleDataType::k_schema_fingerprint)
+        {
+            return false;
+        }
+        read_view_from_serial_buffer(sb);
+        return true;
+    }
+
+    void read_view_from_serial_buffer(SerialBuffer& sb)
+    {
+        size_t name__str_length{ sb.read_value<size_t>() };
+        name = std::string_view{ reinterpret_cast<const char*>(sb.read_elem(sizeof(char) * name__str_length)), name__str_length };
+
+        const uint8_t* is_enabled__run{ static_cast<const uint8_t*>(sb.read_elem(9)) };
+        std::memcpy(&is_enabled, is_enabled__run + 0, sizeof(bool));
+        std::memcpy(&stride_bytes, is_enabled__run + 1, sizeof(uint64_t));
+    }
+};
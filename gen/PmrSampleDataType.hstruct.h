@@ -0,0 +1,791 @@
+/*
+ *    ____   _____   _   _   _____   ____       _      _____   _____   ____       ____    ___    ____    _____ 
+ *   / ___| | ____| | \ | | | ____| |  _ \     / \    |_   _| | ____| |  _ \     / ___|  / _ \  |  _ \  | ____|
+ *  | |  _  |  _|   |  \| | |  _|   | |_) |   / _ \     | |   |  _|   | | | |   | |     | | | | | | | | |  _|  
+ *  | |_| | | |___  | |\  | | |___  |  _ <   / ___ \    | |   | |___  | |_| |   | |___  | |_| | | |_| | | |___ 
+ *   \____| |_____| |_| \_| |_____| |_| \_\ /_/   \_\   |_|   |_____| |____/     \____|  \___/  |____/  |_____|
+ *
+ */
+#pragma once
+
+#include "hstruct_ifc.h"
+#include "PmrOtherSampleDataType.hstruct.h"
+
+
+struct PmrSampleDataType : public HStruct_ifc
+{
+    bool is_enabled{};
+    uint8_t sdr_luminance{};
+    int8_t some_signed_char{};
+    uint16_t id{};
+    int16_t idk_what_this_could_be{};
+    uint32_t complexity{};
+    int32_t some_rando_value{};
+    uint64_t memory_pos{};
+    int64_t grid_pos{};
+    float_t slider_pos{};
+    std::pmr::string name;
+    std::pmr::vector<std::pmr::string> tokens;
+    std::array<std::pmr::string, 2> greeting_and_response;
+    std::pmr::vector<uint32_t> ipv4_addresses;
+    std::array<uint32_t, 8> banana_indexes{};
+    PmrOtherSampleDataType parent_obj;
+    std::pmr::vector<PmrOtherSampleDataType> children_objs;
+    std::array<PmrOtherSampleDataType, 2> banana_objs;
+
+    // Strings, vectors and nested `pmr` structs allocate from the memory resource
+    // the struct was constructed with.
+    using allocator_type = std::pmr::polymorphic_allocator<std::byte>;
+
+    PmrSampleDataType() : PmrSampleDataType(allocator_type{}) {}
+    PmrSampleDataType(const PmrSampleDataType&) = default;
+    PmrSampleDataType(PmrSampleDataType&&) = default;
+    PmrSampleDataType& operator=(const PmrSampleDataType&) = default;
+    PmrSampleDataType& operator=(PmrSampleDataType&&) = default;
+
+    explicit PmrSampleDataType(const allocator_type& allocator) :
+        name{ std::make_obj_using_allocator<std::pmr::string>(allocator) },
+        tokens{ std::make_obj_using_allocator<std::pmr::vector<std::pmr::string>>(allocator) },
+        greeting_and_response{ make_array_of<std::pmr::string, 2>([&](size_t) { return std::make_obj_using_allocator<std::pmr::string>(allocator); }) },
+        ipv4_addresses{ std::make_obj_using_allocator<std::pmr::vector<uint32_t>>(allocator) },
+        parent_obj{ std::make_obj_using_allocator<PmrOtherSampleDataType>(allocator) },
+        children_objs{ std::make_obj_using_allocator<std::pmr::vector<PmrOtherSampleDataType>>(allocator) },
+        banana_objs{ make_array_of<PmrOtherSampleDataType, 2>([&](size_t) { return std::make_obj_using_allocator<PmrOtherSampleDataType>(allocator); }) }
+    {
+    }
+
+    PmrSampleDataType(const PmrSampleDataType& other, const allocator_type& allocator) :
+        is_enabled{ other.is_enabled },
+        sdr_luminance{ other.sdr_luminance },
+        some_signed_char{ other.some_signed_char },
+        id{ other.id },
+        idk_what_this_could_be{ other.idk_what_this_could_be },
+        complexity{ other.complexity },
+        some_rando_value{ other.some_rando_value },
+        memory_pos{ other.memory_pos },
+        grid_pos{ other.grid_pos },
+        slider_pos{ other.slider_pos },
+        name{ std::make_obj_using_allocator<std::pmr::string>(allocator, other.name) },
+        tokens{ std::make_obj_using_allocator<std::pmr::vector<std::pmr::string>>(allocator, other.tokens) },
+        greeting_and_response{ make_array_of<std::pmr::string, 2>([&](size_t i) { return std::make_obj_using_allocator<std::pmr::string>(allocator, other.greeting_and_response[i]); }) },
+        ipv4_addresses{ std::make_obj_using_allocator<std::pmr::vector<uint32_t>>(allocator, other.ipv4_addresses) },
+        banana_indexes{ other.banana_indexes },
+        parent_obj{ std::make_obj_using_allocator<PmrOtherSampleDataType>(allocator, other.parent_obj) },
+        children_objs{ std::make_obj_using_allocator<std::pmr::vector<PmrOtherSampleDataType>>(allocator, other.children_objs) },
+        banana_objs{ make_array_of<PmrOtherSampleDataType, 2>([&](size_t i) { return std::make_obj_using_allocator<PmrOtherSampleDataType>(allocator, other.banana_objs[i]); }) }
+    {
+    }
+
+    PmrSampleDataType(PmrSampleDataType&& other, const allocator_type& allocator) :
+        is_enabled{ other.is_enabled },
+        sdr_luminance{ other.sdr_luminance },
+        some_signed_char{ other.some_signed_char },
+        id{ other.id },
+        idk_what_this_could_be{ other.idk_what_this_could_be },
+        complexity{ other.complexity },
+        some_rando_value{ other.some_rando_value },
+        memory_pos{ other.memory_pos },
+        grid_pos{ other.grid_pos },
+        slider_pos{ other.slider_pos },
+        name{ std::make_obj_using_allocator<std::pmr::string>(allocator, std::move(other.name)) },
+        tokens{ std::make_obj_using_allocator<std::pmr::vector<std::pmr::string>>(allocator, std::move(other.tokens)) },
+        greeting_and_response{ make_array_of<std::pmr::string, 2>([&](size_t i) { return std::make_obj_using_allocator<std::pmr::string>(allocator, std::move(other.greeting_and_response[i])); }) },
+        ipv4_addresses{ std::make_obj_using_allocator<std::pmr::vector<uint32_t>>(allocator, std::move(other.ipv4_addresses)) },
+        banana_indexes{ other.banana_indexes },
+        parent_obj{ std::make_obj_using_allocator<PmrOtherSampleDataType>(allocator, std::move(other.parent_obj)) },
+        children_objs{ std::make_obj_using_allocator<std::pmr::vector<PmrOtherSampleDataType>>(allocator, std::move(other.children_objs)) },
+        banana_objs{ make_array_of<PmrOtherSampleDataType, 2>([&](size_t i) { return std::make_obj_using_allocator<PmrOtherSampleDataType>(allocator, std::move(other.banana_objs[i])); }) }
+    {
+    }
+
+    // Hash of the wire layout, written into the header of dumped files.
+    static constexpr uint64_t k_schema_fingerprint{ 0x75ab49c16ad0f3b3ull };
+
+    static constexpr size_t k_fixed_serialized_size{ 67 + 4 * sizeof(size_t) };
+
+    size_t serialized_size() const override
+    {
+        size_t size{ k_fixed_serialized_size };
+        size += name.length();
+        for (const auto& elem : tokens)
+        {
+            size += sizeof(size_t) + elem.length();
+        }
+        for (const auto& elem : greeting_and_response)
+        {
+            size += sizeof(size_t) + elem.length();
+        }
+        size += ipv4_addresses.size() * sizeof(uint32_t);
+        size += parent_obj.serialized_size();
+        for (const auto& elem : children_objs)
+        {
+            size += elem.serialized_size();
+        }
+        for (const auto& elem : banana_objs)
+        {
+            size += elem.serialized_size();
+        }
+        return size;
+    }
+
+    void serialize_dump(const std::string& fname, SerialCodec codec = SerialCodec::none) override
+    {
+        SerialBuffer sb;
+        sb.mode = SerialBuffer::SBM_WRITE;
+        size_t expected_size{ SchemaHeader::k_size + serialized_size() };
+        sb.reserve(expected_size);
+        SchemaHeader::write(sb, k_schema_fingerprint);
+        write_data_to_serial_buffer(sb);
+        assert(sb.buffer.size() == expected_size);
+        if (!sb.save_buffer_to_disk(fname, codec))
+        {
+            throw std::runtime_error{ "Can't write " + fname };
+        }
+    }
+
+    void serialize_load(const std::string& fname) override
+    {
+        SerialBuffer sb;
+        if (!sb.load_buffer_from_disk(fname))
+        {
+            throw std::runtime_error{ "Can't read " + fname };
+        }
+        if (!read_file_from_serial_buffer(sb))
+        {
+            throw std::runtime_error{ "Wrong schema or truncated data, expected PmrSampleDataType: " + fname };
+        }
+    }
+
+    void serialize_load_mmap(const std::string& fname) override
+    {
+        MappedFile file;
+        if (!file.open(fname))
+        {
+            throw std::runtime_error{ "Can't map " + fname };
+        }
+        SerialBuffer sb;
+        if (!sb.attach_file_view(file.view()))
+        {
+            throw std::runtime_error{ "Can't decompress " + fname };
+        }
+        if (!read_file_from_serial_buffer(sb))
+        {
+            throw std::runtime_error{ "Wrong schema or truncated data, expected PmrSampleDataType: " + fname };
+        }
+    }
+
+    void serialize_dump_streamed(const std::string& fname, size_t window_bytes = SerialBuffer::k_default_window_bytes) override
+    {
+        std::ofstream file{ fname.c_str(), std::ios::out | std::ios::trunc | std::ios::binary };
+        if (!file.is_open())
+        {
+            throw std::runtime_error{ "Can't write " + fname };
+        }
+        SerialBuffer sb;
+        sb.attach_write_stream(file, window_bytes);
+        SchemaHeader::write(sb, k_schema_fingerprint);
+        write_data_to_serial_buffer(sb);
+        if (!sb.flush_write_stream())
+        {
+            throw std::runtime_error{ "Can't write " + fname };
+        }
+    }
+
+    void serialize_load_streamed(const std::string& fname, size_t window_bytes = SerialBuffer::k_default_window_bytes) override
+    {
+        std::ifstream file{ fname.c_str(), std::ios::in | std::ios::binary };
+        if (!file.is_open())
+        {
+            throw std::runtime_error{ "Can't read " + fname };
+        }
+        uint8_t header[CompressedContainer::k_fixed_header_size]{};
+        file.read(reinterpret_cast<char*>(header), sizeof(header));
+        if (CompressedContainer::is_container({ header, static_cast<size_t>(file.gcount()) }))
+        {
+            serialize_load(fname);
+            return;
+        }
+        file.clear();
+        file.seekg(0);
+        SerialBuffer sb;
+        sb.attach_read_stream(file, window_bytes);
+        if (!read_file_from_serial_buffer(sb))
+        {
+            throw std::runtime_error{ "Wrong schema or truncated data, expected PmrSampleDataType: " + fname };
+        }
+    }
+
+    void serialize_to(std::vector<uint8_t>& out) override
+    {
+        SerialBuffer sb;
+        sb.buffer.swap(out);
+        sb.clear();
+        sb.mode = SerialBuffer::SBM_WRITE;
+        size_t expected_size{ SchemaHeader::k_size + serialized_size() };
+        sb.reserve(expected_size);
+        SchemaHeader::write(sb, k_schema_fingerprint);
+        write_data_to_serial_buffer(sb);
+        assert(sb.buffer.size() == expected_size);
+        out.swap(sb.buffer);
+    }
+
+    size_t serialize_into(std::span<uint8_t> out) override
+    {
+        size_t expected_size{ SchemaHeader::k_size + serialized_size() };
+        if (expected_size > out.size())
+        {
+            return 0;
+        }
+        SerialBuffer& sb{ SerialBuffer::thread_scratch() };
+        sb.clear();
+        sb.mode = SerialBuffer::SBM_WRITE;
+        sb.reserve(expected_size);
+        SchemaHeader::write(sb, k_schema_fingerprint);
+        write_data_to_serial_buffer(sb);
+        assert(sb.buffer.size() == expected_size);
+        std::memcpy(out.data(), sb.buffer.data(), expected_size);
+        return expected_size;
+    }
+
+    bool deserialize_from(std::span<const uint8_t> bytes) override
+    {
+        SerialBuffer sb;
+        if (!sb.attach_file_view(bytes) || !read_file_from_serial_buffer(sb))
+        {
+            return false;
+        }
+        return sb.buffer_position == sb.read_view.size();
+    }
+
+    void write_data_to_serial_buffer(SerialBuffer& sb) override
+    {
+        std::array<uint8_t, 35> is_enabled__run;
+        std::memcpy(is_enabled__run.data() + 0, &is_enabled, sizeof(bool));
+        std::memcpy(is_enabled__run.data() + 1, &sdr_luminance, sizeof(uint8_t));
+        std::memcpy(is_enabled__run.data() + 2, &some_signed_char, sizeof(int8_t));
+        std::memcpy(is_enabled__run.data() + 3, &id, sizeof(uint16_t));
+        std::memcpy(is_enabled__run.data() + 5, &idk_what_this_could_be, sizeof(int16_t));
+        std::memcpy(is_enabled__run.data() + 7, &complexity, sizeof(uint32_t));
+        std::memcpy(is_enabled__run.data() + 11, &some_rando_value, sizeof(int32_t));
+        std::memcpy(is_enabled__run.data() + 15, &memory_pos, sizeof(uint64_t));
+        std::memcpy(is_enabled__run.data() + 23, &grid_pos, sizeof(int64_t));
+        std::memcpy(is_enabled__run.data() + 31, &slider_pos, sizeof(float_t));
+        sb.write_bulk(is_enabled__run.data(), 1, 35);
+
+        size_t name__str_length{ name.length() };
+        sb.write_elem(&name__str_length, sizeof(size_t));
+        sb.write_elem(name.data(), sizeof(char) * name__str_length);
+
+        size_t tokens__list_count{ tokens.size() };
+        sb.write_elem(&tokens__list_count, sizeof(size_t));
+        for (size_t i = 0; i < tokens__list_count; i++)
+        {
+            size_t tokens__str_length{ tokens[i].length() };
+            sb.write_elem(&tokens__str_length, sizeof(size_t));
+            sb.write_elem(tokens[i].data(), sizeof(char) * tokens__str_length);
+        }
+
+        for (size_t i = 0; i < 2; i++)
+        {
+            size_t greeting_and_response__str_length{ greeting_and_response[i].length() };
+            sb.write_elem(&greeting_and_response__str_length, sizeof(size_t));
+            sb.write_elem(greeting_and_response[i].data(), sizeof(char) * greeting_and_response__str_length);
+        }
+
+        size_t ipv4_addresses__list_count{ ipv4_addresses.size() };
+        sb.write_elem(&ipv4_addresses__list_count, sizeof(size_t));
+        sb.write_bulk(ipv4_addresses.data(), sizeof(uint32_t), ipv4_addresses__list_count);
+
+        sb.write_bulk(banana_indexes.data(), sizeof(uint32_t), 8);
+
+        parent_obj.write_data_to_serial_buffer(sb);
+
+        size_t children_objs__list_count{ children_objs.size() };
+        sb.write_elem(&children_objs__list_count, sizeof(size_t));
+        for (size_t i = 0; i < children_objs__list_count; i++)
+        {
+            children_objs[i].write_data_to_serial_buffer(sb);
+        }
+
+        for (size_t i = 0; i < 2; i++)
+        {
+            banana_objs[i].write_data_to_serial_buffer(sb);
+        }
+    }
+
+    void read_data_from_serial_buffer(SerialBuffer& sb) override
+    {
+        const uint8_t* is_enabled__run{ static_cast<const uint8_t*>(sb.read_elem(35)) };
+        std::memcpy(&is_enabled, is_enabled__run + 0, sizeof(bool));
+        std::memcpy(&sdr_luminance, is_enabled__run + 1, sizeof(uint8_t));
+        std::memcpy(&some_signed_char, is_enabled__run + 2, sizeof(int8_t));
+        std::memcpy(&id, is_enabled__run + 3, sizeof(uint16_t));
+        std::memcpy(&idk_what_this_could_be, is_enabled__run + 5, sizeof(int16_t));
+        std::memcpy(&complexity, is_enabled__run + 7, sizeof(uint32_t));
+        std::memcpy(&some_rando_value, is_enabled__run + 11, sizeof(int32_t));
+        std::memcpy(&memory_pos, is_enabled__run + 15, sizeof(uint64_t));
+        std::memcpy(&grid_pos, is_enabled__run + 23, sizeof(int64_t));
+        std::memcpy(&slider_pos, is_enabled__run + 31, sizeof(float_t));
+
+        size_t name__str_length{ sb.read_value<size_t>() };
+        name.assign(reinterpret_cast<const char*>(sb.read_elem(sizeof(char) * name__str_length)), name__str_length);
+
+        size_t tokens__list_count{ sb.read_value<size_t>() };
+        sb.check_list_count(tokens__list_count, sizeof(size_t));
+        tokens.clear();
+        tokens.reserve(tokens__list_count);
+        for (size_t i = 0; i < tokens__list_count; i++)
+        {
+            size_t tokens__str_length{ sb.read_value<size_t>() };
+            tokens.emplace_back(reinterpret_cast<const char*>(sb.read_elem(sizeof(char) * tokens__str_length)), tokens__str_length);
+        }
+
+        for (size_t i = 0; i < 2; i++)
+        {
+            size_t greeting_and_response__str_length{ sb.read_value<size_t>() };
+            greeting_and_response[i].assign(reinterpret_cast<const char*>(sb.read_elem(sizeof(char) * greeting_and_response__str_length)), greeting_and_response__str_length);
+        }
+
+        size_t ipv4_addresses__list_count{ sb.read_value<size_t>() };
+        sb.check_list_count(ipv4_addresses__list_count, sizeof(uint32_t));
+        ipv4_addresses.resize(ipv4_addresses__list_count);
+        sb.read_bulk(ipv4_addresses.data(), sizeof(uint32_t), ipv4_addresses__list_count);
+
+        sb.read_bulk(banana_indexes.data(), sizeof(uint32_t), 8);
+
+        parent_obj.read_data_from_serial_buffer(sb);
+
+        size_t children_objs__list_count{ sb.read_value<size_t>() };
+        sb.check_list_count(children_objs__list_count, PmrOtherSampleDataType::k_fixed_serialized_size);
+        children_objs.clear();
+        children_objs.reserve(children_objs__list_count);
+        for (size_t i = 0; i < children_objs__list_count; i++)
+        {
+            children_objs.emplace_back();
+            children_objs.back().read_data_from_serial_buffer(sb);
+        }
+
+        for (size_t i = 0; i < 2; i++)
+        {
+            banana_objs[i].read_data_from_serial_buffer(sb);
+        }
+    }
+
+    // Reads a dumped file's header and the data after it. Files written in a
+    // `previous` layout (or with nested structs in theirs) get migrated. Fails
+    // on any other schema.
+    bool read_file_from_serial_buffer(SerialBuffer& sb)
+    {
+        uint64_t fingerprint{ 0 };
+        if (!SchemaHeader::read(sb, fingerprint))
+        {
+            return false;
+        }
+        if (fingerprint == k_schema_fingerprint)
+        {
+            read_data_from_serial_buffer(sb);
+            return true;
+        }
+        return false;
+    }
+
+    bool operator==(const PmrSampleDataType& other) const
+    {
+        return is_enabled == other.is_enabled
+            && sdr_luminance == other.sdr_luminance
+            && some_signed_char == other.some_signed_char
+            && id == other.id
+            && idk_what_this_could_be == other.idk_what_this_could_be
+            && complexity == other.complexity
+            && some_rando_value == other.some_rando_value
+            && memory_pos == other.memory_pos
+            && grid_pos == other.grid_pos
+            && slider_pos == other.slider_pos
+            && name == other.name
+            && tokens == other.tokens
+            && greeting_and_response == other.greeting_and_response
+            && ipv4_addresses == other.ipv4_addresses
+            && banana_indexes == other.banana_indexes
+            && parent_obj == other.parent_obj
+            && children_objs == other.children_objs
+            && banana_objs == other.banana_objs;
+    }
+
+    // Writes only what changed since `prev`, for `apply_delta` on a copy of
+    // `prev` to catch up with. Not a file: there's no schema header.
+    void write_delta(const PmrSampleDataType& prev, SerialBuffer& sb)
+    {
+        std::array<uint8_t, 3> delta__mask{};
+        delta__mask[0] |= static_cast<uint8_t>((is_enabled != prev.is_enabled) << 0);
+        delta__mask[0] |= static_cast<uint8_t>((sdr_luminance != prev.sdr_luminance) << 1);
+        delta__mask[0] |= static_cast<uint8_t>((some_signed_char != prev.some_signed_char) << 2);
+        delta__mask[0] |= static_cast<uint8_t>((id != prev.id) << 3);
+        delta__mask[0] |= static_cast<uint8_t>((idk_what_this_could_be != prev.idk_what_this_could_be) << 4);
+        delta__mask[0] |= static_cast<uint8_t>((complexity != prev.complexity) << 5);
+        delta__mask[0] |= static_cast<uint8_t>((some_rando_value != prev.some_rando_value) << 6);
+        delta__mask[0] |= static_cast<uint8_t>((memory_pos != prev.memory_pos) << 7);
+        delta__mask[1] |= static_cast<uint8_t>((grid_pos != prev.grid_pos) << 0);
+        delta__mask[1] |= static_cast<uint8_t>((slider_pos != prev.slider_pos) << 1);
+        delta__mask[1] |= static_cast<uint8_t>((name != prev.name) << 2);
+        delta__mask[1] |= static_cast<uint8_t>((tokens != prev.tokens) << 3);
+        delta__mask[1] |= static_cast<uint8_t>((greeting_and_response != prev.greeting_and_response) << 4);
+        delta__mask[1] |= static_cast<uint8_t>((ipv4_addresses != prev.ipv4_addresses) << 5);
+        delta__mask[1] |= static_cast<uint8_t>((banana_indexes != prev.banana_indexes) << 6);
+        delta__mask[1] |= static_cast<uint8_t>((parent_obj != prev.parent_obj) << 7);
+        delta__mask[2] |= static_cast<uint8_t>((children_objs != prev.children_objs) << 0);
+        delta__mask[2] |= static_cast<uint8_t>((banana_objs != prev.banana_objs) << 1);
+        sb.write_bulk(delta__mask.data(), 1, 3);
+
+        if (((delta__mask[0] >> 0) & 1) != 0)
+        {
+            sb.write_elem(&is_enabled, sizeof(bool));
+        }
+
+        if (((delta__mask[0] >> 1) & 1) != 0)
+        {
+            sb.write_elem(&sdr_luminance, sizeof(uint8_t));
+        }
+
+        if (((delta__mask[0] >> 2) & 1) != 0)
+        {
+            sb.write_elem(&some_signed_char, sizeof(int8_t));
+        }
+
+        if (((delta__mask[0] >> 3) & 1) != 0)
+        {
+            sb.write_elem(&id, sizeof(uint16_t));
+        }
+
+        if (((delta__mask[0] >> 4) & 1) != 0)
+        {
+            sb.write_elem(&idk_what_this_could_be, sizeof(int16_t));
+        }
+
+        if (((delta__mask[0] >> 5) & 1) != 0)
+        {
+            sb.write_elem(&complexity, sizeof(uint32_t));
+        }
+
+        if (((delta__mask[0] >> 6) & 1) != 0)
+        {
+            sb.write_elem(&some_rando_value, sizeof(int32_t));
+        }
+
+        if (((delta__mask[0] >> 7) & 1) != 0)
+        {
+            sb.write_elem(&memory_pos, sizeof(uint64_t));
+        }
+
+        if (((delta__mask[1] >> 0) & 1) != 0)
+        {
+            sb.write_elem(&grid_pos, sizeof(int64_t));
+        }
+
+        if (((delta__mask[1] >> 1) & 1) != 0)
+        {
+            sb.write_elem(&slider_pos, sizeof(float_t));
+        }
+
+        if (((delta__mask[1] >> 2) & 1) != 0)
+        {
+            size_t name__str_length{ name.length() };
+            sb.write_elem(&name__str_length, sizeof(size_t));
+            sb.write_elem(name.data(), sizeof(char) * name__str_length);
+        }
+
+        if (((delta__mask[1] >> 3) & 1) != 0)
+        {
+            size_t tokens__list_count{ tokens.size() };
+            sb.write_elem(&tokens__list_count, sizeof(size_t));
+            write_delta_runs(sb, tokens, prev.tokens, [&](size_t i) {
+                size_t tokens__str_length{ tokens[i].length() };
+                sb.write_elem(&tokens__str_length, sizeof(size_t));
+                sb.write_elem(tokens[i].data(), sizeof(char) * tokens__str_length);
+            });
+        }
+
+        if (((delta__mask[1] >> 4) & 1) != 0)
+        {
+            write_delta_elems(sb, greeting_and_response, prev.greeting_and_response, [&](size_t i) {
+                size_t greeting_and_response__str_length{ greeting_and_response[i].length() };
+                sb.write_elem(&greeting_and_response__str_length, sizeof(size_t));
+                sb.write_elem(greeting_and_response[i].data(), sizeof(char) * greeting_and_response__str_length);
+            });
+        }
+
+        if (((delta__mask[1] >> 5) & 1) != 0)
+        {
+            size_t ipv4_addresses__list_count{ ipv4_addresses.size() };
+            sb.write_elem(&ipv4_addresses__list_count, sizeof(size_t));
+            write_delta_runs(sb, ipv4_addresses, prev.ipv4_addresses, [&](size_t i) {
+                sb.write_elem(&ipv4_addresses[i], sizeof(uint32_t));
+            });
+        }
+
+        if (((delta__mask[1] >> 6) & 1) != 0)
+        {
+            write_delta_elems(sb, banana_indexes, prev.banana_indexes, [&](size_t i) {
+                sb.write_elem(&banana_indexes[i], sizeof(uint32_t));
+            });
+        }
+
+        if (((delta__mask[1] >> 7) & 1) != 0)
+        {
+            parent_obj.write_delta(prev.parent_obj, sb);
+        }
+
+        if (((delta__mask[2] >> 0) & 1) != 0)
+        {
+            size_t children_objs__list_count{ children_objs.size() };
+            sb.write_elem(&children_objs__list_count, sizeof(size_t));
+            write_delta_runs(sb, children_objs, prev.children_objs, [&](size_t i) {
+                if (i < prev.children_objs.size())
+                {
+                    children_objs[i].write_delta(prev.children_objs[i], sb);
+                }
+                else
+                {
+                    children_objs[i].write_delta(PmrOtherSampleDataType{}, sb);
+                }
+            });
+        }
+
+        if (((delta__mask[2] >> 1) & 1) != 0)
+        {
+            write_delta_elems(sb, banana_objs, prev.banana_objs, [&](size_t i) {
+                banana_objs[i].write_delta(prev.banana_objs[i], sb);
+            });
+        }
+    }
+
+    // Applies a `write_delta` to the `prev` it was written against.
+    void apply_delta(SerialBuffer& sb)
+    {
+        std::array<uint8_t, 3> delta__mask;
+        sb.read_bulk(delta__mask.data(), 1, 3);
+
+        if (((delta__mask[0] >> 0) & 1) != 0)
+        {
+            is_enabled = sb.read_value<bool>();
+        }
+
+        if (((delta__mask[0] >> 1) & 1) != 0)
+        {
+            sdr_luminance = sb.read_value<uint8_t>();
+        }
+
+        if (((delta__mask[0] >> 2) & 1) != 0)
+        {
+            some_signed_char = sb.read_value<int8_t>();
+        }
+
+        if (((delta__mask[0] >> 3) & 1) != 0)
+        {
+            id = sb.read_value<uint16_t>();
+        }
+
+        if (((delta__mask[0] >> 4) & 1) != 0)
+        {
+            idk_what_this_could_be = sb.read_value<int16_t>();
+        }
+
+        if (((delta__mask[0] >> 5) & 1) != 0)
+        {
+            complexity = sb.read_value<uint32_t>();
+        }
+
+        if (((delta__mask[0] >> 6) & 1) != 0)
+        {
+            some_rando_value = sb.read_value<int32_t>();
+        }
+
+        if (((delta__mask[0] >> 7) & 1) != 0)
+        {
+            memory_pos = sb.read_value<uint64_t>();
+        }
+
+        if (((delta__mask[1] >> 0) & 1) != 0)
+        {
+            grid_pos = sb.read_value<int64_t>();
+        }
+
+        if (((delta__mask[1] >> 1) & 1) != 0)
+        {
+            slider_pos = sb.read_value<float_t>();
+        }
+
+        if (((delta__mask[1] >> 2) & 1) != 0)
+        {
+            size_t name__str_length{ sb.read_value<size_t>() };
+            name.assign(reinterpret_cast<const char*>(sb.read_elem(sizeof(char) * name__str_length)), name__str_length);
+        }
+
+        if (((delta__mask[1] >> 3) & 1) != 0)
+        {
+            size_t tokens__list_count{ sb.read_value<size_t>() };
+            if (tokens__list_count > tokens.size())
+            {
+                sb.check_list_count(tokens__list_count - tokens.size(), sizeof(size_t));
+            }
+            tokens.resize(tokens__list_count);
+            read_delta_runs(sb, tokens, [&](size_t i) {
+                size_t tokens__str_length{ sb.read_value<size_t>() };
+                tokens[i].assign(reinterpret_cast<const char*>(sb.read_elem(sizeof(char) * tokens__str_length)), tokens__str_length);
+            });
+        }
+
+        if (((delta__mask[1] >> 4) & 1) != 0)
+        {
+            read_delta_elems(sb, greeting_and_response, [&](size_t i) {
+                size_t greeting_and_response__str_length{ sb.read_value<size_t>() };
+                greeting_and_response[i].assign(reinterpret_cast<const char*>(sb.read_elem(sizeof(char) * greeting_and_response__str_length)), greeting_and_response__str_length);
+            });
+        }
+
+        if (((delta__mask[1] >> 5) & 1) != 0)
+        {
+            size_t ipv4_addresses__list_count{ sb.read_value<size_t>() };
+            if (ipv4_addresses__list_count > ipv4_addresses.size())
+            {
+                sb.check_list_count(ipv4_addresses__list_count - ipv4_addresses.size(), sizeof(uint32_t));
+            }
+            ipv4_addresses.resize(ipv4_addresses__list_count);
+            read_delta_runs(sb, ipv4_addresses, [&](size_t i) {
+                ipv4_addresses[i] = sb.read_value<uint32_t>();
+            });
+        }
+
+        if (((delta__mask[1] >> 6) & 1) != 0)
+        {
+            read_delta_elems(sb, banana_indexes, [&](size_t i) {
+                banana_indexes[i] = sb.read_value<uint32_t>();
+            });
+        }
+
+        if (((delta__mask[1] >> 7) & 1) != 0)
+        {
+            parent_obj.apply_delta(sb);
+        }
+
+        if (((delta__mask[2] >> 0) & 1) != 0)
+        {
+            size_t children_objs__list_count{ sb.read_value<size_t>() };
+            if (children_objs__list_count > children_objs.size())
+            {
+                sb.check_list_count(children_objs__list_count - children_objs.size(), 1);
+            }
+            children_objs.resize(children_objs__list_count);
+            read_delta_runs(sb, children_objs, [&](size_t i) {
+                children_objs[i].apply_delta(sb);
+            });
+        }
+
+        if (((delta__mask[2] >> 1) & 1) != 0)
+        {
+            read_delta_elems(sb, banana_objs, [&](size_t i) {
+                banana_objs[i].apply_delta(sb);
+            });
+        }
+    }
+};
+
+
+// Read-only view of a serialized `PmrSampleDataType`. Strings and primitive
+// lists point into the serialized bytes, which must outlive the view.
+struct PmrSampleDataType_view
+{
+    bool is_enabled;
+    uint8_t sdr_luminance;
+    int8_t some_signed_char;
+    uint16_t id;
+    int16_t idk_what_this_could_be;
+    uint32_t complexity;
+    int32_t some_rando_value;
+    uint64_t memory_pos;
+    int64_t grid_pos;
+    float_t slider_pos;
+    std::string_view name;
+    std::vector<std::string_view> tokens;
+    std::array<std::string_view, 2> greeting_and_response;
+    UnalignedSpan<uint32_t> ipv4_addresses;
+    UnalignedSpan<uint32_t> banana_indexes;
+    PmrOtherSampleDataType_view parent_obj;
+    std::vector<PmrOtherSampleDataType_view> children_objs;
+    std::array<PmrOtherSampleDataType_view, 2> banana_objs;
+
+    void attach(std::span<const uint8_t> bytes)
+    {
+        SerialBuffer sb;
+        sb.attach_read_view(bytes);
+        read_view_from_serial_buffer(sb);
+    }
+
+    // Same as `attach`, for the bytes of a whole raw `serialize_dump`ed file.
+    // Fails if the file was written with a different schema.
+    bool attach_file(std::span<const uint8_t> bytes)
+    {
+        SerialBuffer sb;
+        sb.attach_read_view(bytes);
+        uint64_t fingerprint{ 0 };
+        if (!SchemaHeader::read(sb, fingerprint) || fingerprint != PmrSampleDataType::k_schema_fingerprint)
+        {
+            return false;
+        }
+        read_view_from_serial_buffer(sb);
+        return true;
+    }
+
+    void read_view_from_serial_buffer(SerialBuffer& sb)
+    {
+        const uint8_t* is_enabled__run{ static_cast<const uint8_t*>(sb.read_elem(35)) };
+        std::memcpy(&is_enabled, is_enabled__run + 0, sizeof(bool));
+        std::memcpy(&sdr_luminance, is_enabled__run + 1, sizeof(uint8_t));
+        std::memcpy(&some_signed_char, is_enabled__run + 2, sizeof(int8_t));
+        std::memcpy(&id, is_enabled__run + 3, sizeof(uint16_t));
+        std::memcpy(&idk_what_this_could_be, is_enabled__run + 5, sizeof(int16_t));
+        std::memcpy(&complexity, is_enabled__run + 7, sizeof(uint32_t));
+        std::memcpy(&some_rando_value, is_enabled__run + 11, sizeof(int32_t));
+        std::memcpy(&memory_pos, is_enabled__run + 15, sizeof(uint64_t));
+        std::memcpy(&grid_pos, is_enabled__run + 23, sizeof(int64_t));
+        std::memcpy(&slider_pos, is_enabled__run + 31, sizeof(float_t));
+
+        size_t name__str_length{ sb.read_value<size_t>() };
+        name = std::string_view{ reinterpret_cast<const char*>(sb.read_elem(sizeof(char) * name__str_length)), name__str_length };
+
+        size_t tokens__list_count{ sb.read_value<size_t>() };
+        sb.check_list_count(tokens__list_count, sizeof(size_t));
+        tokens.resize(tokens__list_count);
+        for (size_t i = 0; i < tokens__list_count; i++)
+        {
+            size_t tokens__str_length{ sb.read_value<size_t>() };
+            tokens[i] = std::string_view{ reinterpret_cast<const char*>(sb.read_elem(sizeof(char) * tokens__str_length)), tokens__str_length };
+        }
+
+        for (size_t i = 0; i < 2; i++)
+        {
+            size_t greeting_and_response__str_length{ sb.read_value<size_t>() };
+            greeting_and_response[i] = std::string_view{ reinterpret_cast<const char*>(sb.read_elem(sizeof(char) * greeting_and_response__str_length)), greeting_and_response__str_length };
+        }
+
+        size_t ipv4_addresses__list_count{ sb.read_value<size_t>() };
+        sb.check_list_count(ipv4_addresses__list_count, sizeof(uint32_t));
+        ipv4_addresses = UnalignedSpan<uint32_t>{ static_cast<const uint8_t*>(sb.read_elem(sizeof(uint32_t) * ipv4_addresses__list_count)), ipv4_addresses__list_count };
+
+        banana_indexes = UnalignedSpan<uint32_t>{ static_cast<const uint8_t*>(sb.read_elem(sizeof(uint32_t) * 8)), 8 };
+
+        parent_obj.read_view_from_serial_buffer(sb);
+
+        size_t children_objs__list_count{ sb.read_value<size_t>() };
+        sb.check_list_count(children_objs__list_count, PmrOtherSampleDataType::k_fixed_serialized_size);
+        children_objs.resize(children_objs__list_count);
+        for (size_t i = 0; i < children_objs__list_count; i++)
+        {
+            children_objs[i].read_view_from_serial_buffer(sb);
+        }
+
+        for (size_t i = 0; i < 2; i++)
+        {
+            banana_objs[i].read_view_from_serial_buffer(sb);
+        }
+    }
+};
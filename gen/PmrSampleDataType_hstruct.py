@@ -0,0 +1,173 @@
+#    ____   _____   _   _   _____   ____       _      _____   _____   ____       ____    ___    ____    _____
+#   / ___| | ____| | \ | | | ____| |  _ \     / \    |_   _| | ____| |  _ \     / ___|  / _ \  |  _ \  | ____|
+#  | |  _  |  _|   |  \| | |  _|   | |_) |   / _ \     | |   |  _|   | | | |   | |     | | | | | | | | |  _|
+#  | |_| | | |___  | |\  | | |___  |  _ <   / ___ \    | |   | |___  | |_| |   | |___  | |_| | | |_| | | |___
+#   \____| |_____| |_| \_| |_____| |_| \_\ /_/   \_\   |_|   |_____| |____/     \____|  \___/  |____/  |_____|
+#
+# Python twin of `PmrSampleDataType.hstruct.h`. Reads and writes the same binary format.
+import struct
+import sys
+from array import array
+from typing import List, Tuple
+
+try:
+    from .hstruct_runtime import _LENGTH, _FILE_HEADER, _FILE_MAGIC, _array_typecode, _pack_string, _unpack_string, _string_size, _pack_array, _unpack_array
+except ImportError:
+    from hstruct_runtime import _LENGTH, _FILE_HEADER, _FILE_MAGIC, _array_typecode, _pack_string, _unpack_string, _string_size, _pack_array, _unpack_array
+try:
+    from .PmrOtherSampleDataType_hstruct import PmrOtherSampleDataType
+except ImportError:
+    from PmrOtherSampleDataType_hstruct import PmrOtherSampleDataType
+
+
+class PmrSampleDataType:
+    __slots__ = (
+        'is_enabled',
+        'sdr_luminance',
+        'some_signed_char',
+        'id',
+        'idk_what_this_could_be',
+        'complexity',
+        'some_rando_value',
+        'memory_pos',
+        'grid_pos',
+        'slider_pos',
+        'name',
+        'tokens',
+        'greeting_and_response',
+        'ipv4_addresses',
+        'banana_indexes',
+        'parent_obj',
+        'children_objs',
+        'banana_objs',
+    )
+
+    SCHEMA_FINGERPRINT = 0x75ab49c16ad0f3b3
+
+    _RUN_0 = struct.Struct('<?BbHhIiQqf')
+    _RUN_1 = struct.Struct('<8I')
+    _TYPECODE_ipv4_addresses = _array_typecode('I')
+
+    def __init__(self):
+        self.is_enabled = False
+        self.sdr_luminance = 0
+        self.some_signed_char = 0
+        self.id = 0
+        self.idk_what_this_could_be = 0
+        self.complexity = 0
+        self.some_rando_value = 0
+        self.memory_pos = 0
+        self.grid_pos = 0
+        self.slider_pos = 0.0
+        self.name = ''
+        self.tokens = []
+        self.greeting_and_response = [''] * 2
+        self.ipv4_addresses = array(self._TYPECODE_ipv4_addresses)
+        self.banana_indexes = [0] * 8
+        self.parent_obj = PmrOtherSampleDataType()
+        self.children_objs = []
+        self.banana_objs = [PmrOtherSampleDataType() for _ in range(2)]
+
+    def serialized_size(self) -> int:
+        size = 67
+        size += _string_size(self.name)
+        size += 8 + sum(_string_size(elem) for elem in self.tokens)
+        size += sum(_string_size(elem) for elem in self.greeting_and_response)
+        size += 8 + 4 * len(self.ipv4_addresses)
+        size += self.parent_obj.serialized_size()
+        size += 8 + sum(elem.serialized_size() for elem in self.children_objs)
+        size += sum(elem.serialized_size() for elem in self.banana_objs)
+        return size
+
+    def pack_into(self, buf, offset: int = 0) -> int:
+        pos = offset
+        self._RUN_0.pack_into(buf, pos, self.is_enabled, self.sdr_luminance, self.some_signed_char, self.id, self.idk_what_this_could_be, self.complexity, self.some_rando_value, self.memory_pos, self.grid_pos, self.slider_pos)
+        pos += 35
+        pos = _pack_string(buf, pos, self.name)
+        _LENGTH.pack_into(buf, pos, len(self.tokens))
+        pos += 8
+        for elem in self.tokens:
+            pos = _pack_string(buf, pos, elem)
+        assert len(self.greeting_and_response) == 2, '`greeting_and_response` must have 2 elements.'
+        for elem in self.greeting_and_response:
+            pos = _pack_string(buf, pos, elem)
+        pos = _pack_array(buf, pos, self.ipv4_addresses, self._TYPECODE_ipv4_addresses)
+        self._RUN_1.pack_into(buf, pos, *self.banana_indexes)
+        pos += 32
+        pos = self.parent_obj.pack_into(buf, pos)
+        _LENGTH.pack_into(buf, pos, len(self.children_objs))
+        pos += 8
+        for elem in self.children_objs:
+            pos = elem.pack_into(buf, pos)
+        assert len(self.banana_objs) == 2, '`banana_objs` must have 2 elements.'
+        for elem in self.banana_objs:
+            pos = elem.pack_into(buf, pos)
+        return pos
+
+    @classmethod
+    def unpack_from(cls, buf, offset: int = 0) -> Tuple['PmrSampleDataType', int]:
+        self = cls.__new__(cls)
+        view = memoryview(buf)
+        pos = offset
+        (self.is_enabled, self.sdr_luminance, self.some_signed_char, self.id, self.idk_what_this_could_be, self.complexity, self.some_rando_value, self.memory_pos, self.grid_pos, self.slider_pos,) = cls._RUN_0.unpack_from(view, pos)
+        pos += 35
+        self.name, pos = _unpack_string(view, pos)
+        (count,) = _LENGTH.unpack_from(view, pos)
+        pos += 8
+        items = []
+        for _ in range(count):
+            item, pos = _unpack_string(view, pos)
+            items.append(item)
+        self.tokens = items
+        items = []
+        for _ in range(2):
+            item, pos = _unpack_string(view, pos)
+            items.append(item)
+        self.greeting_and_response = items
+        self.ipv4_addresses, pos = _unpack_array(view, pos, cls._TYPECODE_ipv4_addresses)
+        values = cls._RUN_1.unpack_from(view, pos)
+        self.banana_indexes = list(values[0:8])
+        pos += 32
+        self.parent_obj, pos = PmrOtherSampleDataType.unpack_from(view, pos)
+        (count,) = _LENGTH.unpack_from(view, pos)
+        pos += 8
+        items = []
+        for _ in range(count):
+            item, pos = PmrOtherSampleDataType.unpack_from(view, pos)
+            items.append(item)
+        self.children_objs = items
+        items = []
+        for _ in range(2):
+            item, pos = PmrOtherSampleDataType.unpack_from(view, pos)
+            items.append(item)
+        self.banana_objs = items
+        return self, pos
+
+    def to_bytes(self) -> bytearray:
+        buf = bytearray(self.serialized_size())
+        end = self.pack_into(buf)
+        assert end == len(buf), f'Packed {end} bytes but measured {len(buf)}.'
+        return buf
+
+    @classmethod
+    def from_bytes(cls, buf) -> 'PmrSampleDataType':
+        obj, end = cls.unpack_from(buf)
+        assert end == len(buf), f'{len(buf) - end} trailing bytes after `PmrSampleDataType`.'
+        return obj
+
+    def to_file_bytes(self) -> bytearray:
+        buf = bytearray(_FILE_HEADER.size + self.serialized_size())
+        _FILE_HEADER.pack_into(buf, 0, _FILE_MAGIC, self.SCHEMA_FINGERPRINT)
+        end = self.pack_into(buf, _FILE_HEADER.size)
+        assert end == len(buf), f'Packed {end} bytes but measured {len(buf)}.'
+        return buf
+
+    @classmethod
+    def from_file_bytes(cls, buf) -> 'PmrSampleDataType':
+        magic, fingerprint = _FILE_HEADER.unpack_from(buf, 0)
+        assert magic == _FILE_MAGIC, 'No schema header, not a dumped file.'
+        assert fingerprint == cls.SCHEMA_FINGERPRINT, \
+            f'File was written with schema 0x{fingerprint:016x}, `PmrSampleDataType` is 0x{cls.SCHEMA_FINGERPRINT:016x}.'
+        obj, end = cls.unpack_from(buf, _FILE_HEADER.size)
+        assert end == len(buf), f'{len(buf) - end} trailing bytes after `PmrSampleDataType`.'
+        return obj
@@ -0,0 +1,802 @@
+/*
+ *    ____   _____   _   _   _____   ____       _      _____   _____   ____       ____    ___    ____    _____ 
+ *   / ___| | ____| | \ | | | ____| |  _ \     / \    |_   _| | ____| |  _ \     / ___|  / _ \  |  _ \  | ____|
+ *  | |  _  |  _|   |  \| | |  _|   | |_) |   / _ \     | |   |  _|   | | | |   | |     | | | | | | | | |  _|  
+ *  | |_| | | |___  | |\  | | |___  |  _ <   / ___ \    | |   | |___  | |_| |   | |___  | |_| | | |_| | | |___ 
+ *   \____| |_____| |_| \_| |_____| |_| \_\ /_/   \_\   |_|   |_____| |____/     \____|  \___/  |____/  |_____|
+ *
+ */
+#pragma once
+
+#include "hstruct_ifc.h"
+#include "OtherSampleDataType.hstruct.h"
+
+
+struct VarintSampleDataType : public HStruct_ifc
+{
+    bool is_enabled;
+    uint16_t id;
+    int32_t some_rando_value;
+    uint64_t memory_pos;
+    int64_t grid_pos;
+    float_t slider_pos;
+    std::string name;
+    std::vector<std::string> tokens;
+    std::array<std::string, 2> greeting_and_response;
+    std::vector<uint32_t> ipv4_addresses;
+    std::array<int32_t, 4> deltas;
+    std::vector<uint8_t> raw_bytes;
+    std::vector<float_t> weights;
+    OtherSampleDataType parent_obj;
+    std::vector<OtherSampleDataType> children_objs;
+
+    // Hash of the wire layout, written into the header of dumped files.
+    static constexpr uint64_t k_schema_fingerprint{ 0x08a8547c9cc6388full };
+
+    static constexpr size_t k_fixed_serialized_size{ 5 + 1 * sizeof(size_t) };
+
+    size_t serialized_size() const override
+    {
+        size_t size{ k_fixed_serialized_size };
+        size += varint_size(id);
+        size += varint_size(zigzag_encode(some_rando_value));
+        size += varint_size(memory_pos);
+        size += varint_size(zigzag_encode(grid_pos));
+        size += varint_size(name.length()) + name.length();
+        size += varint_size(tokens.size());
+        for (const auto& elem : tokens)
+        {
+            size += varint_size(elem.length()) + elem.length();
+        }
+        for (const auto& elem : greeting_and_response)
+        {
+            size += sizeof(size_t) + elem.length();
+        }
+        size += varint_size(ipv4_addresses.size());
+        for (const auto& elem : ipv4_addresses)
+        {
+            size += varint_size(elem);
+        }
+        for (const auto& elem : deltas)
+        {
+            size += varint_size(zigzag_encode(elem));
+        }
+        size += varint_size(raw_bytes.size());
+        size += raw_bytes.size() * sizeof(uint8_t);
+        size += weights.size() * sizeof(float_t);
+        size += parent_obj.serialized_size();
+        size += varint_size(children_objs.size());
+        for (const auto& elem : children_objs)
+        {
+            size += elem.serialized_size();
+        }
+        return size;
+    }
+
+    void serialize_dump(const std::string& fname, SerialCodec codec = SerialCodec::none) override
+    {
+        SerialBuffer sb;
+        sb.mode = SerialBuffer::SBM_WRITE;
+        size_t expected_size{ SchemaHeader::k_size + serialized_size() };
+        sb.reserve(expected_size);
+        SchemaHeader::write(sb, k_schema_fingerprint);
+        write_data_to_serial_buffer(sb);
+        assert(sb.buffer.size() == expected_size);
+        if (!sb.save_buffer_to_disk(fname, codec))
+        {
+            throw std::runtime_error{ "Can't write " + fname };
+        }
+    }
+
+    void serialize_load(const std::string& fname) override
+    {
+        SerialBuffer sb;
+        if (!sb.load_buffer_from_disk(fname))
+        {
+            throw std::runtime_error{ "Can't read " + fname };
+        }
+        if (!read_file_from_serial_buffer(sb))
+        {
+            throw std::runtime_error{ "Wrong schema or truncated data, expected VarintSampleDataType: " + fname };
+        }
+    }
+
+    void serialize_load_mmap(const std::string& fname) override
+    {
+        MappedFile file;
+        if (!file.open(fname))
+        {
+            throw std::runtime_error{ "Can't map " + fname };
+        }
+        SerialBuffer sb;
+        if (!sb.attach_file_view(file.view()))
+        {
+            throw std::runtime_error{ "Can't decompress " + fname };
+        }
+        if (!read_file_from_serial_buffer(sb))
+        {
+            throw std::runtime_error{ "Wrong schema or truncated data, expected VarintSampleDataType: " + fname };
+        }
+    }
+
+    void serialize_dump_streamed(const std::string& fname, size_t window_bytes = SerialBuffer::k_default_window_bytes) override
+    {
+        std::ofstream file{ fname.c_str(), std::ios::out | std::ios::trunc | std::ios::binary };
+        if (!file.is_open())
+        {
+            throw std::runtime_error{ "Can't write " + fname };
+        }
+        SerialBuffer sb;
+        sb.attach_write_stream(file, window_bytes);
+        SchemaHeader::write(sb, k_schema_fingerprint);
+        write_data_to_serial_buffer(sb);
+        if (!sb.flush_write_stream())
+        {
+            throw std::runtime_error{ "Can't write " + fname };
+        }
+    }
+
+    void serialize_load_streamed(const std::string& fname, size_t window_bytes = SerialBuffer::k_default_window_bytes) override
+    {
+        std::ifstream file{ fname.c_str(), std::ios::in | std::ios::binary };
+        if (!file.is_open())
+        {
+            throw std::runtime_error{ "Can't read " + fname };
+        }
+        uint8_t header[CompressedContainer::k_fixed_header_size]{};
+        file.read(reinterpret_cast<char*>(header), sizeof(header));
+        if (CompressedContainer::is_container({ header, static_cast<size_t>(file.gcount()) }))
+        {
+            serialize_load(fname);
+            return;
+        }
+        file.clear();
+        file.seekg(0);
+        SerialBuffer sb;
+        sb.attach_read_stream(file, window_bytes);
+        if (!read_file_from_serial_buffer(sb))
+        {
+            throw std::runtime_error{ "Wrong schema or truncated data, expected VarintSampleDataType: " + fname };
+        }
+    }
+
+    void serialize_to(std::vector<uint8_t>& out) override
+    {
+        SerialBuffer sb;
+        sb.buffer.swap(out);
+        sb.clear();
+        sb.mode = SerialBuffer::SBM_WRITE;
+        size_t expected_size{ SchemaHeader::k_size + serialized_size() };
+        sb.reserve(expected_size);
+        SchemaHeader::write(sb, k_schema_fingerprint);
+        write_data_to_serial_buffer(sb);
+        assert(sb.buffer.size() == expected_size);
+        out.swap(sb.buffer);
+    }
+
+    size_t serialize_into(std::span<uint8_t> out) override
+    {
+        size_t expected_size{ SchemaHeader::k_size + serialized_size() };
+        if (expected_size > out.size())
+        {
+            return 0;
+        }
+        SerialBuffer& sb{ SerialBuffer::thread_scratch() };
+        sb.clear();
+        sb.mode = SerialBuffer::SBM_WRITE;
+        sb.reserve(expected_size);
+        SchemaHeader::write(sb, k_schema_fingerprint);
+        write_data_to_serial_buffer(sb);
+        assert(sb.buffer.size() == expected_size);
+        std::memcpy(out.data(), sb.buffer.data(), expected_size);
+        return expected_size;
+    }
+
+    bool deserialize_from(std::span<const uint8_t> bytes) override
+    {
+        SerialBuffer sb;
+        if (!sb.attach_file_view(bytes) || !read_file_from_serial_buffer(sb))
+        {
+            return false;
+        }
+        return sb.buffer_position == sb.read_view.size();
+    }
+
+    void write_data_to_serial_buffer(SerialBuffer& sb) override
+    {
+        sb.write_elem(&is_enabled, sizeof(bool));
+        sb.write_varint(id);
+        sb.write_varint(zigzag_encode(some_rando_value));
+        sb.write_varint(memory_pos);
+        sb.write_varint(zigzag_encode(grid_pos));
+        sb.write_elem(&slider_pos, sizeof(float_t));
+        size_t name__str_length{ name.length() };
+        sb.write_varint(name__str_length);
+        sb.write_elem(name.data(), sizeof(char) * name__str_length);
+
+        size_t tokens__list_count{ tokens.size() };
+        sb.write_varint(tokens__list_count);
+        for (size_t i = 0; i < tokens__list_count; i++)
+        {
+            size_t tokens__str_length{ tokens[i].length() };
+            sb.write_varint(tokens__str_length);
+            sb.write_elem(tokens[i].data(), sizeof(char) * tokens__str_length);
+        }
+
+        for (size_t i = 0; i < 2; i++)
+        {
+            size_t greeting_and_response__str_length{ greeting_and_response[i].length() };
+            sb.write_elem(&greeting_and_response__str_length, sizeof(size_t));
+            sb.write_elem(greeting_and_response[i].data(), sizeof(char) * greeting_and_response__str_length);
+        }
+
+        size_t ipv4_addresses__list_count{ ipv4_addresses.size() };
+        sb.write_varint(ipv4_addresses__list_count);
+        for (size_t i = 0; i < ipv4_addresses__list_count; i++)
+        {
+            sb.write_varint(ipv4_addresses[i]);
+        }
+
+        for (size_t i = 0; i < 4; i++)
+        {
+            sb.write_varint(zigzag_encode(deltas[i]));
+        }
+
+        size_t raw_bytes__list_count{ raw_bytes.size() };
+        sb.write_varint(raw_bytes__list_count);
+        sb.write_bulk(raw_bytes.data(), sizeof(uint8_t), raw_bytes__list_count);
+
+        size_t weights__list_count{ weights.size() };
+        sb.write_elem(&weights__list_count, sizeof(size_t));
+        sb.write_bulk(weights.data(), sizeof(float_t), weights__list_count);
+
+        parent_obj.write_data_to_serial_buffer(sb);
+
+        size_t children_objs__list_count{ children_objs.size() };
+        sb.write_varint(children_objs__list_count);
+        for (size_t i = 0; i < children_objs__list_count; i++)
+        {
+            children_objs[i].write_data_to_serial_buffer(sb);
+        }
+    }
+
+    void read_data_from_serial_buffer(SerialBuffer& sb) override
+    {
+        is_enabled = sb.read_value<bool>();
+        id = static_cast<uint16_t>(sb.read_varint());
+        some_rando_value = static_cast<int32_t>(zigzag_decode(sb.read_varint()));
+        memory_pos = static_cast<uint64_t>(sb.read_varint());
+        grid_pos = static_cast<int64_t>(zigzag_decode(sb.read_varint()));
+        slider_pos = sb.read_value<float_t>();
+        size_t name__str_length{ sb.read_varint() };
+        name = std::string{ reinterpret_cast<const char*>(sb.read_elem(sizeof(char) * name__str_length)), name__str_length };
+
+        size_t tokens__list_count{ sb.read_varint() };
+        sb.check_list_count(tokens__list_count, 1);
+        tokens.clear();
+        tokens.reserve(tokens__list_count);
+        for (size_t i = 0; i < tokens__list_count; i++)
+        {
+            size_t tokens__str_length{ sb.read_varint() };
+            tokens.emplace_back(reinterpret_cast<const char*>(sb.read_elem(sizeof(char) * tokens__str_length)), tokens__str_length);
+        }
+
+        for (size_t i = 0; i < 2; i++)
+        {
+            size_t greeting_and_response__str_length{ sb.read_value<size_t>() };
+            greeting_and_response[i] = std::string{ reinterpret_cast<const char*>(sb.read_elem(sizeof(char) * greeting_and_response__str_length)), greeting_and_response__str_length };
+        }
+
+        size_t ipv4_addresses__list_count{ sb.read_varint() };
+        sb.check_list_count(ipv4_addresses__list_count, 1);
+        ipv4_addresses.clear();
+        ipv4_addresses.reserve(ipv4_addresses__list_count);
+        for (size_t i = 0; i < ipv4_addresses__list_count; i++)
+        {
+            ipv4_addresses.emplace_back(static_cast<uint32_t>(sb.read_varint()));
+        }
+
+        for (size_t i = 0; i < 4; i++)
+        {
+            deltas[i] = static_cast<int32_t>(zigzag_decode(sb.read_varint()));
+        }
+
+        size_t raw_bytes__list_count{ sb.read_varint() };
+        sb.check_list_count(raw_bytes__list_count, sizeof(uint8_t));
+        raw_bytes.resize(raw_bytes__list_count);
+        sb.read_bulk(raw_bytes.data(), sizeof(uint8_t), raw_bytes__list_count);
+
+        size_t weights__list_count{ sb.read_value<size_t>() };
+        sb.check_list_count(weights__list_count, sizeof(float_t));
+        weights.resize(weights__list_count);
+        sb.read_bulk(weights.data(), sizeof(float_t), weights__list_count);
+
+        parent_obj.read_data_from_serial_buffer(sb);
+
+        size_t children_objs__list_count{ sb.read_varint() };
+        sb.check_list_count(children_objs__list_count, OtherSampleDataType::k_fixed_serialized_size);
+        children_objs.clear();
+        children_objs.reserve(children_objs__list_count);
+        for (size_t i = 0; i < children_objs__list_count; i++)
+        {
+            children_objs.emplace_back(OtherSampleDataType{});
+            children_objs.back().read_data_from_serial_buffer(sb);
+        }
+    }
+
+    // Reads a dumped file's header and the data after it. Files written in a
+    // `previous` layout (or with nested structs in theirs) get migrated. Fails
+    // on any other schema.
+    bool read_file_from_serial_buffer(SerialBuffer& sb)
+    {
+        uint64_t fingerprint{ 0 };
+        if (!SchemaHeader::read(sb, fingerprint))
+        {
+            return false;
+        }
+        if (fingerprint == k_schema_fingerprint)
+        {
+            read_data_from_serial_buffer(sb);
+            return true;
+        }
+        if (fingerprint == 0xaef382c683cdcc81ull)
+        {
+            read_previous_aef382c683cdcc81_from_serial_buffer(sb);
+            return true;
+        }
+        return false;
+    }
+
+    // Reads the older layout with fingerprint 0xaef382c683cdcc81 field by field.
+    // That's the current layout with `OtherSampleDataType` in an older layout.
+    // Fields it doesn't have are left at their defaults.
+    void read_previous_aef382c683cdcc81_from_serial_buffer(SerialBuffer& sb)
+    {
+        *this = VarintSampleDataType{};
+        is_enabled = sb.read_value<bool>();
+        id = static_cast<uint16_t>(sb.read_varint());
+        some_rando_value = static_cast<int32_t>(zigzag_decode(sb.read_varint()));
+        memory_pos = static_cast<uint64_t>(sb.read_varint());
+        grid_pos = static_cast<int64_t>(zigzag_decode(sb.read_varint()));
+        slider_pos = sb.read_value<float_t>();
+        size_t name__str_length{ sb.read_varint() };
+        name = std::string{ reinterpret_cast<const char*>(sb.read_elem(sizeof(char) * name__str_length)), name__str_length };
+
+        size_t tokens__list_count{ sb.read_varint() };
+        sb.check_list_count(tokens__list_count, 1);
+        tokens.clear();
+        tokens.reserve(tokens__list_count);
+        for (size_t i = 0; i < tokens__list_count; i++)
+        {
+            size_t tokens__str_length{ sb.read_varint() };
+            tokens.emplace_back(reinterpret_cast<const char*>(sb.read_elem(sizeof(char) * tokens__str_length)), tokens__str_length);
+        }
+
+        for (size_t i = 0; i < 2; i++)
+        {
+            size_t greeting_and_response__str_length{ sb.read_value<size_t>() };
+            greeting_and_response[i] = std::string{ reinterpret_cast<const char*>(sb.read_elem(sizeof(char) * greeting_and_response__str_length)), greeting_and_response__str_length };
+        }
+
+        size_t ipv4_addresses__list_count{ sb.read_varint() };
+        sb.check_list_count(ipv4_addresses__list_count, 1);
+        ipv4_addresses.clear();
+        ipv4_addresses.reserve(ipv4_addresses__list_count);
+        for (size_t i = 0; i < ipv4_addresses__list_count; i++)
+        {
+            ipv4_addresses.emplace_back(static_cast<uint32_t>(sb.read_varint()));
+        }
+
+        for (size_t i = 0; i < 4; i++)
+        {
+            deltas[i] = static_cast<int32_t>(zigzag_decode(sb.read_varint()));
+        }
+
+        size_t raw_bytes__list_count{ sb.read_varint() };
+        sb.check_list_count(raw_bytes__list_count, sizeof(uint8_t));
+        raw_bytes.resize(raw_bytes__list_count);
+        sb.read_bulk(raw_bytes.data(), sizeof(uint8_t), raw_bytes__list_count);
+
+        size_t weights__list_count{ sb.read_value<size_t>() };
+        sb.check_list_count(weights__list_count, sizeof(float_t));
+        weights.resize(weights__list_count);
+        sb.read_bulk(weights.data(), sizeof(float_t), weights__list_count);
+
+        parent_obj.read_previous_793d713eb978678a_from_serial_buffer(sb);
+
+        size_t children_objs__list_count{ sb.read_varint() };
+        sb.check_list_count(children_objs__list_count, 1);
+        children_objs.clear();
+        children_objs.reserve(children_objs__list_count);
+        for (size_t i = 0; i < children_objs__list_count; i++)
+        {
+            children_objs.emplace_back(OtherSampleDataType{});
+            children_objs.back().read_previous_793d713eb978678a_from_serial_buffer(sb);
+        }
+    }
+
+    bool operator==(const VarintSampleDataType& other) const
+    {
+        return is_enabled == other.is_enabled
+            && id == other.id
+            && some_rando_value == other.some_rando_value
+            && memory_pos == other.memory_pos
+            && grid_pos == other.grid_pos
+            && slider_pos == other.slider_pos
+            && name == other.name
+            && tokens == other.tokens
+            && greeting_and_response == other.greeting_and_response
+            && ipv4_addresses == other.ipv4_addresses
+            && deltas == other.deltas
+            && raw_bytes == other.raw_bytes
+            && weights == other.weights
+            && parent_obj == other.parent_obj
+            && children_objs == other.children_objs;
+    }
+
+    // Writes only what changed since `prev`, for `apply_delta` on a copy of
+    // `prev` to catch up with. Not a file: there's no schema header.
+    void write_delta(const VarintSampleDataType& prev, SerialBuffer& sb)
+    {
+        std::array<uint8_t, 2> delta__mask{};
+        delta__mask[0] |= static_cast<uint8_t>((is_enabled != prev.is_enabled) << 0);
+        delta__mask[0] |= static_cast<uint8_t>((id != prev.id) << 1);
+        delta__mask[0] |= static_cast<uint8_t>((some_rando_value != prev.some_rando_value) << 2);
+        delta__mask[0] |= static_cast<uint8_t>((memory_pos != prev.memory_pos) << 3);
+        delta__mask[0] |= static_cast<uint8_t>((grid_pos != prev.grid_pos) << 4);
+        delta__mask[0] |= static_cast<uint8_t>((slider_pos != prev.slider_pos) << 5);
+        delta__mask[0] |= static_cast<uint8_t>((name != prev.name) << 6);
+        delta__mask[0] |= static_cast<uint8_t>((tokens != prev.tokens) << 7);
+        delta__mask[1] |= static_cast<uint8_t>((greeting_and_response != prev.greeting_and_response) << 0);
+        delta__mask[1] |= static_cast<uint8_t>((ipv4_addresses != prev.ipv4_addresses) << 1);
+        delta__mask[1] |= static_cast<uint8_t>((deltas != prev.deltas) << 2);
+        delta__mask[1] |= static_cast<uint8_t>((raw_bytes != prev.raw_bytes) << 3);
+        delta__mask[1] |= static_cast<uint8_t>((weights != prev.weights) << 4);
+        delta__mask[1] |= static_cast<uint8_t>((parent_obj != prev.parent_obj) << 5);
+        delta__mask[1] |= static_cast<uint8_t>((children_objs != prev.children_objs) << 6);
+        sb.write_bulk(delta__mask.data(), 1, 2);
+
+        if (((delta__mask[0] >> 0) & 1) != 0)
+        {
+            sb.write_elem(&is_enabled, sizeof(bool));
+        }
+
+        if (((delta__mask[0] >> 1) & 1) != 0)
+        {
+            sb.write_varint(id);
+        }
+
+        if (((delta__mask[0] >> 2) & 1) != 0)
+        {
+            sb.write_varint(zigzag_encode(some_rando_value));
+        }
+
+        if (((delta__mask[0] >> 3) & 1) != 0)
+        {
+            sb.write_varint(memory_pos);
+        }
+
+        if (((delta__mask[0] >> 4) & 1) != 0)
+        {
+            sb.write_varint(zigzag_encode(grid_pos));
+        }
+
+        if (((delta__mask[0] >> 5) & 1) != 0)
+        {
+            sb.write_elem(&slider_pos, sizeof(float_t));
+        }
+
+        if (((delta__mask[0] >> 6) & 1) != 0)
+        {
+            size_t name__str_length{ name.length() };
+            sb.write_varint(name__str_length);
+            sb.write_elem(name.data(), sizeof(char) * name__str_length);
+        }
+
+        if (((delta__mask[0] >> 7) & 1) != 0)
+        {
+            size_t tokens__list_count{ tokens.size() };
+            sb.write_varint(tokens__list_count);
+            write_delta_runs(sb, tokens, prev.tokens, [&](size_t i) {
+                size_t tokens__str_length{ tokens[i].length() };
+                sb.write_varint(tokens__str_length);
+                sb.write_elem(tokens[i].data(), sizeof(char) * tokens__str_length);
+            });
+        }
+
+        if (((delta__mask[1] >> 0) & 1) != 0)
+        {
+            write_delta_elems(sb, greeting_and_response, prev.greeting_and_response, [&](size_t i) {
+                size_t greeting_and_response__str_length{ greeting_and_response[i].length() };
+                sb.write_elem(&greeting_and_response__str_length, sizeof(size_t));
+                sb.write_elem(greeting_and_response[i].data(), sizeof(char) * greeting_and_response__str_length);
+            });
+        }
+
+        if (((delta__mask[1] >> 1) & 1) != 0)
+        {
+            size_t ipv4_addresses__list_count{ ipv4_addresses.size() };
+            sb.write_varint(ipv4_addresses__list_count);
+            write_delta_runs(sb, ipv4_addresses, prev.ipv4_addresses, [&](size_t i) {
+                sb.write_varint(ipv4_addresses[i]);
+            });
+        }
+
+        if (((delta__mask[1] >> 2) & 1) != 0)
+        {
+            write_delta_elems(sb, deltas, prev.deltas, [&](size_t i) {
+                sb.write_varint(zigzag_encode(deltas[i]));
+            });
+        }
+
+        if (((delta__mask[1] >> 3) & 1) != 0)
+        {
+            size_t raw_bytes__list_count{ raw_bytes.size() };
+            sb.write_varint(raw_bytes__list_count);
+            write_delta_runs(sb, raw_bytes, prev.raw_bytes, [&](size_t i) {
+                sb.write_elem(&raw_bytes[i], sizeof(uint8_t));
+            });
+        }
+
+        if (((delta__mask[1] >> 4) & 1) != 0)
+        {
+            size_t weights__list_count{ weights.size() };
+            sb.write_elem(&weights__list_count, sizeof(size_t));
+            write_delta_runs(sb, weights, prev.weights, [&](size_t i) {
+                sb.write_elem(&weights[i], sizeof(float_t));
+            });
+        }
+
+        if (((delta__mask[1] >> 5) & 1) != 0)
+        {
+            parent_obj.write_delta(prev.parent_obj, sb);
+        }
+
+        if (((delta__mask[1] >> 6) & 1) != 0)
+        {
+            size_t children_objs__list_count{ children_objs.size() };
+            sb.write_varint(children_objs__list_count);
+            write_delta_runs(sb, children_objs, prev.children_objs, [&](size_t i) {
+                if (i < prev.children_objs.size())
+                {
+                    children_objs[i].write_delta(prev.children_objs[i], sb);
+                }
+                else
+                {
+                    children_objs[i].write_delta(OtherSampleDataType{}, sb);
+                }
+            });
+        }
+    }
+
+    // Applies a `write_delta` to the `prev` it was written against.
+    void apply_delta(SerialBuffer& sb)
+    {
+        std::array<uint8_t, 2> delta__mask;
+        sb.read_bulk(delta__mask.data(), 1, 2);
+
+        if (((delta__mask[0] >> 0) & 1) != 0)
+        {
+            is_enabled = sb.read_value<bool>();
+        }
+
+        if (((delta__mask[0] >> 1) & 1) != 0)
+        {
+            id = static_cast<uint16_t>(sb.read_varint());
+        }
+
+        if (((delta__mask[0] >> 2) & 1) != 0)
+        {
+            some_rando_value = static_cast<int32_t>(zigzag_decode(sb.read_varint()));
+        }
+
+        if (((delta__mask[0] >> 3) & 1) != 0)
+        {
+            memory_pos = static_cast<uint64_t>(sb.read_varint());
+        }
+
+        if (((delta__mask[0] >> 4) & 1) != 0)
+        {
+            grid_pos = static_cast<int64_t>(zigzag_decode(sb.read_varint()));
+        }
+
+        if (((delta__mask[0] >> 5) & 1) != 0)
+        {
+            slider_pos = sb.read_value<float_t>();
+        }
+
+        if (((delta__mask[0] >> 6) & 1) != 0)
+        {
+            size_t name__str_length{ sb.read_varint() };
+            name = std::string{ reinterpret_cast<const char*>(sb.read_elem(sizeof(char) * name__str_length)), name__str_length };
+        }
+
+        if (((delta__mask[0] >> 7) & 1) != 0)
+        {
+            size_t tokens__list_count{ sb.read_varint() };
+            if (tokens__list_count > tokens.size())
+            {
+                sb.check_list_count(tokens__list_count - tokens.size(), 1);
+            }
+            tokens.resize(tokens__list_count);
+            read_delta_runs(sb, tokens, [&](size_t i) {
+                size_t tokens__str_length{ sb.read_varint() };
+                tokens[i] = std::string{ reinterpret_cast<const char*>(sb.read_elem(sizeof(char) * tokens__str_length)), tokens__str_length };
+            });
+        }
+
+        if (((delta__mask[1] >> 0) & 1) != 0)
+        {
+            read_delta_elems(sb, greeting_and_response, [&](size_t i) {
+                size_t greeting_and_response__str_length{ sb.read_value<size_t>() };
+                greeting_and_response[i] = std::string{ reinterpret_cast<const char*>(sb.read_elem(sizeof(char) * greeting_and_response__str_length)), greeting_and_response__str_length };
+            });
+        }
+
+        if (((delta__mask[1] >> 1) & 1) != 0)
+        {
+            size_t ipv4_addresses__list_count{ sb.read_varint() };
+            if (ipv4_addresses__list_count > ipv4_addresses.size())
+            {
+                sb.check_list_count(ipv4_addresses__list_count - ipv4_addresses.size(), 1);
+            }
+            ipv4_addresses.resize(ipv4_addresses__list_count);
+            read_delta_runs(sb, ipv4_addresses, [&](size_t i) {
+                ipv4_addresses[i] = static_cast<uint32_t>(sb.read_varint());
+            });
+        }
+
+        if (((delta__mask[1] >> 2) & 1) != 0)
+        {
+            read_delta_elems(sb, deltas, [&](size_t i) {
+                deltas[i] = static_cast<int32_t>(zigzag_decode(sb.read_varint()));
+            });
+        }
+
+        if (((delta__mask[1] >> 3) & 1) != 0)
+        {
+            size_t raw_bytes__list_count{ sb.read_varint() };
+            if (raw_bytes__list_count > raw_bytes.size())
+            {
+                sb.check_list_count(raw_bytes__list_count - raw_bytes.size(), sizeof(uint8_t));
+            }
+            raw_bytes.resize(raw_bytes__list_count);
+            read_delta_runs(sb, raw_bytes, [&](size_t i) {
+                raw_bytes[i] = sb.read_value<uint8_t>();
+            });
+        }
+
+        if (((delta__mask[1] >> 4) & 1) != 0)
+        {
+            size_t weights__list_count{ sb.read_value<size_t>() };
+            if (weights__list_count > weights.size())
+            {
+                sb.check_list_count(weights__list_count - weights.size(), sizeof(float_t));
+            }
+            weights.resize(weights__list_count);
+            read_delta_runs(sb, weights, [&](size_t i) {
+                weights[i] = sb.read_value<float_t>();
+            });
+        }
+
+        if (((delta__mask[1] >> 5) & 1) != 0)
+        {
+            parent_obj.apply_delta(sb);
+        }
+
+        if (((delta__mask[1] >> 6) & 1) != 0)
+        {
+            size_t children_objs__list_count{ sb.read_varint() };
+            if (children_objs__list_count > children_objs.size())
+            {
+                sb.check_list_count(children_objs__list_count - children_objs.size(), 1);
+            }
+            children_objs.resize(children_objs__list_count);
+            read_delta_runs(sb, children_objs, [&](size_t i) {
+                children_objs[i].apply_delta(sb);
+            });
+        }
+    }
+};
+
+
+// Read-only view of a serialized `VarintSampleDataType`. Strings and primitive
+// lists point into the serialized bytes, which must outlive the view.
+struct VarintSampleDataType_view
+{
+    bool is_enabled;
+    uint16_t id;
+    int32_t some_rando_value;
+    uint64_t memory_pos;
+    int64_t grid_pos;
+    float_t slider_pos;
+    std::string_view name;
+    std::vector<std::string_view> tokens;
+    std::array<std::string_view, 2> greeting_and_response;
+    std::vector<uint32_t> ipv4_addresses;
+    std::array<int32_t, 4> deltas;
+    std::span<const uint8_t> raw_bytes;
+    UnalignedSpan<float_t> weights;
+    OtherSampleDataType_view parent_obj;
+    std::vector<OtherSampleDataType_view> children_objs;
+
+    void attach(std::span<const uint8_t> bytes)
+    {
+        SerialBuffer sb;
+        sb.attach_read_view(bytes);
+        read_view_from_serial_buffer(sb);
+    }
+
+    // Same as `attach`, for the bytes of a whole raw `serialize_dump`ed file.
+    // Fails if the file was written with a different schema.
+    bool attach_file(std::span<const uint8_t> bytes)
+    {
+        SerialBuffer sb;
+        sb.attach_read_view(bytes);
+        uint64_t fingerprint{ 0 };
+        if (!SchemaHeader::read(sb, fingerprint) || fingerprint != VarintSampleDataType::k_schema_fingerprint)
+        {
+            return false;
+        }
+        read_view_from_serial_buffer(sb);
+        return true;
+    }
+
+    void read_view_from_serial_buffer(SerialBuffer& sb)
+    {
+        is_enabled = sb.read_value<bool>();
+        id = static_cast<uint16_t>(sb.read_varint());
+        some_rando_value = static_cast<int32_t>(zigzag_decode(sb.read_varint()));
+        memory_pos = static_cast<uint64_t>(sb.read_varint());
+        grid_pos = static_cast<int64_t>(zigzag_decode(sb.read_varint()));
+        slider_pos = sb.read_value<float_t>();
+        size_t name__str_length{ sb.read_varint() };
+        name = std::string_view{ reinterpret_cast<const char*>(sb.read_elem(sizeof(char) * name__str_length)), name__str_length };
+
+        size_t tokens__list_count{ sb.read_varint() };
+        sb.check_list_count(tokens__list_count, 1);
+        tokens.resize(tokens__list_count);
+        for (size_t i = 0; i < tokens__list_count; i++)
+        {
+            size_t tokens__str_length{ sb.read_varint() };
+            tokens[i] = std::string_view{ reinterpret_cast<const char*>(sb.read_elem(sizeof(char) * tokens__str_length)), tokens__str_length };
+        }
+
+        for (size_t i = 0; i < 2; i++)
+        {
+            size_t greeting_and_response__str_length{ sb.read_value<size_t>() };
+            greeting_and_response[i] = std::string_view{ reinterpret_cast<const char*>(sb.read_elem(sizeof(char) * greeting_and_response__str_length)), greeting_and_response__str_length };
+        }
+
+        size_t ipv4_addresses__list_count{ sb.read_varint() };
+        sb.check_list_count(ipv4_addresses__list_count, 1);
+        ipv4_addresses.resize(ipv4_addresses__list_count);
+        for (size_t i = 0; i < ipv4_addresses__list_count; i++)
+        {
+            ipv4_addresses[i] = static_cast<uint32_t>(sb.read_varint());
+        }
+
+        for (size_t i = 0; i < 4; i++)
+        {
+            deltas[i] = static_cast<int32_t>(zigzag_decode(sb.read_varint()));
+        }
+
+        size_t raw_bytes__list_count{ sb.read_varint() };
+        sb.check_list_count(raw_bytes__list_count, sizeof(uint8_t));
+        raw_bytes = std::span<const uint8_t>{ reinterpret_cast<const uint8_t*>(static_cast<const uint8_t*>(sb.read_elem(sizeof(uint8_t) * raw_bytes__list_count))), raw_bytes__list_count };
+
+        size_t weights__list_count{ sb.read_value<size_t>() };
+        sb.check_list_count(weights__list_count, sizeof(float_t));
+        weights = UnalignedSpan<float_t>{ static_cast<const uint8_t*>(sb.read_elem(sizeof(float_t) * weights__list_count)), weights__list_count };
+
+        parent_obj.read_view_from_serial_buffer(sb);
+
+        size_t children_objs__list_count{ sb.read_varint() };
+        sb.check_list_count(children_objs__list_count, OtherSampleDataType::k_fixed_serialized_size);
+        children_objs.resize(children_objs__list_count);
+        for (size_t i = 0; i < children_objs__list_count; i++)
+        {
+            children_objs[i].read_view_from_serial_buffer(sb);
+        }
+    }
+};
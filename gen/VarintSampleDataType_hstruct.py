@@ -0,0 +1,180 @@
+#    ____   _____   _   _   _____   ____       _      _____   _____   ____       ____    ___    ____    _____
+#   / ___| | ____| | \ | | | ____| |  _ \     / \    |_   _| | ____| |  _ \     / ___|  / _ \  |  _ \  | ____|
+#  | |  _  |  _|   |  \| | |  _|   | |_) |   / _ \     | |   |  _|   | | | |   | |     | | | | | | | | |  _|
+#  | |_| | | |___  | |\  | | |___  |  _ <   / ___ \    | |   | |___  | |_| |   | |___  | |_| | | |_| | | |___
+#   \____| |_____| |_| \_| |_____| |_| \_\ /_/   \_\   |_|   |_____| |____/     \____|  \___/  |____/  |_____|
+#
+# Python twin of `VarintSampleDataType.hstruct.h`. Reads and writes the same binary format.
+import struct
+import sys
+from array import array
+from typing import List, Tuple
+
+try:
+    from .hstruct_runtime import _FILE_HEADER, _FILE_MAGIC, _array_typecode, _varint_size, _pack_varint, _unpack_varint, _zigzag_encode, _zigzag_decode, _pack_varints, _unpack_varints, _varints_size, _pack_string, _unpack_string, _string_size, _pack_array, _unpack_array
+except ImportError:
+    from hstruct_runtime import _FILE_HEADER, _FILE_MAGIC, _array_typecode, _varint_size, _pack_varint, _unpack_varint, _zigzag_encode, _zigzag_decode, _pack_varints, _unpack_varints, _varints_size, _pack_string, _unpack_string, _string_size, _pack_array, _unpack_array
+try:
+    from .OtherSampleDataType_hstruct import OtherSampleDataType
+except ImportError:
+    from OtherSampleDataType_hstruct import OtherSampleDataType
+
+
+class VarintSampleDataType:
+    __slots__ = (
+        'is_enabled',
+        'id',
+        'some_rando_value',
+        'memory_pos',
+        'grid_pos',
+        'slider_pos',
+        'name',
+        'tokens',
+        'greeting_and_response',
+        'ipv4_addresses',
+        'deltas',
+        'raw_bytes',
+        'weights',
+        'parent_obj',
+        'children_objs',
+    )
+
+    SCHEMA_FINGERPRINT = 0x08a8547c9cc6388f
+
+    _RUN_0 = struct.Struct('<?')
+    _RUN_1 = struct.Struct('<f')
+    _TYPECODE_raw_bytes = _array_typecode('B')
+    _TYPECODE_weights = _array_typecode('f')
+
+    def __init__(self):
+        self.is_enabled = False
+        self.id = 0
+        self.some_rando_value = 0
+        self.memory_pos = 0
+        self.grid_pos = 0
+        self.slider_pos = 0.0
+        self.name = ''
+        self.tokens = []
+        self.greeting_and_response = [''] * 2
+        self.ipv4_addresses = []
+        self.deltas = [0] * 4
+        self.raw_bytes = array(self._TYPECODE_raw_bytes)
+        self.weights = array(self._TYPECODE_weights)
+        self.parent_obj = OtherSampleDataType()
+        self.children_objs = []
+
+    def serialized_size(self) -> int:
+        size = 5
+        size += _varint_size(self.id)
+        size += _varint_size(_zigzag_encode(self.some_rando_value))
+        size += _varint_size(self.memory_pos)
+        size += _varint_size(_zigzag_encode(self.grid_pos))
+        size += _string_size(self.name, True)
+        size += _varint_size(len(self.tokens)) + sum(_string_size(elem, True) for elem in self.tokens)
+        size += sum(_string_size(elem) for elem in self.greeting_and_response)
+        size += _varint_size(len(self.ipv4_addresses)) + _varints_size(self.ipv4_addresses, False)
+        size += _varints_size(self.deltas, True)
+        size += _varint_size(len(self.raw_bytes)) + 1 * len(self.raw_bytes)
+        size += 8 + 4 * len(self.weights)
+        size += self.parent_obj.serialized_size()
+        size += _varint_size(len(self.children_objs)) + sum(elem.serialized_size() for elem in self.children_objs)
+        return size
+
+    def pack_into(self, buf, offset: int = 0) -> int:
+        pos = offset
+        self._RUN_0.pack_into(buf, pos, self.is_enabled)
+        pos += 1
+        pos = _pack_varint(buf, pos, self.id)
+        pos = _pack_varint(buf, pos, _zigzag_encode(self.some_rando_value))
+        pos = _pack_varint(buf, pos, self.memory_pos)
+        pos = _pack_varint(buf, pos, _zigzag_encode(self.grid_pos))
+        self._RUN_1.pack_into(buf, pos, self.slider_pos)
+        pos += 4
+        pos = _pack_string(buf, pos, self.name, True)
+        pos = _pack_varint(buf, pos, len(self.tokens))
+        for elem in self.tokens:
+            pos = _pack_string(buf, pos, elem, True)
+        assert len(self.greeting_and_response) == 2, '`greeting_and_response` must have 2 elements.'
+        for elem in self.greeting_and_response:
+            pos = _pack_string(buf, pos, elem)
+        pos = _pack_varint(buf, pos, len(self.ipv4_addresses))
+        pos = _pack_varints(buf, pos, self.ipv4_addresses, False)
+        assert len(self.deltas) == 4, '`deltas` must have 4 elements.'
+        pos = _pack_varints(buf, pos, self.deltas, True)
+        pos = _pack_array(buf, pos, self.raw_bytes, self._TYPECODE_raw_bytes, True)
+        pos = _pack_array(buf, pos, self.weights, self._TYPECODE_weights)
+        pos = self.parent_obj.pack_into(buf, pos)
+        pos = _pack_varint(buf, pos, len(self.children_objs))
+        for elem in self.children_objs:
+            pos = elem.pack_into(buf, pos)
+        return pos
+
+    @classmethod
+    def unpack_from(cls, buf, offset: int = 0) -> Tuple['VarintSampleDataType', int]:
+        self = cls.__new__(cls)
+        view = memoryview(buf)
+        pos = offset
+        (self.is_enabled,) = cls._RUN_0.unpack_from(view, pos)
+        pos += 1
+        self.id, pos = _unpack_varint(view, pos)
+        self.some_rando_value, pos = _unpack_varint(view, pos)
+        self.some_rando_value = _zigzag_decode(self.some_rando_value)
+        self.memory_pos, pos = _unpack_varint(view, pos)
+        self.grid_pos, pos = _unpack_varint(view, pos)
+        self.grid_pos = _zigzag_decode(self.grid_pos)
+        (self.slider_pos,) = cls._RUN_1.unpack_from(view, pos)
+        pos += 4
+        self.name, pos = _unpack_string(view, pos, True)
+        count, pos = _unpack_varint(view, pos)
+        items = []
+        for _ in range(count):
+            item, pos = _unpack_string(view, pos, True)
+            items.append(item)
+        self.tokens = items
+        items = []
+        for _ in range(2):
+            item, pos = _unpack_string(view, pos)
+            items.append(item)
+        self.greeting_and_response = items
+        count, pos = _unpack_varint(view, pos)
+        self.ipv4_addresses, pos = _unpack_varints(view, pos, count, False)
+        self.deltas, pos = _unpack_varints(view, pos, 4, True)
+        self.raw_bytes, pos = _unpack_array(view, pos, cls._TYPECODE_raw_bytes, True)
+        self.weights, pos = _unpack_array(view, pos, cls._TYPECODE_weights)
+        self.parent_obj, pos = OtherSampleDataType.unpack_from(view, pos)
+        count, pos = _unpack_varint(view, pos)
+        items = []
+        for _ in range(count):
+            item, pos = OtherSampleDataType.unpack_from(view, pos)
+            items.append(item)
+        self.children_objs = items
+        return self, pos
+
+    def to_bytes(self) -> bytearray:
+        buf = bytearray(self.serialized_size())
+        end = self.pack_into(buf)
+        assert end == len(buf), f'Packed {end} bytes but measured {len(buf)}.'
+        return buf
+
+    @classmethod
+    def from_bytes(cls, buf) -> 'VarintSampleDataType':
+        obj, end = cls.unpack_from(buf)
+        assert end == len(buf), f'{len(buf) - end} trailing bytes after `VarintSampleDataType`.'
+        return obj
+
+    def to_file_bytes(self) -> bytearray:
+        buf = bytearray(_FILE_HEADER.size + self.serialized_size())
+        _FILE_HEADER.pack_into(buf, 0, _FILE_MAGIC, self.SCHEMA_FINGERPRINT)
+        end = self.pack_into(buf, _FILE_HEADER.size)
+        assert end == len(buf), f'Packed {end} bytes but measured {len(buf)}.'
+        return buf
+
+    @classmethod
+    def from_file_bytes(cls, buf) -> 'VarintSampleDataType':
+        magic, fingerprint = _FILE_HEADER.unpack_from(buf, 0)
+        assert magic == _FILE_MAGIC, 'No schema header, not a dumped file.'
+        assert fingerprint == cls.SCHEMA_FINGERPRINT, \
+            f'File was written with schema 0x{fingerprint:016x}, `VarintSampleDataType` is 0x{cls.SCHEMA_FINGERPRINT:016x}.'
+        obj, end = cls.unpack_from(buf, _FILE_HEADER.size)
+        assert end == len(buf), f'{len(buf) - end} trailing bytes after `VarintSampleDataType`.'
+        return obj
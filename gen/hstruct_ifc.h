@@ -9,7 +9,17 @@
 #pragma once
 
 #include <array>
+#include <cmath>
+#include <functional>
+#include <memory>
+#include <memory_resource> // For `pmr` structs.
+#include <numeric>
+#include <optional>
+#include <span>
 #include <string>
+#include <string_view>
+#include <type_traits>
+#include <utility>
 #include <vector>
 #include "serial_buffer.h"
 
@@ -22,20 +32,278 @@ static_assert(std::endian::native == std::endian::little);
 #endif
 
 
+// Builds a `std::array<T, N>` out of `make_elem(i)` for every index, e.g. so
+// every element of an array member gets constructed with an allocator.
+template<typename T, size_t N, typename Func>
+std::array<T, N> make_array_of(Func&& make_elem)
+{
+    return [&]<size_t... I>(std::index_sequence<I...>) {
+        return std::array<T, N>{ { make_elem(I)... } };
+    }(std::make_index_sequence<N>{});
+}
+
+
 class HStruct_ifc
 {
 public:
     // Dumps HStruct into binary serialization, writing the contents
-    // out to the file `fname`.
-    virtual void serialize_dump(const std::string& fname) = 0;
+    // out to the file `fname`. Any `codec` but `none` writes a chunked
+    // compressed container instead of the raw bytes.
+    virtual void serialize_dump(const std::string& fname, SerialCodec codec = SerialCodec::none) = 0;
 
-    // Loads HStruct from a binary serialization at `fname`.
+    // Loads HStruct from a binary serialization at `fname`, raw or
+    // compressed. The file and streamed versions below throw
+    // `std::runtime_error` if `fname` can't be read or written, or holds
+    // another schema.
     virtual void serialize_load(const std::string& fname) = 0;
 
-protected:
-    // Internal act of collection of data to SerialBuffer.
+    // Same as `serialize_load`, but deserializes straight out of a
+    // read-only memory mapping of `fname` instead of reading it into a
+    // buffer first. Compressed files get decompressed into a buffer.
+    virtual void serialize_load_mmap(const std::string& fname) = 0;
+
+    // Same as `serialize_dump`/`serialize_load`, but streams the
+    // serialization through a window of `window_bytes` instead of holding
+    // all of it in memory. Compressed files are loaded with
+    // `serialize_load`.
+    virtual void serialize_dump_streamed(const std::string& fname, size_t window_bytes = SerialBuffer::k_default_window_bytes) = 0;
+    virtual void serialize_load_streamed(const std::string& fname, size_t window_bytes = SerialBuffer::k_default_window_bytes) = 0;
+
+    // In-memory versions of `serialize_dump`/`serialize_load`, for sending
+    // or caching without touching the filesystem. The bytes are the same
+    // as an uncompressed dumped file.
+    // Replaces the contents of `out`, reusing its capacity.
+    virtual void serialize_to(std::vector<uint8_t>& out) = 0;
+    // Writes into the start of `out` and returns the byte count, or 0 if
+    // it doesn't fit (see `serialized_size`).
+    virtual size_t serialize_into(std::span<uint8_t> out) = 0;
+    // Loads from `bytes`, raw or compressed. False if they hold another
+    // schema or more than one serialization.
+    virtual bool deserialize_from(std::span<const uint8_t> bytes) = 0;
+
+    // Exact number of bytes `write_data_to_serial_buffer` will produce.
+    virtual size_t serialized_size() const = 0;
+
+    // Collects the data into a SerialBuffer in `SBM_WRITE` mode, without a
+    // schema header. A reused buffer should be `clear`ed first.
     virtual void write_data_to_serial_buffer(SerialBuffer& buffer) = 0;
 
-    // Internal propagation of data to HStruct.
+    // Fills the HStruct from a SerialBuffer in `SBM_READ` mode.
     virtual void read_data_from_serial_buffer(SerialBuffer& buffer) = 0;
 };
+
+
+// `parallel` lists of structs are written as the element count, a table of
+// where each element ends (relative to the start of the first one), then
+// the elements. With the table, every element can be written and read on
+// its own, so lists of at least `sb.parallel_threshold` elements are spread
+// over the hardware threads.
+template<typename List>
+void write_parallel_list(SerialBuffer& sb, List& elems)
+{
+    size_t count{ elems.size() };
+    std::vector<uint64_t> elem_ends(count);
+    if (count == 0 || count < sb.parallel_threshold || sb.write_stream != nullptr)
+    {
+        // Reserve the table, then patch it once every element is written.
+        size_t table_position{ sb.write_position() };
+        sb.write_bulk(elem_ends.data(), sizeof(uint64_t), count);
+        size_t elems_position{ sb.write_position() };
+        for (size_t i = 0; i < count; i++)
+        {
+            elems[i].write_data_to_serial_buffer(sb);
+            elem_ends[i] = sb.write_position() - elems_position;
+        }
+        sb.patch_bulk(table_position, elem_ends.data(), sizeof(uint64_t), count);
+        return;
+    }
+
+    // Measure every element first, so each one's slot is known up front.
+    parallel_for_ranges(count, [&](size_t begin, size_t end) {
+        for (size_t i = begin; i < end; i++)
+        {
+            elem_ends[i] = elems[i].serialized_size();
+        }
+    });
+    std::inclusive_scan(elem_ends.begin(), elem_ends.end(), elem_ends.begin());
+    sb.write_bulk(elem_ends.data(), sizeof(uint64_t), count);
+    size_t elems_start{ sb.buffer.size() };
+    sb.buffer.resize(elems_start + elem_ends.back());
+
+    // Then encode ranges of elements concurrently and copy each range into
+    // its slot.
+    parallel_for_ranges(count, [&](size_t begin, size_t end) {
+        size_t range_start{ begin == 0 ? 0 : elem_ends[begin - 1] };
+        size_t range_bytes{ elem_ends[end - 1] - range_start };
+        SerialBuffer range_sb;
+        range_sb.mode = SerialBuffer::SBM_WRITE;
+        // Every thread is busy already, so nested `parallel` lists stay serial.
+        range_sb.parallel_threshold = SIZE_MAX;
+        range_sb.reserve(range_bytes);
+        for (size_t i = begin; i < end; i++)
+        {
+            elems[i].write_data_to_serial_buffer(range_sb);
+        }
+        if (range_sb.buffer.size() != range_bytes)
+        {
+            throw std::logic_error{ "`serialized_size` doesn't match the written size." };
+        }
+        std::memcpy(sb.buffer.data() + elems_start + range_start, range_sb.buffer.data(), range_bytes);
+    });
+}
+
+// Reads the table and `count` elements written by `write_parallel_list`.
+// `read_elem(elem, sb)` reads one element, in an older layout for the
+// readers of older layouts.
+template<typename List, typename ReadElem>
+void read_parallel_list(SerialBuffer& sb, List& elems, size_t count, ReadElem&& read_elem)
+{
+    sb.check_list_count(count, sizeof(uint64_t));
+    std::vector<uint64_t> elem_ends(count);
+    sb.read_bulk(elem_ends.data(), sizeof(uint64_t), count);
+    elems.clear();
+
+    // Memory resources (e.g. arenas) generally aren't thread safe, so
+    // `pmr` lists are always read on the calling thread.
+    constexpr bool k_is_pmr{ std::is_same_v<typename List::allocator_type, std::pmr::polymorphic_allocator<typename List::value_type>> };
+    if (k_is_pmr || count == 0 || count < sb.parallel_threshold || sb.read_stream != nullptr)
+    {
+        elems.reserve(count);
+        for (size_t i = 0; i < count; i++)
+        {
+            elems.emplace_back();
+            read_elem(elems.back(), sb);
+        }
+        return;
+    }
+
+    // The table decides where each element gets read from, so check it.
+    if (std::adjacent_find(elem_ends.begin(), elem_ends.end(), std::greater<uint64_t>{}) != elem_ends.end())
+    {
+        throw std::out_of_range{ "Element offset table isn't in order." };
+    }
+    const uint8_t* elems_data{ reinterpret_cast<const uint8_t*>(sb.read_elem(elem_ends.back())) };
+    elems.resize(count);
+    parallel_for_ranges(count, [&](size_t begin, size_t end) {
+        SerialBuffer elem_sb;
+        elem_sb.parallel_threshold = SIZE_MAX;
+        for (size_t i = begin; i < end; i++)
+        {
+            size_t elem_start{ i == 0 ? 0 : elem_ends[i - 1] };
+            elem_sb.attach_read_view({ elems_data + elem_start, elem_ends[i] - elem_start });
+            read_elem(elems[i], elem_sb);
+            if (elem_sb.buffer_position != elem_sb.read_view.size())
+            {
+                throw std::out_of_range{ "Element doesn't match its offset table entry." };
+            }
+        }
+    });
+}
+
+template<typename List>
+void read_parallel_list(SerialBuffer& sb, List& elems, size_t count)
+{
+    read_parallel_list(sb, elems, count, [](auto& elem, SerialBuffer& elem_sb) { elem.read_data_from_serial_buffer(elem_sb); });
+}
+
+
+// Deltas of list members (see `write_delta`). `std::array`s are a bitmask
+// of the elements that changed, lowest bit first, then those elements.
+template<typename Array, typename WriteElem>
+void write_delta_elems(SerialBuffer& sb, const Array& elems, const Array& prev, WriteElem&& write_elem)
+{
+    constexpr size_t k_count{ std::tuple_size_v<Array> };
+    std::array<uint8_t, (k_count + 7) / 8> changed{};
+    for (size_t i = 0; i < k_count; i++)
+    {
+        changed[i / 8] |= static_cast<uint8_t>((elems[i] != prev[i]) << (i % 8));
+    }
+    sb.write_bulk(changed.data(), 1, changed.size());
+    for (size_t i = 0; i < k_count; i++)
+    {
+        if ((changed[i / 8] >> (i % 8)) & 1)
+        {
+            write_elem(i);
+        }
+    }
+}
+
+template<typename Array, typename ReadElem>
+void read_delta_elems(SerialBuffer& sb, Array& /* elems, only for its size */, ReadElem&& read_elem)
+{
+    constexpr size_t k_count{ std::tuple_size_v<Array> };
+    std::array<uint8_t, (k_count + 7) / 8> changed;
+    sb.read_bulk(changed.data(), 1, changed.size());
+    for (size_t i = 0; i < k_count; i++)
+    {
+        if ((changed[i / 8] >> (i % 8)) & 1)
+        {
+            read_elem(i);
+        }
+    }
+}
+
+// `std::vector`s are their new count (written by the caller), then each
+// run of elements that differ from `prev` or are past its end: the number
+// of unchanged elements before it, its length, then its elements. A skip
+// that reaches the count ends the list.
+template<typename List, typename WriteElem>
+void write_delta_runs(SerialBuffer& sb, const List& elems, const List& prev, WriteElem&& write_elem)
+{
+    size_t count{ elems.size() };
+    size_t common_count{ std::min(count, prev.size()) };
+    size_t i{ 0 };
+    while (true)
+    {
+        size_t run_start{ i };
+        while (run_start < common_count && elems[run_start] == prev[run_start])
+        {
+            run_start++;
+        }
+        sb.write_varint(run_start - i);
+        if (run_start == count)
+        {
+            return;
+        }
+        size_t run_end{ run_start + 1 };
+        while (run_end < count && (run_end >= common_count || elems[run_end] != prev[run_end]))
+        {
+            run_end++;
+        }
+        sb.write_varint(run_end - run_start);
+        for (i = run_start; i < run_end; i++)
+        {
+            write_elem(i);
+        }
+    }
+}
+
+// `elems` must already have the new count.
+template<typename List, typename ReadElem>
+void read_delta_runs(SerialBuffer& sb, List& elems, ReadElem&& read_elem)
+{
+    size_t count{ elems.size() };
+    size_t i{ 0 };
+    while (true)
+    {
+        size_t skip{ sb.read_varint() };
+        if (skip > count - i)
+        {
+            throw std::out_of_range{ "Delta run past the end of the list." };
+        }
+        i += skip;
+        if (i == count)
+        {
+            return;
+        }
+        size_t run_length{ sb.read_varint() };
+        if (run_length == 0 || run_length > count - i)
+        {
+            throw std::out_of_range{ "Delta run past the end of the list." };
+        }
+        for (size_t run_end{ i + run_length }; i < run_end; i++)
+        {
+            read_elem(i);
+        }
+    }
+}
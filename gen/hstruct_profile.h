@@ -0,0 +1,168 @@
+/*
+ *    ____   _____   _   _   _____   ____       _      _____   _____   ____       ____    ___    ____    _____ 
+ *   / ___| | ____| | \ | | | ____| |  _ \     / \    |_   _| | ____| |  _ \     / ___|  / _ \  |  _ \  | ____|
+ *  | |  _  |  _|   |  \| | |  _|   | |_) |   / _ \     | |   |  _|   | | | |   | |     | | | | | | | | |  _|  
+ *  | |_| | | |___  | |\  | | |___  |  _ <   / ___ \    | |   | |___  | |_| |   | |___  | |_| | | |_| | | |___ 
+ *   \____| |_____| |_| \_| |_____| |_| \_\ /_/   \_\   |_|   |_____| |____/     \____|  \___/  |____/  |_____|
+ *
+ */
+#pragma once
+
+#include <algorithm>
+#include <chrono>
+#include <cstdint>
+#include <cstdio>
+#include <map>
+#include <mutex>
+#include <string>
+#include <string_view>
+#include <tuple>
+#include <utility>
+#include <vector>
+#include "serial_buffer.h"
+
+
+// Per-field profiling of structs generated with `--profile-hooks`. Each field
+// read or written by `read_data_from_serial_buffer`/`write_data_to_serial_buffer`
+// reports its bytes and time to `HSTRUCT_PROFILE_CALLBACK(event)`, which adds
+// them up in `HStructProfile::global()` unless defined otherwise before the
+// generated headers are included.
+//
+// Building with `HSTRUCT_PROFILE` defined as 0 compiles the hooks out again
+// without regenerating. Structs generated without the flag have no hooks.
+#ifndef HSTRUCT_PROFILE
+#define HSTRUCT_PROFILE 1
+#endif
+
+enum class HStructProfileOp : std::uint8_t
+{
+    write = 0,
+    read,
+};
+
+struct HStructProfileEvent
+{
+    HStructProfileOp op;
+    const char* struct_name;
+    const char* field_name;
+    size_t byte_count;
+    std::chrono::nanoseconds elapsed;
+};
+
+
+// Totals per struct field and direction. Safe to record into from several
+// threads, e.g. while a `parallel` list is being written. Fields holding
+// nested structs include the time and bytes of the nested fields.
+struct HStructProfile
+{
+    struct FieldTotals
+    {
+        uint64_t calls{ 0 };
+        uint64_t byte_count{ 0 };
+        std::chrono::nanoseconds elapsed{ 0 };
+    };
+    using Key = std::tuple<std::string_view, std::string_view, HStructProfileOp>;
+
+    static HStructProfile& global()
+    {
+        static HStructProfile profile;
+        return profile;
+    }
+
+    void record(const HStructProfileEvent& event)
+    {
+        std::lock_guard<std::mutex> lock{ mutex };
+        FieldTotals& field_totals{ totals[Key{ event.struct_name, event.field_name, event.op }] };
+        field_totals.calls++;
+        field_totals.byte_count += event.byte_count;
+        field_totals.elapsed += event.elapsed;
+    }
+
+    std::map<Key, FieldTotals> snapshot() const
+    {
+        std::lock_guard<std::mutex> lock{ mutex };
+        return totals;
+    }
+
+    void reset()
+    {
+        std::lock_guard<std::mutex> lock{ mutex };
+        totals.clear();
+    }
+
+    // One line per field and direction, slowest first.
+    void dump(std::FILE* out = stdout) const
+    {
+        std::map<Key, FieldTotals> current{ snapshot() };
+        std::vector<std::pair<Key, FieldTotals>> rows{ current.begin(), current.end() };
+        std::stable_sort(rows.begin(), rows.end(), [](const auto& a, const auto& b) {
+            return a.second.elapsed > b.second.elapsed;
+        });
+        std::fprintf(out, "%-40s %-5s %12s %14s %12s %10s\n", "field", "op", "calls", "bytes", "ms", "MB/s");
+        for (const auto& [key, field_totals] : rows)
+        {
+            const auto& [struct_name, field_name, op] = key;
+            std::string name{ struct_name };
+            name += ".";
+            name += field_name;
+            double ms{ std::chrono::duration<double, std::milli>(field_totals.elapsed).count() };
+            double mb_per_s{ ms > 0.0 ? field_totals.byte_count / (ms * 1000.0) : 0.0 };
+            std::fprintf(out, "%-40s %-5s %12llu %14llu %12.3f %10.1f\n", name.c_str(),
+                         op == HStructProfileOp::write ? "write" : "read",
+                         static_cast<unsigned long long>(field_totals.calls),
+                         static_cast<unsigned long long>(field_totals.byte_count), ms, mb_per_s);
+        }
+    }
+
+    mutable std::mutex mutex;
+    std::map<Key, FieldTotals> totals;
+};
+
+#ifndef HSTRUCT_PROFILE_CALLBACK
+#define HSTRUCT_PROFILE_CALLBACK(event) HStructProfile::global().record(event)
+#endif
+
+
+// Measures one field from construction to the end of its scope.
+struct HStructFieldProfileScope
+{
+    const SerialBuffer& sb;
+    HStructProfileOp op;
+    const char* struct_name;
+    const char* field_name;
+    size_t start_position;
+    std::chrono::steady_clock::time_point start_time;
+
+    HStructFieldProfileScope(const SerialBuffer& sb, HStructProfileOp op, const char* struct_name, const char* field_name) :
+        sb{ sb },
+        op{ op },
+        struct_name{ struct_name },
+        field_name{ field_name },
+        start_position{ position() },
+        start_time{ std::chrono::steady_clock::now() }
+    {
+    }
+
+    HStructFieldProfileScope(const HStructFieldProfileScope&) = delete;
+    HStructFieldProfileScope& operator=(const HStructFieldProfileScope&) = delete;
+
+    ~HStructFieldProfileScope()
+    {
+        auto elapsed{ std::chrono::steady_clock::now() - start_time };
+        HStructProfileEvent event{ op, struct_name, field_name, position() - start_position,
+                                   std::chrono::duration_cast<std::chrono::nanoseconds>(elapsed) };
+        HSTRUCT_PROFILE_CALLBACK(event);
+    }
+
+    size_t position() const
+    {
+        return op == HStructProfileOp::write ? sb.write_position() : sb.read_position();
+    }
+};
+
+#if HSTRUCT_PROFILE
+#define HSTRUCT_PROFILE_FIELD(sb, op, struct_name, field_name) \
+    HStructFieldProfileScope hstruct_profile_scope{ sb, HStructProfileOp::op, struct_name, field_name }
+#else
+#define HSTRUCT_PROFILE_FIELD(sb, op, struct_name, field_name) ((void)0)
+#endif
@@ -0,0 +1,189 @@
+#    ____   _____   _   _   _____   ____       _      _____   _____   ____       ____    ___    ____    _____
+#   / ___| | ____| | \ | | | ____| |  _ \     / \    |_   _| | ____| |  _ \     / ___|  / _ \  |  _ \  | ____|
+#  | |  _  |  _|   |  \| | |  _|   | |_) |   / _ \     | |   |  _|   | | | |   | |     | | | | | | | | |  _|
+#  | |_| | | |___  | |\  | | |___  |  _ <   / ___ \    | |   | |___  | |_| |   | |___  | |_| | | |_| | | |___
+#   \____| |_____| |_| \_| |_____| |_| \_\ /_/   \_\   |_|   |_____| |____/     \____|  \___/  |____/  |_____|
+#
+# Codec helpers shared by the generated `*_hstruct.py` modules.
+import struct
+import sys
+from array import array
+from typing import List, Tuple
+
+
+_LENGTH = struct.Struct('<Q')
+
+# Header in front of dumped files: magic, then the schema fingerprint.
+_FILE_HEADER = struct.Struct('<8sQ')
+_FILE_MAGIC = b'\x89HSF\r\n\x1a\n'
+
+
+def _array_typecode(struct_format: str) -> str:
+    # `array` typecodes are platform sized, so pick the one matching the wire size.
+    if struct_format == 'f':
+        return 'f'
+    byte_size = struct.calcsize(f'<{struct_format}')
+    candidates = 'bhilq' if struct_format.islower() else 'BHILQ'
+    for typecode in candidates:
+        if array(typecode).itemsize == byte_size:
+            return typecode
+    raise AssertionError(f'No array typecode for struct format `{struct_format}`.')
+
+
+def _varint_size(value: int) -> int:
+    size = 1
+    while value >= 0x80:
+        value >>= 7
+        size += 1
+    return size
+
+
+def _pack_varint(buf, pos: int, value: int) -> int:
+    while value >= 0x80:
+        buf[pos] = (value & 0x7f) | 0x80
+        value >>= 7
+        pos += 1
+    buf[pos] = value
+    return pos + 1
+
+
+def _unpack_varint(view: memoryview, pos: int) -> Tuple[int, int]:
+    value = 0
+    shift = 0
+    while True:
+        byte = view[pos]
+        pos += 1
+        value |= (byte & 0x7f) << shift
+        if byte < 0x80:
+            return value, pos
+        shift += 7
+
+
+def _zigzag_encode(value: int) -> int:
+    return (value << 1) ^ (value >> 63)
+
+
+def _zigzag_decode(value: int) -> int:
+    return (value >> 1) ^ -(value & 1)
+
+
+def _pack_length(buf, pos: int, length: int, varint: bool) -> int:
+    if varint:
+        return _pack_varint(buf, pos, length)
+    _LENGTH.pack_into(buf, pos, length)
+    return pos + 8
+
+
+def _unpack_length(view: memoryview, pos: int, varint: bool) -> Tuple[int, int]:
+    if varint:
+        return _unpack_varint(view, pos)
+    return _LENGTH.unpack_from(view, pos)[0], pos + 8
+
+
+def _pack_varints(buf, pos: int, values: List[int], signed: bool) -> int:
+    for value in values:
+        pos = _pack_varint(buf, pos, _zigzag_encode(value) if signed else value)
+    return pos
+
+
+def _unpack_varints(view: memoryview, pos: int, count: int, signed: bool) -> Tuple[List[int], int]:
+    values = []
+    for _ in range(count):
+        value, pos = _unpack_varint(view, pos)
+        values.append(_zigzag_decode(value) if signed else value)
+    return values, pos
+
+
+def _varints_size(values: List[int], signed: bool) -> int:
+    if signed:
+        return sum(_varint_size(_zigzag_encode(value)) for value in values)
+    return sum(_varint_size(value) for value in values)
+
+
+def _pack_string(buf, pos: int, value: str, varint: bool = False) -> int:
+    encoded = value.encode('utf-8', errors='surrogateescape')
+    if varint:
+        pos = _pack_varint(buf, pos, len(encoded))
+    else:
+        _LENGTH.pack_into(buf, pos, len(encoded))
+        pos += 8
+    buf[pos : pos + len(encoded)] = encoded
+    return pos + len(encoded)
+
+
+def _unpack_string(view: memoryview, pos: int, varint: bool = False) -> Tuple[str, int]:
+    if varint:
+        length, pos = _unpack_varint(view, pos)
+    else:
+        (length,) = _LENGTH.unpack_from(view, pos)
+        pos += 8
+    assert pos + length <= len(view), 'Read past the end of the serialized data.'
+    return str(view[pos : pos + length], 'utf-8', errors='surrogateescape'), pos + length
+
+
+def _string_size(value: str, varint: bool = False) -> int:
+    length = len(value.encode('utf-8', errors='surrogateescape'))
+    return (_varint_size(length) if varint else 8) + length
+
+
+def _pack_array(buf, pos: int, values, typecode: str, varint: bool = False) -> int:
+    if not isinstance(values, array) or values.typecode != typecode:
+        values = array(typecode, values)
+    if sys.byteorder != 'little':
+        values = array(typecode, values)
+        values.byteswap()
+    pos = _pack_length(buf, pos, len(values), varint)
+    raw = memoryview(values).cast('B')
+    buf[pos : pos + len(raw)] = raw
+    return pos + len(raw)
+
+
+def _unpack_array(view: memoryview, pos: int, typecode: str, varint: bool = False) -> Tuple[array, int]:
+    count, pos = _unpack_length(view, pos, varint)
+    values = array(typecode)
+    end = pos + count * values.itemsize
+    assert end <= len(view), 'Read past the end of the serialized data.'
+    values.frombytes(view[pos:end])
+    if sys.byteorder != 'little':
+        values.byteswap()
+    return values, end
+
+
+def _pack_bool_list(buf, pos: int, values: List[bool], varint: bool = False) -> int:
+    pos = _pack_length(buf, pos, len(values), varint)
+    buf[pos : pos + len(values)] = bytes(bool(value) for value in values)
+    return pos + len(values)
+
+
+def _unpack_bool_list(view: memoryview, pos: int, varint: bool = False) -> Tuple[List[bool], int]:
+    count, pos = _unpack_length(view, pos, varint)
+    assert pos + count <= len(view), 'Read past the end of the serialized data.'
+    return [byte != 0 for byte in view[pos : pos + count]], pos + count
+
+
+def _pack_bits(buf, pos: int, values) -> int:
+    # One bit per bool, lowest bit first.
+    byte_count = (len(values) + 7) // 8
+    bits = 0
+    for i, value in enumerate(values):
+        if value:
+            bits |= 1 << i
+    buf[pos : pos + byte_count] = bits.to_bytes(byte_count, 'little')
+    return pos + byte_count
+
+
+def _unpack_bits(view: memoryview, pos: int, count: int) -> Tuple[List[bool], int]:
+    end = pos + (count + 7) // 8
+    assert end <= len(view), 'Read past the end of the serialized data.'
+    bits = int.from_bytes(view[pos:end], 'little')
+    return [(bits >> i) & 1 == 1 for i in range(count)], end
+
+
+def _pack_bit_list(buf, pos: int, values: List[bool], varint: bool = False) -> int:
+    pos = _pack_length(buf, pos, len(values), varint)
+    return _pack_bits(buf, pos, values)
+
+
+def _unpack_bit_list(view: memoryview, pos: int, varint: bool = False) -> Tuple[List[bool], int]:
+    count, pos = _unpack_length(view, pos, varint)
+    return _unpack_bits(view, pos, count)
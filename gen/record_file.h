@@ -0,0 +1,366 @@
+/*
+ *    ____   _____   _   _   _____   ____       _      _____   _____   ____       ____    ___    ____    _____ 
+ *   / ___| | ____| | \ | | | ____| |  _ \     / \    |_   _| | ____| |  _ \     / ___|  / _ \  |  _ \  | ____|
+ *  | |  _  |  _|   |  \| | |  _|   | |_) |   / _ \     | |   |  _|   | | | |   | |     | | | | | | | | |  _|  
+ *  | |_| | | |___  | |\  | | |___  |  _ <   / ___ \    | |   | |___  | |_| |   | |___  | |_| | | |_| | | |___ 
+ *   \____| |_____| |_| \_| |_____| |_| \_\ /_/   \_\   |_|   |_____| |____/     \____|  \___/  |____/  |_____|
+ *
+ */
+#pragma once
+
+#include <filesystem> // For truncating the footer before appending.
+#include <fstream>
+#include <span>
+#include <string>
+#include <vector>
+#include "serial_buffer.h"
+
+
+// Append-only file holding many serialized records:
+//     uint8_t  magic[8]
+//     uint32_t version
+//     uint32_t reserved
+//     uint64_t schema_fingerprint          `k_schema_fingerprint` of the record type.
+//     records, back to back, each a uint64_t byte length followed by the record
+//     uint64_t end_marker                  All bits set.
+//     uint64_t record_offsets[record_count]    Where each record's length starts.
+//     uint64_t record_count
+//     uint64_t index_offset                Where `record_offsets` starts.
+//     uint8_t  footer_magic[8]
+// The footer index gives O(1) access to any record. If a writer died before
+// writing the footer, the length prefixes still let readers recover every
+// complete record by scanning; the end marker stops that scan at the index.
+struct RecordFileIndex
+{
+    static constexpr uint8_t k_magic[8]{ 0x89, 'H', 'S', 'R', 0x0d, 0x0a, 0x1a, 0x0a };
+    static constexpr uint8_t k_footer_magic[8]{ 'H', 'S', 'R', 'I', 'N', 'D', 'E', 'X' };
+    static constexpr uint32_t k_version{ 2 };
+    static constexpr uint64_t k_end_marker{ ~uint64_t{ 0 } };
+    static constexpr size_t k_header_size{ sizeof(k_magic) + 2 * sizeof(uint32_t) + sizeof(uint64_t) };
+    static constexpr size_t k_footer_size{ 2 * sizeof(uint64_t) + sizeof(k_footer_magic) };
+
+    uint64_t schema_fingerprint{ 0 };
+    std::vector<uint64_t> record_offsets;
+    // End of the last complete record, where the next one gets appended.
+    uint64_t records_end{ k_header_size };
+
+    static bool is_record_file(std::span<const uint8_t> bytes)
+    {
+        return bytes.size() >= k_header_size && std::memcmp(bytes.data(), k_magic, sizeof(k_magic)) == 0;
+    }
+
+    static void write_header(SerialBuffer& sb, uint64_t fingerprint)
+    {
+        uint32_t fields32[2]{ k_version, 0 };
+        sb.write_bulk(k_magic, sizeof(uint8_t), sizeof(k_magic));
+        sb.write_bulk(fields32, sizeof(uint32_t), 2);
+        sb.write_elem(&fingerprint, sizeof(uint64_t));
+    }
+
+    // Writes the end marker, index and footer for records ending at
+    // `file_offset + sb.write_position()`.
+    void write_footer(SerialBuffer& sb, uint64_t file_offset) const
+    {
+        uint64_t end_marker{ k_end_marker };
+        sb.write_elem(&end_marker, sizeof(uint64_t));
+        uint64_t fields64[2]{ record_offsets.size(), file_offset + sb.write_position() };
+        sb.write_bulk(record_offsets.data(), sizeof(uint64_t), record_offsets.size());
+        sb.write_bulk(fields64, sizeof(uint64_t), 2);
+        sb.write_bulk(k_footer_magic, sizeof(uint8_t), sizeof(k_footer_magic));
+    }
+
+    // Reads the index of the record file in `bytes`, falling back to
+    // scanning the records if the footer is missing or damaged.
+    bool parse(std::span<const uint8_t> bytes)
+    {
+        record_offsets.clear();
+        records_end = k_header_size;
+        if (!is_record_file(bytes))
+        {
+            return false;
+        }
+        uint32_t version;
+        std::memcpy(&version, bytes.data() + sizeof(k_magic), sizeof(uint32_t));
+        if (version != k_version)
+        {
+            return false;
+        }
+        std::memcpy(&schema_fingerprint, bytes.data() + sizeof(k_magic) + 2 * sizeof(uint32_t), sizeof(uint64_t));
+
+        if (!parse_footer(bytes))
+        {
+            scan_records(bytes);
+        }
+        return true;
+    }
+
+    bool parse_footer(std::span<const uint8_t> bytes)
+    {
+        if (bytes.size() < k_header_size + sizeof(uint64_t) + k_footer_size)
+        {
+            return false;
+        }
+        const uint8_t* footer{ bytes.data() + bytes.size() - k_footer_size };
+        if (std::memcmp(footer + 2 * sizeof(uint64_t), k_footer_magic, sizeof(k_footer_magic)) != 0)
+        {
+            return false;
+        }
+        uint64_t fields64[2];
+        std::memcpy(fields64, footer, sizeof(fields64));
+        uint64_t count{ fields64[0] };
+        uint64_t index_offset{ fields64[1] };
+        uint64_t index_end{ bytes.size() - k_footer_size };
+        // Divided rather than multiplied, so a corrupt count can't wrap around.
+        if (index_offset < k_header_size + sizeof(uint64_t) || index_offset > index_end
+            || (index_end - index_offset) % sizeof(uint64_t) != 0
+            || (index_end - index_offset) / sizeof(uint64_t) != count)
+        {
+            return false;
+        }
+
+        records_end = index_offset - sizeof(uint64_t);
+        record_offsets.resize(count);
+        std::memcpy(record_offsets.data(), bytes.data() + index_offset, count * sizeof(uint64_t));
+        for (size_t i = 0; i < count; i++)
+        {
+            if (record_offsets[i] < (i == 0 ? k_header_size : record_offsets[i - 1] + sizeof(uint64_t))
+                || record_offsets[i] + sizeof(uint64_t) > records_end)
+            {
+                record_offsets.clear();
+                records_end = k_header_size;
+                return false;
+            }
+        }
+        // Each record has to end before the next one starts.
+        for (size_t i = 0; i < count; i++)
+        {
+            uint64_t length;
+            std::memcpy(&length, bytes.data() + record_offsets[i], sizeof(uint64_t));
+            uint64_t next_start{ i + 1 < count ? record_offsets[i + 1] : records_end };
+            if (length > next_start - record_offsets[i] - sizeof(uint64_t))
+            {
+                record_offsets.clear();
+                records_end = k_header_size;
+                return false;
+            }
+        }
+        return true;
+    }
+
+    void scan_records(std::span<const uint8_t> bytes)
+    {
+        uint64_t position{ k_header_size };
+        while (position + sizeof(uint64_t) <= bytes.size())
+        {
+            uint64_t length;
+            std::memcpy(&length, bytes.data() + position, sizeof(uint64_t));
+            // Stops at the end marker and at a partially written record.
+            if (length > bytes.size() - position - sizeof(uint64_t))
+            {
+                break;
+            }
+            record_offsets.push_back(position);
+            position += sizeof(uint64_t) + length;
+        }
+        records_end = position;
+    }
+};
+
+
+// Appends records of HStruct type `T` to a record file. Records are
+// serialized into a pending batch that goes out in one write once it reaches
+// `batch_bytes` (and on `flush`/`close`). The index and footer are written
+// on `close`.
+template<typename T>
+struct RecordFileAppender
+{
+    static constexpr size_t k_default_batch_bytes{ 1 << 20 };
+
+    std::fstream file;
+    RecordFileIndex index;
+    SerialBuffer pending;
+    // Bytes already in the file, not counting `pending`.
+    uint64_t file_end{ 0 };
+    size_t batch_bytes{ k_default_batch_bytes };
+
+    RecordFileAppender() = default;
+    RecordFileAppender(const RecordFileAppender&) = delete;
+    RecordFileAppender& operator=(const RecordFileAppender&) = delete;
+
+    ~RecordFileAppender()
+    {
+        close();
+    }
+
+    size_t record_count() const
+    {
+        return index.record_offsets.size();
+    }
+
+    // Opens `fname` for appending, creating it if it doesn't exist. The
+    // records already in the file are kept and its footer gets rewritten on
+    // `close`. Fails if the file holds records of a different schema.
+    bool open(const std::string& fname)
+    {
+        close();
+        pending.buffer.clear();
+        pending.mode = SerialBuffer::SBM_WRITE;
+
+        std::error_code error;
+        if (std::filesystem::exists(fname, error) && std::filesystem::file_size(fname, error) > 0)
+        {
+            MappedFile existing;
+            if (!existing.open(fname) || !index.parse(existing.view())
+                || index.schema_fingerprint != T::k_schema_fingerprint)
+            {
+                return false;
+            }
+            existing.close();
+            // Drop the old index (or a partially written record), new
+            // records go right after the last complete one.
+            std::filesystem::resize_file(fname, index.records_end, error);
+            if (error)
+            {
+                return false;
+            }
+            file_end = index.records_end;
+        }
+        else
+        {
+            std::ofstream create{ fname.c_str(), std::ios::out | std::ios::trunc | std::ios::binary };
+            if (!create.is_open())
+            {
+                return false;
+            }
+            index = RecordFileIndex{};
+            index.schema_fingerprint = T::k_schema_fingerprint;
+            RecordFileIndex::write_header(pending, T::k_schema_fingerprint);
+            file_end = 0;
+        }
+
+        file.open(fname.c_str(), std::ios::in | std::ios::out | std::ios::binary);
+        if (!file.is_open())
+        {
+            return false;
+        }
+        file.seekp(static_cast<std::streamoff>(file_end));
+        return file.good();
+    }
+
+    bool append(T& record)
+    {
+        write_record(record);
+        return pending.buffer.size() < batch_bytes || flush();
+    }
+
+    // Appends every record in `records` with a single write.
+    bool append_batch(std::span<T> records)
+    {
+        size_t total_bytes{ pending.buffer.size() };
+        for (const T& record : records)
+        {
+            total_bytes += sizeof(uint64_t) + record.serialized_size();
+        }
+        pending.reserve(total_bytes);
+        for (T& record : records)
+        {
+            write_record(record);
+        }
+        return flush();
+    }
+
+    bool flush()
+    {
+        if (!file.is_open())
+        {
+            return false;
+        }
+        if (pending.buffer.empty())
+        {
+            return true;
+        }
+        file.write(reinterpret_cast<const char*>(pending.buffer.data()), pending.buffer.size());
+        file.flush();
+        file_end += pending.buffer.size();
+        pending.buffer.clear();
+        return file.good();
+    }
+
+    // Writes out the pending records along with the index and footer.
+    bool close()
+    {
+        if (!file.is_open())
+        {
+            return true;
+        }
+        index.write_footer(pending, file_end);
+        bool result{ flush() };
+        file.close();
+        index = RecordFileIndex{};
+        return result && !file.fail();
+    }
+
+    void write_record(T& record)
+    {
+        index.record_offsets.push_back(file_end + pending.write_position());
+        size_t length_position{ pending.write_position() };
+        uint64_t length{ 0 };
+        pending.write_elem(&length, sizeof(uint64_t));
+        record.write_data_to_serial_buffer(pending);
+        length = pending.write_position() - length_position - sizeof(uint64_t);
+        pending.patch_bulk(length_position, &length, sizeof(uint64_t), 1);
+    }
+};
+
+
+// Random access to the records of a record file through a read-only memory
+// mapping. `record_bytes(i)` can also be handed to a `<Name>_view::attach`.
+template<typename T>
+struct RecordFileReader
+{
+    MappedFile file;
+    RecordFileIndex index;
+
+    // Fails if the file holds records of a different schema.
+    bool open(const std::string& fname)
+    {
+        return file.open(fname) && index.parse(file.view())
+            && index.schema_fingerprint == T::k_schema_fingerprint;
+    }
+
+    size_t size() const
+    {
+        return index.record_offsets.size();
+    }
+
+    // Serialized bytes of record `i`, viewing into the mapping. Throws
+    // `std::out_of_range` like reads do if `i` or its length prefix is.
+    std::span<const uint8_t> record_bytes(size_t i) const
+    {
+        if (i >= size())
+        {
+            throw std::out_of_range{ "Record index out of range." };
+        }
+        uint64_t offset{ index.record_offsets[i] };
+        uint64_t length;
+        std::memcpy(&length, file.data + offset, sizeof(uint64_t));
+        if (length > index.records_end - offset - sizeof(uint64_t))
+        {
+            throw std::out_of_range{ "Record length runs past the end of the records." };
+        }
+        return { file.data + offset + sizeof(uint64_t), static_cast<size_t>(length) };
+    }
+
+    // Throws `std::out_of_range` if the record doesn't decode to exactly
+    // its length.
+    void read(size_t i, T& record) const
+    {
+        SerialBuffer sb;
+        sb.attach_read_view(record_bytes(i));
+        record.read_data_from_serial_buffer(sb);
+        if (sb.buffer_position != sb.read_view.size())
+        {
+            throw std::out_of_range{ "Record has bytes left over after decoding." };
+        }
+    }
+};
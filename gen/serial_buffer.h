@@ -11,7 +11,37 @@
 #include <vector>
 #include <string>
 #include <cassert>
+#include <cstdint>
+#include <cstring>
 #include <fstream> // For disk ops.
+#include <span>
+#include <algorithm>
+#include <iterator>
+#include <exception>
+#include <stdexcept> // For out of bounds reads.
+#include <thread> // For parallel (de)compression and `parallel` lists.
+
+// zlib compression needs `HSTRUCT_USE_ZLIB` defined and linking against
+// zlib (e.g. `-lz`). Without it, only raw files can be written and read.
+#ifdef HSTRUCT_USE_ZLIB
+#include <zlib.h>
+#endif
+
+// For memory mapped loads.
+#ifdef _WIN32
+#ifndef WIN32_LEAN_AND_MEAN
+#define WIN32_LEAN_AND_MEAN
+#endif
+#ifndef NOMINMAX
+#define NOMINMAX
+#endif
+#include <windows.h>
+#else
+#include <fcntl.h>
+#include <sys/mman.h>
+#include <sys/stat.h>
+#include <unistd.h>
+#endif
 
 // Make sure is always dealing in little endian.
 #if _DEBUG
@@ -22,44 +52,937 @@ static_assert(std::endian::native == std::endian::little);
 #endif
 
 
+// LEB128 varints: 7 bits per byte, lowest group first, high bit set on every
+// byte but the last. Signed values are zigzag mapped first so small negative
+// numbers stay short.
+inline constexpr size_t k_max_varint_bytes{ 10 };
+
+inline size_t varint_size(uint64_t value)
+{
+    size_t size{ 1 };
+    while (value >= 0x80)
+    {
+        value >>= 7;
+        size++;
+    }
+    return size;
+}
+
+inline uint64_t zigzag_encode(int64_t value)
+{
+    return (static_cast<uint64_t>(value) << 1) ^ static_cast<uint64_t>(value >> 63);
+}
+
+inline int64_t zigzag_decode(uint64_t value)
+{
+    return static_cast<int64_t>(value >> 1) ^ -static_cast<int64_t>(value & 1);
+}
+
+// Decodes the varint at `position` in `bytes` and moves `position` past it.
+inline uint64_t decode_varint(std::span<const uint8_t> bytes, size_t& position)
+{
+    uint64_t value{ 0 };
+    for (size_t shift = 0; shift < 64; shift += 7)
+    {
+        if (position >= bytes.size())
+        {
+            throw std::out_of_range{ "Varint runs past the end of the serialized data." };
+        }
+        uint8_t byte{ bytes[position++] };
+        value |= static_cast<uint64_t>(byte & 0x7f) << shift;
+        if ((byte & 0x80) == 0)
+        {
+            return value;
+        }
+    }
+    throw std::out_of_range{ "Varint longer than 10 bytes." };
+}
+
+// Read-only list of `T`s inside serialized bytes, which can sit at any
+// alignment. Elements are `memcpy`d out on access; `as_span` only hands out
+// a `std::span<const T>` when the bytes happen to be `alignof(T)` aligned.
+template<typename T>
+class UnalignedSpan
+{
+public:
+    class iterator
+    {
+    public:
+        using iterator_category = std::input_iterator_tag;
+        using value_type = T;
+        using difference_type = std::ptrdiff_t;
+        using pointer = void;
+        using reference = T;
+
+        iterator() = default;
+        explicit iterator(const uint8_t* at) : position{ at } {}
+
+        T operator*() const
+        {
+            T value;
+            std::memcpy(&value, position, sizeof(T));
+            return value;
+        }
+
+        iterator& operator++()
+        {
+            position += sizeof(T);
+            return *this;
+        }
+
+        iterator operator++(int)
+        {
+            iterator previous{ *this };
+            position += sizeof(T);
+            return previous;
+        }
+
+        bool operator==(const iterator& other) const = default;
+
+    private:
+        const uint8_t* position{ nullptr };
+    };
+
+    UnalignedSpan() = default;
+    UnalignedSpan(const uint8_t* first, size_t elem_count) : data{ first }, count{ elem_count } {}
+
+    size_t size() const { return count; }
+    bool empty() const { return count == 0; }
+    iterator begin() const { return iterator{ data }; }
+    iterator end() const { return iterator{ data + count * sizeof(T) }; }
+
+    T operator[](size_t index) const
+    {
+        assert(index < count);
+        T value;
+        std::memcpy(&value, data + index * sizeof(T), sizeof(T));
+        return value;
+    }
+
+    std::span<const uint8_t> bytes() const
+    {
+        return { data, count * sizeof(T) };
+    }
+
+    void copy_to(std::span<T> out) const
+    {
+        assert(out.size() >= count);
+        std::memcpy(out.data(), data, count * sizeof(T));
+    }
+
+    bool is_aligned() const
+    {
+        return reinterpret_cast<uintptr_t>(data) % alignof(T) == 0;
+    }
+
+    std::span<const T> as_span() const
+    {
+        if (!is_aligned())
+        {
+            throw std::runtime_error{ "List isn't aligned for its element type, read it element by element." };
+        }
+        return { reinterpret_cast<const T*>(data), count };
+    }
+
+private:
+    const uint8_t* data{ nullptr };
+    size_t count{ 0 };
+};
+
+
+// Runs `func(i)` for every `i` in `[0, count)` across the hardware threads.
+template<typename Func>
+void parallel_for(size_t count, Func&& func)
+{
+    size_t worker_count{ std::min<size_t>(count, std::max(1u, std::thread::hardware_concurrency())) };
+    if (worker_count <= 1)
+    {
+        for (size_t i = 0; i < count; i++)
+        {
+            func(i);
+        }
+        return;
+    }
+    std::vector<std::thread> workers;
+    workers.reserve(worker_count);
+    for (size_t w = 0; w < worker_count; w++)
+    {
+        workers.emplace_back([&func, w, worker_count, count]() {
+            for (size_t i = w; i < count; i += worker_count)
+            {
+                func(i);
+            }
+        });
+    }
+    for (auto& worker : workers)
+    {
+        worker.join();
+    }
+}
+
+// Splits `[0, count)` into contiguous, non-empty ranges and runs
+// `func(begin, end)` on them across the hardware threads. An exception
+// thrown by `func` is rethrown on the calling thread once every range is
+// done.
+template<typename Func>
+void parallel_for_ranges(size_t count, Func&& func)
+{
+    // A few ranges per thread, so uneven ranges still balance out.
+    size_t range_count{ std::min<size_t>(count, 4 * std::max(1u, std::thread::hardware_concurrency())) };
+    std::vector<std::exception_ptr> errors(range_count);
+    parallel_for(range_count, [&](size_t r) {
+        try
+        {
+            func(count * r / range_count, count * (r + 1) / range_count);
+        }
+        catch (...)
+        {
+            errors[r] = std::current_exception();
+        }
+    });
+    for (const auto& error : errors)
+    {
+        if (error)
+        {
+            std::rethrow_exception(error);
+        }
+    }
+}
+
+
+enum class SerialCodec : uint32_t
+{
+    none = 0,  // Raw bytes, no container.
+    zlib = 1,
+};
+
+// Chunked compression container:
+//     uint8_t  magic[8]
+//     uint32_t version
+//     uint32_t codec
+//     uint64_t chunk_size          Uncompressed bytes per chunk (the last one may be shorter).
+//     uint64_t uncompressed_size
+//     uint64_t chunk_count
+//     uint64_t compressed_chunk_sizes[chunk_count]
+//     compressed chunks, back to back
+// Every chunk is compressed on its own, so chunks can be (de)compressed in
+// parallel and a reader can seek straight to the chunk holding any offset.
+struct CompressedContainer
+{
+    static constexpr uint8_t k_magic[8]{ 0x89, 'H', 'S', 'Z', 0x0d, 0x0a, 0x1a, 0x0a };
+    static constexpr uint32_t k_version{ 1 };
+    static constexpr size_t k_fixed_header_size{ sizeof(k_magic) + 2 * sizeof(uint32_t) + 3 * sizeof(uint64_t) };
+    static constexpr size_t k_default_chunk_size{ 1 << 20 };
+    // Fastest zlib level. Higher levels cost a lot of time for little gain on
+    // typical serialized data.
+    static constexpr int k_zlib_level{ 1 };
+
+    SerialCodec codec{ SerialCodec::none };
+    size_t chunk_size{ 0 };
+    size_t uncompressed_size{ 0 };
+    // Where each compressed chunk starts in the file, plus where the last one ends.
+    std::vector<uint64_t> chunk_offsets;
+
+    static bool is_container(std::span<const uint8_t> bytes)
+    {
+        return bytes.size() >= k_fixed_header_size && std::memcmp(bytes.data(), k_magic, sizeof(k_magic)) == 0;
+    }
+
+    size_t chunk_count() const
+    {
+        return chunk_offsets.empty() ? 0 : chunk_offsets.size() - 1;
+    }
+
+    size_t chunk_uncompressed_size(size_t index) const
+    {
+        return std::min(chunk_size, uncompressed_size - index * chunk_size);
+    }
+
+    bool parse_header(std::span<const uint8_t> bytes)
+    {
+        if (!is_container(bytes))
+        {
+            return false;
+        }
+        uint32_t fields32[2];
+        uint64_t fields64[3];
+        std::memcpy(fields32, bytes.data() + sizeof(k_magic), sizeof(fields32));
+        std::memcpy(fields64, bytes.data() + sizeof(k_magic) + sizeof(fields32), sizeof(fields64));
+        if (fields32[0] != k_version)
+        {
+            return false;
+        }
+        codec = static_cast<SerialCodec>(fields32[1]);
+        chunk_size = fields64[0];
+        uncompressed_size = fields64[1];
+        size_t count{ fields64[2] };
+        if (chunk_size == 0 || count > (bytes.size() - k_fixed_header_size) / sizeof(uint64_t)
+            || count != (uncompressed_size + chunk_size - 1) / chunk_size)
+        {
+            return false;
+        }
+
+        chunk_offsets.resize(count + 1);
+        chunk_offsets[0] = k_fixed_header_size + count * sizeof(uint64_t);
+        for (size_t i = 0; i < count; i++)
+        {
+            uint64_t compressed_size;
+            std::memcpy(&compressed_size, bytes.data() + k_fixed_header_size + i * sizeof(uint64_t), sizeof(uint64_t));
+            chunk_offsets[i + 1] = chunk_offsets[i] + compressed_size;
+        }
+        return chunk_offsets[count] <= bytes.size();
+    }
+
+    // Decompresses chunk `index` of the container in `bytes` into `out`,
+    // which must have room for `chunk_uncompressed_size(index)` bytes.
+    // `out` is only written by the codecs compiled in.
+    bool decompress_chunk(std::span<const uint8_t> bytes, size_t index, [[maybe_unused]] uint8_t* out) const
+    {
+        std::span<const uint8_t> chunk{ bytes.subspan(chunk_offsets[index], chunk_offsets[index + 1] - chunk_offsets[index]) };
+        switch (codec)
+        {
+#ifdef HSTRUCT_USE_ZLIB
+        case SerialCodec::zlib:
+        {
+            size_t expected_size{ chunk_uncompressed_size(index) };
+            uLongf out_size{ static_cast<uLongf>(expected_size) };
+            int status{ uncompress(out, &out_size, chunk.data(), static_cast<uLong>(chunk.size())) };
+            return status == Z_OK && out_size == expected_size;
+        }
+#endif
+        default:
+            return false;
+        }
+    }
+
+    // Decompresses the whole container in `bytes` into `out`.
+    static bool decompress(std::span<const uint8_t> bytes, std::vector<uint8_t>& out)
+    {
+        CompressedContainer container;
+        if (!container.parse_header(bytes))
+        {
+            return false;
+        }
+        out.resize(container.uncompressed_size);
+        std::vector<uint8_t> chunk_ok(container.chunk_count(), 0);
+        parallel_for(container.chunk_count(), [&](size_t i) {
+            chunk_ok[i] = container.decompress_chunk(bytes, i, out.data() + i * container.chunk_size);
+        });
+        return std::all_of(chunk_ok.begin(), chunk_ok.end(), [](uint8_t ok) { return ok != 0; });
+    }
+
+    // Compresses `data` into a container in `out`.
+    static bool compress(std::span<const uint8_t> data, SerialCodec codec, std::vector<uint8_t>& out,
+                         size_t chunk_size = k_default_chunk_size)
+    {
+        size_t count{ (data.size() + chunk_size - 1) / chunk_size };
+        std::vector<std::vector<uint8_t>> chunks(count);
+        std::vector<uint8_t> chunk_ok(count, 0);
+        parallel_for(count, [&](size_t i) {
+            std::span<const uint8_t> chunk{ data.subspan(i * chunk_size, std::min(chunk_size, data.size() - i * chunk_size)) };
+            switch (codec)
+            {
+#ifdef HSTRUCT_USE_ZLIB
+            case SerialCodec::zlib:
+            {
+                uLongf compressed_size{ compressBound(static_cast<uLong>(chunk.size())) };
+                chunks[i].resize(compressed_size);
+                int status{ compress2(chunks[i].data(), &compressed_size, chunk.data(), static_cast<uLong>(chunk.size()), k_zlib_level) };
+                chunks[i].resize(compressed_size);
+                chunk_ok[i] = (status == Z_OK);
+                break;
+            }
+#endif
+            default:
+                break;
+            }
+        });
+        if (!std::all_of(chunk_ok.begin(), chunk_ok.end(), [](uint8_t ok) { return ok != 0; }))
+        {
+            return false;
+        }
+
+        uint32_t fields32[2]{ k_version, static_cast<uint32_t>(codec) };
+        uint64_t fields64[3]{ chunk_size, data.size(), count };
+        out.clear();
+        out.insert(out.end(), k_magic, k_magic + sizeof(k_magic));
+        out.insert(out.end(), reinterpret_cast<const uint8_t*>(fields32), reinterpret_cast<const uint8_t*>(fields32) + sizeof(fields32));
+        out.insert(out.end(), reinterpret_cast<const uint8_t*>(fields64), reinterpret_cast<const uint8_t*>(fields64) + sizeof(fields64));
+        for (const auto& chunk : chunks)
+        {
+            uint64_t compressed_size{ chunk.size() };
+            out.insert(out.end(), reinterpret_cast<const uint8_t*>(&compressed_size), reinterpret_cast<const uint8_t*>(&compressed_size) + sizeof(uint64_t));
+        }
+        for (const auto& chunk : chunks)
+        {
+            out.insert(out.end(), chunk.begin(), chunk.end());
+        }
+        return true;
+    }
+};
+
+
+// Read-only memory mapping of a whole file. The mapping stays valid until
+// `close()` or destruction, so anything viewing into it must not outlive it.
+struct MappedFile
+{
+    const uint8_t* data{ nullptr };
+    size_t size{ 0 };
+
+#ifdef _WIN32
+    HANDLE file_handle{ INVALID_HANDLE_VALUE };
+    HANDLE mapping_handle{ nullptr };
+#endif
+
+    MappedFile() = default;
+    MappedFile(const MappedFile&) = delete;
+    MappedFile& operator=(const MappedFile&) = delete;
+
+    ~MappedFile()
+    {
+        close();
+    }
+
+    std::span<const uint8_t> view() const
+    {
+        return { data, size };
+    }
+
+    bool open(const std::string& fname)
+    {
+        close();
+
+#ifdef _WIN32
+        file_handle = CreateFileA(fname.c_str(), GENERIC_READ, FILE_SHARE_READ, nullptr, OPEN_EXISTING, FILE_ATTRIBUTE_NORMAL, nullptr);
+        if (file_handle == INVALID_HANDLE_VALUE)
+        {
+            return false;
+        }
+
+        LARGE_INTEGER filesize;
+        if (!GetFileSizeEx(file_handle, &filesize))
+        {
+            close();
+            return false;
+        }
+        size = static_cast<size_t>(filesize.QuadPart);
+        if (size == 0)
+        {
+            // Empty files can't be mapped, but are still valid.
+            return true;
+        }
+
+        mapping_handle = CreateFileMappingA(file_handle, nullptr, PAGE_READONLY, 0, 0, nullptr);
+        if (mapping_handle == nullptr)
+        {
+            close();
+            return false;
+        }
+
+        data = reinterpret_cast<const uint8_t*>(MapViewOfFile(mapping_handle, FILE_MAP_READ, 0, 0, 0));
+        if (data == nullptr)
+        {
+            close();
+            return false;
+        }
+#else
+        int fd{ ::open(fname.c_str(), O_RDONLY) };
+        if (fd < 0)
+        {
+            return false;
+        }
+
+        struct stat file_stat;
+        if (fstat(fd, &file_stat) != 0)
+        {
+            ::close(fd);
+            return false;
+        }
+        size = static_cast<size_t>(file_stat.st_size);
+        if (size == 0)
+        {
+            // Empty files can't be mapped, but are still valid.
+            ::close(fd);
+            return true;
+        }
+
+        // The mapping keeps its own reference to the file.
+        void* mapping{ mmap(nullptr, size, PROT_READ, MAP_PRIVATE, fd, 0) };
+        ::close(fd);
+        if (mapping == MAP_FAILED)
+        {
+            size = 0;
+            return false;
+        }
+        data = reinterpret_cast<const uint8_t*>(mapping);
+#endif
+
+        return true;
+    }
+
+    void close()
+    {
+#ifdef _WIN32
+        if (data != nullptr)
+        {
+            UnmapViewOfFile(data);
+        }
+        if (mapping_handle != nullptr)
+        {
+            CloseHandle(mapping_handle);
+        }
+        if (file_handle != INVALID_HANDLE_VALUE)
+        {
+            CloseHandle(file_handle);
+        }
+        mapping_handle = nullptr;
+        file_handle = INVALID_HANDLE_VALUE;
+#else
+        if (data != nullptr)
+        {
+            munmap(const_cast<uint8_t*>(data), size);
+        }
+#endif
+        data = nullptr;
+        size = 0;
+    }
+};
+
+
 struct SerialBuffer
 {
+    static constexpr size_t k_default_window_bytes{ 64 * 1024 };
+    static constexpr size_t k_default_parallel_threshold{ 4096 };
+
     std::vector<uint8_t> buffer;
     size_t buffer_position{ 0 };
 
+    // Bytes consumed by the read methods. Either views `buffer` (after
+    // `load_buffer_from_disk`) or external memory such as a `MappedFile`
+    // (after `attach_read_view`).
+    std::span<const uint8_t> read_view;
+
     enum Mode : std::uint8_t
     {
         SBM_READ = 0,
         SBM_WRITE,
     } mode{ 0 };
 
+    // Streaming. With a stream attached, `buffer` only holds a window of
+    // roughly `window_bytes` that is flushed to `write_stream` or refilled
+    // from `read_stream` as the struct gets walked, so memory use doesn't
+    // grow with the size of the serialization.
+    std::ostream* write_stream{ nullptr };
+    std::istream* read_stream{ nullptr };
+    size_t window_bytes{ k_default_window_bytes };
+    // Stream offset of the start of `buffer`.
+    size_t stream_offset{ 0 };
+    // Size of `read_stream` from where it was attached, or `SIZE_MAX` if it
+    // can't seek (pipes, sockets).
+    size_t stream_bytes{ SIZE_MAX };
+
+    // `parallel` lists with at least this many elements are written and
+    // read across the hardware threads. Smaller ones (and all of them while
+    // streaming) are done in place, the bytes are the same either way.
+    size_t parallel_threshold{ k_default_parallel_threshold };
+
+    // Scratch buffer of the calling thread. It keeps its capacity between
+    // uses, so in-memory serialization stops allocating once it has grown.
+    static SerialBuffer& thread_scratch()
+    {
+        thread_local SerialBuffer scratch;
+        return scratch;
+    }
+
+    // Forgets the contents, position and any attached view or stream, but
+    // keeps the capacity of `buffer` for the next use.
+    void clear()
+    {
+        buffer.clear();
+        buffer_position = 0;
+        read_view = {};
+        write_stream = nullptr;
+        read_stream = nullptr;
+        stream_offset = 0;
+        stream_bytes = SIZE_MAX;
+    }
+
+    // `out` must be seekable if the struct is `packed` (the offset tables
+    // get patched after the fact) and must outlive the buffer.
+    void attach_write_stream(std::ostream& out, size_t window = k_default_window_bytes)
+    {
+        mode = SBM_WRITE;
+        write_stream = &out;
+        window_bytes = window;
+        stream_offset = 0;
+        buffer.clear();
+        buffer.reserve(window_bytes);
+    }
+
+    void attach_read_stream(std::istream& in, size_t window = k_default_window_bytes)
+    {
+        mode = SBM_READ;
+        read_stream = &in;
+        window_bytes = window;
+        stream_offset = 0;
+        buffer.clear();
+        buffer.reserve(window_bytes);
+        read_view = {};
+        buffer_position = 0;
+
+        // Measured so list counts can be checked against it.
+        stream_bytes = SIZE_MAX;
+        std::istream::pos_type start{ in.tellg() };
+        if (start != std::istream::pos_type(-1))
+        {
+            if (in.seekg(0, std::ios::end))
+            {
+                std::istream::pos_type end{ in.tellg() };
+                if (end != std::istream::pos_type(-1) && end >= start)
+                {
+                    stream_bytes = static_cast<size_t>(end - start);
+                }
+            }
+            in.clear();
+            in.seekg(start);
+        }
+    }
+
+    // Writes out whatever is left in the window. Must be called once the
+    // struct has been written.
+    bool flush_write_stream()
+    {
+        if (write_stream == nullptr)
+        {
+            return true;
+        }
+        if (!buffer.empty())
+        {
+            write_stream->write(reinterpret_cast<const char*>(buffer.data()), buffer.size());
+            stream_offset += buffer.size();
+            buffer.clear();
+        }
+        return write_stream->good();
+    }
+
+    // Makes sure the window holds `elem_bytes` unread bytes (or whatever is
+    // left of the stream), growing it for elements bigger than the window.
+    void refill_read_window(size_t elem_bytes)
+    {
+        if (buffer_position + elem_bytes <= read_view.size())
+        {
+            return;
+        }
+        size_t unread_bytes{ read_view.size() - buffer_position };
+        std::memmove(buffer.data(), buffer.data() + buffer_position, unread_bytes);
+        stream_offset += buffer_position;
+        buffer_position = 0;
+        buffer.resize(std::max(window_bytes, elem_bytes));
+        read_stream->read(reinterpret_cast<char*>(buffer.data()) + unread_bytes, buffer.size() - unread_bytes);
+        buffer.resize(unread_bytes + static_cast<size_t>(read_stream->gcount()));
+        read_view = buffer;
+    }
+
     // Read buffer methods.
-    void* read_elem(size_t elem_bytes)
+    // Reads straight out of `view` without copying it into `buffer`.
+    void attach_read_view(std::span<const uint8_t> view)
+    {
+        mode = SBM_READ;
+        read_view = view;
+        buffer_position = 0;
+    }
+
+    // Same as `attach_read_view` for the contents of a whole file, except
+    // compressed containers get decompressed into `buffer` first.
+    bool attach_file_view(std::span<const uint8_t> view)
+    {
+        if (!CompressedContainer::is_container(view))
+        {
+            attach_read_view(view);
+            return true;
+        }
+        if (!CompressedContainer::decompress(view, buffer))
+        {
+            return false;
+        }
+        attach_read_view(buffer);
+        return true;
+    }
+
+    // Whether `elem_bytes` more bytes can be read, refilling the window
+    // first when streaming.
+    bool can_read(size_t elem_bytes)
     {
         assert(mode == SBM_READ);
-        void* elem = &buffer[buffer_position];
+        if (read_stream != nullptr)
+        {
+            refill_read_window(elem_bytes);
+        }
+        return elem_bytes <= read_view.size() - buffer_position;
+    }
+
+    // Slow path of `read_elem`, kept out of line so the in-bounds path
+    // stays a single compare.
+#ifdef _MSC_VER
+    __declspec(noinline)
+#else
+    __attribute__((noinline))
+#endif
+    void refill_or_throw(size_t elem_bytes)
+    {
+        if (!can_read(elem_bytes))
+        {
+            throw std::out_of_range{ "Read past the end of the serialized data." };
+        }
+    }
+
+    // Reads are bounds checked in release builds too: truncated or
+    // mismatched data throws `std::out_of_range` instead of reading past
+    // the end of the buffer.
+    const void* read_elem(size_t elem_bytes)
+    {
+        assert(mode == SBM_READ);
+        if (elem_bytes > read_view.size() - buffer_position) [[unlikely]]
+        {
+            refill_or_throw(elem_bytes);
+        }
+        const void* elem = read_view.data() + buffer_position;
         buffer_position += elem_bytes;
 
         return elem;
     }
-    // @NOTE: it'll have to be carried out manually in the code to read arrays. First read a uint32_t elem and then read a big chunk and create a vector from the big chunk (https://www.geeksforgeeks.org/how-to-convert-an-array-to-a-vector-in-cpp/#)
+
+    // Copies `count` contiguous elements out of the buffer into `elems` in
+    // a single memcpy. The list count (if any) must be read beforehand.
+    void read_bulk(void* elems, size_t elem_bytes, size_t count)
+    {
+        assert(mode == SBM_READ);
+        size_t total_bytes{ elem_bytes * count };
+        if (total_bytes == 0)
+        {
+            return;
+        }
+
+        if (read_stream != nullptr && buffer_position + total_bytes > read_view.size())
+        {
+            // Drain the window, then read the rest straight into `elems`.
+            size_t window_part{ read_view.size() - buffer_position };
+            if (window_part > 0)
+            {
+                // An empty window may have no data pointer at all.
+                std::memcpy(elems, read_view.data() + buffer_position, window_part);
+            }
+            read_stream->read(reinterpret_cast<char*>(elems) + window_part, total_bytes - window_part);
+            if (static_cast<size_t>(read_stream->gcount()) != total_bytes - window_part)
+            {
+                throw std::out_of_range{ "Read past the end of the serialized data." };
+            }
+            stream_offset += read_view.size() + (total_bytes - window_part);
+            buffer.clear();
+            read_view = {};
+            buffer_position = 0;
+            return;
+        }
+
+        if (total_bytes > read_view.size() - buffer_position || total_bytes / elem_bytes != count)
+        {
+            throw std::out_of_range{ "Read past the end of the serialized data." };
+        }
+        std::memcpy(elems, read_view.data() + buffer_position, total_bytes);
+        buffer_position += total_bytes;
+    }
+
+    // Reads `count` bools packed one per bit (lowest bit first) into
+    // `values`, resizing it first if it's a vector.
+    template<typename Bools>
+    void read_bits(Bools& values, size_t count)
+    {
+        // Rounded up without `count + 7`, which could overflow.
+        const uint8_t* bits{ static_cast<const uint8_t*>(read_elem(count / 8 + (count % 8 != 0 ? 1 : 0))) };
+        if constexpr (requires { values.resize(count); })
+        {
+            values.resize(count);
+        }
+        for (size_t i = 0; i < count; i++)
+        {
+            values[i] = ((bits[i / 8] >> (i % 8)) & 1) != 0;
+        }
+    }
+
+    // Unread bytes left. Streams that can't seek can't tell, so they report
+    // as many as could possibly follow.
+    size_t remaining_bytes() const
+    {
+        if (read_stream != nullptr)
+        {
+            if (stream_bytes == SIZE_MAX)
+            {
+                return SIZE_MAX;
+            }
+            return stream_bytes - std::min(stream_bytes, read_position());
+        }
+        return read_view.size() - buffer_position;
+    }
+
+    // Throws unless `count` more elements of at least `elem_bytes` each can
+    // be read. Run on list counts before anything gets sized by them.
+    void check_list_count(size_t count, size_t elem_bytes) const
+    {
+        if (elem_bytes > 0 && count > remaining_bytes() / elem_bytes)
+        {
+            throw std::out_of_range{ "List count runs past the end of the serialized data." };
+        }
+    }
+
+    // Offset of the next byte to be read, counted from the start of the
+    // view or stream.
+    size_t read_position() const
+    {
+        return stream_offset + buffer_position;
+    }
+
+    uint64_t read_varint()
+    {
+        assert(mode == SBM_READ);
+        if (read_stream != nullptr)
+        {
+            refill_read_window(k_max_varint_bytes);
+        }
+        return decode_varint(read_view, buffer_position);
+    }
+
+    // Serialized values have no alignment, so they're copied out instead of
+    // dereferenced in place.
+    template<typename T>
+    T read_value()
+    {
+        T value;
+        std::memcpy(&value, read_elem(sizeof(T)), sizeof(T));
+        return value;
+    }
 
     // Write buffer methods.
+    // Pre-sizes the buffer so the following writes don't reallocate.
+    void reserve(size_t total_bytes)
+    {
+        buffer.reserve(total_bytes);
+    }
+
     void write_elem(void* elem, size_t elem_bytes)
     {
         assert(mode == SBM_WRITE);
-        buffer.resize(buffer.size() + elem_bytes);
-        std::memcpy(
-            buffer.data() + buffer.size() - elem_bytes,
-            elem,
-            elem_bytes
-        );
+        const uint8_t* first{ reinterpret_cast<const uint8_t*>(elem) };
+        buffer.insert(buffer.end(), first, first + elem_bytes);
+        if (write_stream != nullptr && buffer.size() >= window_bytes)
+        {
+            flush_write_stream();
+        }
+    }
+
+    void write_varint(uint64_t value)
+    {
+        assert(mode == SBM_WRITE);
+        while (value >= 0x80)
+        {
+            buffer.push_back(static_cast<uint8_t>(value | 0x80));
+            value >>= 7;
+        }
+        buffer.push_back(static_cast<uint8_t>(value));
+        if (write_stream != nullptr && buffer.size() >= window_bytes)
+        {
+            flush_write_stream();
+        }
+    }
+
+    // Writes the first `count` of `values` (e.g. a `std::vector<bool>`) one
+    // per bit, lowest bit first, the last byte zero padded.
+    template<typename Bools>
+    void write_bits(const Bools& values, size_t count)
+    {
+        assert(mode == SBM_WRITE);
+        size_t start{ buffer.size() };
+        buffer.resize(start + (count + 7) / 8);
+        uint8_t* bits{ buffer.data() + start };
+        for (size_t i = 0; i < count; i++)
+        {
+            bits[i / 8] |= static_cast<uint8_t>(values[i] ? 1u << (i % 8) : 0u);
+        }
+        if (write_stream != nullptr && buffer.size() >= window_bytes)
+        {
+            flush_write_stream();
+        }
+    }
+
+    // Offset the next write will land at.
+    size_t write_position() const
+    {
+        return stream_offset + buffer.size();
+    }
+
+    // Overwrites already written bytes at `position`, e.g. to fill in an
+    // offset table once the offsets are known.
+    void patch_bulk(size_t position, const void* elems, size_t elem_bytes, size_t count)
+    {
+        assert(mode == SBM_WRITE);
+        size_t total_bytes{ elem_bytes * count };
+        const uint8_t* first{ reinterpret_cast<const uint8_t*>(elems) };
+        if (position < stream_offset)
+        {
+            // Part of it was already flushed, so seek back and overwrite it.
+            size_t flushed_bytes{ std::min(total_bytes, stream_offset - position) };
+            write_stream->seekp(static_cast<std::streamoff>(position));
+            write_stream->write(reinterpret_cast<const char*>(first), flushed_bytes);
+            write_stream->seekp(static_cast<std::streamoff>(stream_offset));
+            position += flushed_bytes;
+            first += flushed_bytes;
+            total_bytes -= flushed_bytes;
+            if (total_bytes == 0)
+            {
+                return;
+            }
+        }
+        assert(position - stream_offset + total_bytes <= buffer.size());
+        std::memcpy(buffer.data() + (position - stream_offset), first, total_bytes);
+    }
+
+    // Copies `count` contiguous elements from `elems` into the buffer with
+    // one append. The list count (if any) must be written
+    // beforehand.
+    void write_bulk(const void* elems, size_t elem_bytes, size_t count)
+    {
+        assert(mode == SBM_WRITE);
+        size_t total_bytes{ elem_bytes * count };
+        if (total_bytes == 0)
+        {
+            return;
+        }
+
+        const uint8_t* first{ reinterpret_cast<const uint8_t*>(elems) };
+        if (write_stream != nullptr && buffer.size() + total_bytes >= window_bytes)
+        {
+            // Big lists skip the window and go straight to the stream.
+            flush_write_stream();
+            write_stream->write(reinterpret_cast<const char*>(first), total_bytes);
+            stream_offset += total_bytes;
+            return;
+        }
+        buffer.insert(buffer.end(), first, first + total_bytes);
     }
-    // @NOTE: can write big arrays by providing vector.data() as the void* elem, but the beginning number must be written as a uint32_t first.
 
     // Save to/Load from disk methods.
-    bool save_buffer_to_disk(const std::string& fname)
+    bool save_buffer_to_disk(const std::string& fname, SerialCodec codec = SerialCodec::none)
     {
+        std::span<const uint8_t> contents{ buffer };
+        std::vector<uint8_t> compressed;
+        if (codec != SerialCodec::none)
+        {
+            if (!CompressedContainer::compress(buffer, codec, compressed))
+            {
+                return false;
+            }
+            contents = compressed;
+        }
+
         // Open file for writing.
         std::ofstream file{ fname.c_str(), std::ios::out | std::ios::trunc | std::ios::binary };
         if (!file.is_open())
@@ -68,7 +991,7 @@ struct SerialBuffer
         }
 
         // Write buffer to file.
-        file.write(reinterpret_cast<char*>(buffer.data()), buffer.size());
+        file.write(reinterpret_cast<const char*>(contents.data()), contents.size());
         file.close();
 
         // Check for writing errors.
@@ -90,7 +1013,7 @@ struct SerialBuffer
         }
 
         // Get filesize and copy file contents into buffer.
-        size_t filesize{ file.tellg() };
+        size_t filesize{ static_cast<size_t>(file.tellg()) };
         buffer.clear();
         buffer.resize(filesize);
         file.seekg(0);
@@ -103,6 +1026,48 @@ struct SerialBuffer
             return false;
         }
 
+        if (CompressedContainer::is_container(buffer))
+        {
+            std::vector<uint8_t> compressed;
+            compressed.swap(buffer);
+            return attach_file_view(compressed);
+        }
+        attach_read_view(buffer);
+        return true;
+    }
+};
+
+
+// Header in front of every dumped file:
+//     uint8_t  magic[8]
+//     uint64_t schema_fingerprint
+// The fingerprint hashes the struct's wire layout (`k_schema_fingerprint`
+// of the generated struct), so a load can tell with one compare whether
+// the file was written with the same schema.
+struct SchemaHeader
+{
+    static constexpr uint8_t k_magic[8]{ 0x89, 'H', 'S', 'F', 0x0d, 0x0a, 0x1a, 0x0a };
+    static constexpr size_t k_size{ sizeof(k_magic) + sizeof(uint64_t) };
+
+    static void write(SerialBuffer& sb, uint64_t fingerprint)
+    {
+        sb.write_bulk(k_magic, sizeof(uint8_t), sizeof(k_magic));
+        sb.write_elem(&fingerprint, sizeof(uint64_t));
+    }
+
+    // Reads the header's fingerprint. Fails if there's no header.
+    static bool read(SerialBuffer& sb, uint64_t& fingerprint)
+    {
+        if (!sb.can_read(k_size))
+        {
+            return false;
+        }
+        const uint8_t* header{ reinterpret_cast<const uint8_t*>(sb.read_elem(k_size)) };
+        if (std::memcmp(header, k_magic, sizeof(k_magic)) != 0)
+        {
+            return false;
+        }
+        std::memcpy(&fingerprint, header + sizeof(k_magic), sizeof(uint64_t));
         return true;
     }
 };
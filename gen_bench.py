@@ -0,0 +1,393 @@
+import importlib
+import json
+import os
+import random
+import shutil
+import struct
+import subprocess
+import sys
+import tempfile
+import time
+from argparse import ArgumentParser
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Callable, Dict, List
+
+from gen_cpp_struct import generate_directory
+from hstruct_schema import DataType, HStruct, load_schema_ir
+from hstruct_records import RecordFileReader
+
+
+# Value range of every integer primitive, keyed by `struct` format char.
+INTEGER_FORMAT_RANGES: Dict[str, range] = {
+    'B': range(0, 1 << 8),
+    'b': range(-(1 << 7), 1 << 7),
+    'H': range(0, 1 << 16),
+    'h': range(-(1 << 15), 1 << 15),
+    'I': range(0, 1 << 32),
+    'i': range(-(1 << 31), 1 << 31),
+    'Q': range(0, 1 << 64),
+    'q': range(-(1 << 63), 1 << 63),
+}
+
+STRING_ALPHABET = "abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789 "
+
+REPO_DIR = Path(__file__).resolve().parent
+
+# Benchmarks a metric has to get slower than `--max-slowdown` times its
+# baseline in before `--baseline` reports a regression.
+DEFAULT_MAX_SLOWDOWN = 1.10
+
+
+@dataclass
+class BenchConfig:
+    records: int
+    vector_size: int  # Vectors get 0 to 2x this many elements, strings 0 to 2x this many characters.
+    string_size: int
+    max_depth: int    # Vectors of structs nested deeper than this stay empty, so recursive structs end.
+    seed: int
+    repetitions: int
+
+
+class RecordSynthesizer:
+    # Random instances of a schema. Records are plain JSON values in the
+    # layout `json_to_bin.py` takes, so every path benchmarks the same data.
+
+    def __init__(self, schemas: Dict[str, HStruct], config: BenchConfig):
+        self.schemas = schemas
+        self.config = config
+        self.rng = random.Random(config.seed)
+
+    def primitive(self, field_type: DataType):
+        if field_type.is_string:
+            length = self.rng.randint(0, 2 * self.config.string_size)
+            return "".join(self.rng.choices(STRING_ALPHABET, k=length))
+        if field_type.struct_format == '?':
+            return self.rng.random() < 0.5
+        if field_type.struct_format == 'f':
+            # Rounded to float32 so it survives the binary round trip unchanged.
+            return struct.unpack('<f', struct.pack('<f', self.rng.uniform(-1.0e6, 1.0e6)))[0]
+        value_range = INTEGER_FORMAT_RANGES[field_type.struct_format]
+        return self.rng.randrange(value_range.start, value_range.stop)
+
+    def value(self, field_type: DataType, depth: int):
+        if field_type.is_builtin_primitive:
+            return self.primitive(field_type)
+        return self.record(self.schemas[field_type.type_name], depth + 1)
+
+    def field(self, field_type: DataType, depth: int):
+        if not field_type.is_list_of_type:
+            return self.value(field_type, depth)
+        if field_type.list_count > 0:
+            count = field_type.list_count
+        elif not field_type.is_builtin_primitive and depth >= self.config.max_depth:
+            count = 0
+        else:
+            count = self.rng.randint(0, 2 * self.config.vector_size)
+        return [self.value(field_type, depth) for _ in range(count)]
+
+    def record(self, hstruct: HStruct, depth: int = 0) -> Dict:
+        return {member.field_name: self.field(member.field_type, depth) for member in hstruct.members}
+
+
+# Timing.
+def best_seconds(repetitions: int, func: Callable):
+    # Best of `repetitions` runs, which is the least noisy for spotting regressions.
+    best = float("inf")
+    for _ in range(repetitions):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def metric(seconds: float, byte_count: int, record_count: int) -> Dict[str, float]:
+    return {
+        "seconds": seconds,
+        "mb_per_s": byte_count / seconds / 1.0e6 if seconds > 0 else 0.0,
+        "ns_per_record": seconds * 1.0e9 / record_count if record_count > 0 else 0.0,
+    }
+
+
+def run_python(script: str, *script_args: str):
+    subprocess.run([sys.executable, str(REPO_DIR / script), *script_args], check=True, stdout=subprocess.DEVNULL)
+
+
+# C++ harness. Loads the records of a record file once, then times sizing,
+# encoding and decoding all of them in memory (no disk I/O) and prints the
+# best time of each as JSON.
+CPP_BENCH_CODE = \
+"""// Generated by `gen_bench.py` for `{struct_name}`.
+#include <algorithm>
+#include <chrono>
+#include <cstdio>
+#include <string>
+#include <vector>
+#include "record_file.h"
+#include "{struct_name}.hstruct.h"
+
+
+template<typename Func>
+double best_seconds(size_t repetitions, Func&& func)
+{
+    double best{ 1.0e300 };
+    for (size_t r = 0; r < repetitions; r++)
+    {
+        auto start{ std::chrono::steady_clock::now() };
+        func();
+        auto end{ std::chrono::steady_clock::now() };
+        best = std::min(best, std::chrono::duration<double>(end - start).count());
+    }
+    return best;
+}
+
+void write_records(std::vector<{struct_name}>& records, size_t total_bytes, SerialBuffer& sb)
+{
+    sb = SerialBuffer{};
+    sb.mode = SerialBuffer::SBM_WRITE;
+    sb.reserve(total_bytes);
+    for (auto& record : records)
+    {
+        record.write_data_to_serial_buffer(sb);
+    }
+}
+
+void read_records(std::span<const uint8_t> bytes, std::vector<{struct_name}>& records)
+{
+    SerialBuffer sb;
+    sb.attach_read_view(bytes);
+    for (auto& record : records)
+    {
+        record.read_data_from_serial_buffer(sb);
+    }
+}
+
+
+int main(int argc, char** argv)
+{
+    if (argc != 3)
+    {
+        std::fprintf(stderr, "Usage: %s <records.hsr> <repetitions>\\n", argv[0]);
+        return 2;
+    }
+    RecordFileReader<{struct_name}> reader;
+    if (!reader.open(argv[1]))
+    {
+        std::fprintf(stderr, "Can't open `%s` as a `{struct_name}` record file.\\n", argv[1]);
+        return 1;
+    }
+    size_t repetitions{ std::stoul(argv[2]) };
+    std::vector<{struct_name}> records(reader.size());
+    for (size_t i = 0; i < records.size(); i++)
+    {
+        reader.read(i, records[i]);
+    }
+
+    size_t total_bytes{ 0 };
+    double size_seconds{ best_seconds(repetitions, [&]() {
+        total_bytes = 0;
+        for (const auto& record : records)
+        {
+            total_bytes += record.serialized_size();
+        }
+    }) };
+
+    SerialBuffer written;
+    double dump_seconds{ best_seconds(repetitions, [&]() { write_records(records, total_bytes, written); }) };
+
+    std::vector<{struct_name}> decoded(records.size());
+    double load_seconds{ best_seconds(repetitions, [&]() { read_records(written.buffer, decoded); }) };
+
+    SerialBuffer round_trip;
+    double round_trip_seconds{ best_seconds(repetitions, [&]() {
+        write_records(records, total_bytes, round_trip);
+        read_records(round_trip.buffer, decoded);
+    }) };
+
+    // Decoded records have to encode back to the same bytes.
+    SerialBuffer check;
+    write_records(decoded, total_bytes, check);
+    bool round_trip_ok{ check.buffer == written.buffer && written.buffer.size() == total_bytes };
+
+    std::printf("{\\"records\\": %zu, \\"bytes\\": %zu, \\"size\\": %.9g, \\"dump\\": %.9g, \\"load\\": %.9g, "
+                "\\"round_trip\\": %.9g, \\"round_trip_ok\\": %s}\\n",
+                records.size(), total_bytes, size_seconds, dump_seconds, load_seconds, round_trip_seconds,
+                round_trip_ok ? "true" : "false");
+    return round_trip_ok ? 0 : 1;
+}
+"""
+
+
+def bench_cpp(struct_name: str, gen_dir: Path, build_dir: Path, records_fname: Path, repetitions: int,
+              cxx: str, cxx_flags: List[str]) -> Dict:
+    source_fname = build_dir / f"bench_{struct_name}.cpp"
+    exe_fname = build_dir / f"bench_{struct_name}{'.exe' if os.name == 'nt' else ''}"
+    source_fname.write_text(CPP_BENCH_CODE.replace("{struct_name}", struct_name))
+    subprocess.run([cxx, "-std=c++20", "-O2", "-pthread", f"-I{gen_dir}", *cxx_flags,
+                    str(source_fname), "-o", str(exe_fname)], check=True)
+    output = subprocess.run([str(exe_fname), str(records_fname), str(repetitions)],
+                            check=True, capture_output=True, text=True).stdout
+    raw = json.loads(output)
+    assert raw["round_trip_ok"], "C++ round trip didn't reproduce the same bytes."
+    return {
+        name: metric(raw[name], raw["bytes"], raw["records"])
+        for name in ("size", "dump", "load", "round_trip")
+    }
+
+
+def bench_python_codec(struct_name: str, gen_dir: Path, records_fname: Path, byte_count: int,
+                       repetitions: int) -> Dict:
+    # The generated `gen/<Name>_hstruct.py` codec, in process.
+    sys.path.insert(0, str(gen_dir))
+    try:
+        codec = importlib.import_module(f"{struct_name}_hstruct").__dict__[struct_name]
+    finally:
+        sys.path.remove(str(gen_dir))
+    with RecordFileReader(str(records_fname)) as reader:
+        record_bytes = [bytes(reader.record_bytes(i)) for i in range(len(reader))]
+    objs = [codec.from_bytes(data) for data in record_bytes]
+
+    results = {
+        "size": best_seconds(repetitions, lambda: [obj.serialized_size() for obj in objs]),
+        "dump": best_seconds(repetitions, lambda: [obj.to_bytes() for obj in objs]),
+        "load": best_seconds(repetitions, lambda: [codec.from_bytes(data) for data in record_bytes]),
+        "round_trip": best_seconds(repetitions, lambda: [codec.from_bytes(obj.to_bytes()) for obj in objs]),
+    }
+    assert [bytes(obj.to_bytes()) for obj in objs] == record_bytes, "Python codec round trip didn't reproduce the same bytes."
+    return {name: metric(seconds, byte_count, len(objs)) for name, seconds in results.items()}
+
+
+def bench_python_converters(hstruct_fname: str, build_dir: Path, ndjson_fname: Path, records_fname: Path,
+                            byte_count: int, records: List[Dict], repetitions: int) -> Dict:
+    # `json_to_bin.py`/`bin_to_json.py` as they're run, so the times include
+    # interpreter start-up and schema parsing.
+    out_records_fname = build_dir / "records.out.hsr"
+    json_fname = build_dir / "records.out.json"
+    to_bin = lambda: run_python("json_to_bin.py", "-f", hstruct_fname, "-d", str(ndjson_fname),
+                                "-o", str(out_records_fname), "--records")
+    to_json = lambda: run_python("bin_to_json.py", "-f", hstruct_fname, "-b", str(records_fname), "-o", str(json_fname))
+
+    results = {
+        "json_to_bin": best_seconds(repetitions, to_bin),
+        "bin_to_json": best_seconds(repetitions, to_json),
+        "round_trip": best_seconds(repetitions, lambda: (to_bin(), to_json())),
+    }
+    assert out_records_fname.read_bytes() == records_fname.read_bytes(), "`json_to_bin.py` output isn't deterministic."
+    with open(json_fname, "r", encoding="utf-8") as f:
+        assert json.load(f) == records, "`bin_to_json.py` didn't reproduce the input records."
+    return {name: metric(seconds, byte_count, len(records)) for name, seconds in results.items()}
+
+
+def find_regressions(results: Dict, baseline: Dict, max_slowdown: float) -> List[str]:
+    # Every timed metric that got more than `max_slowdown` times slower.
+    regressions: List[str] = []
+    for path, metrics in results["results"].items():
+        for name, values in metrics.items():
+            old = baseline.get("results", {}).get(path, {}).get(name)
+            if old is None or old["seconds"] <= 0:
+                continue
+            slowdown = values["seconds"] / old["seconds"]
+            if slowdown > max_slowdown:
+                regressions.append(f"{path}.{name}: {old['ns_per_record']:.0f} -> {values['ns_per_record']:.0f} ns/record "
+                                   f"({slowdown:.2f}x)")
+    return regressions
+
+
+def main():
+    # Arg parser.
+    parser = ArgumentParser(description="Benchmarks the generated C++ and Python code of an .hstruct "
+                                        "on randomized records and writes the results as JSON.")
+    parser.add_argument("-f", "--file", dest="filename", required=True,
+                        help="input .hstruct file to benchmark (its imports are looked up next to it)")
+    parser.add_argument("-o", "--out", dest="out_fname", default="bench_results.json",
+                        help="JSON file to write the results to (default: bench_results.json)")
+    parser.add_argument("-n", "--records", dest="records", type=int, default=1000,
+                        help="number of random records (default: 1000)")
+    parser.add_argument("--vector-size", dest="vector_size", type=int, default=16,
+                        help="average vector length, vectors get 0 to twice as many elements (default: 16)")
+    parser.add_argument("--string-size", dest="string_size", type=int, default=16,
+                        help="average string length, strings get 0 to twice as many characters (default: 16)")
+    parser.add_argument("--max-depth", dest="max_depth", type=int, default=3,
+                        help="vectors of structs nested deeper than this are left empty (default: 3)")
+    parser.add_argument("--seed", dest="seed", type=int, default=0, help="random seed (default: 0)")
+    parser.add_argument("-r", "--repetitions", dest="repetitions", type=int, default=5,
+                        help="runs per benchmark, the best one is reported (default: 5)")
+    parser.add_argument("--build-dir", dest="build_dir", default=None,
+                        help="where generated code, the dataset and binaries go "
+                             "(default: a temporary directory that gets removed)")
+    parser.add_argument("--cxx", dest="cxx", default=os.environ.get("CXX", "g++"),
+                        help="C++ compiler taking GCC-style flags (default: $CXX or g++)")
+    parser.add_argument("--cxx-flag", dest="cxx_flags", action="append", default=[],
+                        help="extra compiler flag, e.g. `--cxx-flag=-march=native` (repeatable)")
+    parser.add_argument("--no-cpp", dest="cpp", action="store_false", help="skip the C++ benchmarks")
+    parser.add_argument("--no-python", dest="python", action="store_false", help="skip the Python benchmarks")
+    parser.add_argument("--baseline", dest="baseline_fname", default=None,
+                        help="earlier results JSON to compare against, exits with 1 on regressions")
+    parser.add_argument("--max-slowdown", dest="max_slowdown", type=float, default=DEFAULT_MAX_SLOWDOWN,
+                        help=f"slowdown against the baseline that counts as a regression (default: {DEFAULT_MAX_SLOWDOWN})")
+    args = parser.parse_args()
+    assert args.records > 0 and args.repetitions > 0, "Need at least one record and one repetition."
+
+    hstruct_fname = str(Path(args.filename).resolve())
+    ir = load_schema_ir(hstruct_fname)
+    schemas = ir.schemas
+    struct_name = Path(hstruct_fname).stem
+    config = BenchConfig(args.records, args.vector_size, args.string_size, args.max_depth, args.seed, args.repetitions)
+
+    build_dir = Path(args.build_dir or tempfile.mkdtemp(prefix="hstruct_bench_")).resolve()
+    build_dir.mkdir(parents=True, exist_ok=True)
+    try:
+        # Generate fresh code, so the results reflect the current generator.
+        gen_dir = build_dir / "gen"
+        generate_directory(str(Path(hstruct_fname).parent), str(gen_dir))
+
+        synthesizer = RecordSynthesizer(schemas, config)
+        records = [synthesizer.record(schemas[struct_name]) for _ in range(config.records)]
+        ndjson_fname = build_dir / "records.ndjson"
+        with open(ndjson_fname, "w", encoding="utf-8") as f:
+            for record in records:
+                f.write(json.dumps(record) + "\n")
+        records_fname = build_dir / "records.hsr"
+        run_python("json_to_bin.py", "-f", hstruct_fname, "-d", str(ndjson_fname), "-o", str(records_fname), "--records")
+        with RecordFileReader(str(records_fname)) as reader:
+            byte_count = sum(len(reader.record_bytes(i)) for i in range(len(reader)))
+
+        results: Dict[str, Dict] = {}
+        if args.cpp:
+            results["cpp"] = bench_cpp(struct_name, gen_dir, build_dir, records_fname, args.repetitions,
+                                       args.cxx, args.cxx_flags)
+        if args.python:
+            results["python_codec"] = bench_python_codec(struct_name, gen_dir, records_fname, byte_count, args.repetitions)
+            results["python_converters"] = bench_python_converters(hstruct_fname, build_dir, ndjson_fname, records_fname,
+                                                                   byte_count, records, args.repetitions)
+    finally:
+        if args.build_dir is None:
+            shutil.rmtree(build_dir, ignore_errors=True)
+
+    output = {
+        "schema": struct_name,
+        "schema_fingerprint": f"0x{ir.fingerprints[struct_name]:016x}",
+        "config": asdict(config),
+        "bytes": byte_count,
+        "bytes_per_record": byte_count / args.records,
+        "results": results,
+    }
+    with open(args.out_fname, "w", encoding="utf-8") as f:
+        json.dump(output, f, indent=4)
+        f.write("\n")
+
+    for path, metrics in results.items():
+        for name, values in metrics.items():
+            print(f"{path + '.' + name:<32} {values['mb_per_s']:10.1f} MB/s {values['ns_per_record']:14.0f} ns/record")
+
+    if args.baseline_fname is not None:
+        with open(args.baseline_fname, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = find_regressions(output, baseline, args.max_slowdown)
+        for regression in regressions:
+            print(f"Regression: {regression}")
+        if len(regressions) > 0:
+            sys.exit(1)
+
+if __name__ == '__main__':
+    main()
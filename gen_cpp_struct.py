@@ -1,196 +1,1315 @@
-import re
+import os
+import json
+from concurrent.futures import Executor, ProcessPoolExecutor
 from argparse import ArgumentParser
 from dataclasses import dataclass
-from typing import List, Tuple, Dict
+from typing import Callable, List, Optional, Tuple, Dict
 from pathlib import Path
 
-# Arg parser.
-parser = ArgumentParser()
-parser.add_argument("-f", "--file", dest="filename", required=True,
-                    help="input .hstruct file to use for generating struct")
-args = parser.parse_args()
-
-# Input file structure.
-all_primitive_names_to_cpp_type: Dict[str, str] = {
-    'bool': 'bool',
-    'uint8': 'uint8_t',
-    'int8': 'int8_t',
-    'uint16': 'uint16_t',
-    'int16': 'int16_t',
-    'uint32': 'uint32_t',
-    'int32': 'int32_t',
-    'uint64': 'uint64_t',
-    'int64': 'int64_t',
-    'float': 'float_t',
-    'string': 'std::string',
-}
+from gen_py_struct import PY_RUNTIME_MODULE_NAME, write_py_runtime_file, write_py_struct_file
+from hstruct_schema import (
+    GENERATED_CODE_COMMENT_CODE,
+    DataType,
+    HField,
+    HStruct,
+    LayoutVariant,
+    bit_byte_count,
+    check_struct_references,
+    field_is_bit_flag,
+    field_varint_elems,
+    field_varint_is_signed,
+    fixed_run_byte_size,
+    group_fixed_size_runs,
+    hash_bytes,
+    layout_variants,
+    load_schema_ir,
+    member_run_kind,
+    packed_field_offsets,
+    packed_offset_table_count,
+    parse_hstruct_file,
+    split_packed_members,
+    struct_is_packed,
+    struct_is_pmr,
+    write_file_if_changed,
+)
 
 
 INDENTATION_AMOUNT = 4
 class CppFilePrinter:
+    # Builds the whole file in memory and writes it out on exit. Block depth
+    # is tracked explicitly through `open_block`/`close_block`.
 
     def __init__(self, fname: str):
         self.fname = fname
         self.indentation = 0
+        self.written = False
 
     def __enter__(self):
-        self.fhandle = open(self.fname, "w")
+        self.lines: List[str] = []
         return self
 
     def __exit__(self, exc_type, exc_val, exc_tb):
-        self.fhandle.close()
+        if exc_type is None:
+            assert self.indentation == 0, f"Unclosed block in {self.fname}."
+            self.written = write_file_if_changed(self.fname, "".join(self.lines))
 
     def write_line(self, line: str):
         if len(line.strip()) == 0:
             # Write empty line if no content.
-            line_with_indent = ""
-        else:
-            allow_indentation_mutation = True
-            if "{" in line and "}" in line:
-                # Don't mess with indentation
-                allow_indentation_mutation = False
-
-            # Check for end block.
-            if allow_indentation_mutation and "}" in line:
-                assert self.indentation >= INDENTATION_AMOUNT, "One too many exit blocks!"
-                self.indentation -= INDENTATION_AMOUNT
-
-            # Construct indentation amount.
-            indent = " " * self.indentation
-
-            # Check for start block.
-            if allow_indentation_mutation and "{" in line:
-                self.indentation += INDENTATION_AMOUNT
-
-            # Combine indent with line content.
-            line_with_indent = f"{indent}{line}"
-        
-        # Write out line.
-        self.fhandle.write(f"{line_with_indent}\n")
-
-
-class DataType:
-    type_name: str
-    is_builtin_primitive: bool
-    is_string: bool
-    is_list_of_type: bool
-    list_count: int  # If -1 then list becomes std::vector. If 0, then fail. If >0, then list becomes std::array.
-
-    def __init__(self, type_token: str):
-        # Check if type is a list.
-        type_str_stem = ''
-        list_count = -1
-        if type_token[-1] == ']':
-            is_list_of_type = True
-
-            # Check if list is finite or expandable.
-            lb_pos = type_token.find('[')
-            assert lb_pos > 0, f'Malformed type: {type_token}'
-
-            list_finite_count_str = type_token[lb_pos + 1 : -1].strip()
-            if len(list_finite_count_str) > 0:
-                list_count = int(list_finite_count_str)
-                assert list_count > 0, f'Bad list count: {list_count}'
-
-            type_str_stem = type_token[:lb_pos]
+            self.lines.append("\n")
         else:
-            is_list_of_type = False
-            type_str_stem = type_token
+            self.lines.append(f"{' ' * self.indentation}{line}\n")
 
-        is_builtin_primitive = bool(type_str_stem in all_primitive_names_to_cpp_type.keys())
-        is_string = bool(type_str_stem == 'string')
-        type_name_cpp = (all_primitive_names_to_cpp_type[type_str_stem] if is_builtin_primitive else type_str_stem)
+    def open_block(self, line: str = "{"):
+        # Writes `line` and indents everything after it.
+        self.write_line(line)
+        self.indentation += INDENTATION_AMOUNT
 
-        # Simple check that there aren't any special characters in cleaned token str.
-        assert re.compile(r"\W").match(type_str_stem) is None, f'Malformed type: {type_token}'
+    def close_block(self, line: str = "}"):
+        assert self.indentation >= INDENTATION_AMOUNT, "One too many exit blocks!"
+        self.indentation -= INDENTATION_AMOUNT
+        self.write_line(line)
 
-        # Finish.
-        self.type_name = type_name_cpp
-        self.is_builtin_primitive = is_builtin_primitive
-        self.is_string = is_string
-        self.is_list_of_type = is_list_of_type
-        self.list_count = list_count
 
+def field_type_elem_cpp_name(field_type: DataType):
+    if field_type.is_string and field_type.is_pmr:
+        return "std::pmr::string"
+    return field_type.type_name
 
-@dataclass
-class TokenLine:
-    indentation_amount: int
-    tokens: List[str]
 
+def field_type_name_to_cpp_name(field_type: DataType):
+    type_name = field_type_elem_cpp_name(field_type)
+    if field_type.is_list_of_type:
+        assert field_type.list_count != 0, "Malformed list_count"
+        if field_type.list_count == -1:
+            vector_name = "std::pmr::vector" if field_type.is_pmr else "std::vector"
+            type_name = f"{vector_name}<{type_name}>"
+        else:
+            type_name = f"std::array<{type_name}, {field_type.list_count}>"
+    return type_name
 
-@dataclass
-class HField:
-    field_type: DataType
-    field_name: str
 
+def field_type_name_to_cpp_view_name(field_type: DataType):
+    # Views point into the serialized bytes instead of owning copies.
+    if field_type.is_builtin_primitive and not field_type.is_string:
+        if field_type.is_list_of_type and (field_varint_elems(field_type) or field_type.is_bitpacked):
+            # Varints and bits have to be decoded, so there's nothing to point at.
+            return field_type_name_to_cpp_name(field_type)
+        if field_type.is_list_of_type:
+            return cpp_view_list_name(field_type)
+        return field_type.type_name
 
-@dataclass
-class HStruct:
-    struct_name: str
-    members: List[HField]
+    elem_name = "std::string_view" if field_type.is_string else f"{field_type.type_name}_view"
+    if field_type.is_list_of_type:
+        assert field_type.list_count != 0, "Malformed list_count"
+        if field_type.list_count == -1:
+            return f"std::vector<{elem_name}>"
+        return f"std::array<{elem_name}, {field_type.list_count}>"
+    return elem_name
+
+
+def cpp_view_list_name(field_type: DataType) -> str:
+    # Serialized bytes have no alignment, so lists of wider primitives can't
+    # be pointed at with a `std::span` (see `UnalignedSpan`).
+    if field_type.byte_size == 1:
+        return f"std::span<const {field_type.type_name}>"
+    return f"UnalignedSpan<{field_type.type_name}>"
+
+
+def cpp_view_list_expr(field_type: DataType, bytes_expr: str, count_expr) -> str:
+    # List of `count_expr` elements starting at the `const uint8_t*` `bytes_expr`.
+    if field_type.byte_size == 1:
+        return f"std::span<const {field_type.type_name}>{{ reinterpret_cast<const {field_type.type_name}*>({bytes_expr}), {count_expr} }}"
+    return f"UnalignedSpan<{field_type.type_name}>{{ {bytes_expr}, {count_expr} }}"
+
+
+def field_type_is_bulk_copyable(field_type: DataType) -> bool:
+    # Lists of fixed-size primitives are contiguous in memory and on the wire,
+    # so they can be copied with a single memcpy. `std::vector<bool>` is
+    # bit-packed and has no `.data()`, so it keeps the per-element path.
+    if not field_type.is_list_of_type or not field_type.is_builtin_primitive or field_type.is_string:
+        return False
+    if field_varint_elems(field_type):
+        return False
+    if field_type.list_count == -1 and field_type.type_name == 'bool':
+        return False
+    return True
+
+
+def cpp_varint_encode_expr(field_type: DataType, value: str) -> str:
+    return f"zigzag_encode({value})" if field_varint_is_signed(field_type) else value
+
+
+def cpp_varint_decode_expr(field_type: DataType) -> str:
+    value = "sb.read_varint()"
+    if field_varint_is_signed(field_type):
+        value = f"zigzag_decode({value})"
+    return f"static_cast<{field_type.type_name}>({value})"
+
+
+def varint_serialized_size_lines(field_type: DataType, name: str) -> List[str]:
+    # Varint sizes depend on the values, so they're all added at runtime.
+    def elem_size(elem: str) -> str:
+        if field_varint_elems(field_type):
+            return f"varint_size({cpp_varint_encode_expr(field_type, elem)})"
+        if field_type.is_string:
+            return f"varint_size({elem}.length()) + {elem}.length()"
+        if field_type.byte_size > 0:
+            return f"sizeof({field_type.type_name})"
+        return f"{elem}.serialized_size()"
+
+    lines: List[str] = []
+    if field_type.is_list_of_type and field_type.list_count == -1:
+        lines.append(f"size += varint_size({name}.size());")
+    if not field_type.is_list_of_type:
+        lines.append(f"size += {elem_size(name)};")
+    elif field_type.byte_size > 0 and not field_varint_elems(field_type):
+        lines.append(f"size += {name}.size() * sizeof({field_type.type_name});")
+    else:
+        lines.append(f"for (const auto& elem : {name})")
+        lines.append("{")
+        lines.append(f"{' ' * INDENTATION_AMOUNT}size += {elem_size('elem')};")
+        lines.append("}")
+    return lines
+
+
+def write_serialized_size_method(cfp: CppFilePrinter, struct: HStruct):
+    # Fold everything that doesn't depend on runtime data into one constant.
+    fixed_bytes = 0
+    fixed_size_t_count = 0
+    runtime_lines: List[str] = []
+    members: List[HField] = []
+    for group in group_fixed_size_runs(struct.members):
+        if field_is_bit_flag(group[0].field_type):
+            fixed_bytes += bit_byte_count(len(group))
+        else:
+            members += group
+    for member in members:
+        field_type = member.field_type
+        name = member.field_name
+        count = field_type.list_count if field_type.is_list_of_type else 1
+        if field_type.is_lazy:
+            # Byte size prefix.
+            fixed_size_t_count += 1
+        if field_type.is_parallel:
+            # Element offset table.
+            runtime_lines.append(f"size += {name}.size() * sizeof(uint64_t);")
+        if field_type.is_bitpacked:
+            # List of bits.
+            if field_type.list_count > 0:
+                fixed_bytes += bit_byte_count(field_type.list_count)
+                continue
+            if field_type.is_varint:
+                runtime_lines.append(f"size += varint_size({name}.size());")
+            else:
+                fixed_size_t_count += 1
+            runtime_lines.append(f"size += ({name}.size() + 7) / 8;")
+            continue
+        if field_type.is_varint:
+            runtime_lines += varint_serialized_size_lines(field_type, name)
+            continue
+        if field_type.is_list_of_type and field_type.list_count == -1:
+            # Vector count prefix.
+            fixed_size_t_count += 1
+            if field_type.byte_size > 0:
+                runtime_lines.append(f"size += {name}.size() * sizeof({field_type.type_name});")
+                continue
+        elif field_type.byte_size > 0:
+            fixed_bytes += field_type.byte_size * count
+            continue
+
+        if not field_type.is_list_of_type:
+            if field_type.is_string:
+                fixed_size_t_count += 1
+                runtime_lines.append(f"size += {name}.length();")
+            else:
+                runtime_lines.append(f"size += {name}.serialized_size();")
+            continue
+
+        # List of strings or HStructs.
+        body_indent = " " * INDENTATION_AMOUNT
+        runtime_lines.append(f"for (const auto& elem : {name})")
+        runtime_lines.append("{")
+        if field_type.is_string:
+            runtime_lines.append(f"{body_indent}size += sizeof(size_t) + elem.length();")
+        else:
+            runtime_lines.append(f"{body_indent}size += elem.serialized_size();")
+        runtime_lines.append("}")
+
+    fixed_size_expr = str(fixed_bytes)
+    if fixed_size_t_count > 0:
+        fixed_size_expr += f" + {fixed_size_t_count} * sizeof(size_t)"
+    if struct_is_packed(struct) and packed_offset_table_count(struct) > 0:
+        fixed_size_expr += " + k_packed_offset_table_count * sizeof(uint64_t)"
+    cfp.write_line(f"static constexpr size_t k_fixed_serialized_size{{ {fixed_size_expr} }};")
+    cfp.write_line("")
+
+    cfp.write_line("size_t serialized_size() const override")
+    cfp.open_block()
+    cfp.write_line("size_t size{ k_fixed_serialized_size };")
+    for line in runtime_lines:
+        cfp.write_line(line)
+    cfp.write_line("return size;")
+    cfp.close_block()
+    cfp.write_line("")
+
+
+def write_slot_length_skip(cfp: CppFilePrinter, field_type: DataType):
+    # Steps over the length prefix at the start of a slot's `bytes`.
+    if field_type.is_varint:
+        cfp.write_line("size_t length_size{ 0 };")
+        cfp.write_line("decode_varint(bytes, length_size);")
+        return
+    cfp.write_line("if (bytes.size() < sizeof(size_t))")
+    cfp.open_block()
+    cfp.write_line("throw std::out_of_range{ \"Packed field is truncated.\" };")
+    cfp.close_block()
+
+
+def write_packed_layout(cfp: CppFilePrinter, struct: HStruct):
+    fixed_members, variable_members = split_packed_members(struct)
+
+    # Offset constants.
+    cfp.write_line("// Packed layout. Fixed-size fields sit at constant offsets from the start")
+    cfp.write_line("// of the record, followed by a table of `uint64_t` offsets locating each")
+    cfp.write_line("// variable-size field (plus the end of the record).")
+    offsets, fixed_size = packed_field_offsets(struct)
+    for member in fixed_members:
+        cfp.write_line(f"static constexpr size_t k_offset_{member.field_name}{{ {offsets[member.field_name]} }};")
+    cfp.write_line(f"static constexpr size_t k_packed_fixed_size{{ {fixed_size} }};")
+    cfp.write_line(f"static constexpr size_t k_packed_offset_table_count{{ {packed_offset_table_count(struct)} }};")
+    for slot, member in enumerate(variable_members):
+        cfp.write_line(f"static constexpr size_t k_slot_{member.field_name}{{ {slot} }};")
+    cfp.write_line("")
+
+    # Record check. `peek_` accessors throw `std::out_of_range` on records
+    # too short for the fixed-size fields and the table, like reads do.
+    cfp.write_line("static void check_packed_record(std::span<const uint8_t> record)")
+    cfp.open_block()
+    cfp.write_line("if (record.size() < k_packed_fixed_size + k_packed_offset_table_count * sizeof(uint64_t))")
+    cfp.open_block()
+    cfp.write_line("throw std::out_of_range{ \"Packed record is truncated.\" };")
+    cfp.close_block()
+    cfp.close_block()
+    cfp.write_line("")
+
+    # Fixed-size field accessors.
+    for member in fixed_members:
+        field_type = member.field_type
+        name = member.field_name
+        if field_type.is_list_of_type:
+            cfp.write_line(f"static {cpp_view_list_name(field_type)} peek_{name}(std::span<const uint8_t> record)")
+            cfp.open_block()
+            cfp.write_line("check_packed_record(record);")
+            cfp.write_line(f"return {cpp_view_list_expr(field_type, f'record.data() + k_offset_{name}', field_type.list_count)};")
+            cfp.close_block()
+        else:
+            cfp.write_line(f"static {field_type.type_name} peek_{name}(std::span<const uint8_t> record)")
+            cfp.open_block()
+            cfp.write_line("check_packed_record(record);")
+            cfp.write_line(f"{field_type.type_name} value;")
+            cfp.write_line(f"std::memcpy(&value, record.data() + k_offset_{name}, sizeof({field_type.type_name}));")
+            cfp.write_line("return value;")
+            cfp.close_block()
+        cfp.write_line("")
+
+    if len(variable_members) == 0:
+        return
+
+    # Variable-size field accessors.
+    cfp.write_line("// Encoded bytes of the variable-size field in `slot`.")
+    cfp.write_line("static std::span<const uint8_t> peek_slot_bytes(std::span<const uint8_t> record, size_t slot)")
+    cfp.open_block()
+    cfp.write_line("check_packed_record(record);")
+    cfp.write_line("uint64_t offsets[2];")
+    cfp.write_line("std::memcpy(offsets, record.data() + k_packed_fixed_size + slot * sizeof(uint64_t), sizeof(offsets));")
+    cfp.write_line("if (offsets[0] > offsets[1] || offsets[1] > record.size())")
+    cfp.open_block()
+    cfp.write_line("throw std::out_of_range{ \"Packed offset table entry is out of range.\" };")
+    cfp.close_block()
+    cfp.write_line("return record.subspan(offsets[0], offsets[1] - offsets[0]);")
+    cfp.close_block()
+    cfp.write_line("")
+    for member in variable_members:
+        field_type = member.field_type
+        name = member.field_name
+        # Varint lengths are skipped by decoding them, fixed ones have a known size.
+        if field_type.is_varint:
+            length_size = "length_size"
+        else:
+            length_size = "sizeof(size_t)"
+        if field_varint_elems(field_type) and not field_type.is_list_of_type:
+            cfp.write_line(f"static {field_type.type_name} peek_{name}(std::span<const uint8_t> record)")
+            cfp.open_block()
+            cfp.write_line("size_t position{ 0 };")
+            value = f"decode_varint(peek_slot_bytes(record, k_slot_{name}), position)"
+            if field_varint_is_signed(field_type):
+                value = f"zigzag_decode({value})"
+            cfp.write_line(f"return static_cast<{field_type.type_name}>({value});")
+            cfp.close_block()
+        elif field_type.is_string and not field_type.is_list_of_type:
+            cfp.write_line(f"static std::string_view peek_{name}(std::span<const uint8_t> record)")
+            cfp.open_block()
+            cfp.write_line(f"std::span<const uint8_t> bytes{{ peek_slot_bytes(record, k_slot_{name}) }};")
+            write_slot_length_skip(cfp, field_type)
+            cfp.write_line(f"return {{ reinterpret_cast<const char*>(bytes.data() + {length_size}), bytes.size() - {length_size} }};")
+            cfp.close_block()
+        elif field_type.byte_size > 0 and not field_varint_elems(field_type):
+            # Vector of primitives.
+            cfp.write_line(f"static {cpp_view_list_name(field_type)} peek_{name}(std::span<const uint8_t> record)")
+            cfp.open_block()
+            cfp.write_line(f"std::span<const uint8_t> bytes{{ peek_slot_bytes(record, k_slot_{name}) }};")
+            write_slot_length_skip(cfp, field_type)
+            count_expr = f"(bytes.size() - {length_size}) / sizeof({field_type.type_name})"
+            cfp.write_line(f"return {cpp_view_list_expr(field_type, f'bytes.data() + {length_size}', count_expr)};")
+            cfp.close_block()
+        else:
+            # Lists of strings, HStructs and varints stay encoded. Nested HStructs
+            # can be read in place with their own `_view` or `peek_` accessors.
+            cfp.write_line(f"static std::span<const uint8_t> peek_{name}_bytes(std::span<const uint8_t> record)")
+            cfp.open_block()
+            cfp.write_line(f"return peek_slot_bytes(record, k_slot_{name});")
+            cfp.close_block()
+        cfp.write_line("")
 
 
-def read_into_token_line(file_line: str) -> TokenLine:
-    comment_sym = file_line.find('#')
-    if comment_sym >= 0:
-        file_line = file_line[:comment_sym]
+def write_member_block(cfp: CppFilePrinter, members: List[HField], write_member_func, write_group_func=None):
+    # Runs of more than one fixed-size field or bit flag (see
+    # `group_fixed_size_runs`) go to `write_group_func` as a whole.
+    first = True
+    prev_was_block = False
+    for group in group_fixed_size_runs(members):
+        is_group = len(group) > 1
+        assert not is_group or write_group_func is not None or member_run_kind(group[0].field_type) == "fixed", \
+            "Bit flags have to be written as a group."
+        if write_group_func is None:
+            is_group = False
+        for member in (group[:1] if is_group else group):
+            is_block = is_group or member.field_type.is_list_of_type or member.field_type.is_lazy
+            # Add separating line if prev written section was a block.
+            if not first:
+                if prev_was_block or is_block:
+                    cfp.write_line("")
+
+            if is_group:
+                write_group_func(cfp, group)
+            else:
+                write_member_func(cfp, member)
+
+            prev_was_block = is_block
+            first = False
+
+
+def fixed_run_members(group: List[HField]) -> List[Tuple[HField, int, str]]:
+    # Each member of a run of fixed-size fields with its byte offset in the
+    # run and its size expression.
+    members: List[Tuple[HField, int, str]] = []
+    offset = 0
+    for member in group:
+        field_type = member.field_type
+        if field_type.is_list_of_type:
+            members.append((member, offset, f"sizeof({field_type.type_name}) * {field_type.list_count}"))
+            offset += field_type.byte_size * field_type.list_count
+        else:
+            members.append((member, offset, f"sizeof({field_type.type_name})"))
+            offset += field_type.byte_size
+    return members
+
+
+def bit_flag_expr(bits_name: str, index: int) -> str:
+    return f"(({bits_name}[{index // 8}] >> {index % 8}) & 1) != 0"
+
+
+def write_group_serialize(cfp: CppFilePrinter, group: List[HField]):
+    run_name = f"{group[0].field_name}__run"
+    if field_is_bit_flag(group[0].field_type):
+        # Bit flags, packed into a bitset.
+        byte_count = bit_byte_count(len(group))
+        cfp.write_line(f"std::array<uint8_t, {byte_count}> {run_name}{{}};")
+        for i, member in enumerate(group):
+            cfp.write_line(f"{run_name}[{i // 8}] |= static_cast<uint8_t>({member.field_name} << {i % 8});")
+        cfp.write_line(f"sb.write_bulk({run_name}.data(), 1, {byte_count});")
+        return
+
+    # Copy the fixed-size fields together, then write them as one block.
+    members = fixed_run_members(group)
+    run_size = fixed_run_byte_size(group)
+    cfp.write_line(f"std::array<uint8_t, {run_size}> {run_name};")
+    for member, offset, size_expr in members:
+        source = f"{member.field_name}.data()" if member.field_type.is_list_of_type else f"&{member.field_name}"
+        cfp.write_line(f"std::memcpy({run_name}.data() + {offset}, {source}, {size_expr});")
+    cfp.write_line(f"sb.write_bulk({run_name}.data(), 1, {run_size});")
+
+
+def write_group_deserialize(cfp: CppFilePrinter, group: List[HField], is_view: bool = False):
+    run_name = f"{group[0].field_name}__run"
+    if field_is_bit_flag(group[0].field_type):
+        cfp.write_line(f"const uint8_t* {run_name}{{ static_cast<const uint8_t*>(sb.read_elem({bit_byte_count(len(group))})) }};")
+        for i, member in enumerate(group):
+            cfp.write_line(f"{member.field_name} = {bit_flag_expr(run_name, i)};")
+        return
+
+    # One bounds check for the whole run, then copy the fields out of it.
+    # Views point their arrays into it instead.
+    cfp.write_line(f"const uint8_t* {run_name}{{ static_cast<const uint8_t*>(sb.read_elem({fixed_run_byte_size(group)})) }};")
+    for member, offset, size_expr in fixed_run_members(group):
+        field_type = member.field_type
+        name = member.field_name
+        if is_view and field_type.is_list_of_type:
+            cfp.write_line(f"{name} = {cpp_view_list_expr(field_type, f'{run_name} + {offset}', field_type.list_count)};")
+        else:
+            target = f"{name}.data()" if field_type.is_list_of_type else f"&{name}"
+            cfp.write_line(f"std::memcpy({target}, {run_name} + {offset}, {size_expr});")
+
+
+def write_group_view_deserialize(cfp: CppFilePrinter, group: List[HField]):
+    write_group_deserialize(cfp, group, is_view=True)
+
+
+def write_length_serialize(cfp: CppFilePrinter, field_type: DataType, var_name: str, length_expr: str):
+    cfp.write_line(f"size_t {var_name}{{ {length_expr} }};")
+    if field_type.is_varint:
+        cfp.write_line(f"sb.write_varint({var_name});")
+    else:
+        cfp.write_line(f"sb.write_elem(&{var_name}, sizeof(size_t));")
+
+
+def write_length_deserialize(cfp: CppFilePrinter, field_type: DataType, var_name: str):
+    if field_type.is_varint:
+        cfp.write_line(f"size_t {var_name}{{ sb.read_varint() }};")
+        return
+    cfp.write_line(f"size_t {var_name}{{ sb.read_value<size_t>() }};")
+
+
+def layout_min_byte_size(variant: LayoutVariant) -> int:
+    # Fewest bytes a struct in an older layout takes up on the wire. Plain
+    # fields take at least a byte between them (bitpacked bools share one).
+    size = 0
+    for member in variant.struct.members:
+        field_type = member.field_type
+        if field_type.is_builtin_primitive or (field_type.is_list_of_type and field_type.list_count == -1):
+            size = max(size, 1)
+    for member in variant.struct.members:
+        field_type = member.field_type
+        if field_type.is_builtin_primitive or (field_type.is_list_of_type and field_type.list_count == -1):
+            continue
+        count = field_type.list_count if field_type.is_list_of_type else 1
+        size += count * layout_min_byte_size(variant.nested[field_type.type_name])
+    return size
+
+
+def cpp_list_elem_min_bytes(field_type: DataType, nested: Optional[LayoutVariant] = None) -> str:
+    # Fewest bytes each element of a list takes up on the wire. `nested` is
+    # the layout struct elements are in, if it isn't the current one.
+    if field_varint_elems(field_type):
+        elem = "1"
+    elif field_type.is_string:
+        elem = "1" if field_type.is_varint else "sizeof(size_t)"
+    elif field_type.byte_size > 0:
+        elem = f"sizeof({field_type.type_name})"
+    elif nested is not None:
+        elem = str(layout_min_byte_size(nested))
+    else:
+        elem = f"{field_type.type_name}::k_fixed_serialized_size"
+    if field_type.is_parallel:
+        # Element offset table entry.
+        return f"sizeof(uint64_t) + {elem}"
+    return elem
+
+
+def write_list_count_deserialize(cfp: CppFilePrinter, field_type: DataType, var_name: str,
+                                 nested: Optional[LayoutVariant] = None):
+    # The count is checked against what's left to read before anything gets
+    # sized by it, so corrupt data throws instead of overflowing or
+    # allocating gigabytes.
+    write_length_deserialize(cfp, field_type, var_name)
+    if not field_type.is_bitpacked:
+        # `read_bits` checks its bytes before sizing anything.
+        cfp.write_line(f"sb.check_list_count({var_name}, {cpp_list_elem_min_bytes(field_type, nested)});")
+
+
+def struct_has_lazy_fields(struct: HStruct) -> bool:
+    return any(member.field_type.is_lazy for member in struct.members)
+
+
+def write_member_serialize(cfp: CppFilePrinter, member: HField):
+    if not member.field_type.is_lazy:
+        write_member_value_serialize(cfp, member)
+        return
+
+    # Reserve the byte size prefix, then patch it once the field is written.
+    name = member.field_name
+    cfp.write_line(f"size_t {name}__lazy_position{{ sb.write_position() }};")
+    cfp.write_line(f"size_t {name}__lazy_size{{ 0 }};")
+    cfp.write_line(f"sb.write_elem(&{name}__lazy_size, sizeof(size_t));")
+    write_member_value_serialize(cfp, member)
+    cfp.write_line(f"{name}__lazy_size = sb.write_position() - {name}__lazy_position - sizeof(size_t);")
+    cfp.write_line(f"sb.patch_bulk({name}__lazy_position, &{name}__lazy_size, sizeof(size_t), 1);")
+
+
+def write_lazy_size_skip(cfp: CppFilePrinter):
+    cfp.write_line("sb.read_elem(sizeof(size_t));  // Byte size prefix is only needed for skipping.")
+
+
+def write_member_value_serialize(cfp: CppFilePrinter, member: HField):
+    field_type = member.field_type
+    name = member.field_name
+
+    iterations = 1  # Default 1 for if not a list.
+    if field_type.is_list_of_type:
+        if field_type.list_count == -1:
+            # Is vector, write count as int right now.
+            write_length_serialize(cfp, field_type, f"{name}__list_count", f"{name}.size()")
+            iterations = f"{name}__list_count"
+        else:
+            # Is array, use fixed count.
+            iterations = field_type.list_count
+            assert iterations > 0, f"Bad list_count: {iterations}"
+
+    if field_type.is_bitpacked and field_type.is_list_of_type:
+        cfp.write_line(f"sb.write_bits({name}, {iterations});")
+        return
+    if field_type_is_bulk_copyable(field_type):
+        # Write out all elements as one block.
+        cfp.write_line(f"sb.write_bulk({name}.data(), sizeof({field_type.type_name}), {iterations});")
+        return
+    if field_type.is_parallel:
+        # Element offset table, then the elements (across threads if there are enough).
+        cfp.write_line(f"write_parallel_list(sb, {name});")
+        return
+
+    # Write out elements.
+    field_suffix = ""
+    if field_type.is_list_of_type:
+        cfp.write_line(f"for (size_t i = 0; i < {iterations}; i++)")
+        cfp.open_block()
+        field_suffix = "[i]"
+    if field_type.is_builtin_primitive:
+        # Write primitive.
+        if field_type.is_string:
+            write_length_serialize(cfp, field_type, f"{name}__str_length", f"{name}{field_suffix}.length()")
+            cfp.write_line(f"sb.write_elem({name}{field_suffix}.data(), sizeof(char) * {name}__str_length);")
+        elif field_varint_elems(field_type):
+            cfp.write_line(f"sb.write_varint({cpp_varint_encode_expr(field_type, name + field_suffix)});")
+        elif field_type.is_list_of_type and field_type.list_count == -1 and field_type.type_name == 'bool':
+            # `std::vector<bool>` elements are bits, so there's nothing to point at.
+            cfp.write_line(f"bool {name}__elem{{ {name}[i] }};")
+            cfp.write_line(f"sb.write_elem(&{name}__elem, sizeof(bool));")
+        else:
+            cfp.write_line(f"sb.write_elem(&{name}{field_suffix}, sizeof({field_type.type_name}));")
+    else:
+        # Recurse thru HStruct write func.
+        cfp.write_line(f"{name}{field_suffix}.write_data_to_serial_buffer(sb);")
+    if field_type.is_list_of_type:
+        cfp.close_block()
+
 
-    line_len = len(file_line)
-    line_len_left_trimmed = len(file_line.lstrip())
-    indentation_amt = line_len - line_len_left_trimmed
+def write_member_deserialize(cfp: CppFilePrinter, member: HField, nested: Optional[LayoutVariant] = None):
+    if member.field_type.is_lazy:
+        write_lazy_size_skip(cfp)
+    write_member_value_deserialize(cfp, member, nested)
 
-    tokens = file_line.split()
-    return TokenLine(indentation_amt, tokens)
 
+def write_member_value_deserialize(cfp: CppFilePrinter, member: HField, nested: Optional[LayoutVariant] = None):
+    # `nested` is the older layout a nested struct field is in, in the
+    # readers of older layouts.
+    field_type = member.field_type
+    name = member.field_name
+    read_func = "read_data_from_serial_buffer" if nested is None else previous_layout_read_func_name(nested.fingerprint)
 
-def parse_struct_import_token_line(tokens: List[str]) -> str:
-    assert len(tokens) == 2, f'Improper number of tokens in list: {tokens}'
-    assert tokens[0] == 'import', f'First token isn\'t `import`: {tokens[0]}'
-    return tokens[1]
+    iterations = 1  # Default 1 for if not a list.
+    use_emplace_back = False
+    if field_type.is_list_of_type:
+        if field_type.list_count == -1:
+            # Is vector, read count as int right now.
+            write_list_count_deserialize(cfp, field_type, f"{name}__list_count", nested)
+            iterations = f"{name}__list_count"
+            if field_type.is_parallel:
+                # Element offset table, then the elements (across threads if there are enough).
+                if nested is None:
+                    cfp.write_line(f"read_parallel_list(sb, {name}, {name}__list_count);")
+                else:
+                    cfp.write_line(f"read_parallel_list(sb, {name}, {name}__list_count, [](auto& elem, SerialBuffer& elem_sb) {{ elem.{read_func}(elem_sb); }});")
+                return
+            if field_type.is_bitpacked:
+                cfp.write_line(f"sb.read_bits({name}, {name}__list_count);")
+                return
+            if field_type_is_bulk_copyable(field_type):
+                cfp.write_line(f"{name}.resize({name}__list_count);")
+            else:
+                cfp.write_line(f"{name}.clear();")
+                cfp.write_line(f"{name}.reserve({name}__list_count);")
+                use_emplace_back = True
+        else:
+            # Is array, use fixed count.
+            iterations = field_type.list_count
+            assert iterations > 0, f"Bad list_count: {iterations}"
+
+    if field_type.is_bitpacked and field_type.is_list_of_type:
+        cfp.write_line(f"sb.read_bits({name}, {iterations});")
+        return
+    if field_type_is_bulk_copyable(field_type):
+        # Read in all elements as one block.
+        cfp.write_line(f"sb.read_bulk({name}.data(), sizeof({field_type.type_name}), {iterations});")
+        return
+
+    # Read in elements.
+    field_suffix = ""
+    if field_type.is_list_of_type:
+        cfp.write_line(f"for (size_t i = 0; i < {iterations}; i++)")
+        cfp.open_block()
+        field_suffix = "[i]"
+    if use_emplace_back:
+        if field_type.is_builtin_primitive:
+            # Read primitive.
+            if field_type.is_string:
+                write_length_deserialize(cfp, field_type, f"{name}__str_length")
+                cfp.write_line(f"{name}.emplace_back(reinterpret_cast<const char*>(sb.read_elem(sizeof(char) * {name}__str_length)), {name}__str_length);")
+            elif field_varint_elems(field_type):
+                cfp.write_line(f"{name}.emplace_back({cpp_varint_decode_expr(field_type)});")
+            else:
+                cfp.write_line(f"{name}.emplace_back(sb.read_value<{field_type.type_name}>());")
+        else:
+            # Recurse thru HStruct read func.
+            if field_type.is_pmr:
+                # Constructed in place, so it gets the vector's allocator.
+                cfp.write_line(f"{name}.emplace_back();")
+            else:
+                cfp.write_line(f"{name}.emplace_back({field_type.type_name}{{}});")
+            cfp.write_line(f"{name}.back().{read_func}(sb);")
+    else:
+        if field_type.is_builtin_primitive:
+            # Read primitive.
+            if field_type.is_string:
+                write_length_deserialize(cfp, field_type, f"{name}__str_length")
+                if field_type.is_pmr:
+                    # Assigned in place, so it keeps its allocator.
+                    cfp.write_line(f"{name}{field_suffix}.assign(reinterpret_cast<const char*>(sb.read_elem(sizeof(char) * {name}__str_length)), {name}__str_length);")
+                else:
+                    cfp.write_line(f"{name}{field_suffix} = std::string{{ reinterpret_cast<const char*>(sb.read_elem(sizeof(char) * {name}__str_length)), {name}__str_length }};")
+            elif field_varint_elems(field_type):
+                cfp.write_line(f"{name}{field_suffix} = {cpp_varint_decode_expr(field_type)};")
+            else:
+                cfp.write_line(f"{name}{field_suffix} = sb.read_value<{field_type.type_name}>();")
+        else:
+            # Recurse thru HStruct read func.
+            cfp.write_line(f"{name}{field_suffix}.{read_func}(sb);")
+    if field_type.is_list_of_type:
+        cfp.close_block()
 
 
-def parse_struct_name_token_line(tokens: List[str]) -> str:
-    assert len(tokens) == 2, f'Improper number of tokens in list: {tokens}'
-    assert tokens[0] == 'struct', f'First token isn\'t `struct`: {tokens[0]}'
-    assert tokens[1][-1] == ':', f'Second token doesn\'t end with `:`: {tokens[1]}'
-    return tokens[1][:-1]
+def write_member_view_deserialize(cfp: CppFilePrinter, member: HField):
+    if member.field_type.is_lazy:
+        write_lazy_size_skip(cfp)
+    write_member_view_value_deserialize(cfp, member)
 
 
-def parse_struct_member_field_token_line(tokens: List[str]) -> HField:
-    assert len(tokens) == 2, f'Improper number of tokens in list: {tokens}'
-    line_type = DataType(tokens[0])
-    variable_name = tokens[1]
-    return HField(line_type, variable_name)
+def write_member_view_value_deserialize(cfp: CppFilePrinter, member: HField):
+    field_type = member.field_type
+    name = member.field_name
 
+    iterations = 1
+    if field_type.is_list_of_type:
+        if field_type.list_count == -1:
+            write_list_count_deserialize(cfp, field_type, f"{name}__list_count")
+            iterations = f"{name}__list_count"
+            if field_type.is_parallel:
+                cfp.write_line(f"sb.read_elem(sizeof(uint64_t) * {iterations});  // Element offset table is only needed for parallel reads.")
+        else:
+            iterations = field_type.list_count
+
+    if field_type.is_bitpacked and field_type.is_list_of_type:
+        # Decoded into owned values.
+        cfp.write_line(f"sb.read_bits({name}, {iterations});")
+        return
+    if field_varint_elems(field_type):
+        # Decoded into owned values.
+        if not field_type.is_list_of_type:
+            cfp.write_line(f"{name} = {cpp_varint_decode_expr(field_type)};")
+            return
+        if field_type.list_count == -1:
+            cfp.write_line(f"{name}.resize({iterations});")
+        cfp.write_line(f"for (size_t i = 0; i < {iterations}; i++)")
+        cfp.open_block()
+        cfp.write_line(f"{name}[i] = {cpp_varint_decode_expr(field_type)};")
+        cfp.close_block()
+        return
+
+    if field_type.is_builtin_primitive and not field_type.is_string:
+        if field_type.is_list_of_type:
+            # Span over the whole list.
+            bytes_expr = f"static_cast<const uint8_t*>(sb.read_elem(sizeof({field_type.type_name}) * {iterations}))"
+            cfp.write_line(f"{name} = {cpp_view_list_expr(field_type, bytes_expr, iterations)};")
+        else:
+            cfp.write_line(f"{name} = sb.read_value<{field_type.type_name}>();")
+        return
 
-def field_type_name_to_cpp_name(field_type: DataType):
-    type_name = field_type.type_name
+    field_suffix = ""
     if field_type.is_list_of_type:
-        assert field_type.list_count != 0, "Malformed list_count"
         if field_type.list_count == -1:
-            type_name = f"std::vector<{field_type.type_name}>"
+            cfp.write_line(f"{name}.resize({iterations});")
+        cfp.write_line(f"for (size_t i = 0; i < {iterations}; i++)")
+        cfp.open_block()
+        field_suffix = "[i]"
+    if field_type.is_string:
+        write_length_deserialize(cfp, field_type, f"{name}__str_length")
+        cfp.write_line(f"{name}{field_suffix} = std::string_view{{ reinterpret_cast<const char*>(sb.read_elem(sizeof(char) * {name}__str_length)), {name}__str_length }};")
+    else:
+        cfp.write_line(f"{name}{field_suffix}.read_view_from_serial_buffer(sb);")
+    if field_type.is_list_of_type:
+        cfp.close_block()
+
+
+def write_members_deserialize(cfp: CppFilePrinter, struct: HStruct, write_member_func, table_count_expr: str = "",
+                              write_group_func=None):
+    if not struct_is_packed(struct):
+        write_member_block(cfp, struct.members, write_member_func, write_group_func)
+        return
+
+    fixed_members, variable_members = split_packed_members(struct)
+    write_member_block(cfp, fixed_members, write_member_func, write_group_func)
+    if len(variable_members) == 0:
+        return
+
+    # Reading in order never needs the offset table, so skip over it.
+    cfp.write_line("")
+    cfp.write_line("// Offset table is only needed for in-place access.")
+    table_count_expr = table_count_expr or f"{struct.struct_name}::k_packed_offset_table_count"
+    cfp.write_line(f"sb.read_elem(sizeof(uint64_t) * {table_count_expr});")
+    cfp.write_line("")
+    write_member_block(cfp, variable_members, write_member_func, write_group_func)
+
+
+def field_type_is_pmr_plain(field_type: DataType) -> bool:
+    # Primitives and arrays of them, which don't allocate.
+    if not field_type.is_builtin_primitive or field_type.is_string:
+        return False
+    return not field_type.is_list_of_type or field_type.list_count > 0
+
+
+def pmr_member_init(member: HField, source: str) -> Optional[str]:
+    # Member initializer of a `pmr` struct's constructors, constructing the
+    # member with `allocator`. `source` is "" (nothing else), "copy" or
+    # "move" (from `other`). None if the member isn't initialized.
+    field_type = member.field_type
+    name = member.field_name
+    if field_type_is_pmr_plain(field_type):
+        return None if source == "" else f"{name}{{ other.{name} }}"
+    source_expr = {"": "", "copy": f"other.{name}", "move": f"std::move(other.{name})"}[source]
+    if field_type.is_list_of_type and field_type.list_count > 0:
+        # Every element of an array gets the allocator.
+        elem_name = field_type_elem_cpp_name(field_type)
+        index_param = "size_t i" if source != "" else "size_t"
+        elem_args = f", {source_expr}[i]" if source == "copy" else f", std::move(other.{name}[i])" if source == "move" else ""
+        return f"{name}{{ make_array_of<{elem_name}, {field_type.list_count}>([&]({index_param}) {{ return std::make_obj_using_allocator<{elem_name}>(allocator{elem_args}); }}) }}"
+    args = f", {source_expr}" if source != "" else ""
+    return f"{name}{{ std::make_obj_using_allocator<{field_type_name_to_cpp_name(field_type)}>(allocator{args}) }}"
+
+
+def write_pmr_constructor(cfp: CppFilePrinter, struct: HStruct, signature: str, source: str):
+    inits = [init for init in (pmr_member_init(member, source) for member in struct.members) if init is not None]
+    if len(inits) == 0:
+        cfp.write_line(signature)
+    else:
+        cfp.write_line(f"{signature} :")
+        for i, init in enumerate(inits):
+            cfp.write_line(" " * INDENTATION_AMOUNT + init + ("," if i + 1 < len(inits) else ""))
+    cfp.open_block()
+    cfp.close_block()
+
+
+def write_pmr_constructors(cfp: CppFilePrinter, struct: HStruct):
+    # Makes the struct allocator-aware, so containers of it hand their
+    # allocator down and a whole object graph comes out of one memory
+    # resource.
+    name = struct.struct_name
+    cfp.write_line("// Strings, vectors and nested `pmr` structs allocate from the memory resource")
+    cfp.write_line("// the struct was constructed with.")
+    cfp.write_line("using allocator_type = std::pmr::polymorphic_allocator<std::byte>;")
+    cfp.write_line("")
+    cfp.write_line(f"{name}() : {name}(allocator_type{{}}) {{}}")
+    cfp.write_line(f"{name}(const {name}&) = default;")
+    cfp.write_line(f"{name}({name}&&) = default;")
+    cfp.write_line(f"{name}& operator=(const {name}&) = default;")
+    cfp.write_line(f"{name}& operator=({name}&&) = default;")
+    cfp.write_line("")
+    write_pmr_constructor(cfp, struct, f"explicit {name}(const allocator_type& allocator)", "")
+    cfp.write_line("")
+    write_pmr_constructor(cfp, struct, f"{name}(const {name}& other, const allocator_type& allocator)", "copy")
+    cfp.write_line("")
+    write_pmr_constructor(cfp, struct, f"{name}({name}&& other, const allocator_type& allocator)", "move")
+    cfp.write_line("")
+
+
+def profiled_member_func(struct: HStruct, op: str, write_member_func, is_group: bool = False):
+    # Wraps each field's code in a scope timing it for `hstruct_profile.h`.
+    # Runs of fields written together are reported as `first..last`.
+    def write_profiled_member(cfp: CppFilePrinter, member):
+        field_name = f"{member[0].field_name}..{member[-1].field_name}" if is_group else member.field_name
+        cfp.open_block()
+        cfp.write_line(f"HSTRUCT_PROFILE_FIELD(sb, {op}, \"{struct.struct_name}\", \"{field_name}\");")
+        write_member_func(cfp, member)
+        cfp.close_block()
+    return write_profiled_member
+
+
+def write_serialize_method(cfp: CppFilePrinter, struct: HStruct, profile_hooks: bool = False):
+    cfp.write_line("void write_data_to_serial_buffer(SerialBuffer& sb) override")
+    cfp.open_block()
+
+    write_member_func = write_member_serialize
+    write_group_func = write_group_serialize
+    if profile_hooks:
+        write_member_func = profiled_member_func(struct, "write", write_member_func)
+        write_group_func = profiled_member_func(struct, "write", write_group_func, is_group=True)
+
+    if not struct_is_packed(struct):
+        write_member_block(cfp, struct.members, write_member_func, write_group_func)
+        cfp.close_block()
+        return
+
+    fixed_members, variable_members = split_packed_members(struct)
+    if len(variable_members) == 0:
+        write_member_block(cfp, fixed_members, write_member_func, write_group_func)
+        cfp.close_block()
+        return
+
+    cfp.write_line("size_t record_start{ sb.write_position() };")
+    write_member_block(cfp, fixed_members, write_member_func, write_group_func)
+    cfp.write_line("")
+
+    # Reserve the offset table, then patch it once the offsets are known.
+    cfp.write_line("std::array<uint64_t, k_packed_offset_table_count> offset_table{};")
+    cfp.write_line("size_t offset_table_position{ sb.write_position() };")
+    cfp.write_line("sb.write_bulk(offset_table.data(), sizeof(uint64_t), k_packed_offset_table_count);")
+    for member in variable_members:
+        cfp.write_line("")
+        cfp.write_line(f"offset_table[k_slot_{member.field_name}] = sb.write_position() - record_start;")
+        write_member_func(cfp, member)
+    cfp.write_line("")
+    cfp.write_line(f"offset_table[{len(variable_members)}] = sb.write_position() - record_start;")
+    cfp.write_line("sb.patch_bulk(offset_table_position, offset_table.data(), sizeof(uint64_t), k_packed_offset_table_count);")
+    cfp.close_block()
+
+
+def write_deserialize_method(cfp: CppFilePrinter, struct: HStruct, profile_hooks: bool = False):
+    cfp.write_line(f"void read_data_from_serial_buffer(SerialBuffer& sb) override")
+    cfp.open_block()
+    write_member_func = write_member_deserialize
+    write_group_func = write_group_deserialize
+    if profile_hooks:
+        write_member_func = profiled_member_func(struct, "read", write_member_func)
+        write_group_func = profiled_member_func(struct, "read", write_group_func, is_group=True)
+    write_members_deserialize(cfp, struct, write_member_func, write_group_func=write_group_func)
+    cfp.close_block()
+
+
+def previous_layout_read_func_name(fingerprint: int) -> str:
+    return f"read_previous_{fingerprint:016x}_from_serial_buffer"
+
+
+def field_type_is_numeric_primitive(field_type: DataType) -> bool:
+    return field_type.is_builtin_primitive and not field_type.is_string
+
+
+def write_member_migrate(cfp: CppFilePrinter, previous_member: HField, current_members: Dict[str, HField],
+                         nested: Dict[str, LayoutVariant], value_expr: str = ""):
+    # Decodes a field of an older layout. Fields with the same name and C++
+    # type are read straight into the member, numbers and lists of numbers
+    # of another type are converted, and everything else is read past.
+    # Nested structs are read in their layout from `nested`. `value_expr` is
+    # the already decoded value of a bit flag.
+    name = previous_member.field_name
+    previous_type = previous_member.field_type
+    nested_variant = nested.get(previous_type.type_name)
+    if nested_variant is not None and nested_variant.is_current:
+        nested_variant = None
+    current = current_members.get(name)
+    previous_cpp_name = field_type_name_to_cpp_name(previous_type)
+    if current is not None and field_type_name_to_cpp_name(current.field_type) == previous_cpp_name:
+        if value_expr:
+            cfp.write_line(f"{name} = {value_expr};")
+        else:
+            write_member_deserialize(cfp, previous_member, nested_variant)
+        return
+
+    local_name = f"{name}__previous"
+    if value_expr:
+        cfp.write_line(f"{previous_cpp_name} {local_name}{{ {value_expr} }};")
+    else:
+        cfp.write_line(f"{previous_cpp_name} {local_name}{{}};")
+        write_member_deserialize(cfp, HField(previous_type, local_name), nested_variant)
+    current_type = current.field_type if current is not None else None
+    if current_type is None:
+        cfp.write_line(f"(void){local_name};  // No longer a field.")
+    elif not (field_type_is_numeric_primitive(previous_type) and field_type_is_numeric_primitive(current_type)) \
+            or previous_type.is_list_of_type != current_type.is_list_of_type:
+        cfp.write_line(f"(void){local_name};  // Type changed to `{field_type_name_to_cpp_name(current_type)}`, which can't be converted. Left at its default.")
+    elif not current_type.is_list_of_type:
+        cfp.write_line(f"{name} = static_cast<{current_type.type_name}>({local_name});")
+    elif current_type.list_count == -1:
+        cfp.write_line(f"{name}.resize({local_name}.size());")
+        cfp.write_line(f"std::transform({local_name}.begin(), {local_name}.end(), {name}.begin(), [](auto value) {{ return static_cast<{current_type.type_name}>(value); }});")
+    else:
+        # Copies as many elements as fit into the array.
+        cfp.write_line(f"for (size_t i = 0; i < std::min<size_t>({local_name}.size(), {current_type.list_count}); i++)")
+        cfp.open_block()
+        cfp.write_line(f"{name}[i] = static_cast<{current_type.type_name}>({local_name}[i]);")
+        cfp.close_block()
+
+
+def write_previous_layout_read_method(cfp: CppFilePrinter, struct: HStruct, variant: LayoutVariant):
+    previous = variant.struct
+    fingerprint = variant.fingerprint
+    cfp.write_line(f"// Reads the older layout with fingerprint 0x{fingerprint:016x} field by field.")
+    older_nested = [name for name, nested in variant.nested.items() if not nested.is_current]
+    if len(older_nested) > 0:
+        layout_name = "current layout" if previous is struct else "`previous` layout"
+        cfp.write_line(f"// That's the {layout_name} with {', '.join(f'`{name}`' for name in older_nested)} in an older layout.")
+    cfp.write_line("// Fields it doesn't have are left at their defaults.")
+    cfp.write_line(f"void {previous_layout_read_func_name(fingerprint)}(SerialBuffer& sb)")
+    cfp.open_block()
+    cfp.write_line(f"*this = {struct.struct_name}{{}};")
+    current_members = {member.field_name: member for member in struct.members}
+
+    def write_group_migrate(cfp: CppFilePrinter, group: List[HField]):
+        if not field_is_bit_flag(group[0].field_type):
+            for member in group:
+                write_member_migrate(cfp, member, current_members, variant.nested)
+            return
+        run_name = f"{group[0].field_name}__run"
+        cfp.write_line(f"const uint8_t* {run_name}{{ static_cast<const uint8_t*>(sb.read_elem({bit_byte_count(len(group))})) }};")
+        for i, member in enumerate(group):
+            write_member_migrate(cfp, member, current_members, variant.nested, bit_flag_expr(run_name, i))
+
+    write_members_deserialize(
+        cfp, previous,
+        lambda cfp, member: write_member_migrate(cfp, member, current_members, variant.nested),
+        str(packed_offset_table_count(previous)),
+        write_group_migrate,
+    )
+    cfp.close_block()
+
+
+def write_equality_operator(cfp: CppFilePrinter, struct: HStruct):
+    # Field by field, `HStruct_ifc` rules out `= default`.
+    cfp.write_line(f"bool operator==(const {struct.struct_name}& other) const")
+    cfp.open_block()
+    if len(struct.members) == 0:
+        cfp.write_line("return true;")
+    for i, member in enumerate(struct.members):
+        name = member.field_name
+        prefix = "return " if i == 0 else "    && "
+        suffix = ";" if i == len(struct.members) - 1 else ""
+        cfp.write_line(f"{prefix}{name} == other.{name}{suffix}")
+    cfp.close_block()
+
+
+def field_is_delta_list(field_type: DataType) -> bool:
+    # Lists diffed element by element. Bitpacked ones are written whole.
+    return field_type.is_list_of_type and not field_type.is_bitpacked
+
+
+def write_delta_elem_serialize(cfp: CppFilePrinter, member: HField):
+    # Writes element `i` of a list inside a `write_delta_*` callback.
+    field_type = member.field_type
+    name = member.field_name
+    elem = f"{name}[i]"
+    if not field_type.is_builtin_primitive:
+        if field_type.list_count == -1:
+            # Elements past the end of `prev` are diffed against a new one.
+            cfp.write_line(f"if (i < prev.{name}.size())")
+            cfp.open_block()
+            cfp.write_line(f"{elem}.write_delta(prev.{elem}, sb);")
+            cfp.close_block()
+            cfp.write_line("else")
+            cfp.open_block()
+            cfp.write_line(f"{elem}.write_delta({field_type.type_name}{{}}, sb);")
+            cfp.close_block()
         else:
-            type_name = f"std::array<{field_type.type_name}, {field_type.list_count}>"
-    return type_name
+            cfp.write_line(f"{elem}.write_delta(prev.{elem}, sb);")
+    elif field_type.is_string:
+        write_length_serialize(cfp, field_type, f"{name}__str_length", f"{elem}.length()")
+        cfp.write_line(f"sb.write_elem({elem}.data(), sizeof(char) * {name}__str_length);")
+    elif field_varint_elems(field_type):
+        cfp.write_line(f"sb.write_varint({cpp_varint_encode_expr(field_type, elem)});")
+    elif field_type.list_count == -1 and field_type.type_name == 'bool':
+        # `std::vector<bool>` elements are bits, so there's nothing to point at.
+        cfp.write_line(f"bool {name}__elem{{ {elem} }};")
+        cfp.write_line(f"sb.write_elem(&{name}__elem, sizeof(bool));")
+    else:
+        cfp.write_line(f"sb.write_elem(&{elem}, sizeof({field_type.type_name}));")
+
+
+def write_delta_elem_deserialize(cfp: CppFilePrinter, member: HField):
+    # Reads element `i` of a list inside a `read_delta_*` callback.
+    field_type = member.field_type
+    name = member.field_name
+    elem = f"{name}[i]"
+    if not field_type.is_builtin_primitive:
+        cfp.write_line(f"{elem}.apply_delta(sb);")
+    elif field_type.is_string:
+        write_length_deserialize(cfp, field_type, f"{name}__str_length")
+        if field_type.is_pmr:
+            # Assigned in place, so it keeps its allocator.
+            cfp.write_line(f"{elem}.assign(reinterpret_cast<const char*>(sb.read_elem(sizeof(char) * {name}__str_length)), {name}__str_length);")
+        else:
+            cfp.write_line(f"{elem} = std::string{{ reinterpret_cast<const char*>(sb.read_elem(sizeof(char) * {name}__str_length)), {name}__str_length }};")
+    elif field_varint_elems(field_type):
+        cfp.write_line(f"{elem} = {cpp_varint_decode_expr(field_type)};")
+    else:
+        cfp.write_line(f"{elem} = sb.read_value<{field_type.type_name}>();")
+
 
+def write_member_delta_serialize(cfp: CppFilePrinter, member: HField):
+    field_type = member.field_type
+    name = member.field_name
+    if field_is_delta_list(field_type):
+        if field_type.list_count == -1:
+            write_length_serialize(cfp, field_type, f"{name}__list_count", f"{name}.size()")
+            cfp.open_block(f"write_delta_runs(sb, {name}, prev.{name}, [&](size_t i) {{")
+        else:
+            cfp.open_block(f"write_delta_elems(sb, {name}, prev.{name}, [&](size_t i) {{")
+        write_delta_elem_serialize(cfp, member)
+        cfp.close_block("});")
+    elif not field_type.is_builtin_primitive and not field_type.is_list_of_type:
+        cfp.write_line(f"{name}.write_delta(prev.{name}, sb);")
+    else:
+        # Written whole, without a `lazy` size prefix.
+        write_member_value_serialize(cfp, member)
+
+
+def write_member_delta_deserialize(cfp: CppFilePrinter, member: HField):
+    field_type = member.field_type
+    name = member.field_name
+    if field_is_delta_list(field_type):
+        if field_type.list_count == -1:
+            write_length_deserialize(cfp, field_type, f"{name}__list_count")
+            # Unchanged elements take up no bytes, but every element past
+            # the old count is written out.
+            new_elem_bytes = cpp_list_elem_min_bytes(field_type) if field_type.is_builtin_primitive else "1"
+            cfp.write_line(f"if ({name}__list_count > {name}.size())")
+            cfp.open_block()
+            cfp.write_line(f"sb.check_list_count({name}__list_count - {name}.size(), {new_elem_bytes});")
+            cfp.close_block()
+            cfp.write_line(f"{name}.resize({name}__list_count);")
+            cfp.open_block(f"read_delta_runs(sb, {name}, [&](size_t i) {{")
+        else:
+            cfp.open_block(f"read_delta_elems(sb, {name}, [&](size_t i) {{")
+        write_delta_elem_deserialize(cfp, member)
+        cfp.close_block("});")
+    elif not field_type.is_builtin_primitive and not field_type.is_list_of_type:
+        cfp.write_line(f"{name}.apply_delta(sb);")
+    else:
+        write_member_value_deserialize(cfp, member)
+
+
+def write_delta_methods(cfp: CppFilePrinter, struct: HStruct):
+    # A delta is a bitmask of the fields that changed (in declaration order,
+    # lowest bit first), then each changed field. Nested structs and lists
+    # are deltas of their own, everything else is written as usual.
+    mask_bytes = bit_byte_count(len(struct.members))
+    cfp.write_line("// Writes only what changed since `prev`, for `apply_delta` on a copy of")
+    cfp.write_line("// `prev` to catch up with. Not a file: there's no schema header.")
+    cfp.write_line(f"void write_delta(const {struct.struct_name}& prev, SerialBuffer& sb)")
+    cfp.open_block()
+    cfp.write_line(f"std::array<uint8_t, {mask_bytes}> delta__mask{{}};")
+    for i, member in enumerate(struct.members):
+        name = member.field_name
+        cfp.write_line(f"delta__mask[{i // 8}] |= static_cast<uint8_t>(({name} != prev.{name}) << {i % 8});")
+    cfp.write_line(f"sb.write_bulk(delta__mask.data(), 1, {mask_bytes});")
+    for i, member in enumerate(struct.members):
+        cfp.write_line("")
+        cfp.write_line(f"if ({bit_flag_expr('delta__mask', i)})")
+        cfp.open_block()
+        write_member_delta_serialize(cfp, member)
+        cfp.close_block()
+    cfp.close_block()
+    cfp.write_line("")
+
+    cfp.write_line("// Applies a `write_delta` to the `prev` it was written against.")
+    cfp.write_line("void apply_delta(SerialBuffer& sb)")
+    cfp.open_block()
+    cfp.write_line(f"std::array<uint8_t, {mask_bytes}> delta__mask;")
+    cfp.write_line(f"sb.read_bulk(delta__mask.data(), 1, {mask_bytes});")
+    for i, member in enumerate(struct.members):
+        cfp.write_line("")
+        cfp.write_line(f"if ({bit_flag_expr('delta__mask', i)})")
+        cfp.open_block()
+        write_member_delta_deserialize(cfp, member)
+        cfp.close_block()
+    cfp.close_block()
+
+
+def write_throw_unless(cfp: CppFilePrinter, condition: str, message: str):
+    # `message` gets the file name appended.
+    cfp.write_line(f"if (!{condition})")
+    cfp.open_block()
+    cfp.write_line(f"throw std::runtime_error{{ \"{message} \" + fname }};")
+    cfp.close_block()
+
+
+def write_read_file_method(cfp: CppFilePrinter, previous_fingerprints: List[int]):
+    cfp.write_line("// Reads a dumped file's header and the data after it. Files written in a")
+    cfp.write_line("// `previous` layout (or with nested structs in theirs) get migrated. Fails")
+    cfp.write_line("// on any other schema.")
+    cfp.write_line("bool read_file_from_serial_buffer(SerialBuffer& sb)")
+    cfp.open_block()
+    cfp.write_line("uint64_t fingerprint{ 0 };")
+    cfp.write_line("if (!SchemaHeader::read(sb, fingerprint))")
+    cfp.open_block()
+    cfp.write_line("return false;")
+    cfp.close_block()
+    cfp.write_line("if (fingerprint == k_schema_fingerprint)")
+    cfp.open_block()
+    cfp.write_line("read_data_from_serial_buffer(sb);")
+    cfp.write_line("return true;")
+    cfp.close_block()
+    for fingerprint in previous_fingerprints:
+        cfp.write_line(f"if (fingerprint == 0x{fingerprint:016x}ull)")
+        cfp.open_block()
+        cfp.write_line(f"{previous_layout_read_func_name(fingerprint)}(sb);")
+        cfp.write_line("return true;")
+        cfp.close_block()
+    cfp.write_line("return false;")
+    cfp.close_block()
+
+
+def write_attach_file_method(cfp: CppFilePrinter, struct: HStruct, read_func_name: str):
+    cfp.write_line("// Same as `attach`, for the bytes of a whole raw `serialize_dump`ed file.")
+    cfp.write_line("// Fails if the file was written with a different schema.")
+    cfp.write_line("bool attach_file(std::span<const uint8_t> bytes)")
+    cfp.open_block()
+    cfp.write_line("SerialBuffer sb;")
+    cfp.write_line("sb.attach_read_view(bytes);")
+    cfp.write_line("uint64_t fingerprint{ 0 };")
+    cfp.write_line(f"if (!SchemaHeader::read(sb, fingerprint) || fingerprint != {struct.struct_name}::k_schema_fingerprint)")
+    cfp.open_block()
+    cfp.write_line("return false;")
+    cfp.close_block()
+    cfp.write_line(f"{read_func_name}(sb);")
+    cfp.write_line("return true;")
+    cfp.close_block()
+
+
+def write_view_struct(cfp: CppFilePrinter, struct: HStruct):
+    view_name = f"{struct.struct_name}_view"
+    cfp.write_line(f"// Read-only view of a serialized `{struct.struct_name}`. Strings and primitive")
+    cfp.write_line("// lists point into the serialized bytes, which must outlive the view.")
+    cfp.write_line(f"struct {view_name}")
+    cfp.open_block()
+
+    # Write out member variables.
+    for member in struct.members:
+        cfp.write_line(f"{field_type_name_to_cpp_view_name(member.field_type)} {member.field_name};")
+    cfp.write_line("")
+
+    # attach().
+    cfp.write_line("void attach(std::span<const uint8_t> bytes)")
+    cfp.open_block()
+    cfp.write_line("SerialBuffer sb;")
+    cfp.write_line("sb.attach_read_view(bytes);")
+    cfp.write_line("read_view_from_serial_buffer(sb);")
+    cfp.close_block()
+    cfp.write_line("")
+
+    # attach_file().
+    write_attach_file_method(cfp, struct, "read_view_from_serial_buffer")
+    cfp.write_line("")
+
+    # read_view_from_serial_buffer().
+    cfp.write_line("void read_view_from_serial_buffer(SerialBuffer& sb)")
+    cfp.open_block()
+    write_members_deserialize(cfp, struct, write_member_view_deserialize, write_group_func=write_group_view_deserialize)
+    cfp.close_block()
+    cfp.close_block("};")
+
+
+def write_member_lazy_deserialize(cfp: CppFilePrinter, member: HField):
+    if not member.field_type.is_lazy:
+        write_member_value_deserialize(cfp, member)
+        return
+
+    # Only remember where the field is.
+    name = member.field_name
+    cfp.write_line(f"size_t {name}__lazy_size{{ sb.read_value<size_t>() }};")
+    cfp.write_line(f"{name}__bytes = {{ reinterpret_cast<const uint8_t*>(sb.read_elem({name}__lazy_size)), {name}__lazy_size }};")
+    cfp.write_line(f"{name}__value.reset();")
+
+
+def write_lazy_struct(cfp: CppFilePrinter, struct: HStruct):
+    lazy_name = f"{struct.struct_name}_lazy"
+    cfp.write_line(f"// Lazily decoded `{struct.struct_name}`. `attach` decodes the eager fields and")
+    cfp.write_line("// skips over the `lazy` ones, which get decoded on first access. The")
+    cfp.write_line("// serialized bytes must outlive it.")
+    cfp.write_line(f"struct {lazy_name}")
+    cfp.open_block()
+
+    # Write out member variables.
+    for member in struct.members:
+        cpp_name = field_type_name_to_cpp_name(member.field_type)
+        if member.field_type.is_lazy:
+            cfp.write_line(f"std::span<const uint8_t> {member.field_name}__bytes;")
+            cfp.write_line(f"std::optional<{cpp_name}> {member.field_name}__value;")
+        else:
+            cfp.write_line(f"{cpp_name} {member.field_name};")
+    cfp.write_line("")
+
+    # attach().
+    cfp.write_line("void attach(std::span<const uint8_t> bytes)")
+    cfp.open_block()
+    cfp.write_line("SerialBuffer sb;")
+    cfp.write_line("sb.attach_read_view(bytes);")
+    cfp.write_line("read_lazy_from_serial_buffer(sb);")
+    cfp.close_block()
+    cfp.write_line("")
+
+    # attach_file().
+    write_attach_file_method(cfp, struct, "read_lazy_from_serial_buffer")
+    cfp.write_line("")
+
+    # read_lazy_from_serial_buffer().
+    cfp.write_line("void read_lazy_from_serial_buffer(SerialBuffer& sb)")
+    cfp.open_block()
+    write_member_block(cfp, struct.members, write_member_lazy_deserialize, write_group_deserialize)
+    cfp.close_block()
+
+    # Lazy field accessors.
+    for member in struct.members:
+        if not member.field_type.is_lazy:
+            continue
+        name = member.field_name
+        cfp.write_line("")
+        cfp.write_line(f"const {field_type_name_to_cpp_name(member.field_type)}& {name}()")
+        cfp.open_block()
+        cfp.write_line(f"if (!{name}__value)")
+        cfp.open_block()
+        cfp.write_line("SerialBuffer sb;")
+        cfp.write_line(f"sb.attach_read_view({name}__bytes);")
+        cfp.write_line(f"auto& {name}{{ {name}__value.emplace() }};")
+        write_member_value_deserialize(cfp, member)
+        cfp.close_block()
+        cfp.write_line(f"return *{name}__value;")
+        cfp.close_block()
+    cfp.close_block("};")
 
-# Generated header comment marking generated code.
-GENERATED_CODE_COMMENT_CODE = \
-"""/*
- *    ____   _____   _   _   _____   ____       _      _____   _____   ____       ____    ___    ____    _____ 
- *   / ___| | ____| | \ | | | ____| |  _ \     / \    |_   _| | ____| |  _ \     / ___|  / _ \  |  _ \  | ____|
- *  | |  _  |  _|   |  \| | |  _|   | |_) |   / _ \     | |   |  _|   | | | |   | |     | | | | | | | | |  _|  
- *  | |_| | | |___  | |\  | | |___  |  _ <   / ___ \    | |   | |___  | |_| |   | |___  | |_| | | |_| | | |___ 
- *   \____| |_____| |_| \_| |_____| |_| \_\ /_/   \_\   |_|   |_____| |____/     \____|  \___/  |____/  |_____|
- *
- */"""
 
 # HStruct interface.
 HSTRUCT_IFC_CODE = \
 """#pragma once
 
 #include <array>
+#include <cmath>
+#include <functional>
+#include <memory>
+#include <memory_resource> // For `pmr` structs.
+#include <numeric>
+#include <optional>
+#include <span>
 #include <string>
+#include <string_view>
+#include <type_traits>
+#include <utility>
 #include <vector>
 #include "serial_buffer.h"
 
@@ -203,23 +1322,281 @@ static_assert(std::endian::native == std::endian::little);
 #endif
 
 
+// Builds a `std::array<T, N>` out of `make_elem(i)` for every index, e.g. so
+// every element of an array member gets constructed with an allocator.
+template<typename T, size_t N, typename Func>
+std::array<T, N> make_array_of(Func&& make_elem)
+{
+    return [&]<size_t... I>(std::index_sequence<I...>) {
+        return std::array<T, N>{ { make_elem(I)... } };
+    }(std::make_index_sequence<N>{});
+}
+
+
 class HStruct_ifc
 {
 public:
     // Dumps HStruct into binary serialization, writing the contents
-    // out to the file `fname`.
-    virtual void serialize_dump(const std::string& fname) = 0;
-
-    // Loads HStruct from a binary serialization at `fname`.
+    // out to the file `fname`. Any `codec` but `none` writes a chunked
+    // compressed container instead of the raw bytes.
+    virtual void serialize_dump(const std::string& fname, SerialCodec codec = SerialCodec::none) = 0;
+
+    // Loads HStruct from a binary serialization at `fname`, raw or
+    // compressed. The file and streamed versions below throw
+    // `std::runtime_error` if `fname` can't be read or written, or holds
+    // another schema.
     virtual void serialize_load(const std::string& fname) = 0;
 
-protected:
-    // Internal act of collection of data to SerialBuffer.
+    // Same as `serialize_load`, but deserializes straight out of a
+    // read-only memory mapping of `fname` instead of reading it into a
+    // buffer first. Compressed files get decompressed into a buffer.
+    virtual void serialize_load_mmap(const std::string& fname) = 0;
+
+    // Same as `serialize_dump`/`serialize_load`, but streams the
+    // serialization through a window of `window_bytes` instead of holding
+    // all of it in memory. Compressed files are loaded with
+    // `serialize_load`.
+    virtual void serialize_dump_streamed(const std::string& fname, size_t window_bytes = SerialBuffer::k_default_window_bytes) = 0;
+    virtual void serialize_load_streamed(const std::string& fname, size_t window_bytes = SerialBuffer::k_default_window_bytes) = 0;
+
+    // In-memory versions of `serialize_dump`/`serialize_load`, for sending
+    // or caching without touching the filesystem. The bytes are the same
+    // as an uncompressed dumped file.
+    // Replaces the contents of `out`, reusing its capacity.
+    virtual void serialize_to(std::vector<uint8_t>& out) = 0;
+    // Writes into the start of `out` and returns the byte count, or 0 if
+    // it doesn't fit (see `serialized_size`).
+    virtual size_t serialize_into(std::span<uint8_t> out) = 0;
+    // Loads from `bytes`, raw or compressed. False if they hold another
+    // schema or more than one serialization.
+    virtual bool deserialize_from(std::span<const uint8_t> bytes) = 0;
+
+    // Exact number of bytes `write_data_to_serial_buffer` will produce.
+    virtual size_t serialized_size() const = 0;
+
+    // Collects the data into a SerialBuffer in `SBM_WRITE` mode, without a
+    // schema header. A reused buffer should be `clear`ed first.
     virtual void write_data_to_serial_buffer(SerialBuffer& buffer) = 0;
 
-    // Internal propagation of data to HStruct.
+    // Fills the HStruct from a SerialBuffer in `SBM_READ` mode.
     virtual void read_data_from_serial_buffer(SerialBuffer& buffer) = 0;
-};"""
+};
+
+
+// `parallel` lists of structs are written as the element count, a table of
+// where each element ends (relative to the start of the first one), then
+// the elements. With the table, every element can be written and read on
+// its own, so lists of at least `sb.parallel_threshold` elements are spread
+// over the hardware threads.
+template<typename List>
+void write_parallel_list(SerialBuffer& sb, List& elems)
+{
+    size_t count{ elems.size() };
+    std::vector<uint64_t> elem_ends(count);
+    if (count == 0 || count < sb.parallel_threshold || sb.write_stream != nullptr)
+    {
+        // Reserve the table, then patch it once every element is written.
+        size_t table_position{ sb.write_position() };
+        sb.write_bulk(elem_ends.data(), sizeof(uint64_t), count);
+        size_t elems_position{ sb.write_position() };
+        for (size_t i = 0; i < count; i++)
+        {
+            elems[i].write_data_to_serial_buffer(sb);
+            elem_ends[i] = sb.write_position() - elems_position;
+        }
+        sb.patch_bulk(table_position, elem_ends.data(), sizeof(uint64_t), count);
+        return;
+    }
+
+    // Measure every element first, so each one's slot is known up front.
+    parallel_for_ranges(count, [&](size_t begin, size_t end) {
+        for (size_t i = begin; i < end; i++)
+        {
+            elem_ends[i] = elems[i].serialized_size();
+        }
+    });
+    std::inclusive_scan(elem_ends.begin(), elem_ends.end(), elem_ends.begin());
+    sb.write_bulk(elem_ends.data(), sizeof(uint64_t), count);
+    size_t elems_start{ sb.buffer.size() };
+    sb.buffer.resize(elems_start + elem_ends.back());
+
+    // Then encode ranges of elements concurrently and copy each range into
+    // its slot.
+    parallel_for_ranges(count, [&](size_t begin, size_t end) {
+        size_t range_start{ begin == 0 ? 0 : elem_ends[begin - 1] };
+        size_t range_bytes{ elem_ends[end - 1] - range_start };
+        SerialBuffer range_sb;
+        range_sb.mode = SerialBuffer::SBM_WRITE;
+        // Every thread is busy already, so nested `parallel` lists stay serial.
+        range_sb.parallel_threshold = SIZE_MAX;
+        range_sb.reserve(range_bytes);
+        for (size_t i = begin; i < end; i++)
+        {
+            elems[i].write_data_to_serial_buffer(range_sb);
+        }
+        if (range_sb.buffer.size() != range_bytes)
+        {
+            throw std::logic_error{ "`serialized_size` doesn't match the written size." };
+        }
+        std::memcpy(sb.buffer.data() + elems_start + range_start, range_sb.buffer.data(), range_bytes);
+    });
+}
+
+// Reads the table and `count` elements written by `write_parallel_list`.
+// `read_elem(elem, sb)` reads one element, in an older layout for the
+// readers of older layouts.
+template<typename List, typename ReadElem>
+void read_parallel_list(SerialBuffer& sb, List& elems, size_t count, ReadElem&& read_elem)
+{
+    sb.check_list_count(count, sizeof(uint64_t));
+    std::vector<uint64_t> elem_ends(count);
+    sb.read_bulk(elem_ends.data(), sizeof(uint64_t), count);
+    elems.clear();
+
+    // Memory resources (e.g. arenas) generally aren't thread safe, so
+    // `pmr` lists are always read on the calling thread.
+    constexpr bool k_is_pmr{ std::is_same_v<typename List::allocator_type, std::pmr::polymorphic_allocator<typename List::value_type>> };
+    if (k_is_pmr || count == 0 || count < sb.parallel_threshold || sb.read_stream != nullptr)
+    {
+        elems.reserve(count);
+        for (size_t i = 0; i < count; i++)
+        {
+            elems.emplace_back();
+            read_elem(elems.back(), sb);
+        }
+        return;
+    }
+
+    // The table decides where each element gets read from, so check it.
+    if (std::adjacent_find(elem_ends.begin(), elem_ends.end(), std::greater<uint64_t>{}) != elem_ends.end())
+    {
+        throw std::out_of_range{ "Element offset table isn't in order." };
+    }
+    const uint8_t* elems_data{ reinterpret_cast<const uint8_t*>(sb.read_elem(elem_ends.back())) };
+    elems.resize(count);
+    parallel_for_ranges(count, [&](size_t begin, size_t end) {
+        SerialBuffer elem_sb;
+        elem_sb.parallel_threshold = SIZE_MAX;
+        for (size_t i = begin; i < end; i++)
+        {
+            size_t elem_start{ i == 0 ? 0 : elem_ends[i - 1] };
+            elem_sb.attach_read_view({ elems_data + elem_start, elem_ends[i] - elem_start });
+            read_elem(elems[i], elem_sb);
+            if (elem_sb.buffer_position != elem_sb.read_view.size())
+            {
+                throw std::out_of_range{ "Element doesn't match its offset table entry." };
+            }
+        }
+    });
+}
+
+template<typename List>
+void read_parallel_list(SerialBuffer& sb, List& elems, size_t count)
+{
+    read_parallel_list(sb, elems, count, [](auto& elem, SerialBuffer& elem_sb) { elem.read_data_from_serial_buffer(elem_sb); });
+}
+
+
+// Deltas of list members (see `write_delta`). `std::array`s are a bitmask
+// of the elements that changed, lowest bit first, then those elements.
+template<typename Array, typename WriteElem>
+void write_delta_elems(SerialBuffer& sb, const Array& elems, const Array& prev, WriteElem&& write_elem)
+{
+    constexpr size_t k_count{ std::tuple_size_v<Array> };
+    std::array<uint8_t, (k_count + 7) / 8> changed{};
+    for (size_t i = 0; i < k_count; i++)
+    {
+        changed[i / 8] |= static_cast<uint8_t>((elems[i] != prev[i]) << (i % 8));
+    }
+    sb.write_bulk(changed.data(), 1, changed.size());
+    for (size_t i = 0; i < k_count; i++)
+    {
+        if ((changed[i / 8] >> (i % 8)) & 1)
+        {
+            write_elem(i);
+        }
+    }
+}
+
+template<typename Array, typename ReadElem>
+void read_delta_elems(SerialBuffer& sb, Array& /* elems, only for its size */, ReadElem&& read_elem)
+{
+    constexpr size_t k_count{ std::tuple_size_v<Array> };
+    std::array<uint8_t, (k_count + 7) / 8> changed;
+    sb.read_bulk(changed.data(), 1, changed.size());
+    for (size_t i = 0; i < k_count; i++)
+    {
+        if ((changed[i / 8] >> (i % 8)) & 1)
+        {
+            read_elem(i);
+        }
+    }
+}
+
+// `std::vector`s are their new count (written by the caller), then each
+// run of elements that differ from `prev` or are past its end: the number
+// of unchanged elements before it, its length, then its elements. A skip
+// that reaches the count ends the list.
+template<typename List, typename WriteElem>
+void write_delta_runs(SerialBuffer& sb, const List& elems, const List& prev, WriteElem&& write_elem)
+{
+    size_t count{ elems.size() };
+    size_t common_count{ std::min(count, prev.size()) };
+    size_t i{ 0 };
+    while (true)
+    {
+        size_t run_start{ i };
+        while (run_start < common_count && elems[run_start] == prev[run_start])
+        {
+            run_start++;
+        }
+        sb.write_varint(run_start - i);
+        if (run_start == count)
+        {
+            return;
+        }
+        size_t run_end{ run_start + 1 };
+        while (run_end < count && (run_end >= common_count || elems[run_end] != prev[run_end]))
+        {
+            run_end++;
+        }
+        sb.write_varint(run_end - run_start);
+        for (i = run_start; i < run_end; i++)
+        {
+            write_elem(i);
+        }
+    }
+}
+
+// `elems` must already have the new count.
+template<typename List, typename ReadElem>
+void read_delta_runs(SerialBuffer& sb, List& elems, ReadElem&& read_elem)
+{
+    size_t count{ elems.size() };
+    size_t i{ 0 };
+    while (true)
+    {
+        size_t skip{ sb.read_varint() };
+        if (skip > count - i)
+        {
+            throw std::out_of_range{ "Delta run past the end of the list." };
+        }
+        i += skip;
+        if (i == count)
+        {
+            return;
+        }
+        size_t run_length{ sb.read_varint() };
+        if (run_length == 0 || run_length > count - i)
+        {
+            throw std::out_of_range{ "Delta run past the end of the list." };
+        }
+        for (size_t run_end{ i + run_length }; i < run_end; i++)
+        {
+            read_elem(i);
+        }
+    }
+}"""
 
 
 # Serial buffer.
@@ -229,7 +1606,37 @@ SERIAL_BUFFER_CODE = \
 #include <vector>
 #include <string>
 #include <cassert>
+#include <cstdint>
+#include <cstring>
 #include <fstream> // For disk ops.
+#include <span>
+#include <algorithm>
+#include <iterator>
+#include <exception>
+#include <stdexcept> // For out of bounds reads.
+#include <thread> // For parallel (de)compression and `parallel` lists.
+
+// zlib compression needs `HSTRUCT_USE_ZLIB` defined and linking against
+// zlib (e.g. `-lz`). Without it, only raw files can be written and read.
+#ifdef HSTRUCT_USE_ZLIB
+#include <zlib.h>
+#endif
+
+// For memory mapped loads.
+#ifdef _WIN32
+#ifndef WIN32_LEAN_AND_MEAN
+#define WIN32_LEAN_AND_MEAN
+#endif
+#ifndef NOMINMAX
+#define NOMINMAX
+#endif
+#include <windows.h>
+#else
+#include <fcntl.h>
+#include <sys/mman.h>
+#include <sys/stat.h>
+#include <unistd.h>
+#endif
 
 // Make sure is always dealing in little endian.
 #if _DEBUG
@@ -240,346 +1647,2057 @@ static_assert(std::endian::native == std::endian::little);
 #endif
 
 
-struct SerialBuffer
-{
-    std::vector<uint8_t> buffer;
-    size_t buffer_position{ 0 };
-
-    enum Mode : std::uint8_t
-    {
-        SBM_READ = 0,
-        SBM_WRITE,
-    } mode{ 0 };
+// LEB128 varints: 7 bits per byte, lowest group first, high bit set on every
+// byte but the last. Signed values are zigzag mapped first so small negative
+// numbers stay short.
+inline constexpr size_t k_max_varint_bytes{ 10 };
 
-    // Read buffer methods.
-    void* read_elem(size_t elem_bytes)
+inline size_t varint_size(uint64_t value)
+{
+    size_t size{ 1 };
+    while (value >= 0x80)
     {
-        assert(mode == SBM_READ);
-        void* elem = &buffer[buffer_position];
-        buffer_position += elem_bytes;
-
-        return elem;
+        value >>= 7;
+        size++;
     }
-    // @NOTE: it'll have to be carried out manually in the code to read arrays. First read a uint32_t elem and then read a big chunk and create a vector from the big chunk (https://www.geeksforgeeks.org/how-to-convert-an-array-to-a-vector-in-cpp/#)
+    return size;
+}
 
-    // Write buffer methods.
-    void write_elem(void* elem, size_t elem_bytes)
-    {
-        assert(mode == SBM_WRITE);
-        buffer.resize(buffer.size() + elem_bytes);
-        std::memcpy(
-            buffer.data() + buffer.size() - elem_bytes,
-            elem,
-            elem_bytes
-        );
-    }
-    // @NOTE: can write big arrays by providing vector.data() as the void* elem, but the beginning number must be written as a uint32_t first.
+inline uint64_t zigzag_encode(int64_t value)
+{
+    return (static_cast<uint64_t>(value) << 1) ^ static_cast<uint64_t>(value >> 63);
+}
 
-    // Save to/Load from disk methods.
-    bool save_buffer_to_disk(const std::string& fname)
+inline int64_t zigzag_decode(uint64_t value)
+{
+    return static_cast<int64_t>(value >> 1) ^ -static_cast<int64_t>(value & 1);
+}
+
+// Decodes the varint at `position` in `bytes` and moves `position` past it.
+inline uint64_t decode_varint(std::span<const uint8_t> bytes, size_t& position)
+{
+    uint64_t value{ 0 };
+    for (size_t shift = 0; shift < 64; shift += 7)
     {
-        // Open file for writing.
-        std::ofstream file{ fname.c_str(), std::ios::out | std::ios::trunc | std::ios::binary };
-        if (!file.is_open())
+        if (position >= bytes.size())
         {
-            return false;
+            throw std::out_of_range{ "Varint runs past the end of the serialized data." };
         }
-
-        // Write buffer to file.
-        file.write(reinterpret_cast<char*>(buffer.data()), buffer.size());
-        file.close();
-
-        // Check for writing errors.
-        if (!file.good())
+        uint8_t byte{ bytes[position++] };
+        value |= static_cast<uint64_t>(byte & 0x7f) << shift;
+        if ((byte & 0x80) == 0)
         {
-            return false;
+            return value;
         }
-
-        return true;
     }
+    throw std::out_of_range{ "Varint longer than 10 bytes." };
+}
 
-    bool load_buffer_from_disk(const std::string& fname)
+// Read-only list of `T`s inside serialized bytes, which can sit at any
+// alignment. Elements are `memcpy`d out on access; `as_span` only hands out
+// a `std::span<const T>` when the bytes happen to be `alignof(T)` aligned.
+template<typename T>
+class UnalignedSpan
+{
+public:
+    class iterator
     {
-        // Open file for reading.
-        std::ifstream file{ fname.c_str(), std::ios::in | std::ios::ate | std::ios::binary };
-        if (!file.is_open())
-        {
-            return false;
-        }
+    public:
+        using iterator_category = std::input_iterator_tag;
+        using value_type = T;
+        using difference_type = std::ptrdiff_t;
+        using pointer = void;
+        using reference = T;
 
-        // Get filesize and copy file contents into buffer.
-        size_t filesize{ file.tellg() };
-        buffer.clear();
-        buffer.resize(filesize);
-        file.seekg(0);
-        file.read(reinterpret_cast<char*>(buffer.data()), filesize);
-        file.close();
+        iterator() = default;
+        explicit iterator(const uint8_t* at) : position{ at } {}
 
-        // Check for reading errors.
-        if (!file.good())
+        T operator*() const
         {
-            return false;
+            T value;
+            std::memcpy(&value, position, sizeof(T));
+            return value;
         }
 
-        return true;
-    }
-};"""
+        iterator& operator++()
+        {
+            position += sizeof(T);
+            return *this;
+        }
 
+        iterator operator++(int)
+        {
+            iterator previous{ *this };
+            position += sizeof(T);
+            return previous;
+        }
 
-def main():
-    # Read in all tokens.
-    lines: List[TokenLine] = []
-
-    with open(args.filename, "r") as input_file:
-        for line in input_file:
-            token_line = read_into_token_line(line)
-            if len(token_line.tokens) > 0:
-                lines.append(token_line)
-    
-    # Group read lines into groups based off indentation amount.
-    line_groups: List[List[TokenLine]] = []
-    for line in lines:
-        if line.indentation_amount == 0:
-            line_groups.append([line,])
-        else:
-            line_groups[-1].append(line)
-
-    # Turn token groups into structs.
-    import_list: List[str] = []
-    struct_list: List[HStruct] = []
-    for group in line_groups:
-        # Add import to import list.
-        initial_token = group[0].tokens[0]
-        if initial_token == 'import':
-            # Parse out import statement.
-            import_list.append(
-                parse_struct_import_token_line(group[0].tokens)
-            )
-        elif initial_token == 'struct':
-            # Iterate thru struct members.
-            struct_name = ''
-            struct_members: List[HField] = []
-            first = True
-            for token_line in group:
-                if first:
-                    struct_name = parse_struct_name_token_line(token_line.tokens)
-                    first = False
-                else:
-                    struct_members.append(
-                        parse_struct_member_field_token_line(token_line.tokens)
-                    )
-            struct_list.append(
-                HStruct(struct_name, struct_members)
-            )
+        bool operator==(const iterator& other) const = default;
 
-    # Make sure only one struct definition is there.
-    assert len(struct_list) == 1, "Only place 1 struct definition."
+    private:
+        const uint8_t* position{ nullptr };
+    };
 
-    # Make sure struct is same definition as file.
-    fname_only = Path(args.filename).name
-    msg = f"Struct name must match file name. " \
-        f"Struct name: {struct_list[0].struct_name}. File name: {fname_only}."
-    assert fname_only == f"{struct_list[0].struct_name}.hstruct", msg
+    UnalignedSpan() = default;
+    UnalignedSpan(const uint8_t* first, size_t elem_count) : data{ first }, count{ elem_count } {}
 
-    # Write out generated file.
-    with CppFilePrinter(f"gen/{fname_only}.h") as cfp:
-        cfp.write_line(GENERATED_CODE_COMMENT_CODE)
-        cfp.write_line("#pragma once")
-        cfp.write_line("")
-        cfp.write_line("#include \"hstruct_ifc.h\"")
+    size_t size() const { return count; }
+    bool empty() const { return count == 0; }
+    iterator begin() const { return iterator{ data }; }
+    iterator end() const { return iterator{ data + count * sizeof(T) }; }
 
-        for import_em in import_list:
-            cfp.write_line(f"#include \"{import_em}.hstruct.h\"")
+    T operator[](size_t index) const
+    {
+        assert(index < count);
+        T value;
+        std::memcpy(&value, data + index * sizeof(T), sizeof(T));
+        return value;
+    }
 
-        cfp.write_line("")
-        cfp.write_line("")
+    std::span<const uint8_t> bytes() const
+    {
+        return { data, count * sizeof(T) };
+    }
 
+    void copy_to(std::span<T> out) const
+    {
+        assert(out.size() >= count);
+        std::memcpy(out.data(), data, count * sizeof(T));
+    }
 
-        for struct in struct_list:
-            # Start struct.
-            cfp.write_line(f"struct {struct.struct_name} : public HStruct_ifc")
-            cfp.write_line("{")
+    bool is_aligned() const
+    {
+        return reinterpret_cast<uintptr_t>(data) % alignof(T) == 0;
+    }
 
-            # Write out member variables.
-            for member in struct.members:
-                cfp.write_line(f"{field_type_name_to_cpp_name(member.field_type)} {member.field_name};")
+    std::span<const T> as_span() const
+    {
+        if (!is_aligned())
+        {
+            throw std::runtime_error{ "List isn't aligned for its element type, read it element by element." };
+        }
+        return { reinterpret_cast<const T*>(data), count };
+    }
 
-            cfp.write_line("")
+private:
+    const uint8_t* data{ nullptr };
+    size_t count{ 0 };
+};
 
 
-            # serialize_dump().
-            cfp.write_line("void serialize_dump(const std::string& fname) override")
-            cfp.write_line("{")
+// Runs `func(i)` for every `i` in `[0, count)` across the hardware threads.
+template<typename Func>
+void parallel_for(size_t count, Func&& func)
+{
+    size_t worker_count{ std::min<size_t>(count, std::max(1u, std::thread::hardware_concurrency())) };
+    if (worker_count <= 1)
+    {
+        for (size_t i = 0; i < count; i++)
+        {
+            func(i);
+        }
+        return;
+    }
+    std::vector<std::thread> workers;
+    workers.reserve(worker_count);
+    for (size_t w = 0; w < worker_count; w++)
+    {
+        workers.emplace_back([&func, w, worker_count, count]() {
+            for (size_t i = w; i < count; i += worker_count)
+            {
+                func(i);
+            }
+        });
+    }
+    for (auto& worker : workers)
+    {
+        worker.join();
+    }
+}
 
-            # Dump struct data into buffer.
+// Splits `[0, count)` into contiguous, non-empty ranges and runs
+// `func(begin, end)` on them across the hardware threads. An exception
+// thrown by `func` is rethrown on the calling thread once every range is
+// done.
+template<typename Func>
+void parallel_for_ranges(size_t count, Func&& func)
+{
+    // A few ranges per thread, so uneven ranges still balance out.
+    size_t range_count{ std::min<size_t>(count, 4 * std::max(1u, std::thread::hardware_concurrency())) };
+    std::vector<std::exception_ptr> errors(range_count);
+    parallel_for(range_count, [&](size_t r) {
+        try
+        {
+            func(count * r / range_count, count * (r + 1) / range_count);
+        }
+        catch (...)
+        {
+            errors[r] = std::current_exception();
+        }
+    });
+    for (const auto& error : errors)
+    {
+        if (error)
+        {
+            std::rethrow_exception(error);
+        }
+    }
+}
+
+
+enum class SerialCodec : uint32_t
+{
+    none = 0,  // Raw bytes, no container.
+    zlib = 1,
+};
+
+// Chunked compression container:
+//     uint8_t  magic[8]
+//     uint32_t version
+//     uint32_t codec
+//     uint64_t chunk_size          Uncompressed bytes per chunk (the last one may be shorter).
+//     uint64_t uncompressed_size
+//     uint64_t chunk_count
+//     uint64_t compressed_chunk_sizes[chunk_count]
+//     compressed chunks, back to back
+// Every chunk is compressed on its own, so chunks can be (de)compressed in
+// parallel and a reader can seek straight to the chunk holding any offset.
+struct CompressedContainer
+{
+    static constexpr uint8_t k_magic[8]{ 0x89, 'H', 'S', 'Z', 0x0d, 0x0a, 0x1a, 0x0a };
+    static constexpr uint32_t k_version{ 1 };
+    static constexpr size_t k_fixed_header_size{ sizeof(k_magic) + 2 * sizeof(uint32_t) + 3 * sizeof(uint64_t) };
+    static constexpr size_t k_default_chunk_size{ 1 << 20 };
+    // Fastest zlib level. Higher levels cost a lot of time for little gain on
+    // typical serialized data.
+    static constexpr int k_zlib_level{ 1 };
+
+    SerialCodec codec{ SerialCodec::none };
+    size_t chunk_size{ 0 };
+    size_t uncompressed_size{ 0 };
+    // Where each compressed chunk starts in the file, plus where the last one ends.
+    std::vector<uint64_t> chunk_offsets;
+
+    static bool is_container(std::span<const uint8_t> bytes)
+    {
+        return bytes.size() >= k_fixed_header_size && std::memcmp(bytes.data(), k_magic, sizeof(k_magic)) == 0;
+    }
+
+    size_t chunk_count() const
+    {
+        return chunk_offsets.empty() ? 0 : chunk_offsets.size() - 1;
+    }
+
+    size_t chunk_uncompressed_size(size_t index) const
+    {
+        return std::min(chunk_size, uncompressed_size - index * chunk_size);
+    }
+
+    bool parse_header(std::span<const uint8_t> bytes)
+    {
+        if (!is_container(bytes))
+        {
+            return false;
+        }
+        uint32_t fields32[2];
+        uint64_t fields64[3];
+        std::memcpy(fields32, bytes.data() + sizeof(k_magic), sizeof(fields32));
+        std::memcpy(fields64, bytes.data() + sizeof(k_magic) + sizeof(fields32), sizeof(fields64));
+        if (fields32[0] != k_version)
+        {
+            return false;
+        }
+        codec = static_cast<SerialCodec>(fields32[1]);
+        chunk_size = fields64[0];
+        uncompressed_size = fields64[1];
+        size_t count{ fields64[2] };
+        if (chunk_size == 0 || count > (bytes.size() - k_fixed_header_size) / sizeof(uint64_t)
+            || count != (uncompressed_size + chunk_size - 1) / chunk_size)
+        {
+            return false;
+        }
+
+        chunk_offsets.resize(count + 1);
+        chunk_offsets[0] = k_fixed_header_size + count * sizeof(uint64_t);
+        for (size_t i = 0; i < count; i++)
+        {
+            uint64_t compressed_size;
+            std::memcpy(&compressed_size, bytes.data() + k_fixed_header_size + i * sizeof(uint64_t), sizeof(uint64_t));
+            chunk_offsets[i + 1] = chunk_offsets[i] + compressed_size;
+        }
+        return chunk_offsets[count] <= bytes.size();
+    }
+
+    // Decompresses chunk `index` of the container in `bytes` into `out`,
+    // which must have room for `chunk_uncompressed_size(index)` bytes.
+    // `out` is only written by the codecs compiled in.
+    bool decompress_chunk(std::span<const uint8_t> bytes, size_t index, [[maybe_unused]] uint8_t* out) const
+    {
+        std::span<const uint8_t> chunk{ bytes.subspan(chunk_offsets[index], chunk_offsets[index + 1] - chunk_offsets[index]) };
+        switch (codec)
+        {
+#ifdef HSTRUCT_USE_ZLIB
+        case SerialCodec::zlib:
+        {
+            size_t expected_size{ chunk_uncompressed_size(index) };
+            uLongf out_size{ static_cast<uLongf>(expected_size) };
+            int status{ uncompress(out, &out_size, chunk.data(), static_cast<uLong>(chunk.size())) };
+            return status == Z_OK && out_size == expected_size;
+        }
+#endif
+        default:
+            return false;
+        }
+    }
+
+    // Decompresses the whole container in `bytes` into `out`.
+    static bool decompress(std::span<const uint8_t> bytes, std::vector<uint8_t>& out)
+    {
+        CompressedContainer container;
+        if (!container.parse_header(bytes))
+        {
+            return false;
+        }
+        out.resize(container.uncompressed_size);
+        std::vector<uint8_t> chunk_ok(container.chunk_count(), 0);
+        parallel_for(container.chunk_count(), [&](size_t i) {
+            chunk_ok[i] = container.decompress_chunk(bytes, i, out.data() + i * container.chunk_size);
+        });
+        return std::all_of(chunk_ok.begin(), chunk_ok.end(), [](uint8_t ok) { return ok != 0; });
+    }
+
+    // Compresses `data` into a container in `out`.
+    static bool compress(std::span<const uint8_t> data, SerialCodec codec, std::vector<uint8_t>& out,
+                         size_t chunk_size = k_default_chunk_size)
+    {
+        size_t count{ (data.size() + chunk_size - 1) / chunk_size };
+        std::vector<std::vector<uint8_t>> chunks(count);
+        std::vector<uint8_t> chunk_ok(count, 0);
+        parallel_for(count, [&](size_t i) {
+            std::span<const uint8_t> chunk{ data.subspan(i * chunk_size, std::min(chunk_size, data.size() - i * chunk_size)) };
+            switch (codec)
+            {
+#ifdef HSTRUCT_USE_ZLIB
+            case SerialCodec::zlib:
+            {
+                uLongf compressed_size{ compressBound(static_cast<uLong>(chunk.size())) };
+                chunks[i].resize(compressed_size);
+                int status{ compress2(chunks[i].data(), &compressed_size, chunk.data(), static_cast<uLong>(chunk.size()), k_zlib_level) };
+                chunks[i].resize(compressed_size);
+                chunk_ok[i] = (status == Z_OK);
+                break;
+            }
+#endif
+            default:
+                break;
+            }
+        });
+        if (!std::all_of(chunk_ok.begin(), chunk_ok.end(), [](uint8_t ok) { return ok != 0; }))
+        {
+            return false;
+        }
+
+        uint32_t fields32[2]{ k_version, static_cast<uint32_t>(codec) };
+        uint64_t fields64[3]{ chunk_size, data.size(), count };
+        out.clear();
+        out.insert(out.end(), k_magic, k_magic + sizeof(k_magic));
+        out.insert(out.end(), reinterpret_cast<const uint8_t*>(fields32), reinterpret_cast<const uint8_t*>(fields32) + sizeof(fields32));
+        out.insert(out.end(), reinterpret_cast<const uint8_t*>(fields64), reinterpret_cast<const uint8_t*>(fields64) + sizeof(fields64));
+        for (const auto& chunk : chunks)
+        {
+            uint64_t compressed_size{ chunk.size() };
+            out.insert(out.end(), reinterpret_cast<const uint8_t*>(&compressed_size), reinterpret_cast<const uint8_t*>(&compressed_size) + sizeof(uint64_t));
+        }
+        for (const auto& chunk : chunks)
+        {
+            out.insert(out.end(), chunk.begin(), chunk.end());
+        }
+        return true;
+    }
+};
+
+
+// Read-only memory mapping of a whole file. The mapping stays valid until
+// `close()` or destruction, so anything viewing into it must not outlive it.
+struct MappedFile
+{
+    const uint8_t* data{ nullptr };
+    size_t size{ 0 };
+
+#ifdef _WIN32
+    HANDLE file_handle{ INVALID_HANDLE_VALUE };
+    HANDLE mapping_handle{ nullptr };
+#endif
+
+    MappedFile() = default;
+    MappedFile(const MappedFile&) = delete;
+    MappedFile& operator=(const MappedFile&) = delete;
+
+    ~MappedFile()
+    {
+        close();
+    }
+
+    std::span<const uint8_t> view() const
+    {
+        return { data, size };
+    }
+
+    bool open(const std::string& fname)
+    {
+        close();
+
+#ifdef _WIN32
+        file_handle = CreateFileA(fname.c_str(), GENERIC_READ, FILE_SHARE_READ, nullptr, OPEN_EXISTING, FILE_ATTRIBUTE_NORMAL, nullptr);
+        if (file_handle == INVALID_HANDLE_VALUE)
+        {
+            return false;
+        }
+
+        LARGE_INTEGER filesize;
+        if (!GetFileSizeEx(file_handle, &filesize))
+        {
+            close();
+            return false;
+        }
+        size = static_cast<size_t>(filesize.QuadPart);
+        if (size == 0)
+        {
+            // Empty files can't be mapped, but are still valid.
+            return true;
+        }
+
+        mapping_handle = CreateFileMappingA(file_handle, nullptr, PAGE_READONLY, 0, 0, nullptr);
+        if (mapping_handle == nullptr)
+        {
+            close();
+            return false;
+        }
+
+        data = reinterpret_cast<const uint8_t*>(MapViewOfFile(mapping_handle, FILE_MAP_READ, 0, 0, 0));
+        if (data == nullptr)
+        {
+            close();
+            return false;
+        }
+#else
+        int fd{ ::open(fname.c_str(), O_RDONLY) };
+        if (fd < 0)
+        {
+            return false;
+        }
+
+        struct stat file_stat;
+        if (fstat(fd, &file_stat) != 0)
+        {
+            ::close(fd);
+            return false;
+        }
+        size = static_cast<size_t>(file_stat.st_size);
+        if (size == 0)
+        {
+            // Empty files can't be mapped, but are still valid.
+            ::close(fd);
+            return true;
+        }
+
+        // The mapping keeps its own reference to the file.
+        void* mapping{ mmap(nullptr, size, PROT_READ, MAP_PRIVATE, fd, 0) };
+        ::close(fd);
+        if (mapping == MAP_FAILED)
+        {
+            size = 0;
+            return false;
+        }
+        data = reinterpret_cast<const uint8_t*>(mapping);
+#endif
+
+        return true;
+    }
+
+    void close()
+    {
+#ifdef _WIN32
+        if (data != nullptr)
+        {
+            UnmapViewOfFile(data);
+        }
+        if (mapping_handle != nullptr)
+        {
+            CloseHandle(mapping_handle);
+        }
+        if (file_handle != INVALID_HANDLE_VALUE)
+        {
+            CloseHandle(file_handle);
+        }
+        mapping_handle = nullptr;
+        file_handle = INVALID_HANDLE_VALUE;
+#else
+        if (data != nullptr)
+        {
+            munmap(const_cast<uint8_t*>(data), size);
+        }
+#endif
+        data = nullptr;
+        size = 0;
+    }
+};
+
+
+struct SerialBuffer
+{
+    static constexpr size_t k_default_window_bytes{ 64 * 1024 };
+    static constexpr size_t k_default_parallel_threshold{ 4096 };
+
+    std::vector<uint8_t> buffer;
+    size_t buffer_position{ 0 };
+
+    // Bytes consumed by the read methods. Either views `buffer` (after
+    // `load_buffer_from_disk`) or external memory such as a `MappedFile`
+    // (after `attach_read_view`).
+    std::span<const uint8_t> read_view;
+
+    enum Mode : std::uint8_t
+    {
+        SBM_READ = 0,
+        SBM_WRITE,
+    } mode{ 0 };
+
+    // Streaming. With a stream attached, `buffer` only holds a window of
+    // roughly `window_bytes` that is flushed to `write_stream` or refilled
+    // from `read_stream` as the struct gets walked, so memory use doesn't
+    // grow with the size of the serialization.
+    std::ostream* write_stream{ nullptr };
+    std::istream* read_stream{ nullptr };
+    size_t window_bytes{ k_default_window_bytes };
+    // Stream offset of the start of `buffer`.
+    size_t stream_offset{ 0 };
+    // Size of `read_stream` from where it was attached, or `SIZE_MAX` if it
+    // can't seek (pipes, sockets).
+    size_t stream_bytes{ SIZE_MAX };
+
+    // `parallel` lists with at least this many elements are written and
+    // read across the hardware threads. Smaller ones (and all of them while
+    // streaming) are done in place, the bytes are the same either way.
+    size_t parallel_threshold{ k_default_parallel_threshold };
+
+    // Scratch buffer of the calling thread. It keeps its capacity between
+    // uses, so in-memory serialization stops allocating once it has grown.
+    static SerialBuffer& thread_scratch()
+    {
+        thread_local SerialBuffer scratch;
+        return scratch;
+    }
+
+    // Forgets the contents, position and any attached view or stream, but
+    // keeps the capacity of `buffer` for the next use.
+    void clear()
+    {
+        buffer.clear();
+        buffer_position = 0;
+        read_view = {};
+        write_stream = nullptr;
+        read_stream = nullptr;
+        stream_offset = 0;
+        stream_bytes = SIZE_MAX;
+    }
+
+    // `out` must be seekable if the struct is `packed` (the offset tables
+    // get patched after the fact) and must outlive the buffer.
+    void attach_write_stream(std::ostream& out, size_t window = k_default_window_bytes)
+    {
+        mode = SBM_WRITE;
+        write_stream = &out;
+        window_bytes = window;
+        stream_offset = 0;
+        buffer.clear();
+        buffer.reserve(window_bytes);
+    }
+
+    void attach_read_stream(std::istream& in, size_t window = k_default_window_bytes)
+    {
+        mode = SBM_READ;
+        read_stream = &in;
+        window_bytes = window;
+        stream_offset = 0;
+        buffer.clear();
+        buffer.reserve(window_bytes);
+        read_view = {};
+        buffer_position = 0;
+
+        // Measured so list counts can be checked against it.
+        stream_bytes = SIZE_MAX;
+        std::istream::pos_type start{ in.tellg() };
+        if (start != std::istream::pos_type(-1))
+        {
+            if (in.seekg(0, std::ios::end))
+            {
+                std::istream::pos_type end{ in.tellg() };
+                if (end != std::istream::pos_type(-1) && end >= start)
+                {
+                    stream_bytes = static_cast<size_t>(end - start);
+                }
+            }
+            in.clear();
+            in.seekg(start);
+        }
+    }
+
+    // Writes out whatever is left in the window. Must be called once the
+    // struct has been written.
+    bool flush_write_stream()
+    {
+        if (write_stream == nullptr)
+        {
+            return true;
+        }
+        if (!buffer.empty())
+        {
+            write_stream->write(reinterpret_cast<const char*>(buffer.data()), buffer.size());
+            stream_offset += buffer.size();
+            buffer.clear();
+        }
+        return write_stream->good();
+    }
+
+    // Makes sure the window holds `elem_bytes` unread bytes (or whatever is
+    // left of the stream), growing it for elements bigger than the window.
+    void refill_read_window(size_t elem_bytes)
+    {
+        if (buffer_position + elem_bytes <= read_view.size())
+        {
+            return;
+        }
+        size_t unread_bytes{ read_view.size() - buffer_position };
+        std::memmove(buffer.data(), buffer.data() + buffer_position, unread_bytes);
+        stream_offset += buffer_position;
+        buffer_position = 0;
+        buffer.resize(std::max(window_bytes, elem_bytes));
+        read_stream->read(reinterpret_cast<char*>(buffer.data()) + unread_bytes, buffer.size() - unread_bytes);
+        buffer.resize(unread_bytes + static_cast<size_t>(read_stream->gcount()));
+        read_view = buffer;
+    }
+
+    // Read buffer methods.
+    // Reads straight out of `view` without copying it into `buffer`.
+    void attach_read_view(std::span<const uint8_t> view)
+    {
+        mode = SBM_READ;
+        read_view = view;
+        buffer_position = 0;
+    }
+
+    // Same as `attach_read_view` for the contents of a whole file, except
+    // compressed containers get decompressed into `buffer` first.
+    bool attach_file_view(std::span<const uint8_t> view)
+    {
+        if (!CompressedContainer::is_container(view))
+        {
+            attach_read_view(view);
+            return true;
+        }
+        if (!CompressedContainer::decompress(view, buffer))
+        {
+            return false;
+        }
+        attach_read_view(buffer);
+        return true;
+    }
+
+    // Whether `elem_bytes` more bytes can be read, refilling the window
+    // first when streaming.
+    bool can_read(size_t elem_bytes)
+    {
+        assert(mode == SBM_READ);
+        if (read_stream != nullptr)
+        {
+            refill_read_window(elem_bytes);
+        }
+        return elem_bytes <= read_view.size() - buffer_position;
+    }
+
+    // Slow path of `read_elem`, kept out of line so the in-bounds path
+    // stays a single compare.
+#ifdef _MSC_VER
+    __declspec(noinline)
+#else
+    __attribute__((noinline))
+#endif
+    void refill_or_throw(size_t elem_bytes)
+    {
+        if (!can_read(elem_bytes))
+        {
+            throw std::out_of_range{ "Read past the end of the serialized data." };
+        }
+    }
+
+    // Reads are bounds checked in release builds too: truncated or
+    // mismatched data throws `std::out_of_range` instead of reading past
+    // the end of the buffer.
+    const void* read_elem(size_t elem_bytes)
+    {
+        assert(mode == SBM_READ);
+        if (elem_bytes > read_view.size() - buffer_position) [[unlikely]]
+        {
+            refill_or_throw(elem_bytes);
+        }
+        const void* elem = read_view.data() + buffer_position;
+        buffer_position += elem_bytes;
+
+        return elem;
+    }
+
+    // Copies `count` contiguous elements out of the buffer into `elems` in
+    // a single memcpy. The list count (if any) must be read beforehand.
+    void read_bulk(void* elems, size_t elem_bytes, size_t count)
+    {
+        assert(mode == SBM_READ);
+        size_t total_bytes{ elem_bytes * count };
+        if (total_bytes == 0)
+        {
+            return;
+        }
+
+        if (read_stream != nullptr && buffer_position + total_bytes > read_view.size())
+        {
+            // Drain the window, then read the rest straight into `elems`.
+            size_t window_part{ read_view.size() - buffer_position };
+            if (window_part > 0)
+            {
+                // An empty window may have no data pointer at all.
+                std::memcpy(elems, read_view.data() + buffer_position, window_part);
+            }
+            read_stream->read(reinterpret_cast<char*>(elems) + window_part, total_bytes - window_part);
+            if (static_cast<size_t>(read_stream->gcount()) != total_bytes - window_part)
+            {
+                throw std::out_of_range{ "Read past the end of the serialized data." };
+            }
+            stream_offset += read_view.size() + (total_bytes - window_part);
+            buffer.clear();
+            read_view = {};
+            buffer_position = 0;
+            return;
+        }
+
+        if (total_bytes > read_view.size() - buffer_position || total_bytes / elem_bytes != count)
+        {
+            throw std::out_of_range{ "Read past the end of the serialized data." };
+        }
+        std::memcpy(elems, read_view.data() + buffer_position, total_bytes);
+        buffer_position += total_bytes;
+    }
+
+    // Reads `count` bools packed one per bit (lowest bit first) into
+    // `values`, resizing it first if it's a vector.
+    template<typename Bools>
+    void read_bits(Bools& values, size_t count)
+    {
+        // Rounded up without `count + 7`, which could overflow.
+        const uint8_t* bits{ static_cast<const uint8_t*>(read_elem(count / 8 + (count % 8 != 0 ? 1 : 0))) };
+        if constexpr (requires { values.resize(count); })
+        {
+            values.resize(count);
+        }
+        for (size_t i = 0; i < count; i++)
+        {
+            values[i] = ((bits[i / 8] >> (i % 8)) & 1) != 0;
+        }
+    }
+
+    // Unread bytes left. Streams that can't seek can't tell, so they report
+    // as many as could possibly follow.
+    size_t remaining_bytes() const
+    {
+        if (read_stream != nullptr)
+        {
+            if (stream_bytes == SIZE_MAX)
+            {
+                return SIZE_MAX;
+            }
+            return stream_bytes - std::min(stream_bytes, read_position());
+        }
+        return read_view.size() - buffer_position;
+    }
+
+    // Throws unless `count` more elements of at least `elem_bytes` each can
+    // be read. Run on list counts before anything gets sized by them.
+    void check_list_count(size_t count, size_t elem_bytes) const
+    {
+        if (elem_bytes > 0 && count > remaining_bytes() / elem_bytes)
+        {
+            throw std::out_of_range{ "List count runs past the end of the serialized data." };
+        }
+    }
+
+    // Offset of the next byte to be read, counted from the start of the
+    // view or stream.
+    size_t read_position() const
+    {
+        return stream_offset + buffer_position;
+    }
+
+    uint64_t read_varint()
+    {
+        assert(mode == SBM_READ);
+        if (read_stream != nullptr)
+        {
+            refill_read_window(k_max_varint_bytes);
+        }
+        return decode_varint(read_view, buffer_position);
+    }
+
+    // Serialized values have no alignment, so they're copied out instead of
+    // dereferenced in place.
+    template<typename T>
+    T read_value()
+    {
+        T value;
+        std::memcpy(&value, read_elem(sizeof(T)), sizeof(T));
+        return value;
+    }
+
+    // Write buffer methods.
+    // Pre-sizes the buffer so the following writes don't reallocate.
+    void reserve(size_t total_bytes)
+    {
+        buffer.reserve(total_bytes);
+    }
+
+    void write_elem(void* elem, size_t elem_bytes)
+    {
+        assert(mode == SBM_WRITE);
+        const uint8_t* first{ reinterpret_cast<const uint8_t*>(elem) };
+        buffer.insert(buffer.end(), first, first + elem_bytes);
+        if (write_stream != nullptr && buffer.size() >= window_bytes)
+        {
+            flush_write_stream();
+        }
+    }
+
+    void write_varint(uint64_t value)
+    {
+        assert(mode == SBM_WRITE);
+        while (value >= 0x80)
+        {
+            buffer.push_back(static_cast<uint8_t>(value | 0x80));
+            value >>= 7;
+        }
+        buffer.push_back(static_cast<uint8_t>(value));
+        if (write_stream != nullptr && buffer.size() >= window_bytes)
+        {
+            flush_write_stream();
+        }
+    }
+
+    // Writes the first `count` of `values` (e.g. a `std::vector<bool>`) one
+    // per bit, lowest bit first, the last byte zero padded.
+    template<typename Bools>
+    void write_bits(const Bools& values, size_t count)
+    {
+        assert(mode == SBM_WRITE);
+        size_t start{ buffer.size() };
+        buffer.resize(start + (count + 7) / 8);
+        uint8_t* bits{ buffer.data() + start };
+        for (size_t i = 0; i < count; i++)
+        {
+            bits[i / 8] |= static_cast<uint8_t>(values[i] ? 1u << (i % 8) : 0u);
+        }
+        if (write_stream != nullptr && buffer.size() >= window_bytes)
+        {
+            flush_write_stream();
+        }
+    }
+
+    // Offset the next write will land at.
+    size_t write_position() const
+    {
+        return stream_offset + buffer.size();
+    }
+
+    // Overwrites already written bytes at `position`, e.g. to fill in an
+    // offset table once the offsets are known.
+    void patch_bulk(size_t position, const void* elems, size_t elem_bytes, size_t count)
+    {
+        assert(mode == SBM_WRITE);
+        size_t total_bytes{ elem_bytes * count };
+        const uint8_t* first{ reinterpret_cast<const uint8_t*>(elems) };
+        if (position < stream_offset)
+        {
+            // Part of it was already flushed, so seek back and overwrite it.
+            size_t flushed_bytes{ std::min(total_bytes, stream_offset - position) };
+            write_stream->seekp(static_cast<std::streamoff>(position));
+            write_stream->write(reinterpret_cast<const char*>(first), flushed_bytes);
+            write_stream->seekp(static_cast<std::streamoff>(stream_offset));
+            position += flushed_bytes;
+            first += flushed_bytes;
+            total_bytes -= flushed_bytes;
+            if (total_bytes == 0)
+            {
+                return;
+            }
+        }
+        assert(position - stream_offset + total_bytes <= buffer.size());
+        std::memcpy(buffer.data() + (position - stream_offset), first, total_bytes);
+    }
+
+    // Copies `count` contiguous elements from `elems` into the buffer with
+    // one append. The list count (if any) must be written
+    // beforehand.
+    void write_bulk(const void* elems, size_t elem_bytes, size_t count)
+    {
+        assert(mode == SBM_WRITE);
+        size_t total_bytes{ elem_bytes * count };
+        if (total_bytes == 0)
+        {
+            return;
+        }
+
+        const uint8_t* first{ reinterpret_cast<const uint8_t*>(elems) };
+        if (write_stream != nullptr && buffer.size() + total_bytes >= window_bytes)
+        {
+            // Big lists skip the window and go straight to the stream.
+            flush_write_stream();
+            write_stream->write(reinterpret_cast<const char*>(first), total_bytes);
+            stream_offset += total_bytes;
+            return;
+        }
+        buffer.insert(buffer.end(), first, first + total_bytes);
+    }
+
+    // Save to/Load from disk methods.
+    bool save_buffer_to_disk(const std::string& fname, SerialCodec codec = SerialCodec::none)
+    {
+        std::span<const uint8_t> contents{ buffer };
+        std::vector<uint8_t> compressed;
+        if (codec != SerialCodec::none)
+        {
+            if (!CompressedContainer::compress(buffer, codec, compressed))
+            {
+                return false;
+            }
+            contents = compressed;
+        }
+
+        // Open file for writing.
+        std::ofstream file{ fname.c_str(), std::ios::out | std::ios::trunc | std::ios::binary };
+        if (!file.is_open())
+        {
+            return false;
+        }
+
+        // Write buffer to file.
+        file.write(reinterpret_cast<const char*>(contents.data()), contents.size());
+        file.close();
+
+        // Check for writing errors.
+        if (!file.good())
+        {
+            return false;
+        }
+
+        return true;
+    }
+
+    bool load_buffer_from_disk(const std::string& fname)
+    {
+        // Open file for reading.
+        std::ifstream file{ fname.c_str(), std::ios::in | std::ios::ate | std::ios::binary };
+        if (!file.is_open())
+        {
+            return false;
+        }
+
+        // Get filesize and copy file contents into buffer.
+        size_t filesize{ static_cast<size_t>(file.tellg()) };
+        buffer.clear();
+        buffer.resize(filesize);
+        file.seekg(0);
+        file.read(reinterpret_cast<char*>(buffer.data()), filesize);
+        file.close();
+
+        // Check for reading errors.
+        if (!file.good())
+        {
+            return false;
+        }
+
+        if (CompressedContainer::is_container(buffer))
+        {
+            std::vector<uint8_t> compressed;
+            compressed.swap(buffer);
+            return attach_file_view(compressed);
+        }
+        attach_read_view(buffer);
+        return true;
+    }
+};
+
+
+// Header in front of every dumped file:
+//     uint8_t  magic[8]
+//     uint64_t schema_fingerprint
+// The fingerprint hashes the struct's wire layout (`k_schema_fingerprint`
+// of the generated struct), so a load can tell with one compare whether
+// the file was written with the same schema.
+struct SchemaHeader
+{
+    static constexpr uint8_t k_magic[8]{ 0x89, 'H', 'S', 'F', 0x0d, 0x0a, 0x1a, 0x0a };
+    static constexpr size_t k_size{ sizeof(k_magic) + sizeof(uint64_t) };
+
+    static void write(SerialBuffer& sb, uint64_t fingerprint)
+    {
+        sb.write_bulk(k_magic, sizeof(uint8_t), sizeof(k_magic));
+        sb.write_elem(&fingerprint, sizeof(uint64_t));
+    }
+
+    // Reads the header's fingerprint. Fails if there's no header.
+    static bool read(SerialBuffer& sb, uint64_t& fingerprint)
+    {
+        if (!sb.can_read(k_size))
+        {
+            return false;
+        }
+        const uint8_t* header{ reinterpret_cast<const uint8_t*>(sb.read_elem(k_size)) };
+        if (std::memcmp(header, k_magic, sizeof(k_magic)) != 0)
+        {
+            return false;
+        }
+        std::memcpy(&fingerprint, header + sizeof(k_magic), sizeof(uint64_t));
+        return true;
+    }
+};"""
+
+
+# Record file.
+RECORD_FILE_CODE = \
+"""#pragma once
+
+#include <filesystem> // For truncating the footer before appending.
+#include <fstream>
+#include <span>
+#include <string>
+#include <vector>
+#include "serial_buffer.h"
+
+
+// Append-only file holding many serialized records:
+//     uint8_t  magic[8]
+//     uint32_t version
+//     uint32_t reserved
+//     uint64_t schema_fingerprint          `k_schema_fingerprint` of the record type.
+//     records, back to back, each a uint64_t byte length followed by the record
+//     uint64_t end_marker                  All bits set.
+//     uint64_t record_offsets[record_count]    Where each record's length starts.
+//     uint64_t record_count
+//     uint64_t index_offset                Where `record_offsets` starts.
+//     uint8_t  footer_magic[8]
+// The footer index gives O(1) access to any record. If a writer died before
+// writing the footer, the length prefixes still let readers recover every
+// complete record by scanning; the end marker stops that scan at the index.
+struct RecordFileIndex
+{
+    static constexpr uint8_t k_magic[8]{ 0x89, 'H', 'S', 'R', 0x0d, 0x0a, 0x1a, 0x0a };
+    static constexpr uint8_t k_footer_magic[8]{ 'H', 'S', 'R', 'I', 'N', 'D', 'E', 'X' };
+    static constexpr uint32_t k_version{ 2 };
+    static constexpr uint64_t k_end_marker{ ~uint64_t{ 0 } };
+    static constexpr size_t k_header_size{ sizeof(k_magic) + 2 * sizeof(uint32_t) + sizeof(uint64_t) };
+    static constexpr size_t k_footer_size{ 2 * sizeof(uint64_t) + sizeof(k_footer_magic) };
+
+    uint64_t schema_fingerprint{ 0 };
+    std::vector<uint64_t> record_offsets;
+    // End of the last complete record, where the next one gets appended.
+    uint64_t records_end{ k_header_size };
+
+    static bool is_record_file(std::span<const uint8_t> bytes)
+    {
+        return bytes.size() >= k_header_size && std::memcmp(bytes.data(), k_magic, sizeof(k_magic)) == 0;
+    }
+
+    static void write_header(SerialBuffer& sb, uint64_t fingerprint)
+    {
+        uint32_t fields32[2]{ k_version, 0 };
+        sb.write_bulk(k_magic, sizeof(uint8_t), sizeof(k_magic));
+        sb.write_bulk(fields32, sizeof(uint32_t), 2);
+        sb.write_elem(&fingerprint, sizeof(uint64_t));
+    }
+
+    // Writes the end marker, index and footer for records ending at
+    // `file_offset + sb.write_position()`.
+    void write_footer(SerialBuffer& sb, uint64_t file_offset) const
+    {
+        uint64_t end_marker{ k_end_marker };
+        sb.write_elem(&end_marker, sizeof(uint64_t));
+        uint64_t fields64[2]{ record_offsets.size(), file_offset + sb.write_position() };
+        sb.write_bulk(record_offsets.data(), sizeof(uint64_t), record_offsets.size());
+        sb.write_bulk(fields64, sizeof(uint64_t), 2);
+        sb.write_bulk(k_footer_magic, sizeof(uint8_t), sizeof(k_footer_magic));
+    }
+
+    // Reads the index of the record file in `bytes`, falling back to
+    // scanning the records if the footer is missing or damaged.
+    bool parse(std::span<const uint8_t> bytes)
+    {
+        record_offsets.clear();
+        records_end = k_header_size;
+        if (!is_record_file(bytes))
+        {
+            return false;
+        }
+        uint32_t version;
+        std::memcpy(&version, bytes.data() + sizeof(k_magic), sizeof(uint32_t));
+        if (version != k_version)
+        {
+            return false;
+        }
+        std::memcpy(&schema_fingerprint, bytes.data() + sizeof(k_magic) + 2 * sizeof(uint32_t), sizeof(uint64_t));
+
+        if (!parse_footer(bytes))
+        {
+            scan_records(bytes);
+        }
+        return true;
+    }
+
+    bool parse_footer(std::span<const uint8_t> bytes)
+    {
+        if (bytes.size() < k_header_size + sizeof(uint64_t) + k_footer_size)
+        {
+            return false;
+        }
+        const uint8_t* footer{ bytes.data() + bytes.size() - k_footer_size };
+        if (std::memcmp(footer + 2 * sizeof(uint64_t), k_footer_magic, sizeof(k_footer_magic)) != 0)
+        {
+            return false;
+        }
+        uint64_t fields64[2];
+        std::memcpy(fields64, footer, sizeof(fields64));
+        uint64_t count{ fields64[0] };
+        uint64_t index_offset{ fields64[1] };
+        uint64_t index_end{ bytes.size() - k_footer_size };
+        // Divided rather than multiplied, so a corrupt count can't wrap around.
+        if (index_offset < k_header_size + sizeof(uint64_t) || index_offset > index_end
+            || (index_end - index_offset) % sizeof(uint64_t) != 0
+            || (index_end - index_offset) / sizeof(uint64_t) != count)
+        {
+            return false;
+        }
+
+        records_end = index_offset - sizeof(uint64_t);
+        record_offsets.resize(count);
+        std::memcpy(record_offsets.data(), bytes.data() + index_offset, count * sizeof(uint64_t));
+        for (size_t i = 0; i < count; i++)
+        {
+            if (record_offsets[i] < (i == 0 ? k_header_size : record_offsets[i - 1] + sizeof(uint64_t))
+                || record_offsets[i] + sizeof(uint64_t) > records_end)
+            {
+                record_offsets.clear();
+                records_end = k_header_size;
+                return false;
+            }
+        }
+        // Each record has to end before the next one starts.
+        for (size_t i = 0; i < count; i++)
+        {
+            uint64_t length;
+            std::memcpy(&length, bytes.data() + record_offsets[i], sizeof(uint64_t));
+            uint64_t next_start{ i + 1 < count ? record_offsets[i + 1] : records_end };
+            if (length > next_start - record_offsets[i] - sizeof(uint64_t))
+            {
+                record_offsets.clear();
+                records_end = k_header_size;
+                return false;
+            }
+        }
+        return true;
+    }
+
+    void scan_records(std::span<const uint8_t> bytes)
+    {
+        uint64_t position{ k_header_size };
+        while (position + sizeof(uint64_t) <= bytes.size())
+        {
+            uint64_t length;
+            std::memcpy(&length, bytes.data() + position, sizeof(uint64_t));
+            // Stops at the end marker and at a partially written record.
+            if (length > bytes.size() - position - sizeof(uint64_t))
+            {
+                break;
+            }
+            record_offsets.push_back(position);
+            position += sizeof(uint64_t) + length;
+        }
+        records_end = position;
+    }
+};
+
+
+// Appends records of HStruct type `T` to a record file. Records are
+// serialized into a pending batch that goes out in one write once it reaches
+// `batch_bytes` (and on `flush`/`close`). The index and footer are written
+// on `close`.
+template<typename T>
+struct RecordFileAppender
+{
+    static constexpr size_t k_default_batch_bytes{ 1 << 20 };
+
+    std::fstream file;
+    RecordFileIndex index;
+    SerialBuffer pending;
+    // Bytes already in the file, not counting `pending`.
+    uint64_t file_end{ 0 };
+    size_t batch_bytes{ k_default_batch_bytes };
+
+    RecordFileAppender() = default;
+    RecordFileAppender(const RecordFileAppender&) = delete;
+    RecordFileAppender& operator=(const RecordFileAppender&) = delete;
+
+    ~RecordFileAppender()
+    {
+        close();
+    }
+
+    size_t record_count() const
+    {
+        return index.record_offsets.size();
+    }
+
+    // Opens `fname` for appending, creating it if it doesn't exist. The
+    // records already in the file are kept and its footer gets rewritten on
+    // `close`. Fails if the file holds records of a different schema.
+    bool open(const std::string& fname)
+    {
+        close();
+        pending.buffer.clear();
+        pending.mode = SerialBuffer::SBM_WRITE;
+
+        std::error_code error;
+        if (std::filesystem::exists(fname, error) && std::filesystem::file_size(fname, error) > 0)
+        {
+            MappedFile existing;
+            if (!existing.open(fname) || !index.parse(existing.view())
+                || index.schema_fingerprint != T::k_schema_fingerprint)
+            {
+                return false;
+            }
+            existing.close();
+            // Drop the old index (or a partially written record), new
+            // records go right after the last complete one.
+            std::filesystem::resize_file(fname, index.records_end, error);
+            if (error)
+            {
+                return false;
+            }
+            file_end = index.records_end;
+        }
+        else
+        {
+            std::ofstream create{ fname.c_str(), std::ios::out | std::ios::trunc | std::ios::binary };
+            if (!create.is_open())
+            {
+                return false;
+            }
+            index = RecordFileIndex{};
+            index.schema_fingerprint = T::k_schema_fingerprint;
+            RecordFileIndex::write_header(pending, T::k_schema_fingerprint);
+            file_end = 0;
+        }
+
+        file.open(fname.c_str(), std::ios::in | std::ios::out | std::ios::binary);
+        if (!file.is_open())
+        {
+            return false;
+        }
+        file.seekp(static_cast<std::streamoff>(file_end));
+        return file.good();
+    }
+
+    bool append(T& record)
+    {
+        write_record(record);
+        return pending.buffer.size() < batch_bytes || flush();
+    }
+
+    // Appends every record in `records` with a single write.
+    bool append_batch(std::span<T> records)
+    {
+        size_t total_bytes{ pending.buffer.size() };
+        for (const T& record : records)
+        {
+            total_bytes += sizeof(uint64_t) + record.serialized_size();
+        }
+        pending.reserve(total_bytes);
+        for (T& record : records)
+        {
+            write_record(record);
+        }
+        return flush();
+    }
+
+    bool flush()
+    {
+        if (!file.is_open())
+        {
+            return false;
+        }
+        if (pending.buffer.empty())
+        {
+            return true;
+        }
+        file.write(reinterpret_cast<const char*>(pending.buffer.data()), pending.buffer.size());
+        file.flush();
+        file_end += pending.buffer.size();
+        pending.buffer.clear();
+        return file.good();
+    }
+
+    // Writes out the pending records along with the index and footer.
+    bool close()
+    {
+        if (!file.is_open())
+        {
+            return true;
+        }
+        index.write_footer(pending, file_end);
+        bool result{ flush() };
+        file.close();
+        index = RecordFileIndex{};
+        return result && !file.fail();
+    }
+
+    void write_record(T& record)
+    {
+        index.record_offsets.push_back(file_end + pending.write_position());
+        size_t length_position{ pending.write_position() };
+        uint64_t length{ 0 };
+        pending.write_elem(&length, sizeof(uint64_t));
+        record.write_data_to_serial_buffer(pending);
+        length = pending.write_position() - length_position - sizeof(uint64_t);
+        pending.patch_bulk(length_position, &length, sizeof(uint64_t), 1);
+    }
+};
+
+
+// Random access to the records of a record file through a read-only memory
+// mapping. `record_bytes(i)` can also be handed to a `<Name>_view::attach`.
+template<typename T>
+struct RecordFileReader
+{
+    MappedFile file;
+    RecordFileIndex index;
+
+    // Fails if the file holds records of a different schema.
+    bool open(const std::string& fname)
+    {
+        return file.open(fname) && index.parse(file.view())
+            && index.schema_fingerprint == T::k_schema_fingerprint;
+    }
+
+    size_t size() const
+    {
+        return index.record_offsets.size();
+    }
+
+    // Serialized bytes of record `i`, viewing into the mapping. Throws
+    // `std::out_of_range` like reads do if `i` or its length prefix is.
+    std::span<const uint8_t> record_bytes(size_t i) const
+    {
+        if (i >= size())
+        {
+            throw std::out_of_range{ "Record index out of range." };
+        }
+        uint64_t offset{ index.record_offsets[i] };
+        uint64_t length;
+        std::memcpy(&length, file.data + offset, sizeof(uint64_t));
+        if (length > index.records_end - offset - sizeof(uint64_t))
+        {
+            throw std::out_of_range{ "Record length runs past the end of the records." };
+        }
+        return { file.data + offset + sizeof(uint64_t), static_cast<size_t>(length) };
+    }
+
+    // Throws `std::out_of_range` if the record doesn't decode to exactly
+    // its length.
+    void read(size_t i, T& record) const
+    {
+        SerialBuffer sb;
+        sb.attach_read_view(record_bytes(i));
+        record.read_data_from_serial_buffer(sb);
+        if (sb.buffer_position != sb.read_view.size())
+        {
+            throw std::out_of_range{ "Record has bytes left over after decoding." };
+        }
+    }
+};"""
+
+
+
+# Profiling hooks.
+HSTRUCT_PROFILE_CODE = \
+"""#pragma once
+
+#include <algorithm>
+#include <chrono>
+#include <cstdint>
+#include <cstdio>
+#include <map>
+#include <mutex>
+#include <string>
+#include <string_view>
+#include <tuple>
+#include <utility>
+#include <vector>
+#include "serial_buffer.h"
+
+
+// Per-field profiling of structs generated with `--profile-hooks`. Each field
+// read or written by `read_data_from_serial_buffer`/`write_data_to_serial_buffer`
+// reports its bytes and time to `HSTRUCT_PROFILE_CALLBACK(event)`, which adds
+// them up in `HStructProfile::global()` unless defined otherwise before the
+// generated headers are included.
+//
+// Building with `HSTRUCT_PROFILE` defined as 0 compiles the hooks out again
+// without regenerating. Structs generated without the flag have no hooks.
+#ifndef HSTRUCT_PROFILE
+#define HSTRUCT_PROFILE 1
+#endif
+
+enum class HStructProfileOp : std::uint8_t
+{
+    write = 0,
+    read,
+};
+
+struct HStructProfileEvent
+{
+    HStructProfileOp op;
+    const char* struct_name;
+    const char* field_name;
+    size_t byte_count;
+    std::chrono::nanoseconds elapsed;
+};
+
+
+// Totals per struct field and direction. Safe to record into from several
+// threads, e.g. while a `parallel` list is being written. Fields holding
+// nested structs include the time and bytes of the nested fields.
+struct HStructProfile
+{
+    struct FieldTotals
+    {
+        uint64_t calls{ 0 };
+        uint64_t byte_count{ 0 };
+        std::chrono::nanoseconds elapsed{ 0 };
+    };
+    using Key = std::tuple<std::string_view, std::string_view, HStructProfileOp>;
+
+    static HStructProfile& global()
+    {
+        static HStructProfile profile;
+        return profile;
+    }
+
+    void record(const HStructProfileEvent& event)
+    {
+        std::lock_guard<std::mutex> lock{ mutex };
+        FieldTotals& field_totals{ totals[Key{ event.struct_name, event.field_name, event.op }] };
+        field_totals.calls++;
+        field_totals.byte_count += event.byte_count;
+        field_totals.elapsed += event.elapsed;
+    }
+
+    std::map<Key, FieldTotals> snapshot() const
+    {
+        std::lock_guard<std::mutex> lock{ mutex };
+        return totals;
+    }
+
+    void reset()
+    {
+        std::lock_guard<std::mutex> lock{ mutex };
+        totals.clear();
+    }
+
+    // One line per field and direction, slowest first.
+    void dump(std::FILE* out = stdout) const
+    {
+        std::map<Key, FieldTotals> current{ snapshot() };
+        std::vector<std::pair<Key, FieldTotals>> rows{ current.begin(), current.end() };
+        std::stable_sort(rows.begin(), rows.end(), [](const auto& a, const auto& b) {
+            return a.second.elapsed > b.second.elapsed;
+        });
+        std::fprintf(out, "%-40s %-5s %12s %14s %12s %10s\\n", "field", "op", "calls", "bytes", "ms", "MB/s");
+        for (const auto& [key, field_totals] : rows)
+        {
+            const auto& [struct_name, field_name, op] = key;
+            std::string name{ struct_name };
+            name += ".";
+            name += field_name;
+            double ms{ std::chrono::duration<double, std::milli>(field_totals.elapsed).count() };
+            double mb_per_s{ ms > 0.0 ? field_totals.byte_count / (ms * 1000.0) : 0.0 };
+            std::fprintf(out, "%-40s %-5s %12llu %14llu %12.3f %10.1f\\n", name.c_str(),
+                         op == HStructProfileOp::write ? "write" : "read",
+                         static_cast<unsigned long long>(field_totals.calls),
+                         static_cast<unsigned long long>(field_totals.byte_count), ms, mb_per_s);
+        }
+    }
+
+    mutable std::mutex mutex;
+    std::map<Key, FieldTotals> totals;
+};
+
+#ifndef HSTRUCT_PROFILE_CALLBACK
+#define HSTRUCT_PROFILE_CALLBACK(event) HStructProfile::global().record(event)
+#endif
+
+
+// Measures one field from construction to the end of its scope.
+struct HStructFieldProfileScope
+{
+    const SerialBuffer& sb;
+    HStructProfileOp op;
+    const char* struct_name;
+    const char* field_name;
+    size_t start_position;
+    std::chrono::steady_clock::time_point start_time;
+
+    HStructFieldProfileScope(const SerialBuffer& sb, HStructProfileOp op, const char* struct_name, const char* field_name) :
+        sb{ sb },
+        op{ op },
+        struct_name{ struct_name },
+        field_name{ field_name },
+        start_position{ position() },
+        start_time{ std::chrono::steady_clock::now() }
+    {
+    }
+
+    HStructFieldProfileScope(const HStructFieldProfileScope&) = delete;
+    HStructFieldProfileScope& operator=(const HStructFieldProfileScope&) = delete;
+
+    ~HStructFieldProfileScope()
+    {
+        auto elapsed{ std::chrono::steady_clock::now() - start_time };
+        HStructProfileEvent event{ op, struct_name, field_name, position() - start_position,
+                                   std::chrono::duration_cast<std::chrono::nanoseconds>(elapsed) };
+        HSTRUCT_PROFILE_CALLBACK(event);
+    }
+
+    size_t position() const
+    {
+        return op == HStructProfileOp::write ? sb.write_position() : sb.read_position();
+    }
+};
+
+#if HSTRUCT_PROFILE
+#define HSTRUCT_PROFILE_FIELD(sb, op, struct_name, field_name) \\
+    HStructFieldProfileScope hstruct_profile_scope{ sb, HStructProfileOp::op, struct_name, field_name }
+#else
+#define HSTRUCT_PROFILE_FIELD(sb, op, struct_name, field_name) ((void)0)
+#endif"""
+
+def write_struct_files(out_dir: str, struct: HStruct, import_list: List[str], variants: List[LayoutVariant],
+                       profile_hooks: bool = False) -> List[str]:
+    # Writes the C++ header and Python codec for `struct`. `variants` are
+    # its `layout_variants`. Returns the files that actually changed on disk.
+    # `profile_hooks` instruments every field's read and write for
+    # `hstruct_profile.h`.
+    struct_list: List[HStruct] = [struct]
+    fingerprint = variants[0].fingerprint
+    previous_variants = variants[1:]
+
+    # Write out generated file.
+    with CppFilePrinter(f"{out_dir}/{struct.struct_name}.hstruct.h") as cfp:
+        cfp.write_line(GENERATED_CODE_COMMENT_CODE)
+        cfp.write_line("#pragma once")
+        cfp.write_line("")
+        cfp.write_line("#include \"hstruct_ifc.h\"")
+        if profile_hooks:
+            cfp.write_line("#include \"hstruct_profile.h\"")
+
+        for import_em in import_list:
+            cfp.write_line(f"#include \"{import_em}.hstruct.h\"")
+
+        cfp.write_line("")
+        cfp.write_line("")
+
+
+        for struct in struct_list:
+            # Start struct.
+            cfp.write_line(f"struct {struct.struct_name} : public HStruct_ifc")
+            cfp.open_block()
+
+            # Write out member variables. `pmr` structs have constructors, so
+            # their primitives need initializers to still start out zeroed.
+            primitive_init = "{}" if struct_is_pmr(struct) else ""
+            for member in struct.members:
+                field_type = member.field_type
+                init = primitive_init if field_type_is_pmr_plain(field_type) else ""
+                cfp.write_line(f"{field_type_name_to_cpp_name(field_type)} {member.field_name}{init};")
+
+            cfp.write_line("")
+
+
+            # Allocator-aware constructors.
+            if struct_is_pmr(struct):
+                write_pmr_constructors(cfp, struct)
+
+
+            # Schema fingerprint.
+            cfp.write_line("// Hash of the wire layout, written into the header of dumped files.")
+            cfp.write_line(f"static constexpr uint64_t k_schema_fingerprint{{ 0x{fingerprint:016x}ull }};")
+            cfp.write_line("")
+
+
+            # Packed layout offsets and in-place accessors.
+            if struct_is_packed(struct):
+                write_packed_layout(cfp, struct)
+
+
+            # serialized_size().
+            write_serialized_size_method(cfp, struct)
+
+
+            # File I/O failures throw, they're not programming errors.
+            wrong_schema_message = f"Wrong schema or truncated data, expected {struct.struct_name}:"
+
+            # serialize_dump().
+            cfp.write_line("void serialize_dump(const std::string& fname, SerialCodec codec = SerialCodec::none) override")
+            cfp.open_block()
+
+            # Dump struct data into buffer.
             cfp.write_line("SerialBuffer sb;")
+            cfp.write_line("sb.mode = SerialBuffer::SBM_WRITE;")
+            cfp.write_line("size_t expected_size{ SchemaHeader::k_size + serialized_size() };")
+            cfp.write_line("sb.reserve(expected_size);")
+            cfp.write_line("SchemaHeader::write(sb, k_schema_fingerprint);")
             cfp.write_line("write_data_to_serial_buffer(sb);")
+            cfp.write_line("assert(sb.buffer.size() == expected_size);")
 
             # Write data to disk.
-            cfp.write_line("bool result{ sb.save_buffer_to_disk(fname) };")
-            cfp.write_line("assert(result);")
-            cfp.write_line("}")
+            write_throw_unless(cfp, "sb.save_buffer_to_disk(fname, codec)", "Can't write")
+            cfp.close_block()
             cfp.write_line("")
 
 
             # serialize_load().
             cfp.write_line("void serialize_load(const std::string& fname) override")
-            cfp.write_line("{")
+            cfp.open_block()
 
             # Read data from disk.
             cfp.write_line("SerialBuffer sb;")
-            cfp.write_line("bool result{ sb.load_buffer_from_disk(fname) };")
-            cfp.write_line("assert(result);")
-            cfp.write_line("read_data_from_serial_buffer(sb);")
+            write_throw_unless(cfp, "sb.load_buffer_from_disk(fname)", "Can't read")
+            write_throw_unless(cfp, "read_file_from_serial_buffer(sb)", wrong_schema_message)
 
-            cfp.write_line("}")
+            cfp.close_block()
             cfp.write_line("")
 
 
-            # write_data_to_serial_buffer().
-            cfp.write_line("void write_data_to_serial_buffer(SerialBuffer& sb) override")
-            cfp.write_line("{")
+            # serialize_load_mmap().
+            cfp.write_line("void serialize_load_mmap(const std::string& fname) override")
+            cfp.open_block()
 
-            # Write out member variables.
-            first = True
-            prev_was_block = False
-            for member in struct.members:
-                # Add separating line if prev written section was a block.
-                if not first:
-                    if prev_was_block or member.field_type.is_list_of_type:
-                        cfp.write_line("")
-
-                prev_was_block = False
-
-                iterations = 1  # Default 1 for if not a list.
-                if member.field_type.is_list_of_type:
-                    if member.field_type.list_count == -1:
-                        # Is vector, write count as int right now.
-                        cfp.write_line(f"size_t {member.field_name}__list_count{{ {member.field_name}.size() }};")
-                        cfp.write_line(f"sb.write_elem(&{member.field_name}__list_count, sizeof(size_t));")
-                        iterations = f"{member.field_name}__list_count"
-                    else:
-                        # Is array, use fixed count.
-                        iterations = member.field_type.list_count
-                        assert iterations > 0, f"Bad list_count: {iterations}"
-
-                # Write out elements.
-                field_suffix = ""
-                if iterations != 1:
-                    cfp.write_line(f"for (size_t i = 0; i < {iterations}; i++)")
-                    cfp.write_line("{")
-                    field_suffix = "[i]"
-                if member.field_type.is_builtin_primitive:
-                    # Write primitive.
-                    if member.field_type.is_string:
-                        cfp.write_line(f"size_t {member.field_name}__str_length{{ {member.field_name}{field_suffix}.length() }};")
-                        cfp.write_line(f"sb.write_elem(&{member.field_name}__str_length, sizeof(size_t));")
-                        cfp.write_line(f"sb.write_elem({member.field_name}{field_suffix}.data(), sizeof(char) * {member.field_name}__str_length);")
-                    else:
-                        cfp.write_line(f"sb.write_elem(&{member.field_name}{field_suffix}, sizeof({member.field_type.type_name}));")
-                else:
-                    # Recurse thru HStruct write func.
-                    cfp.write_line(f"{member.field_name}{field_suffix}.write_data_to_serial_buffer(sb);")
-                if iterations != 1:
-                    cfp.write_line("}")
+            # Map file and read straight out of the mapping.
+            cfp.write_line("MappedFile file;")
+            write_throw_unless(cfp, "file.open(fname)", "Can't map")
+            cfp.write_line("SerialBuffer sb;")
+            write_throw_unless(cfp, "sb.attach_file_view(file.view())", "Can't decompress")
+            write_throw_unless(cfp, "read_file_from_serial_buffer(sb)", wrong_schema_message)
+
+            cfp.close_block()
+            cfp.write_line("")
+
+
+            # serialize_dump_streamed().
+            cfp.write_line("void serialize_dump_streamed(const std::string& fname, size_t window_bytes = SerialBuffer::k_default_window_bytes) override")
+            cfp.open_block()
+
+            # Write through a bounded window straight to the file.
+            cfp.write_line("std::ofstream file{ fname.c_str(), std::ios::out | std::ios::trunc | std::ios::binary };")
+            write_throw_unless(cfp, "file.is_open()", "Can't write")
+            cfp.write_line("SerialBuffer sb;")
+            cfp.write_line("sb.attach_write_stream(file, window_bytes);")
+            cfp.write_line("SchemaHeader::write(sb, k_schema_fingerprint);")
+            cfp.write_line("write_data_to_serial_buffer(sb);")
+            write_throw_unless(cfp, "sb.flush_write_stream()", "Can't write")
+
+            cfp.close_block()
+            cfp.write_line("")
+
+
+            # serialize_load_streamed().
+            cfp.write_line("void serialize_load_streamed(const std::string& fname, size_t window_bytes = SerialBuffer::k_default_window_bytes) override")
+            cfp.open_block()
+
+            # Read through a bounded window straight from the file.
+            cfp.write_line("std::ifstream file{ fname.c_str(), std::ios::in | std::ios::binary };")
+            write_throw_unless(cfp, "file.is_open()", "Can't read")
+            cfp.write_line("uint8_t header[CompressedContainer::k_fixed_header_size]{};")
+            cfp.write_line("file.read(reinterpret_cast<char*>(header), sizeof(header));")
+            cfp.write_line("if (CompressedContainer::is_container({ header, static_cast<size_t>(file.gcount()) }))")
+            cfp.open_block()
+            cfp.write_line("serialize_load(fname);")
+            cfp.write_line("return;")
+            cfp.close_block()
+            cfp.write_line("file.clear();")
+            cfp.write_line("file.seekg(0);")
+            cfp.write_line("SerialBuffer sb;")
+            cfp.write_line("sb.attach_read_stream(file, window_bytes);")
+            write_throw_unless(cfp, "read_file_from_serial_buffer(sb)", wrong_schema_message)
+
+            cfp.close_block()
+            cfp.write_line("")
+
+
+            # serialize_to().
+            cfp.write_line("void serialize_to(std::vector<uint8_t>& out) override")
+            cfp.open_block()
+
+            # Write straight into `out`'s storage.
+            cfp.write_line("SerialBuffer sb;")
+            cfp.write_line("sb.buffer.swap(out);")
+            cfp.write_line("sb.clear();")
+            cfp.write_line("sb.mode = SerialBuffer::SBM_WRITE;")
+            cfp.write_line("size_t expected_size{ SchemaHeader::k_size + serialized_size() };")
+            cfp.write_line("sb.reserve(expected_size);")
+            cfp.write_line("SchemaHeader::write(sb, k_schema_fingerprint);")
+            cfp.write_line("write_data_to_serial_buffer(sb);")
+            cfp.write_line("assert(sb.buffer.size() == expected_size);")
+            cfp.write_line("out.swap(sb.buffer);")
+
+            cfp.close_block()
+            cfp.write_line("")
+
+
+            # serialize_into().
+            cfp.write_line("size_t serialize_into(std::span<uint8_t> out) override")
+            cfp.open_block()
+
+            # Write into the thread's scratch buffer, then copy it over.
+            cfp.write_line("size_t expected_size{ SchemaHeader::k_size + serialized_size() };")
+            cfp.write_line("if (expected_size > out.size())")
+            cfp.open_block()
+            cfp.write_line("return 0;")
+            cfp.close_block()
+            cfp.write_line("SerialBuffer& sb{ SerialBuffer::thread_scratch() };")
+            cfp.write_line("sb.clear();")
+            cfp.write_line("sb.mode = SerialBuffer::SBM_WRITE;")
+            cfp.write_line("sb.reserve(expected_size);")
+            cfp.write_line("SchemaHeader::write(sb, k_schema_fingerprint);")
+            cfp.write_line("write_data_to_serial_buffer(sb);")
+            cfp.write_line("assert(sb.buffer.size() == expected_size);")
+            cfp.write_line("std::memcpy(out.data(), sb.buffer.data(), expected_size);")
+            cfp.write_line("return expected_size;")
+
+            cfp.close_block()
+            cfp.write_line("")
+
+
+            # deserialize_from().
+            cfp.write_line("bool deserialize_from(std::span<const uint8_t> bytes) override")
+            cfp.open_block()
+
+            # Read straight out of `bytes`.
+            cfp.write_line("SerialBuffer sb;")
+            cfp.write_line("if (!sb.attach_file_view(bytes) || !read_file_from_serial_buffer(sb))")
+            cfp.open_block()
+            cfp.write_line("return false;")
+            cfp.close_block()
+            cfp.write_line("return sb.buffer_position == sb.read_view.size();")
 
-                prev_was_block = iterations != 1
-                first = False
+            cfp.close_block()
+            cfp.write_line("")
 
 
-            cfp.write_line("}")
+            # write_data_to_serial_buffer().
+            write_serialize_method(cfp, struct, profile_hooks)
             cfp.write_line("")
 
 
             # read_data_from_serial_buffer().
-            cfp.write_line(f"void read_data_from_serial_buffer(SerialBuffer& sb) override")
-            cfp.write_line("{")
+            write_deserialize_method(cfp, struct, profile_hooks)
+            cfp.write_line("")
 
-            # Read in member variables.
-            first = True
-            prev_was_block = False
-            for member in struct.members:
-                # Add separating line if prev written section was a block.
-                if not first:
-                    if prev_was_block or member.field_type.is_list_of_type:
-                        cfp.write_line("")
-
-                prev_was_block = False
-
-                iterations = 1  # Default 1 for if not a list.
-                use_emplace_back = False
-                if member.field_type.is_list_of_type:
-                    if member.field_type.list_count == -1:
-                        # Is vector, read count as int right now.
-                        cfp.write_line(f"size_t {member.field_name}__list_count{{")
-                        cfp.write_line(f"*reinterpret_cast<size_t*>(sb.read_elem(sizeof(size_t)))")
-                        cfp.write_line("};")
-                        cfp.write_line(f"{member.field_name}.clear();")
-                        cfp.write_line(f"{member.field_name}.reserve({member.field_name}__list_count);")
-                        iterations = f"{member.field_name}__list_count"
-                        use_emplace_back = True
-                    else:
-                        # Is array, use fixed count.
-                        iterations = member.field_type.list_count
-                        use_emplace_back = False
-                        assert iterations > 0, f"Bad list_count: {iterations}"
-
-                # Write out elements.
-                field_suffix = ""
-                if iterations != 1:
-                    cfp.write_line(f"for (size_t i = 0; i < {iterations}; i++)")
-                    cfp.write_line("{")
-                    field_suffix = "[i]"
-                if use_emplace_back:
-                    if member.field_type.is_builtin_primitive:
-                        # Read primitive.
-                        if member.field_type.is_string:
-                            cfp.write_line(f"size_t {member.field_name}__str_length{{")
-                            cfp.write_line(f"*reinterpret_cast<size_t*>(sb.read_elem(sizeof(size_t)))")
-                            cfp.write_line("};")
-                            cfp.write_line(f"{member.field_name}.emplace_back(reinterpret_cast<const char*>(sb.read_elem(sizeof(char) * {member.field_name}__str_length)), {member.field_name}__str_length);")
-                        else:
-                            cfp.write_line(f"{member.field_name}.emplace_back(*reinterpret_cast<{member.field_type.type_name}*>(sb.read_elem(sizeof({member.field_type.type_name}))));")
-                    else:
-                        # Recurse thru HStruct read func.
-                        cfp.write_line(f"{member.field_name}.emplace_back({member.field_type.type_name}{{}});")
-                        cfp.write_line(f"{member.field_name}.back().read_data_from_serial_buffer(sb);")
-                else:
-                    if member.field_type.is_builtin_primitive:
-                        # Read primitive.
-                        if member.field_type.is_string:
-                            cfp.write_line(f"size_t {member.field_name}__str_length{{")
-                            cfp.write_line(f"*reinterpret_cast<size_t*>(sb.read_elem(sizeof(size_t)))")
-                            cfp.write_line("};")
-                            cfp.write_line(f"{member.field_name}{field_suffix} = std::string{{ reinterpret_cast<const char*>(sb.read_elem(sizeof(char) * {member.field_name}__str_length)), {member.field_name}__str_length }};")
-                        else:
-                            cfp.write_line(f"{member.field_name}{field_suffix} = *reinterpret_cast<{member.field_type.type_name}*>(sb.read_elem(sizeof({member.field_type.type_name})));")
-                    else:
-                        # Recurse thru HStruct read func.
-                        cfp.write_line(f"{member.field_name}{field_suffix}.read_data_from_serial_buffer(sb);")
-                if iterations != 1:
-                    cfp.write_line("}")
-
-                prev_was_block = iterations != 1
-                first = False
-
-            cfp.write_line("}")
+
+            # read_file_from_serial_buffer().
+            write_read_file_method(cfp, [variant.fingerprint for variant in previous_variants])
+
+            # Migrations from older layouts.
+            for variant in previous_variants:
+                cfp.write_line("")
+                write_previous_layout_read_method(cfp, struct, variant)
+
+            # operator==(), write_delta() and apply_delta().
+            cfp.write_line("")
+            write_equality_operator(cfp, struct)
+            cfp.write_line("")
+            write_delta_methods(cfp, struct)
 
             # End struct.
-            cfp.write_line("};")
+            cfp.close_block("};")
+            cfp.write_line("")
+            cfp.write_line("")
+
+            # Write out view variant of struct.
+            write_view_struct(cfp, struct)
+
+            # Write out lazy variant of struct.
+            if struct_has_lazy_fields(struct):
+                cfp.write_line("")
+                cfp.write_line("")
+                write_lazy_struct(cfp, struct)
+
+    # Write out Python twin of generated file.
+    py_fname = f"{out_dir}/{struct.struct_name}_hstruct.py"
+    written = [cfp.fname] if cfp.written else []
+    if write_py_struct_file(py_fname, struct, import_list, fingerprint):
+        written.append(py_fname)
+    return written
+
+
+def write_support_files(out_dir: str) -> List[str]:
+    # Writes the headers (and Python module) shared by every generated struct.
+    written: List[str] = []
 
     # Write HStruct interface file.
-    with CppFilePrinter(f"gen/hstruct_ifc.h") as cfp:
+    with CppFilePrinter(f"{out_dir}/hstruct_ifc.h") as cfp:
         cfp.write_line(GENERATED_CODE_COMMENT_CODE)
         cfp.write_line(HSTRUCT_IFC_CODE)
+    if cfp.written:
+        written.append(cfp.fname)
 
     # Write Serial buffer file.
-    with CppFilePrinter(f"gen/serial_buffer.h") as cfp:
+    with CppFilePrinter(f"{out_dir}/serial_buffer.h") as cfp:
         cfp.write_line(GENERATED_CODE_COMMENT_CODE)
         cfp.write_line(SERIAL_BUFFER_CODE)
-    
-    # End.
-    pass
+    if cfp.written:
+        written.append(cfp.fname)
+
+    # Write record file header.
+    with CppFilePrinter(f"{out_dir}/record_file.h") as cfp:
+        cfp.write_line(GENERATED_CODE_COMMENT_CODE)
+        cfp.write_line(RECORD_FILE_CODE)
+    if cfp.written:
+        written.append(cfp.fname)
+
+    # Write profiling hooks header.
+    with CppFilePrinter(f"{out_dir}/hstruct_profile.h") as cfp:
+        cfp.write_line(GENERATED_CODE_COMMENT_CODE)
+        cfp.write_line(HSTRUCT_PROFILE_CODE)
+    if cfp.written:
+        written.append(cfp.fname)
+
+    # Write the helpers shared by the Python twins.
+    if write_py_runtime_file(out_dir):
+        written.append(f"{out_dir}/{PY_RUNTIME_MODULE_NAME}.py")
+
+    return written
+
+
+@dataclass
+class HStructSource:
+    path: Path
+    source_hash: str
+    import_list: List[str]
+    struct: HStruct
+
+
+# Rebuild cache kept next to the generated files in batch mode.
+REBUILD_CACHE_FNAME = ".hstruct_cache.json"
+
+# Anything these files emit is baked into the generated output, so editing
+# them invalidates the whole rebuild cache.
+GENERATOR_SOURCE_FNAMES = ["gen_cpp_struct.py", "gen_py_struct.py", "hstruct_schema.py"]
+
+
+def generator_hash() -> str:
+    generator_dir = Path(__file__).resolve().parent
+    return hash_bytes(*[(generator_dir / fname).read_bytes() for fname in GENERATOR_SOURCE_FNAMES])
+
+
+def parse_hstruct_source(path: Path) -> HStructSource:
+    source_bytes = path.read_bytes()
+    import_list, struct = parse_hstruct_file(str(path))
+    check_struct_references(struct, import_list)
+    return HStructSource(path, hash_bytes(source_bytes), import_list, struct)
+
+
+# Jobs are handed to pool workers in batches of about this many per worker
+# to keep the pickling round trips down.
+JOB_BATCHES_PER_WORKER = 4
+
+
+def run_jobs(executor: Optional[Executor], jobs: int, func: Callable, *iterables: List) -> List:
+    # `map` over the pool, or inline without one. Results come back in input
+    # order either way, so output doesn't depend on scheduling.
+    if executor is None:
+        return list(map(func, *iterables))
+    chunksize = max(1, len(iterables[0]) // (jobs * JOB_BATCHES_PER_WORKER))
+    return list(executor.map(func, *iterables, chunksize=chunksize))
+
+
+def collect_hstruct_sources(root_dir: str, executor: Optional[Executor] = None, jobs: int = 1) -> Dict[str, HStructSource]:
+    # Parses every `.hstruct` file under `root_dir` exactly once.
+    sources: Dict[str, HStructSource] = {}
+    paths = sorted(Path(root_dir).rglob("*.hstruct"))
+    for path, source in zip(paths, run_jobs(executor, jobs, parse_hstruct_source, paths)):
+        struct_name = source.struct.struct_name
+        if struct_name in sources:
+            raise AssertionError(f"Struct `{struct_name}` defined twice: "
+                                 f"{sources[struct_name].path} and {path}.")
+        sources[struct_name] = source
+
+    # Every import has to resolve to a parsed struct.
+    for source in sources.values():
+        for import_em in source.import_list:
+            assert import_em in sources, f"`{source.path}` imports `{import_em}`, which isn't defined under {root_dir}."
+    return sources
+
+
+def resolve_import_order(sources: Dict[str, HStructSource]) -> List[str]:
+    # Topologically sorts structs so imports come before their importers.
+    # Ties keep name order so the result is deterministic.
+    order: List[str] = []
+    state: Dict[str, str] = {}  # "visiting" or "done".
+    stack: List[str] = []
+
+    def visit(name: str):
+        if state.get(name) == "done":
+            return
+        if state.get(name) == "visiting":
+            cycle = stack[stack.index(name):] + [name]
+            raise AssertionError(f"Import cycle: {' -> '.join(cycle)}")
+        state[name] = "visiting"
+        stack.append(name)
+        for import_em in sorted(sources[name].import_list):
+            visit(import_em)
+        stack.pop()
+        state[name] = "done"
+        order.append(name)
+
+    for name in sorted(sources):
+        visit(name)
+    return order
+
+
+def compute_rebuild_keys(sources: Dict[str, HStructSource], order: List[str], gen_hash: str) -> Dict[str, str]:
+    # A struct's key covers the generator, its own source and, through the
+    # keys of its imports, everything it transitively imports.
+    keys: Dict[str, str] = {}
+    for name in order:
+        source = sources[name]
+        import_keys = [keys[import_em].encode() for import_em in sorted(source.import_list)]
+        keys[name] = hash_bytes(gen_hash.encode(), source.source_hash.encode(), *import_keys)
+    return keys
+
+
+def load_rebuild_cache(out_dir: str) -> Dict[str, str]:
+    cache_path = Path(out_dir) / REBUILD_CACHE_FNAME
+    if not cache_path.exists():
+        return {}
+    try:
+        with open(cache_path, "r") as cache_file:
+            return json.load(cache_file)
+    except (OSError, ValueError):
+        # A broken cache just means a full rebuild.
+        return {}
+
+
+def save_rebuild_cache(out_dir: str, keys: Dict[str, str]):
+    write_file_if_changed(str(Path(out_dir) / REBUILD_CACHE_FNAME), json.dumps(keys, indent=4, sort_keys=True) + "\n")
+
+
+def struct_output_fnames(out_dir: str, struct_name: str) -> List[str]:
+    return [f"{out_dir}/{struct_name}.hstruct.h", f"{out_dir}/{struct_name}_hstruct.py"]
+
+
+def group_import_levels(sources: Dict[str, HStructSource], order: List[str]) -> List[List[str]]:
+    # Splits the topological order into levels: a struct's imports all live in
+    # earlier levels, so everything within a level can be generated at once.
+    levels: List[List[str]] = []
+    level_of: Dict[str, int] = {}
+    for name in order:
+        level = 1 + max((level_of[import_em] for import_em in sources[name].import_list), default=-1)
+        level_of[name] = level
+        if level == len(levels):
+            levels.append([])
+        levels[level].append(name)
+    return levels
+
+
+def generate_directory(root_dir: str, out_dir: str, jobs: int = 1, profile_hooks: bool = False):
+    executor = ProcessPoolExecutor(max_workers=jobs) if jobs > 1 else None
+    try:
+        sources = collect_hstruct_sources(root_dir, executor, jobs)
+        order = resolve_import_order(sources)
+        gen_hash = generator_hash()
+        if profile_hooks:
+            # Instrumented output differs, so it mustn't share cache keys.
+            gen_hash = hash_bytes(gen_hash.encode(), b"profile_hooks")
+        keys = compute_rebuild_keys(sources, order, gen_hash)
+        variants = layout_variants({name: source.struct for name, source in sources.items()})
+        cache = load_rebuild_cache(out_dir)
+
+        Path(out_dir).mkdir(parents=True, exist_ok=True)
+        written: List[str] = []
+        regenerated = 0
+        for level in group_import_levels(sources, order):
+            stale = [
+                name for name in level
+                if cache.get(name) != keys[name]
+                or not all(Path(fname).exists() for fname in struct_output_fnames(out_dir, name))
+            ]
+            results = run_jobs(
+                executor, jobs, write_struct_files,
+                [out_dir] * len(stale),
+                [sources[name].struct for name in stale],
+                [sources[name].import_list for name in stale],
+                [variants[name] for name in stale],
+                [profile_hooks] * len(stale),
+            )
+            for struct_written in results:
+                written += struct_written
+            regenerated += len(stale)
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+    written += write_support_files(out_dir)
+    save_rebuild_cache(out_dir, keys)
+    print(f"{len(order)} structs, {regenerated} regenerated, {len(written)} files written.")
+
+
+def main():
+    # Arg parser.
+    parser = ArgumentParser()
+    input_group = parser.add_mutually_exclusive_group(required=True)
+    input_group.add_argument("-f", "--file", dest="filename",
+                             help="input .hstruct file to use for generating struct")
+    input_group.add_argument("-d", "--dir", dest="dirname",
+                             help="generate every .hstruct file under this directory, "
+                                  "skipping structs that haven't changed since the last run")
+    parser.add_argument("-o", "--out-dir", dest="out_dir", default="gen",
+                        help="directory to write generated files into (default: gen)")
+    parser.add_argument("-j", "--jobs", dest="jobs", type=int, default=1,
+                        help="worker processes for parsing and generating in batch mode "
+                             "(0 uses every core, default: 1)")
+    parser.add_argument("--profile-hooks", dest="profile_hooks", action="store_true",
+                        help="time and count the bytes of every field read and write "
+                             "(see hstruct_profile.h)")
+    args = parser.parse_args()
+
+    if args.dirname is not None:
+        jobs = args.jobs if args.jobs > 0 else (os.cpu_count() or 1)
+        generate_directory(args.dirname, args.out_dir, jobs, args.profile_hooks)
+        return
+
+    # Single file. Imports are looked up next to it.
+    ir = load_schema_ir(args.filename)
+    struct = ir.layouts[ir.root_name].struct
+    import_list = ir.import_lists[ir.root_name]
+    variants = layout_variants(ir.schemas)
+
+    Path(args.out_dir).mkdir(parents=True, exist_ok=True)
+    write_struct_files(args.out_dir, struct, import_list, variants[ir.root_name], args.profile_hooks)
+    write_support_files(args.out_dir)
 
 if __name__ == '__main__':
     main()
@@ -0,0 +1,724 @@
+import re
+from argparse import ArgumentParser
+from contextlib import contextmanager
+from pathlib import Path
+from typing import List
+
+from hstruct_schema import (
+    GENERATED_CODE_COMMENT_CODE,
+    LENGTH_BYTE_SIZE,
+    DataType,
+    HField,
+    HStruct,
+    bit_byte_count,
+    field_is_bit_flag,
+    field_is_fixed_size,
+    field_varint_elems,
+    field_varint_is_signed,
+    fixed_run_byte_size,
+    fixed_run_struct_format,
+    group_fixed_size_runs,
+    load_schema_ir,
+    packed_offset_table_count,
+    split_packed_members,
+    struct_is_packed,
+    write_file_if_changed,
+)
+
+
+PY_INDENTATION_AMOUNT = 4
+class PyFilePrinter:
+
+    def __init__(self, fname: str):
+        self.fname = fname
+        self.indentation = 0
+        self.written = False
+
+    def __enter__(self):
+        self.lines: List[str] = []
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if exc_type is None:
+            self.written = write_file_if_changed(self.fname, "".join(self.lines))
+
+    def write_line(self, line: str):
+        if len(line.strip()) == 0:
+            self.lines.append("\n")
+        else:
+            self.lines.append(f"{' ' * self.indentation}{line}\n")
+
+    @contextmanager
+    def block(self, line: str):
+        # Writes `line` (ending in `:`) and indents everything inside the block.
+        self.write_line(line)
+        self.indentation += PY_INDENTATION_AMOUNT
+        yield
+        self.indentation -= PY_INDENTATION_AMOUNT
+
+
+# Generated header comment marking generated code (same banner as the C++ headers).
+GENERATED_CODE_COMMENT_PY = "\n".join(
+    f"#{line[2:]}".rstrip() for line in GENERATED_CODE_COMMENT_CODE.splitlines()[1:-1]
+)
+
+# Standard imports at the top of every generated module.
+PY_STANDARD_IMPORTS_CODE = \
+"""import struct
+import sys
+from array import array
+from typing import List, Tuple"""
+
+# Module holding the codec helpers, written once next to the generated modules.
+PY_RUNTIME_MODULE_NAME = "hstruct_runtime"
+
+# Helpers shared by every generated module.
+PY_RUNTIME_CODE = PY_STANDARD_IMPORTS_CODE + \
+"""
+
+
+_LENGTH = struct.Struct('<Q')
+
+# Header in front of dumped files: magic, then the schema fingerprint.
+_FILE_HEADER = struct.Struct('<8sQ')
+_FILE_MAGIC = b'\\x89HSF\\r\\n\\x1a\\n'
+
+
+def _array_typecode(struct_format: str) -> str:
+    # `array` typecodes are platform sized, so pick the one matching the wire size.
+    if struct_format == 'f':
+        return 'f'
+    byte_size = struct.calcsize(f'<{struct_format}')
+    candidates = 'bhilq' if struct_format.islower() else 'BHILQ'
+    for typecode in candidates:
+        if array(typecode).itemsize == byte_size:
+            return typecode
+    raise AssertionError(f'No array typecode for struct format `{struct_format}`.')
+
+
+def _varint_size(value: int) -> int:
+    size = 1
+    while value >= 0x80:
+        value >>= 7
+        size += 1
+    return size
+
+
+def _pack_varint(buf, pos: int, value: int) -> int:
+    while value >= 0x80:
+        buf[pos] = (value & 0x7f) | 0x80
+        value >>= 7
+        pos += 1
+    buf[pos] = value
+    return pos + 1
+
+
+def _unpack_varint(view: memoryview, pos: int) -> Tuple[int, int]:
+    value = 0
+    shift = 0
+    while True:
+        byte = view[pos]
+        pos += 1
+        value |= (byte & 0x7f) << shift
+        if byte < 0x80:
+            return value, pos
+        shift += 7
+
+
+def _zigzag_encode(value: int) -> int:
+    return (value << 1) ^ (value >> 63)
+
+
+def _zigzag_decode(value: int) -> int:
+    return (value >> 1) ^ -(value & 1)
+
+
+def _pack_length(buf, pos: int, length: int, varint: bool) -> int:
+    if varint:
+        return _pack_varint(buf, pos, length)
+    _LENGTH.pack_into(buf, pos, length)
+    return pos + 8
+
+
+def _unpack_length(view: memoryview, pos: int, varint: bool) -> Tuple[int, int]:
+    if varint:
+        return _unpack_varint(view, pos)
+    return _LENGTH.unpack_from(view, pos)[0], pos + 8
+
+
+def _pack_varints(buf, pos: int, values: List[int], signed: bool) -> int:
+    for value in values:
+        pos = _pack_varint(buf, pos, _zigzag_encode(value) if signed else value)
+    return pos
+
+
+def _unpack_varints(view: memoryview, pos: int, count: int, signed: bool) -> Tuple[List[int], int]:
+    values = []
+    for _ in range(count):
+        value, pos = _unpack_varint(view, pos)
+        values.append(_zigzag_decode(value) if signed else value)
+    return values, pos
+
+
+def _varints_size(values: List[int], signed: bool) -> int:
+    if signed:
+        return sum(_varint_size(_zigzag_encode(value)) for value in values)
+    return sum(_varint_size(value) for value in values)
+
+
+def _pack_string(buf, pos: int, value: str, varint: bool = False) -> int:
+    encoded = value.encode('utf-8', errors='surrogateescape')
+    if varint:
+        pos = _pack_varint(buf, pos, len(encoded))
+    else:
+        _LENGTH.pack_into(buf, pos, len(encoded))
+        pos += 8
+    buf[pos : pos + len(encoded)] = encoded
+    return pos + len(encoded)
+
+
+def _unpack_string(view: memoryview, pos: int, varint: bool = False) -> Tuple[str, int]:
+    if varint:
+        length, pos = _unpack_varint(view, pos)
+    else:
+        (length,) = _LENGTH.unpack_from(view, pos)
+        pos += 8
+    assert pos + length <= len(view), 'Read past the end of the serialized data.'
+    return str(view[pos : pos + length], 'utf-8', errors='surrogateescape'), pos + length
+
+
+def _string_size(value: str, varint: bool = False) -> int:
+    length = len(value.encode('utf-8', errors='surrogateescape'))
+    return (_varint_size(length) if varint else 8) + length
+
+
+def _pack_array(buf, pos: int, values, typecode: str, varint: bool = False) -> int:
+    if not isinstance(values, array) or values.typecode != typecode:
+        values = array(typecode, values)
+    if sys.byteorder != 'little':
+        values = array(typecode, values)
+        values.byteswap()
+    pos = _pack_length(buf, pos, len(values), varint)
+    raw = memoryview(values).cast('B')
+    buf[pos : pos + len(raw)] = raw
+    return pos + len(raw)
+
+
+def _unpack_array(view: memoryview, pos: int, typecode: str, varint: bool = False) -> Tuple[array, int]:
+    count, pos = _unpack_length(view, pos, varint)
+    values = array(typecode)
+    end = pos + count * values.itemsize
+    assert end <= len(view), 'Read past the end of the serialized data.'
+    values.frombytes(view[pos:end])
+    if sys.byteorder != 'little':
+        values.byteswap()
+    return values, end
+
+
+def _pack_bool_list(buf, pos: int, values: List[bool], varint: bool = False) -> int:
+    pos = _pack_length(buf, pos, len(values), varint)
+    buf[pos : pos + len(values)] = bytes(bool(value) for value in values)
+    return pos + len(values)
+
+
+def _unpack_bool_list(view: memoryview, pos: int, varint: bool = False) -> Tuple[List[bool], int]:
+    count, pos = _unpack_length(view, pos, varint)
+    assert pos + count <= len(view), 'Read past the end of the serialized data.'
+    return [byte != 0 for byte in view[pos : pos + count]], pos + count
+
+
+def _pack_bits(buf, pos: int, values) -> int:
+    # One bit per bool, lowest bit first.
+    byte_count = (len(values) + 7) // 8
+    bits = 0
+    for i, value in enumerate(values):
+        if value:
+            bits |= 1 << i
+    buf[pos : pos + byte_count] = bits.to_bytes(byte_count, 'little')
+    return pos + byte_count
+
+
+def _unpack_bits(view: memoryview, pos: int, count: int) -> Tuple[List[bool], int]:
+    end = pos + (count + 7) // 8
+    assert end <= len(view), 'Read past the end of the serialized data.'
+    bits = int.from_bytes(view[pos:end], 'little')
+    return [(bits >> i) & 1 == 1 for i in range(count)], end
+
+
+def _pack_bit_list(buf, pos: int, values: List[bool], varint: bool = False) -> int:
+    pos = _pack_length(buf, pos, len(values), varint)
+    return _pack_bits(buf, pos, values)
+
+
+def _unpack_bit_list(view: memoryview, pos: int, varint: bool = False) -> Tuple[List[bool], int]:
+    count, pos = _unpack_length(view, pos, varint)
+    return _unpack_bits(view, pos, count)"""
+
+# Names a generated module can import from the runtime.
+PY_RUNTIME_NAMES = re.findall(r"^(?:def )?(_\w+)\b", PY_RUNTIME_CODE, re.MULTILINE)
+
+
+def py_field_is_array(field_type: DataType) -> bool:
+    # Vectors of primitives held in an `array` (bools and varints are plain lists).
+    return field_type.is_list_of_type and field_type.list_count == -1 and field_type.byte_size > 0 \
+        and field_type.struct_format != '?' and not field_varint_elems(field_type)
+
+
+def py_varint_args(field_type: DataType) -> str:
+    # Trailing `varint` argument for the length-prefixed helpers.
+    return ", True" if field_type.is_varint else ""
+
+
+def py_default_value(field_type: DataType) -> str:
+    if field_type.is_string:
+        return "''"
+    if field_type.is_builtin_primitive:
+        if field_type.struct_format == '?':
+            return "False"
+        if field_type.struct_format == 'f':
+            return "0.0"
+        return "0"
+    return f"{field_type.type_name}()"
+
+
+def py_field_default(field_type: DataType, name: str) -> str:
+    if not field_type.is_list_of_type:
+        return py_default_value(field_type)
+    if field_type.list_count == -1:
+        if py_field_is_array(field_type):
+            return f"array(self._TYPECODE_{name})"
+        return "[]"
+    if field_type.is_builtin_primitive:
+        return f"[{py_default_value(field_type)}] * {field_type.list_count}"
+    return f"[{py_default_value(field_type)} for _ in range({field_type.list_count})]"
+
+
+def write_py_run_pack(pfp: PyFilePrinter, run_index: int, members: List[HField]):
+    values: List[str] = []
+    for member in members:
+        if member.field_type.is_list_of_type:
+            values.append(f"*self.{member.field_name}")
+        else:
+            values.append(f"self.{member.field_name}")
+    pfp.write_line(f"self._RUN_{run_index}.pack_into(buf, pos, {', '.join(values)})")
+    pfp.write_line(f"pos += {fixed_run_byte_size(members)}")
+
+
+def write_py_run_unpack(pfp: PyFilePrinter, run_index: int, members: List[HField]):
+    if not any(member.field_type.is_list_of_type for member in members):
+        targets = ", ".join(f"self.{member.field_name}" for member in members)
+        pfp.write_line(f"({targets},) = cls._RUN_{run_index}.unpack_from(view, pos)")
+    else:
+        # Slice fixed-size arrays back out of the flat tuple.
+        pfp.write_line(f"values = cls._RUN_{run_index}.unpack_from(view, pos)")
+        value_index = 0
+        for member in members:
+            if member.field_type.is_list_of_type:
+                end_index = value_index + member.field_type.list_count
+                pfp.write_line(f"self.{member.field_name} = list(values[{value_index}:{end_index}])")
+                value_index = end_index
+            else:
+                pfp.write_line(f"self.{member.field_name} = values[{value_index}]")
+                value_index += 1
+    pfp.write_line(f"pos += {fixed_run_byte_size(members)}")
+
+
+def py_tuple_expr(members: List[HField]) -> str:
+    names = [f"self.{member.field_name}" for member in members]
+    return f"({names[0]},)" if len(names) == 1 else f"({', '.join(names)})"
+
+
+def write_py_bit_flags_pack(pfp: PyFilePrinter, members: List[HField]):
+    values = py_tuple_expr(members)
+    pfp.write_line(f"pos = _pack_bits(buf, pos, {values})")
+
+
+def write_py_bit_flags_unpack(pfp: PyFilePrinter, members: List[HField]):
+    targets = py_tuple_expr(members)
+    pfp.write_line(f"{targets}, pos = _unpack_bits(view, pos, {len(members)})")
+
+
+def write_py_member_pack(pfp: PyFilePrinter, member: HField):
+    field_type = member.field_type
+    name = member.field_name
+    varint = py_varint_args(field_type)
+    if field_type.is_bitpacked:
+        # List of bits (single bit flags are packed as a group).
+        if field_type.list_count == -1:
+            pfp.write_line(f"pos = _pack_bit_list(buf, pos, self.{name}{varint})")
+        else:
+            pfp.write_line(f"assert len(self.{name}) == {field_type.list_count}, '`{name}` must have {field_type.list_count} elements.'")
+            pfp.write_line(f"pos = _pack_bits(buf, pos, self.{name})")
+        return
+    if field_varint_elems(field_type):
+        signed = field_varint_is_signed(field_type)
+        if not field_type.is_list_of_type:
+            value = f"_zigzag_encode(self.{name})" if signed else f"self.{name}"
+            pfp.write_line(f"pos = _pack_varint(buf, pos, {value})")
+            return
+        if field_type.list_count == -1:
+            pfp.write_line(f"pos = _pack_varint(buf, pos, len(self.{name}))")
+        else:
+            pfp.write_line(f"assert len(self.{name}) == {field_type.list_count}, '`{name}` must have {field_type.list_count} elements.'")
+        pfp.write_line(f"pos = _pack_varints(buf, pos, self.{name}, {signed})")
+        return
+
+    if field_type.is_list_of_type and field_type.byte_size > 0:
+        # Vector of primitives (fixed arrays are part of a run).
+        if field_type.struct_format == '?':
+            pfp.write_line(f"pos = _pack_bool_list(buf, pos, self.{name}{varint})")
+        else:
+            pfp.write_line(f"pos = _pack_array(buf, pos, self.{name}, self._TYPECODE_{name}{varint})")
+        return
+
+    if field_type.is_string:
+        elem_pack = f"pos = _pack_string(buf, pos, {{}}{varint})"
+    else:
+        elem_pack = "pos = {}.pack_into(buf, pos)"
+
+    if not field_type.is_list_of_type:
+        pfp.write_line(elem_pack.format(f"self.{name}"))
+        return
+
+    if field_type.list_count == -1 and field_type.is_varint:
+        pfp.write_line(f"pos = _pack_varint(buf, pos, len(self.{name}))")
+    elif field_type.list_count == -1:
+        pfp.write_line(f"_LENGTH.pack_into(buf, pos, len(self.{name}))")
+        pfp.write_line(f"pos += {LENGTH_BYTE_SIZE}")
+    else:
+        pfp.write_line(f"assert len(self.{name}) == {field_type.list_count}, '`{name}` must have {field_type.list_count} elements.'")
+    if field_type.is_parallel:
+        # Reserve the element offset table, filled in once every element is written.
+        pfp.write_line(f"{name}__table_pos = pos")
+        pfp.write_line(f"pos += 8 * len(self.{name})")
+        pfp.write_line(f"{name}__start = pos")
+        pfp.write_line(f"{name}__ends = []")
+        with pfp.block(f"for elem in self.{name}:"):
+            pfp.write_line(elem_pack.format("elem"))
+            pfp.write_line(f"{name}__ends.append(pos - {name}__start)")
+        pfp.write_line(f"struct.pack_into(f'<{{len(self.{name})}}Q', buf, {name}__table_pos, *{name}__ends)")
+        return
+    with pfp.block(f"for elem in self.{name}:"):
+        pfp.write_line(elem_pack.format("elem"))
+
+
+def write_py_member_unpack(pfp: PyFilePrinter, member: HField):
+    field_type = member.field_type
+    name = member.field_name
+    varint = py_varint_args(field_type)
+    if field_type.is_bitpacked:
+        if field_type.list_count == -1:
+            pfp.write_line(f"self.{name}, pos = _unpack_bit_list(view, pos{varint})")
+        else:
+            pfp.write_line(f"self.{name}, pos = _unpack_bits(view, pos, {field_type.list_count})")
+        return
+    if field_varint_elems(field_type):
+        signed = field_varint_is_signed(field_type)
+        if not field_type.is_list_of_type:
+            pfp.write_line(f"self.{name}, pos = _unpack_varint(view, pos)")
+            if signed:
+                pfp.write_line(f"self.{name} = _zigzag_decode(self.{name})")
+            return
+        if field_type.list_count == -1:
+            pfp.write_line("count, pos = _unpack_varint(view, pos)")
+            count = "count"
+        else:
+            count = str(field_type.list_count)
+        pfp.write_line(f"self.{name}, pos = _unpack_varints(view, pos, {count}, {signed})")
+        return
+
+    if field_type.is_list_of_type and field_type.byte_size > 0:
+        # Vector of primitives (fixed arrays are part of a run).
+        if field_type.struct_format == '?':
+            pfp.write_line(f"self.{name}, pos = _unpack_bool_list(view, pos{varint})")
+        else:
+            pfp.write_line(f"self.{name}, pos = _unpack_array(view, pos, cls._TYPECODE_{name}{varint})")
+        return
+
+    if field_type.is_string:
+        elem_unpack = f"_unpack_string(view, pos{varint})"
+    else:
+        elem_unpack = f"{field_type.type_name}.unpack_from(view, pos)"
+
+    if not field_type.is_list_of_type:
+        pfp.write_line(f"self.{name}, pos = {elem_unpack}")
+        return
+
+    if field_type.list_count == -1 and field_type.is_varint:
+        pfp.write_line("count, pos = _unpack_varint(view, pos)")
+        count = "count"
+    elif field_type.list_count == -1:
+        pfp.write_line("(count,) = _LENGTH.unpack_from(view, pos)")
+        pfp.write_line(f"pos += {LENGTH_BYTE_SIZE}")
+        count = "count"
+    else:
+        count = str(field_type.list_count)
+    if field_type.is_parallel:
+        # The element offset table is only needed for parallel reads.
+        pfp.write_line("pos += 8 * count")
+    pfp.write_line("items = []")
+    with pfp.block(f"for _ in range({count}):"):
+        pfp.write_line(f"item, pos = {elem_unpack}")
+        pfp.write_line("items.append(item)")
+    pfp.write_line(f"self.{name} = items")
+
+
+def write_py_member_size(pfp: PyFilePrinter, member: HField):
+    field_type = member.field_type
+    name = member.field_name
+    varint = py_varint_args(field_type)
+    if field_type.list_count == -1 and field_type.is_varint:
+        length_size = f"_varint_size(len(self.{name}))"
+    else:
+        length_size = str(LENGTH_BYTE_SIZE)
+
+    if field_type.is_bitpacked:
+        if field_type.list_count == -1:
+            pfp.write_line(f"size += {length_size} + (len(self.{name}) + 7) // 8")
+        else:
+            pfp.write_line(f"size += {bit_byte_count(field_type.list_count)}")
+        return
+
+    if field_varint_elems(field_type):
+        signed = field_varint_is_signed(field_type)
+        if not field_type.is_list_of_type:
+            value = f"_zigzag_encode(self.{name})" if signed else f"self.{name}"
+            pfp.write_line(f"size += _varint_size({value})")
+            return
+        prefix = f"{length_size} + " if field_type.list_count == -1 else ""
+        pfp.write_line(f"size += {prefix}_varints_size(self.{name}, {signed})")
+        return
+
+    if field_type.is_list_of_type and field_type.byte_size > 0:
+        pfp.write_line(f"size += {length_size} + {field_type.byte_size} * len(self.{name})")
+        return
+
+    elem_size = f"_string_size({{}}{varint})" if field_type.is_string else "{}.serialized_size()"
+    if not field_type.is_list_of_type:
+        pfp.write_line(f"size += {elem_size.format(f'self.{name}')}")
+        return
+
+    prefix = f"{length_size} + " if field_type.list_count == -1 else ""
+    if field_type.is_parallel:
+        prefix += f"8 * len(self.{name}) + "
+    pfp.write_line(f"size += {prefix}sum({elem_size.format('elem')} for elem in self.{name})")
+
+
+def write_py_struct_class(pfp: PyFilePrinter, struct: HStruct, fingerprint: int):
+    is_packed = struct_is_packed(struct)
+    if is_packed:
+        fixed_members, variable_members = split_packed_members(struct)
+        wire_members = fixed_members + variable_members
+    else:
+        wire_members = struct.members
+    groups = group_fixed_size_runs(wire_members)
+    table_count = packed_offset_table_count(struct) if is_packed else 0
+
+    with pfp.block(f"class {struct.struct_name}:"):
+        # Slots.
+        pfp.write_line("__slots__ = (")
+        for member in struct.members:
+            pfp.write_line(f"    '{member.field_name}',")
+        pfp.write_line(")")
+        pfp.write_line("")
+
+        # Same as `k_schema_fingerprint` of the C++ struct.
+        pfp.write_line(f"SCHEMA_FINGERPRINT = 0x{fingerprint:016x}")
+        pfp.write_line("")
+
+        # Precompiled formats.
+        run_index = 0
+        fixed_size = table_count * 8
+        for group in groups:
+            if field_is_fixed_size(group[0].field_type):
+                pfp.write_line(f"_RUN_{run_index} = struct.Struct('{fixed_run_struct_format(group)}')")
+                fixed_size += fixed_run_byte_size(group)
+                run_index += 1
+            elif field_is_bit_flag(group[0].field_type):
+                fixed_size += bit_byte_count(len(group))
+            elif group[0].field_type.is_lazy:
+                # Byte size prefix.
+                fixed_size += LENGTH_BYTE_SIZE
+        if table_count > 0:
+            pfp.write_line(f"_OFFSET_TABLE = struct.Struct('<{table_count}Q')")
+        for member in struct.members:
+            field_type = member.field_type
+            if py_field_is_array(field_type):
+                pfp.write_line(f"_TYPECODE_{member.field_name} = _array_typecode('{field_type.struct_format}')")
+        pfp.write_line("")
+
+        # __init__().
+        with pfp.block("def __init__(self):"):
+            for member in struct.members:
+                pfp.write_line(f"self.{member.field_name} = {py_field_default(member.field_type, member.field_name)}")
+        pfp.write_line("")
+
+        # serialized_size().
+        with pfp.block("def serialized_size(self) -> int:"):
+            pfp.write_line(f"size = {fixed_size}")
+            for member in wire_members:
+                if not field_is_fixed_size(member.field_type) and not field_is_bit_flag(member.field_type):
+                    write_py_member_size(pfp, member)
+            pfp.write_line("return size")
+        pfp.write_line("")
+
+        # pack_into().
+        with pfp.block("def pack_into(self, buf, offset: int = 0) -> int:"):
+            pfp.write_line("pos = offset")
+            run_index = 0
+            variable_written = False
+            for group in groups:
+                if field_is_fixed_size(group[0].field_type):
+                    write_py_run_pack(pfp, run_index, group)
+                    run_index += 1
+                    continue
+                if field_is_bit_flag(group[0].field_type):
+                    write_py_bit_flags_pack(pfp, group)
+                    continue
+                if table_count > 0 and not variable_written:
+                    # Reserve the offset table, filled in once the offsets are known.
+                    pfp.write_line("table_pos = pos")
+                    pfp.write_line(f"pos += {table_count * 8}")
+                    pfp.write_line("offsets = []")
+                    variable_written = True
+                if table_count > 0:
+                    pfp.write_line("offsets.append(pos - offset)")
+                if group[0].field_type.is_lazy:
+                    # Reserve the byte size prefix, filled in once the field is written.
+                    pfp.write_line(f"{group[0].field_name}__lazy_pos = pos")
+                    pfp.write_line(f"pos += {LENGTH_BYTE_SIZE}")
+                    write_py_member_pack(pfp, group[0])
+                    lazy_pos = f"{group[0].field_name}__lazy_pos"
+                    pfp.write_line(f"_LENGTH.pack_into(buf, {lazy_pos}, pos - {lazy_pos} - {LENGTH_BYTE_SIZE})")
+                    continue
+                write_py_member_pack(pfp, group[0])
+            if table_count > 0:
+                pfp.write_line("offsets.append(pos - offset)")
+                pfp.write_line("self._OFFSET_TABLE.pack_into(buf, table_pos, *offsets)")
+            pfp.write_line("return pos")
+        pfp.write_line("")
+
+        # unpack_from().
+        pfp.write_line("@classmethod")
+        with pfp.block(f"def unpack_from(cls, buf, offset: int = 0) -> Tuple['{struct.struct_name}', int]:"):
+            pfp.write_line("self = cls.__new__(cls)")
+            pfp.write_line("view = memoryview(buf)")
+            pfp.write_line("pos = offset")
+            run_index = 0
+            table_skipped = False
+            for group in groups:
+                if field_is_fixed_size(group[0].field_type):
+                    write_py_run_unpack(pfp, run_index, group)
+                    run_index += 1
+                    continue
+                if field_is_bit_flag(group[0].field_type):
+                    write_py_bit_flags_unpack(pfp, group)
+                    continue
+                if table_count > 0 and not table_skipped:
+                    # Reading in order never needs the offset table.
+                    pfp.write_line(f"pos += {table_count * 8}")
+                    table_skipped = True
+                if group[0].field_type.is_lazy:
+                    # Decoded eagerly, the byte size prefix is only needed for skipping.
+                    pfp.write_line(f"pos += {LENGTH_BYTE_SIZE}")
+                write_py_member_unpack(pfp, group[0])
+            pfp.write_line("return self, pos")
+        pfp.write_line("")
+
+        # to_bytes()/from_bytes().
+        with pfp.block("def to_bytes(self) -> bytearray:"):
+            pfp.write_line("buf = bytearray(self.serialized_size())")
+            pfp.write_line("end = self.pack_into(buf)")
+            pfp.write_line("assert end == len(buf), f'Packed {end} bytes but measured {len(buf)}.'")
+            pfp.write_line("return buf")
+        pfp.write_line("")
+
+        pfp.write_line("@classmethod")
+        with pfp.block(f"def from_bytes(cls, buf) -> '{struct.struct_name}':"):
+            pfp.write_line("obj, end = cls.unpack_from(buf)")
+            pfp.write_line(f"assert end == len(buf), f'{{len(buf) - end}} trailing bytes after `{struct.struct_name}`.'")
+            pfp.write_line("return obj")
+        pfp.write_line("")
+
+        # to_file_bytes()/from_file_bytes(), the contents of a raw dumped file.
+        with pfp.block("def to_file_bytes(self) -> bytearray:"):
+            pfp.write_line("buf = bytearray(_FILE_HEADER.size + self.serialized_size())")
+            pfp.write_line("_FILE_HEADER.pack_into(buf, 0, _FILE_MAGIC, self.SCHEMA_FINGERPRINT)")
+            pfp.write_line("end = self.pack_into(buf, _FILE_HEADER.size)")
+            pfp.write_line("assert end == len(buf), f'Packed {end} bytes but measured {len(buf)}.'")
+            pfp.write_line("return buf")
+        pfp.write_line("")
+
+        pfp.write_line("@classmethod")
+        with pfp.block(f"def from_file_bytes(cls, buf) -> '{struct.struct_name}':"):
+            pfp.write_line("magic, fingerprint = _FILE_HEADER.unpack_from(buf, 0)")
+            pfp.write_line("assert magic == _FILE_MAGIC, 'No schema header, not a dumped file.'")
+            pfp.write_line("assert fingerprint == cls.SCHEMA_FINGERPRINT, \\")
+            pfp.write_line(f"    f'File was written with schema 0x{{fingerprint:016x}}, `{struct.struct_name}` is 0x{{cls.SCHEMA_FINGERPRINT:016x}}.'")
+            pfp.write_line("obj, end = cls.unpack_from(buf, _FILE_HEADER.size)")
+            pfp.write_line(f"assert end == len(buf), f'{{len(buf) - end}} trailing bytes after `{struct.struct_name}`.'")
+            pfp.write_line("return obj")
+
+
+def write_py_import(pfp: PyFilePrinter, module: str, names: str):
+    # Works both when `gen/` is imported as a package and when it's on `sys.path`.
+    with pfp.block("try:"):
+        pfp.write_line(f"from .{module} import {names}")
+    with pfp.block("except ImportError:"):
+        pfp.write_line(f"from {module} import {names}")
+
+
+def write_py_runtime_file(out_dir: str) -> bool:
+    # Returns whether the file changed on disk.
+    with PyFilePrinter(f"{out_dir}/{PY_RUNTIME_MODULE_NAME}.py") as pfp:
+        pfp.write_line(GENERATED_CODE_COMMENT_PY)
+        pfp.write_line("# Codec helpers shared by the generated `*_hstruct.py` modules.")
+        pfp.write_line(PY_RUNTIME_CODE)
+    return pfp.written
+
+
+def write_py_struct_file(fname: str, struct: HStruct, import_list: List[str], fingerprint: int) -> bool:
+    # Returns whether the file changed on disk.
+    with PyFilePrinter(fname) as pfp:
+        pfp.write_line(GENERATED_CODE_COMMENT_PY)
+        pfp.write_line(f"# Python twin of `{struct.struct_name}.hstruct.h`. Reads and writes the same binary format.")
+        pfp.write_line(PY_STANDARD_IMPORTS_CODE)
+        pfp.write_line("")
+        imports_at = len(pfp.lines)
+
+        for import_em in import_list:
+            write_py_import(pfp, f"{import_em}_hstruct", import_em)
+
+        pfp.write_line("")
+        pfp.write_line("")
+        write_py_struct_class(pfp, struct, fingerprint)
+
+        # Import only the runtime helpers the class uses.
+        class_code = "".join(pfp.lines[imports_at:])
+        used = [name for name in PY_RUNTIME_NAMES if re.search(rf"\b{name}\b", class_code)]
+        if len(used) > 0:
+            class_lines = pfp.lines[imports_at:]
+            del pfp.lines[imports_at:]
+            write_py_import(pfp, PY_RUNTIME_MODULE_NAME, ", ".join(used))
+            pfp.lines += class_lines
+    return pfp.written
+
+
+def main():
+    # Arg parser.
+    parser = ArgumentParser()
+    parser.add_argument("-f", "--file", dest="filename", required=True,
+                        help="input .hstruct file to use for generating struct")
+    parser.add_argument("-o", "--out-dir", dest="out_dir", default="gen",
+                        help="directory to write the generated file into (default: gen)")
+    args = parser.parse_args()
+
+    ir = load_schema_ir(args.filename)
+    root = ir.layouts[ir.root_name]
+    Path(args.out_dir).mkdir(parents=True, exist_ok=True)
+    write_py_runtime_file(args.out_dir)
+    write_py_struct_file(f"{args.out_dir}/{ir.root_name}_hstruct.py", root.struct, ir.import_lists[ir.root_name],
+                         root.fingerprint)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,133 @@
+import os
+import struct
+import zlib
+from typing import BinaryIO, List, Optional
+
+# Python side of `CompressedContainer` in `serial_buffer.h`:
+#     uint8_t  magic[8]
+#     uint32_t version
+#     uint32_t codec
+#     uint64_t chunk_size          Uncompressed bytes per chunk (the last one may be shorter).
+#     uint64_t uncompressed_size
+#     uint64_t chunk_count
+#     uint64_t compressed_chunk_sizes[chunk_count]
+#     compressed chunks, back to back
+CONTAINER_MAGIC = b"\x89HSZ\r\n\x1a\n"
+CONTAINER_VERSION = 1
+HEADER_STRUCT = struct.Struct("<8sIIQQQ")
+CHUNK_SIZE_STRUCT = struct.Struct("<Q")
+
+CODEC_ZLIB = 1
+codec_names_to_ids = {
+    "zlib": CODEC_ZLIB,
+}
+
+DEFAULT_CHUNK_SIZE = 1 << 20
+
+# Same level as `CompressedContainer::k_zlib_level`.
+ZLIB_LEVEL = 1
+
+
+def default_jobs() -> int:
+    return os.cpu_count() or 1
+
+
+def is_compressed(data) -> bool:
+    return len(data) >= HEADER_STRUCT.size and bytes(data[:len(CONTAINER_MAGIC)]) == CONTAINER_MAGIC
+
+
+def compress_chunk(codec: int, chunk) -> bytes:
+    assert codec == CODEC_ZLIB, f"Unknown codec id: {codec}"
+    return zlib.compress(chunk, ZLIB_LEVEL)
+
+
+class CompressedReader:
+    # Parses the container header so single chunks can be decompressed on
+    # their own. Chunk `i` holds uncompressed bytes
+    # `[i * chunk_size, (i + 1) * chunk_size)`.
+
+    def __init__(self, data):
+        assert is_compressed(data), "Not a compressed container."
+        magic, version, self.codec, self.chunk_size, self.uncompressed_size, chunk_count = \
+            HEADER_STRUCT.unpack_from(data, 0)
+        assert version == CONTAINER_VERSION, f"Unsupported container version: {version}"
+        assert self.codec == CODEC_ZLIB, f"Unknown codec id: {self.codec}"
+        assert self.chunk_size > 0 and chunk_count == -(-self.uncompressed_size // self.chunk_size), \
+            "Corrupt container header."
+        self.data = data
+
+        table_end = HEADER_STRUCT.size + chunk_count * CHUNK_SIZE_STRUCT.size
+        assert table_end <= len(data), "Compressed container is truncated."
+        sizes = struct.unpack_from(f"<{chunk_count}Q", data, HEADER_STRUCT.size)
+        self.chunk_offsets: List[int] = [table_end]
+        for size in sizes:
+            self.chunk_offsets.append(self.chunk_offsets[-1] + size)
+        assert self.chunk_offsets[-1] <= len(data), "Compressed container is truncated."
+
+    @property
+    def chunk_count(self) -> int:
+        return len(self.chunk_offsets) - 1
+
+    def chunk_index_for_offset(self, offset: int) -> int:
+        return offset // self.chunk_size
+
+    def read_chunk(self, index: int) -> bytes:
+        compressed = self.data[self.chunk_offsets[index] : self.chunk_offsets[index + 1]]
+        chunk = zlib.decompress(compressed)
+        expected_size = min(self.chunk_size, self.uncompressed_size - index * self.chunk_size)
+        assert len(chunk) == expected_size, f"Chunk {index} decompressed to {len(chunk)} bytes, expected {expected_size}."
+        return chunk
+
+
+class CompressedWriter:
+    # File-like writer producing a container in `out` on `close()`. Full
+    # chunks are compressed as soon as enough of them are pending, so only the
+    # compressed data stays in memory.
+
+    def __init__(self, out: BinaryIO, codec: int = CODEC_ZLIB, chunk_size: int = DEFAULT_CHUNK_SIZE,
+                 jobs: Optional[int] = None):
+        self.out = out
+        self.codec = codec
+        self.chunk_size = chunk_size
+        self.jobs = jobs or default_jobs()
+        self.executor = None
+        if self.jobs > 1:
+            from concurrent.futures import ThreadPoolExecutor
+            self.executor = ThreadPoolExecutor(max_workers=self.jobs)
+        self.pending = bytearray()
+        self.uncompressed_size = 0
+        self.chunks: List[bytes] = []
+
+    def compress_chunks(self, chunks: List[bytes]):
+        if self.executor is None:
+            self.chunks += [compress_chunk(self.codec, chunk) for chunk in chunks]
+        else:
+            self.chunks += self.executor.map(compress_chunk, [self.codec] * len(chunks), chunks)
+
+    def write(self, data):
+        self.pending += data
+        self.uncompressed_size += len(data)
+        # Wait for one chunk per worker so they all have something to do.
+        if len(self.pending) >= self.chunk_size * self.jobs:
+            full_size = len(self.pending) - len(self.pending) % self.chunk_size
+            self.compress_chunks([
+                bytes(self.pending[start : start + self.chunk_size])
+                for start in range(0, full_size, self.chunk_size)
+            ])
+            del self.pending[:full_size]
+
+    def close(self):
+        if len(self.pending) > 0:
+            self.compress_chunks([
+                bytes(self.pending[start : start + self.chunk_size])
+                for start in range(0, len(self.pending), self.chunk_size)
+            ])
+            self.pending.clear()
+        if self.executor is not None:
+            self.executor.shutdown()
+
+        self.out.write(HEADER_STRUCT.pack(CONTAINER_MAGIC, CONTAINER_VERSION, self.codec,
+                                          self.chunk_size, self.uncompressed_size, len(self.chunks)))
+        self.out.write(struct.pack(f"<{len(self.chunks)}Q", *map(len, self.chunks)))
+        for chunk in self.chunks:
+            self.out.write(chunk)
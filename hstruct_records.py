@@ -0,0 +1,183 @@
+import mmap
+import os
+import struct
+from typing import BinaryIO, Iterator, List, Optional, Tuple
+
+from hstruct_schema import LENGTH_STRUCT, primitive_run_struct
+
+# Python side of the record file in `record_file.h`:
+#     uint8_t  magic[8]
+#     uint32_t version
+#     uint32_t reserved
+#     uint64_t schema_fingerprint          `SCHEMA_FINGERPRINT` of the record type.
+#     records, back to back, each a uint64_t byte length followed by the record
+#     uint64_t end_marker                  All bits set.
+#     uint64_t record_offsets[record_count]    Where each record's length starts.
+#     uint64_t record_count
+#     uint64_t index_offset                Where `record_offsets` starts.
+#     uint8_t  footer_magic[8]
+RECORD_FILE_MAGIC = b"\x89HSR\r\n\x1a\n"
+RECORD_FILE_FOOTER_MAGIC = b"HSRINDEX"
+RECORD_FILE_VERSION = 2
+HEADER_STRUCT = struct.Struct("<8sIIQ")
+FOOTER_STRUCT = struct.Struct("<QQ8s")
+END_MARKER = (1 << 64) - 1
+
+# Pending records are written out once they reach this many bytes.
+DEFAULT_BATCH_BYTES = 1 << 20
+
+
+def is_record_file(data) -> bool:
+    return len(data) >= HEADER_STRUCT.size and bytes(data[:len(RECORD_FILE_MAGIC)]) == RECORD_FILE_MAGIC
+
+
+def parse_footer(data) -> Optional[List[int]]:
+    # Returns the record offsets from the footer index, or None if the footer
+    # is missing or damaged.
+    if len(data) < HEADER_STRUCT.size + LENGTH_STRUCT.size + FOOTER_STRUCT.size:
+        return None
+    count, index_offset, footer_magic = FOOTER_STRUCT.unpack_from(data, len(data) - FOOTER_STRUCT.size)
+    index_end = len(data) - FOOTER_STRUCT.size
+    if footer_magic != RECORD_FILE_FOOTER_MAGIC \
+            or not HEADER_STRUCT.size + LENGTH_STRUCT.size <= index_offset <= index_end \
+            or index_end - index_offset != count * LENGTH_STRUCT.size:
+        return None
+    return list(primitive_run_struct("Q", count).unpack_from(data, index_offset))
+
+
+def scan_records(data) -> List[int]:
+    # Rebuilds the record offsets from the length prefixes, stopping at the end
+    # marker or at a partially written record.
+    offsets = []
+    pos = HEADER_STRUCT.size
+    while pos + LENGTH_STRUCT.size <= len(data):
+        length = LENGTH_STRUCT.unpack_from(data, pos)[0]
+        if length > len(data) - pos - LENGTH_STRUCT.size:
+            break
+        offsets.append(pos)
+        pos += LENGTH_STRUCT.size + length
+    return offsets
+
+
+class RecordFileReader:
+    # Random access to the records of a record file through a read-only
+    # memory mapping. Records come back as `memoryview`s into the mapping, or
+    # decoded with `codec.from_bytes` (a generated `<Name>_hstruct` class) if
+    # `codec` is given, in which case the file's schema fingerprint has to
+    # match the codec's.
+
+    def __init__(self, fname: str, codec=None):
+        self.codec = codec
+        with open(fname, "rb") as f:
+            # Empty files can't be mmapped.
+            size = f.seek(0, 2)
+            self.data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if size > 0 else b""
+        assert is_record_file(self.data), f"`{fname}` is not a record file."
+        magic, version, _, self.schema_fingerprint = HEADER_STRUCT.unpack_from(self.data, 0)
+        assert version == RECORD_FILE_VERSION, f"Unsupported record file version: {version}"
+        assert codec is None or self.schema_fingerprint == codec.SCHEMA_FINGERPRINT, \
+            f"`{fname}` holds records of schema 0x{self.schema_fingerprint:016x}, " \
+            f"`{codec.__name__}` is 0x{codec.SCHEMA_FINGERPRINT:016x}."
+        self.view = memoryview(self.data)
+        offsets = parse_footer(self.data)
+        self.record_offsets = offsets if offsets is not None else scan_records(self.data)
+
+    def close(self):
+        self.view.release()
+        if isinstance(self.data, mmap.mmap):
+            self.data.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self) -> int:
+        return len(self.record_offsets)
+
+    def record_range(self, index: int) -> Tuple[int, int]:
+        # Start and end of record `index` in `data`, without its length prefix.
+        offset = self.record_offsets[index]
+        length = LENGTH_STRUCT.unpack_from(self.data, offset)[0]
+        start = offset + LENGTH_STRUCT.size
+        assert start + length <= len(self.data), f"Record {index} runs past the end of the file."
+        return start, start + length
+
+    def record_bytes(self, index: int) -> memoryview:
+        start, end = self.record_range(index)
+        return self.view[start : end]
+
+    def __getitem__(self, index: int):
+        record = self.record_bytes(index)
+        return record if self.codec is None else self.codec.from_bytes(record)
+
+    def __iter__(self) -> Iterator:
+        return (self[i] for i in range(len(self)))
+
+
+class RecordFileWriter:
+    # Appends records to a record file, creating it if needed (or replacing it
+    # if `append` is False). Records collect in a pending batch that is
+    # written out with one `write` once it reaches `batch_bytes`; the index
+    # and footer are written on `close`. `schema_fingerprint` is the record
+    # type's `SCHEMA_FINGERPRINT` and has to match an existing file's.
+
+    def __init__(self, fname: str, schema_fingerprint: int, batch_bytes: int = DEFAULT_BATCH_BYTES,
+                 append: bool = True):
+        self.batch_bytes = batch_bytes
+        self.pending = bytearray()
+        if append and os.path.exists(fname) and os.path.getsize(fname) > 0:
+            with RecordFileReader(fname) as reader:
+                assert reader.schema_fingerprint == schema_fingerprint, \
+                    f"`{fname}` holds records of schema 0x{reader.schema_fingerprint:016x}, " \
+                    f"appending 0x{schema_fingerprint:016x}."
+                self.record_offsets = list(reader.record_offsets)
+                if len(self.record_offsets) == 0:
+                    records_end = HEADER_STRUCT.size
+                else:
+                    last = self.record_offsets[-1]
+                    records_end = last + LENGTH_STRUCT.size + LENGTH_STRUCT.unpack_from(reader.data, last)[0]
+            # Drop the old index (or a partially written record), new records
+            # go right after the last complete one.
+            self.out: BinaryIO = open(fname, "r+b")
+            self.out.truncate(records_end)
+            self.out.seek(records_end)
+            self.file_end = records_end
+        else:
+            self.out = open(fname, "wb")
+            self.record_offsets = []
+            self.pending += HEADER_STRUCT.pack(RECORD_FILE_MAGIC, RECORD_FILE_VERSION, 0, schema_fingerprint)
+            self.file_end = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def append_bytes(self, record):
+        self.record_offsets.append(self.file_end + len(self.pending))
+        self.pending += LENGTH_STRUCT.pack(len(record))
+        self.pending += record
+        if len(self.pending) >= self.batch_bytes:
+            self.flush()
+
+    def append(self, obj):
+        # Appends a generated `<Name>_hstruct` object.
+        self.append_bytes(obj.to_bytes())
+
+    def flush(self):
+        self.out.write(self.pending)
+        self.file_end += len(self.pending)
+        self.pending.clear()
+
+    def close(self):
+        if self.out.closed:
+            return
+        self.pending += LENGTH_STRUCT.pack(END_MARKER)
+        index_offset = self.file_end + len(self.pending)
+        self.pending += primitive_run_struct("Q", len(self.record_offsets)).pack(*self.record_offsets)
+        self.pending += FOOTER_STRUCT.pack(len(self.record_offsets), index_offset, RECORD_FILE_FOOTER_MAGIC)
+        self.flush()
+        self.out.close()
@@ -0,0 +1,837 @@
+import gc
+import hashlib
+import itertools
+import os
+import pickle
+import re
+import struct
+import tempfile
+from dataclasses import dataclass, field
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+# Schema side of the generator and the converters: `.hstruct` parsing, wire
+# layout rules, fingerprints and the cached, resolved schema IR
+# (`load_schema_ir`), plus the file writing both generators share. Kept apart
+# from `gen_cpp_struct.py` so the converters don't pay for importing the code
+# generator.
+
+# Input file structure.
+all_primitive_names_to_cpp_type: Dict[str, str] = {
+    'bool': 'bool',
+    'uint8': 'uint8_t',
+    'int8': 'int8_t',
+    'uint16': 'uint16_t',
+    'int16': 'int16_t',
+    'uint32': 'uint32_t',
+    'int32': 'int32_t',
+    'uint64': 'uint64_t',
+    'int64': 'int64_t',
+    'float': 'float_t',
+    'string': 'std::string',
+}
+
+# Serialized byte size of each fixed-size primitive (strings are length-prefixed).
+all_primitive_names_to_byte_size: Dict[str, int] = {
+    'bool': 1,
+    'uint8': 1,
+    'int8': 1,
+    'uint16': 2,
+    'int16': 2,
+    'uint32': 4,
+    'int32': 4,
+    'uint64': 8,
+    'int64': 8,
+    'float': 4,
+}
+
+# `struct` module format characters (little endian, no padding) of each
+# fixed-size primitive. Used by the Python converters.
+all_primitive_names_to_struct_format: Dict[str, str] = {
+    'bool': '?',
+    'uint8': 'B',
+    'int8': 'b',
+    'uint16': 'H',
+    'int16': 'h',
+    'uint32': 'I',
+    'int32': 'i',
+    'uint64': 'Q',
+    'int64': 'q',
+    'float': 'f',
+}
+
+# Vector counts and string lengths are written as a 64-bit `size_t`.
+LENGTH_STRUCT_FORMAT = 'Q'
+LENGTH_BYTE_SIZE = 8
+LENGTH_STRUCT = struct.Struct(f'<{LENGTH_STRUCT_FORMAT}')
+
+# Packed struct offset tables hold `uint64_t` entries.
+OFFSET_TABLE_ENTRY_BYTE_SIZE = 8
+
+# The converters pack and unpack primitive lists this many elements at a time,
+# so huge lists never get materialized as one Python list.
+LIST_CHUNK_ELEM_COUNT = 1 << 16
+
+
+@lru_cache(maxsize=None)
+def primitive_run_struct(struct_format: str, count: int) -> struct.Struct:
+    return struct.Struct(f'<{count}{struct_format}')
+
+
+# Python side of `varint_size`/`zigzag_encode`/`zigzag_decode` in `serial_buffer.h`,
+# for the converters.
+def varint_size(value: int) -> int:
+    size = 1
+    while value >= 0x80:
+        value >>= 7
+        size += 1
+    return size
+
+
+def zigzag_encode(value: int) -> int:
+    return (value << 1) ^ (value >> 63)
+
+
+def zigzag_decode(value: int) -> int:
+    return (value >> 1) ^ -(value & 1)
+
+
+# Compiled once, `DataType` is constructed for every field.
+TYPE_NAME_SPECIAL_CHAR_RE = re.compile(r"\W")
+
+
+class DataType:
+    type_name: str
+    is_builtin_primitive: bool
+    is_string: bool
+    is_list_of_type: bool
+    list_count: int  # If -1 then list becomes std::vector. If 0, then fail. If >0, then list becomes std::array.
+    byte_size: int  # Serialized size of one element. -1 if not a fixed-size primitive.
+    struct_format: str  # `struct` module format char of one element. Empty if not a fixed-size primitive.
+    is_varint: bool  # Lengths (and integers wider than 1 byte) are LEB128 varints. Set by the parser.
+    is_lazy: bool  # Prefixed with its serialized byte size so readers can skip it. Set by the parser.
+    is_parallel: bool  # Element offset table, so elements can be (de)coded concurrently. Set by the parser.
+    is_pmr: bool  # Strings and vectors are `std::pmr` ones. Set by the parser.
+    is_bitpacked: bool  # Bools take one bit, adjacent single ones share bytes. Set by the parser.
+
+    def __init__(self, type_token: str):
+        # Check if type is a list.
+        type_str_stem = ''
+        list_count = -1
+        if type_token[-1] == ']':
+            is_list_of_type = True
+
+            # Check if list is finite or expandable.
+            lb_pos = type_token.find('[')
+            assert lb_pos > 0, f'Malformed type: {type_token}'
+
+            list_finite_count_str = type_token[lb_pos + 1 : -1].strip()
+            if len(list_finite_count_str) > 0:
+                list_count = int(list_finite_count_str)
+                assert list_count > 0, f'Bad list count: {list_count}'
+
+            type_str_stem = type_token[:lb_pos]
+        else:
+            is_list_of_type = False
+            type_str_stem = type_token
+
+        is_builtin_primitive = bool(type_str_stem in all_primitive_names_to_cpp_type.keys())
+        is_string = bool(type_str_stem == 'string')
+        type_name_cpp = (all_primitive_names_to_cpp_type[type_str_stem] if is_builtin_primitive else type_str_stem)
+
+        # Simple check that there aren't any special characters in cleaned token str.
+        assert TYPE_NAME_SPECIAL_CHAR_RE.match(type_str_stem) is None, f'Malformed type: {type_token}'
+
+        # Finish.
+        self.type_name = type_name_cpp
+        self.byte_size = all_primitive_names_to_byte_size.get(type_str_stem, -1)
+        self.struct_format = all_primitive_names_to_struct_format.get(type_str_stem, '')
+        self.is_builtin_primitive = is_builtin_primitive
+        self.is_string = is_string
+        self.is_list_of_type = is_list_of_type
+        self.list_count = list_count
+        self.is_varint = False
+        self.is_lazy = False
+        self.is_parallel = False
+        self.is_pmr = False
+        self.is_bitpacked = False
+
+
+@dataclass
+class TokenLine:
+    indentation_amount: int
+    tokens: List[str]
+
+
+@dataclass
+class HField:
+    field_type: DataType
+    field_name: str
+
+
+@dataclass
+class HStruct:
+    struct_name: str
+    members: List[HField]
+    attributes: List[str] = field(default_factory=list)
+    # Older layouts of the struct from `previous Name:` blocks. Files written
+    # in one of them get migrated field by field on load.
+    previous_layouts: List['HStruct'] = field(default_factory=list)
+
+
+# Optional attributes after `struct Name:` that change the wire layout.
+all_struct_attributes: List[str] = [
+    'packed',  # Fixed-size fields at constant offsets + offset table for the rest.
+    'varint',  # Every field that can be `varint` is.
+    'lazy',    # Every field that can be `lazy` is.
+    'parallel',  # Every field that can be `parallel` is.
+    'pmr',     # `std::pmr` strings and vectors, allocated from the struct's memory resource.
+    'bitpacked',  # Every bool field and bool list is `bitpacked`.
+]
+
+# Optional attributes before a field's type (`varint uint64 memory_pos`).
+all_field_attributes: List[str] = [
+    'varint',  # LEB128 lengths and integers, zigzag mapped if signed.
+    'lazy',    # Byte size prefix, so `<Name>_lazy` can skip it and decode it on first access.
+    'parallel',  # Element offset table, so big lists of structs are (de)coded across threads.
+    'bitpacked',  # One bit per bool. Adjacent `bitpacked` bools share bytes.
+]
+
+# Integers wide enough to be worth varint encoding.
+VARINT_STRUCT_FORMATS = ['h', 'H', 'i', 'I', 'q', 'Q']
+
+
+def field_type_has_length_prefix(field_type: DataType) -> bool:
+    # Strings and vectors (or their elements, for lists of strings) carry a length.
+    return field_type.is_string or (field_type.is_list_of_type and field_type.list_count == -1)
+
+
+def field_type_can_be_varint(field_type: DataType) -> bool:
+    return field_type.struct_format in VARINT_STRUCT_FORMATS or field_type_has_length_prefix(field_type)
+
+
+def field_varint_elems(field_type: DataType) -> bool:
+    # Whether the integer values themselves (not just lengths) are varints.
+    return field_type.is_varint and field_type.struct_format in VARINT_STRUCT_FORMATS
+
+
+def field_varint_is_signed(field_type: DataType) -> bool:
+    return field_type.struct_format.islower()
+
+
+def field_type_can_be_lazy(field_type: DataType) -> bool:
+    # Only variable-size strings, lists and HStructs are worth skipping.
+    if field_is_fixed_size(field_type):
+        return False
+    return field_type.is_string or field_type.is_list_of_type or not field_type.is_builtin_primitive
+
+
+def field_type_can_be_parallel(field_type: DataType) -> bool:
+    # Only vectors of HStructs have elements worth (de)coding on their own.
+    return field_type.is_list_of_type and field_type.list_count == -1 and not field_type.is_builtin_primitive
+
+
+def field_type_can_be_bitpacked(field_type: DataType) -> bool:
+    # Bools and lists of them.
+    return field_type.struct_format == '?'
+
+
+def field_is_bit_flag(field_type: DataType) -> bool:
+    # Single `bitpacked` bools, packed together with their `bitpacked` neighbours.
+    return field_type.is_bitpacked and not field_type.is_list_of_type
+
+
+def bit_byte_count(bit_count: int) -> int:
+    # Bits are stored lowest first, 8 to a byte, the last byte zero padded.
+    return (bit_count + 7) // 8
+
+
+# Bumped whenever the canonical form below changes, so old and new
+# fingerprints can never collide.
+SCHEMA_FINGERPRINT_VERSION = b"hstruct-fingerprint-1"
+
+# Header in front of every dumped file. Same layout as `SchemaHeader` in
+# `serial_buffer.h`:
+#     uint8_t  magic[8]
+#     uint64_t schema_fingerprint
+SCHEMA_HEADER_MAGIC = b"\x89HSF\r\n\x1a\n"
+SCHEMA_HEADER_FORMAT = "<8sQ"
+SCHEMA_HEADER_BYTE_SIZE = 16
+
+
+def struct_fingerprint(struct: HStruct, import_fingerprints: Dict[str, int]) -> int:
+    # Stable 64-bit hash of everything that decides the wire layout: field
+    # order, names, types, attributes and, through their own fingerprints,
+    # the layouts of nested structs. The struct's name is left out, so
+    # renaming a struct keeps its files loadable.
+    lines = [SCHEMA_FINGERPRINT_VERSION.decode(), " ".join(sorted(set(struct.attributes) & {'packed'}))]
+    for member in struct.members:
+        field_type = member.field_type
+        tokens = [attribute for attribute, is_set in [
+            ('varint', field_type.is_varint),
+            ('lazy', field_type.is_lazy),
+            ('parallel', field_type.is_parallel),
+            ('bitpacked', field_type.is_bitpacked),
+        ] if is_set]
+        # Nested structs go by their fingerprint rather than their name.
+        type_token = field_type.type_name if field_type.is_builtin_primitive else "struct"
+        if field_type.is_list_of_type:
+            type_token += f"[{field_type.list_count}]" if field_type.list_count > 0 else "[]"
+        tokens += [type_token, member.field_name]
+        if not field_type.is_builtin_primitive:
+            if field_type.type_name == struct.struct_name:
+                tokens.append("self")
+            else:
+                tokens.append(f"{import_fingerprints[field_type.type_name]:016x}")
+        lines.append(" ".join(tokens))
+    digest = hashlib.blake2b("\n".join(lines).encode(), digest_size=8).digest()
+    return int.from_bytes(digest, "little")
+
+
+# Most layouts a struct can be read in, which bounds the readers generated
+# for it. Every `previous` layout of a nested struct multiplies the layouts
+# of the structs nesting it.
+MAX_LAYOUT_VARIANTS = 64
+
+
+@dataclass
+class LayoutVariant:
+    # A layout files of a struct can be in: its current layout or one of its
+    # `previous` ones, with each nested struct in one of its own variants.
+    struct: HStruct
+    fingerprint: int
+    nested: Dict[str, 'LayoutVariant']
+    # Current layout, with every nested struct in its current layout too.
+    is_current: bool
+
+
+def layout_variants(schemas: Dict[str, HStruct]) -> Dict[str, List[LayoutVariant]]:
+    # Every layout files of each struct in `schemas` can be in, current first.
+    # Nested structs are hashed into the fingerprint, so files written before
+    # a nested struct changed are in a layout of their own, readable through
+    # the nested struct's `previous` layout.
+    variants: Dict[str, List[LayoutVariant]] = {}
+
+    def visit(name: str):
+        if name in variants:
+            return
+        struct = schemas[name]
+        found: List[LayoutVariant] = []
+        for i, layout in enumerate([struct] + struct.previous_layouts):
+            nested_names = sorted({
+                member.field_type.type_name for member in layout.members
+                if not member.field_type.is_builtin_primitive and member.field_type.type_name != name
+            })
+            for nested_name in nested_names:
+                visit(nested_name)
+            for nested_variants in itertools.product(*(variants[nested_name] for nested_name in nested_names)):
+                nested = dict(zip(nested_names, nested_variants))
+                fingerprint = struct_fingerprint(layout, {
+                    nested_name: variant.fingerprint for nested_name, variant in nested.items()
+                })
+                is_current = i == 0 and all(variant.is_current for variant in nested_variants)
+                if any(variant.fingerprint == fingerprint for variant in found):
+                    msg = f"`previous {name}` #{i} has the same layout as the current struct or an earlier `previous`."
+                    assert not all(variant.is_current for variant in nested_variants), msg
+                    continue
+                found.append(LayoutVariant(layout, fingerprint, nested, is_current))
+        msg = f"`{name}` has {len(found)} layouts counting the `previous` layouts of the structs it nests, " \
+              f"more than {MAX_LAYOUT_VARIANTS}. Drop `previous` layouts that no files are in anymore."
+        assert len(found) <= MAX_LAYOUT_VARIANTS, msg
+        variants[name] = found
+
+    for name in sorted(schemas):
+        visit(name)
+    return variants
+
+
+def read_into_token_line(file_line: str) -> TokenLine:
+    comment_sym = file_line.find('#')
+    if comment_sym >= 0:
+        file_line = file_line[:comment_sym]
+
+    line_len = len(file_line)
+    line_len_left_trimmed = len(file_line.lstrip())
+    indentation_amt = line_len - line_len_left_trimmed
+
+    tokens = file_line.split()
+    return TokenLine(indentation_amt, tokens)
+
+
+def parse_struct_import_token_line(tokens: List[str]) -> str:
+    assert len(tokens) == 2, f'Improper number of tokens in list: {tokens}'
+    assert tokens[0] == 'import', f'First token isn\'t `import`: {tokens[0]}'
+    return tokens[1]
+
+
+def parse_struct_name_token_line(tokens: List[str], keyword: str = 'struct') -> Tuple[str, List[str]]:
+    assert len(tokens) >= 2, f'Improper number of tokens in list: {tokens}'
+    assert tokens[0] == keyword, f'First token isn\'t `{keyword}`: {tokens[0]}'
+    assert tokens[1][-1] == ':', f'Second token doesn\'t end with `:`: {tokens[1]}'
+    attributes = tokens[2:]
+    for attribute in attributes:
+        assert attribute in all_struct_attributes, f'Unknown struct attribute: {attribute}'
+    return tokens[1][:-1], attributes
+
+
+def parse_struct_member_field_token_line(tokens: List[str]) -> HField:
+    assert len(tokens) >= 2, f'Improper number of tokens in list: {tokens}'
+    field_attributes = tokens[:-2]
+    for attribute in field_attributes:
+        assert attribute in all_field_attributes, f'Unknown field attribute: {attribute}'
+    line_type = DataType(tokens[-2])
+    variable_name = tokens[-1]
+    if 'bitpacked' in field_attributes:
+        msg = f'`bitpacked` needs a bool or a list of bools: {tokens}'
+        assert field_type_can_be_bitpacked(line_type), msg
+        line_type.is_bitpacked = True
+    if 'varint' in field_attributes:
+        msg = f'`varint` needs an integer wider than 1 byte, a string or a vector: {tokens}'
+        assert field_type_can_be_varint(line_type), msg
+        line_type.is_varint = True
+    if 'lazy' in field_attributes:
+        msg = f'`lazy` needs a variable-size string, list or struct: {tokens}'
+        assert field_type_can_be_lazy(line_type), msg
+        line_type.is_lazy = True
+    if 'parallel' in field_attributes:
+        msg = f'`parallel` needs a vector of structs: {tokens}'
+        assert field_type_can_be_parallel(line_type), msg
+        line_type.is_parallel = True
+    return HField(line_type, variable_name)
+
+
+def struct_is_pmr(struct: HStruct) -> bool:
+    return 'pmr' in struct.attributes
+
+
+def struct_is_packed(struct: HStruct) -> bool:
+    return 'packed' in struct.attributes
+
+
+def field_is_fixed_size(field_type: DataType) -> bool:
+    # Fixed-size fields serialize to the same number of bytes regardless of data.
+    # `bitpacked` bools don't take whole bytes, so they're handled on their own.
+    if field_type.byte_size <= 0 or field_type.is_varint or field_type.is_bitpacked:
+        return False
+    return not field_type.is_list_of_type or field_type.list_count > 0
+
+
+def split_packed_members(struct: HStruct) -> Tuple[List[HField], List[HField]]:
+    # Packed structs put every fixed-size field first (at constant offsets),
+    # followed by the variable-size fields in declaration order.
+    fixed_members = [m for m in struct.members if field_is_fixed_size(m.field_type)]
+    variable_members = [m for m in struct.members if not field_is_fixed_size(m.field_type)]
+    return fixed_members, variable_members
+
+
+def member_run_kind(field_type: DataType) -> str:
+    # Adjacent fields of the same kind are encoded as one block: "fixed" ones
+    # back to back, "bits" (bit flags) packed into a bitset. "" if neither.
+    if field_is_bit_flag(field_type):
+        return "bits"
+    if field_is_fixed_size(field_type):
+        return "fixed"
+    return ""
+
+
+def group_fixed_size_runs(members: List[HField]) -> List[List[HField]]:
+    # Splits `members` into runs of adjacent fixed-size fields (which can be
+    # packed with a single `struct` format), runs of adjacent bit flags and
+    # single variable-size fields.
+    groups: List[List[HField]] = []
+    for member in members:
+        kind = member_run_kind(member.field_type)
+        if kind != "" and len(groups) > 0 and member_run_kind(groups[-1][0].field_type) == kind:
+            groups[-1].append(member)
+        else:
+            groups.append([member])
+    return groups
+
+
+def fixed_run_struct_format(members: List[HField]) -> str:
+    # `struct` module format string for a run of fixed-size fields.
+    format_str = "<"
+    for member in members:
+        if member.field_type.is_list_of_type:
+            format_str += str(member.field_type.list_count)
+        format_str += member.field_type.struct_format
+    return format_str
+
+
+def fixed_run_byte_size(members: List[HField]) -> int:
+    size = 0
+    for member in members:
+        count = member.field_type.list_count if member.field_type.is_list_of_type else 1
+        size += member.field_type.byte_size * count
+    return size
+
+
+def packed_field_offsets(struct: HStruct) -> Tuple[Dict[str, int], int]:
+    # Byte offset of each fixed-size field from the start of the record, plus
+    # the total size of the fixed region.
+    fixed_members, _ = split_packed_members(struct)
+    offsets: Dict[str, int] = {}
+    offset = 0
+    for member in fixed_members:
+        offsets[member.field_name] = offset
+        count = member.field_type.list_count if member.field_type.is_list_of_type else 1
+        offset += member.field_type.byte_size * count
+    return offsets, offset
+
+
+def packed_offset_table_count(struct: HStruct) -> int:
+    # One start offset per variable-size field plus the end of the record.
+    _, variable_members = split_packed_members(struct)
+    return len(variable_members) + 1 if len(variable_members) > 0 else 0
+
+
+def parse_hstruct_file(filename: str) -> Tuple[List[str], HStruct]:
+    # Read in all tokens.
+    lines: List[TokenLine] = []
+
+    with open(filename, "r") as input_file:
+        for line in input_file:
+            token_line = read_into_token_line(line)
+            if len(token_line.tokens) > 0:
+                lines.append(token_line)
+    
+    # Group read lines into groups based off indentation amount.
+    line_groups: List[List[TokenLine]] = []
+    for line in lines:
+        if line.indentation_amount == 0:
+            line_groups.append([line,])
+        else:
+            line_groups[-1].append(line)
+
+    # Turn token groups into structs.
+    import_list: List[str] = []
+    struct_list: List[HStruct] = []
+    previous_list: List[HStruct] = []
+    for group in line_groups:
+        # Add import to import list.
+        initial_token = group[0].tokens[0]
+        if initial_token == 'import':
+            # Parse out import statement.
+            import_list.append(
+                parse_struct_import_token_line(group[0].tokens)
+            )
+        elif initial_token in ('struct', 'previous'):
+            # Iterate thru struct members.
+            struct_name = ''
+            struct_attributes: List[str] = []
+            struct_members: List[HField] = []
+            first = True
+            for token_line in group:
+                if first:
+                    struct_name, struct_attributes = parse_struct_name_token_line(token_line.tokens, initial_token)
+                    first = False
+                else:
+                    struct_members.append(
+                        parse_struct_member_field_token_line(token_line.tokens)
+                    )
+            if 'varint' in struct_attributes:
+                for member in struct_members:
+                    if field_type_can_be_varint(member.field_type):
+                        member.field_type.is_varint = True
+            if 'lazy' in struct_attributes:
+                for member in struct_members:
+                    if field_type_can_be_lazy(member.field_type):
+                        member.field_type.is_lazy = True
+            if 'parallel' in struct_attributes:
+                for member in struct_members:
+                    if field_type_can_be_parallel(member.field_type):
+                        member.field_type.is_parallel = True
+            if 'pmr' in struct_attributes:
+                for member in struct_members:
+                    member.field_type.is_pmr = True
+            if 'bitpacked' in struct_attributes:
+                for member in struct_members:
+                    if field_type_can_be_bitpacked(member.field_type):
+                        member.field_type.is_bitpacked = True
+            msg = f"`packed` structs already locate fields through their offset table, `lazy` isn't needed: {struct_name}"
+            assert 'packed' not in struct_attributes or not any(m.field_type.is_lazy for m in struct_members), msg
+            msg = f"`packed` structs keep fixed-size fields at byte offsets, they can't be `bitpacked`: {struct_name}"
+            assert 'packed' not in struct_attributes or not any(m.field_type.is_bitpacked for m in struct_members), msg
+            layout = HStruct(struct_name, struct_members, struct_attributes)
+            if initial_token == 'struct':
+                struct_list.append(layout)
+            else:
+                previous_list.append(layout)
+
+    # Make sure only one struct definition is there.
+    assert len(struct_list) == 1, "Only place 1 struct definition."
+
+    # Older layouts have to be of the same struct, and are decoded into
+    # the same kind of containers.
+    for previous in previous_list:
+        msg = f"`previous {previous.struct_name}` doesn't match struct `{struct_list[0].struct_name}`."
+        assert previous.struct_name == struct_list[0].struct_name, msg
+        for member in previous.members:
+            member.field_type.is_pmr = struct_is_pmr(struct_list[0])
+    struct_list[0].previous_layouts = previous_list
+
+    # Make sure struct is same definition as file.
+    fname_only = Path(filename).name
+    msg = f"Struct name must match file name. " \
+        f"Struct name: {struct_list[0].struct_name}. File name: {fname_only}."
+    assert fname_only == f"{struct_list[0].struct_name}.hstruct", msg
+
+    return import_list, struct_list[0]
+
+
+def hash_bytes(*chunks: bytes) -> str:
+    hasher = hashlib.sha256()
+    for chunk in chunks:
+        hasher.update(chunk)
+        hasher.update(b"\0")
+    return hasher.hexdigest()
+
+
+def check_struct_references(struct: HStruct, import_list: List[str]):
+    # Every non-primitive field type has to come from an `import`.
+    for member in struct.members + [m for previous in struct.previous_layouts for m in previous.members]:
+        field_type = member.field_type
+        if field_type.is_builtin_primitive or field_type.type_name == struct.struct_name:
+            continue
+        msg = f"`{struct.struct_name}.{member.field_name}` uses `{field_type.type_name}` without importing it."
+        assert field_type.type_name in import_list, msg
+
+
+# Generated header comment marking generated code.
+GENERATED_CODE_COMMENT_CODE = \
+"""/*
+ *    ____   _____   _   _   _____   ____       _      _____   _____   ____       ____    ___    ____    _____ 
+ *   / ___| | ____| | \ | | | ____| |  _ \     / \    |_   _| | ____| |  _ \     / ___|  / _ \  |  _ \  | ____|
+ *  | |  _  |  _|   |  \| | |  _|   | |_) |   / _ \     | |   |  _|   | | | |   | |     | | | | | | | | |  _|  
+ *  | |_| | | |___  | |\  | | |___  |  _ <   / ___ \    | |   | |___  | |_| |   | |___  | |_| | | |_| | | |___ 
+ *   \____| |_____| |_| \_| |_____| |_| \_\ /_/   \_\   |_|   |_____| |____/     \____|  \___/  |____/  |_____|
+ *
+ */"""
+
+
+def write_file_if_changed(fname: str, content: str) -> bool:
+    # Leaves the file (and its timestamp) alone if it already has `content`,
+    # so downstream builds don't recompile untouched headers. Otherwise the
+    # content goes to a temp file next to it that then replaces it, so a
+    # crashed run never leaves a half-written file behind.
+    path = Path(fname)
+    if path.exists():
+        with open(path, "r") as existing_file:
+            if existing_file.read() == content:
+                return False
+        mode = path.stat().st_mode & 0o777
+    else:
+        # `mkstemp` creates files as 0600, so apply the usual umask instead.
+        umask = os.umask(0)
+        os.umask(umask)
+        mode = 0o666 & ~umask
+
+    fd, temp_fname = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w") as temp_file:
+            temp_file.write(content)
+        os.chmod(temp_fname, mode)
+        os.replace(temp_fname, path)
+    except BaseException:
+        os.unlink(temp_fname)
+        raise
+    return True
+
+
+# Cached schema IR. Everything the converters need from a root `.hstruct`
+# file and the files it transitively imports, parsed and resolved once and
+# pickled to `HSTRUCT_CACHE_DIR` (default `~/.cache/hstruct`, set it empty to
+# turn the cache off). Later runs only `stat` the sources to reuse it.
+SCHEMA_IR_CACHE_DIR_ENV = "HSTRUCT_CACHE_DIR"
+
+# Bumped whenever the IR classes below change shape.
+SCHEMA_IR_VERSION = b"hstruct-ir-2"
+
+
+@dataclass
+class StructLayout:
+    struct: HStruct
+    fingerprint: int
+    # `group_fixed_size_runs` of the members in wire order (fixed-size
+    # fields first in `packed` structs).
+    runs: List[List[HField]]
+    # `packed` structs only: fixed-size field offsets, the size of the fixed
+    # region, the variable-size fields in offset table order and the number
+    # of offset table entries.
+    packed_offsets: Dict[str, int] = field(default_factory=dict)
+    fixed_size: int = 0
+    variable_members: List[HField] = field(default_factory=list)
+    table_count: int = 0
+    # Layouts the nested structs are in, keyed by struct name. Older layouts
+    # of the struct can nest structs in their older layouts.
+    nested_layouts: Dict[str, 'StructLayout'] = field(default_factory=dict)
+
+
+@dataclass
+class SourceStamp:
+    path: str
+    mtime_ns: int
+    byte_size: int
+    source_hash: str
+
+
+@dataclass
+class SchemaIR:
+    root_name: str
+    # Current layout and imports of every struct, keyed by struct name.
+    layouts: Dict[str, StructLayout]
+    import_lists: Dict[str, List[str]]
+    # Layouts files of the root struct can be in: the current one, then its
+    # `previous` ones and the ones with nested structs in a `previous` layout
+    # (see `layout_variants`).
+    root_layouts: List[StructLayout]
+    sources: List[SourceStamp]
+
+    @property
+    def schemas(self) -> Dict[str, HStruct]:
+        return {name: layout.struct for name, layout in self.layouts.items()}
+
+    @property
+    def fingerprints(self) -> Dict[str, int]:
+        return {name: layout.fingerprint for name, layout in self.layouts.items()}
+
+
+def build_struct_layout(struct: HStruct, fingerprint: int) -> StructLayout:
+    if not struct_is_packed(struct):
+        return StructLayout(struct, fingerprint, group_fixed_size_runs(struct.members))
+    fixed_members, variable_members = split_packed_members(struct)
+    offsets, fixed_size = packed_field_offsets(struct)
+    return StructLayout(struct, fingerprint, group_fixed_size_runs(fixed_members + variable_members),
+                        offsets, fixed_size, variable_members, packed_offset_table_count(struct))
+
+
+def source_stamp(path: Path) -> SourceStamp:
+    stat = path.stat()
+    return SourceStamp(str(path.resolve()), stat.st_mtime_ns, stat.st_size, hash_bytes(path.read_bytes()))
+
+
+def build_schema_ir(filename: str) -> SchemaIR:
+    # Parses `filename` and everything it transitively imports, and resolves
+    # their layouts. Imports are looked up next to the importing file.
+    schemas: Dict[str, HStruct] = {}
+    import_lists: Dict[str, List[str]] = {}
+    sources: List[SourceStamp] = []
+    pending: List[Path] = [Path(filename)]
+    while len(pending) > 0:
+        path = pending.pop()
+        stamp = source_stamp(path)
+        import_list, struct = parse_hstruct_file(str(path))
+        if struct.struct_name in schemas:
+            continue
+        check_struct_references(struct, import_list)
+        schemas[struct.struct_name] = struct
+        import_lists[struct.struct_name] = import_list
+        sources.append(stamp)
+        for import_em in import_list:
+            if import_em not in schemas:
+                import_path = path.parent / f"{import_em}.hstruct"
+                assert import_path.exists(), f"Imported struct not found: {import_path}"
+                pending.append(import_path)
+
+    variants = layout_variants(schemas)
+    built: Dict[int, StructLayout] = {}
+
+    def build_variant_layout(variant: LayoutVariant) -> StructLayout:
+        # Variants are shared between the structs nesting them, and so are
+        # their layouts.
+        if id(variant) not in built:
+            layout = build_struct_layout(variant.struct, variant.fingerprint)
+            layout.nested_layouts = {name: build_variant_layout(nested) for name, nested in variant.nested.items()}
+            built[id(variant)] = layout
+        return built[id(variant)]
+
+    layouts = {name: build_variant_layout(variants[name][0]) for name in schemas}
+    root_name = Path(filename).stem
+    root_layouts = [build_variant_layout(variant) for variant in variants[root_name]]
+    return SchemaIR(root_name, layouts, import_lists, root_layouts, sources)
+
+
+def schema_ir_cache_path(filename: str) -> Optional[Path]:
+    cache_dir = os.environ.get(SCHEMA_IR_CACHE_DIR_ENV)
+    if cache_dir is None:
+        cache_dir = str(Path(os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache") / "hstruct")
+    if cache_dir == "":
+        return None
+    key = hash_bytes(SCHEMA_IR_VERSION, str(Path(filename).resolve()).encode())
+    return Path(cache_dir) / f"{key[:32]}.ir.pickle"
+
+
+def schema_module_hash() -> str:
+    # The IR is only as good as the code that built it.
+    return hash_bytes(SCHEMA_IR_VERSION, Path(__file__).read_bytes())
+
+
+def refresh_source_stamps(ir: SchemaIR) -> Optional[bool]:
+    # None if a source changed (or is gone), otherwise whether any stamp
+    # had to be updated for a file that was touched but not edited.
+    refreshed = False
+    for stamp in ir.sources:
+        try:
+            stat = os.stat(stamp.path)
+        except OSError:
+            return None
+        if stat.st_mtime_ns == stamp.mtime_ns and stat.st_size == stamp.byte_size:
+            continue
+        if stat.st_size != stamp.byte_size or hash_bytes(Path(stamp.path).read_bytes()) != stamp.source_hash:
+            return None
+        stamp.mtime_ns = stat.st_mtime_ns
+        refreshed = True
+    return refreshed
+
+
+def read_schema_ir_cache(cache_path: Path) -> Optional[SchemaIR]:
+    # The IR is many small objects, and garbage collection passes triggered
+    # while unpickling them would take about as long as the unpickling.
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        with open(cache_path, "rb") as cache_file:
+            module_hash, ir = pickle.load(cache_file)
+    except (OSError, EOFError, pickle.UnpicklingError, AttributeError, ImportError, TypeError, ValueError):
+        # A broken cache just means a rebuild.
+        return None
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+    if module_hash != schema_module_hash() or not isinstance(ir, SchemaIR):
+        return None
+    return ir
+
+
+def write_schema_ir_cache(cache_path: Path, ir: SchemaIR):
+    # Written next to its final name and renamed over it, so concurrent runs
+    # never read a half-written cache. Failing to cache isn't an error.
+    temp_path = cache_path.with_name(f".{cache_path.name}.{os.getpid()}.tmp")
+    try:
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(temp_path, "wb") as temp_file:
+            pickle.dump((schema_module_hash(), ir), temp_file, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temp_path, cache_path)
+    except OSError:
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
+
+
+def load_schema_ir(filename: str) -> SchemaIR:
+    # `build_schema_ir`, reusing the cached IR while none of the sources changed.
+    cache_path = schema_ir_cache_path(filename)
+    if cache_path is not None:
+        ir = read_schema_ir_cache(cache_path)
+        if ir is not None and ir.root_name == Path(filename).stem:
+            refreshed = refresh_source_stamps(ir)
+            if refreshed is not None:
+                if refreshed:
+                    write_schema_ir_cache(cache_path, ir)
+                return ir
+    ir = build_schema_ir(filename)
+    if cache_path is not None:
+        write_schema_ir_cache(cache_path, ir)
+    return ir
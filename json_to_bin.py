@@ -1,18 +1,541 @@
+import json
+import struct
 from argparse import ArgumentParser
-from dataclasses import dataclass
-from enum import Enum
+from itertools import chain, islice
+from operator import itemgetter
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
 
-# Arg parser.
-parser = ArgumentParser()
-parser.add_argument("-f", "--hstruct-file", dest="hstruct_fname", required=True,
-                    help="input .hstruct file to use as schema")
-parser.add_argument("-d", "--json-data-file", dest="json_fname", required=True,
-                    help="input JSON file to convert to binary")
-args = parser.parse_args()
+from hstruct_compression import CompressedWriter, DEFAULT_CHUNK_SIZE, codec_names_to_ids
+from hstruct_records import RecordFileWriter
+from hstruct_schema import (
+    LENGTH_BYTE_SIZE,
+    LENGTH_STRUCT,
+    LIST_CHUNK_ELEM_COUNT,
+    OFFSET_TABLE_ENTRY_BYTE_SIZE,
+    SCHEMA_HEADER_FORMAT,
+    SCHEMA_HEADER_MAGIC,
+    DataType,
+    HField,
+    HStruct,
+    StructLayout,
+    bit_byte_count,
+    field_is_bit_flag,
+    field_is_fixed_size,
+    field_varint_elems,
+    field_varint_is_signed,
+    fixed_run_struct_format,
+    load_schema_ir,
+    primitive_run_struct,
+    struct_is_packed,
+    varint_size,
+    zigzag_encode,
+)
 
+# Numpy is optional. Without it primitive lists are packed with `struct`.
+try:
+    import numpy
+except ImportError:
+    numpy = None
 
-def main():
-    pass
+
+# NDJSON input is parsed in batches of this many bytes.
+BATCH_FLUSH_BYTES = 1 << 22
+
+
+def encode_string(value: str) -> bytes:
+    # Inverse of the decoding in `bin_to_json.py`.
+    return value.encode("utf-8", errors="surrogateescape")
+
+
+def pack_varint_into(buf: bytearray, pos: int, value: int) -> int:
+    while value >= 0x80:
+        buf[pos] = (value & 0x7f) | 0x80
+        value >>= 7
+        pos += 1
+    buf[pos] = value
+    return pos + 1
+
+
+def length_size(length: int, varint: bool) -> int:
+    return varint_size(length) if varint else LENGTH_BYTE_SIZE
+
+
+def pack_length_into(buf: bytearray, pos: int, length: int, varint: bool) -> int:
+    if varint:
+        return pack_varint_into(buf, pos, length)
+    LENGTH_STRUCT.pack_into(buf, pos, length)
+    return pos + LENGTH_BYTE_SIZE
+
+
+def pack_bits_into(buf: bytearray, pos: int, values: List) -> int:
+    bits = 0
+    for i, value in enumerate(values):
+        if value:
+            bits |= 1 << i
+    byte_count = bit_byte_count(len(values))
+    buf[pos : pos + byte_count] = bits.to_bytes(byte_count, "little")
+    return pos + byte_count
+
+
+# Encoders. Each one knows the exact encoded size of a value (`measure`) and
+# packs it into a preallocated buffer (`pack_into`), returning the position
+# right after it.
+class FixedRunEncoder:
+    # Adjacent fixed-size fields merged into a single `struct.Struct`.
+
+    def __init__(self, members: List[HField]):
+        self.names = [member.field_name for member in members]
+        self.list_counts = [
+            member.field_type.list_count if member.field_type.is_list_of_type else 0
+            for member in members
+        ]
+        self.packer = struct.Struct(fixed_run_struct_format(members))
+        self.size = self.packer.size
+        self.has_lists = any(count > 0 for count in self.list_counts)
+        self.getter = itemgetter(*self.names)
+
+    def values(self, obj: Dict) -> Tuple:
+        if not self.has_lists:
+            values = self.getter(obj)
+            return values if len(self.names) > 1 else (values,)
+
+        values = []
+        for name, count in zip(self.names, self.list_counts):
+            if count == 0:
+                values.append(obj[name])
+            else:
+                assert len(obj[name]) == count, f"`{name}` must have exactly {count} elements, got {len(obj[name])}."
+                values.extend(obj[name])
+        return tuple(values)
+
+    def pack_into(self, buf: bytearray, pos: int, obj: Dict) -> int:
+        try:
+            self.packer.pack_into(buf, pos, *self.values(obj))
+        except (struct.error, OverflowError) as e:
+            raise AssertionError(f"Bad value in fields {self.names}: {e}") from e
+        return pos + self.size
+
+
+class BitFlagsEncoder:
+    # Adjacent bitpacked bools, one bit each, lowest bit first.
+
+    def __init__(self, members: List[HField]):
+        self.names = [member.field_name for member in members]
+        self.size = bit_byte_count(len(members))
+
+    def pack_into(self, buf: bytearray, pos: int, obj: Dict) -> int:
+        return pack_bits_into(buf, pos, [obj[name] for name in self.names])
+
+
+class BitListEncoder:
+    # Bitpacked `bool[]` (length prefix, then the bits) or `bool[N]`.
+
+    def __init__(self, list_count: int, varint: bool = False):
+        self.list_count = list_count
+        self.varint = varint
+
+    def measure(self, value: List) -> int:
+        size = length_size(len(value), self.varint) if self.list_count == -1 else 0
+        return size + bit_byte_count(len(value))
+
+    def pack_into(self, buf: bytearray, pos: int, value: List) -> int:
+        if self.list_count == -1:
+            pos = pack_length_into(buf, pos, len(value), self.varint)
+        else:
+            assert len(value) == self.list_count, f"List must have exactly {self.list_count} elements, got {len(value)}."
+        return pack_bits_into(buf, pos, value)
+
+
+class StringEncoder:
+
+    def __init__(self, varint: bool = False):
+        self.varint = varint
+
+    def measure(self, value: str) -> int:
+        length = len(encode_string(value))
+        return length_size(length, self.varint) + length
+
+    def pack_into(self, buf: bytearray, pos: int, value: str) -> int:
+        encoded = encode_string(value)
+        pos = pack_length_into(buf, pos, len(encoded), self.varint)
+        buf[pos : pos + len(encoded)] = encoded
+        return pos + len(encoded)
+
+
+class VarintEncoder:
+    # One integer as a LEB128 varint, zigzag mapped if signed.
+
+    def __init__(self, field_type: DataType):
+        self.signed = field_varint_is_signed(field_type)
+        bits = 8 * struct.calcsize(field_type.struct_format)
+        if self.signed:
+            self.min_value, self.max_value = -(1 << (bits - 1)), (1 << (bits - 1)) - 1
+        else:
+            self.min_value, self.max_value = 0, (1 << bits) - 1
+
+    def encode(self, value: int) -> int:
+        if not isinstance(value, int) or not self.min_value <= value <= self.max_value:
+            raise AssertionError(f"Bad varint value {value!r}, expected an integer in "
+                                 f"[{self.min_value}, {self.max_value}].")
+        return zigzag_encode(value) if self.signed else value
+
+    def measure(self, value: int) -> int:
+        return varint_size(self.encode(value))
+
+    def pack_into(self, buf: bytearray, pos: int, value: int) -> int:
+        return pack_varint_into(buf, pos, self.encode(value))
+
+
+class PrimitiveVectorEncoder:
+    # Length prefix followed by the elements packed in bulk.
+
+    def __init__(self, field_type: DataType):
+        self.type_name = field_type.type_name
+        self.struct_format = field_type.struct_format
+        self.byte_size = field_type.byte_size
+        self.varint = field_type.is_varint
+        if numpy is not None:
+            self.dtype = numpy.dtype(f"<{self.struct_format}")
+            # Element kinds numpy packs the way `struct` does. Anything else
+            # (ints into bools, floats into ints) goes through `struct`.
+            self.numpy_kinds = {'b': "b", 'f': "biuf"}.get(self.dtype.kind, "biu")
+
+    def measure(self, value: List) -> int:
+        return length_size(len(value), self.varint) + self.byte_size * len(value)
+
+    def numpy_encode(self, value: List) -> Optional[bytes]:
+        # `value` packed by numpy, or None where numpy would pack it
+        # differently from `struct`: truncating floats into integers, parsing
+        # strings or wrapping out of range values.
+        try:
+            source = numpy.asarray(value)
+        except (OverflowError, TypeError, ValueError):
+            return None
+        if source.ndim != 1 or source.dtype.kind not in self.numpy_kinds:
+            return None
+        with numpy.errstate(all="ignore"):
+            encoded = source.astype(self.dtype)
+        if self.dtype.kind == 'f':
+            # Floats get rounded like `struct` does, but mustn't overflow.
+            exact = numpy.array_equal(numpy.isinf(encoded), numpy.isinf(source))
+        else:
+            exact = numpy.array_equal(encoded, source)
+        return encoded.tobytes() if exact else None
+
+    def pack_into(self, buf: bytearray, pos: int, value: List) -> int:
+        pos = pack_length_into(buf, pos, len(value), self.varint)
+        if numpy is not None and len(value) > 1:
+            encoded = self.numpy_encode(value)
+            if encoded is not None:
+                buf[pos : pos + len(encoded)] = encoded
+                return pos + len(encoded)
+
+        # Also where numpy wouldn't match `struct`, so the same values fail.
+        for start in range(0, len(value), LIST_CHUNK_ELEM_COUNT):
+            chunk = value[start : start + LIST_CHUNK_ELEM_COUNT]
+            packer = primitive_run_struct(self.struct_format, len(chunk))
+            try:
+                packer.pack_into(buf, pos, *chunk)
+            except (struct.error, OverflowError) as e:
+                raise AssertionError(f"Bad value in `{self.type_name}[]`: {e}") from e
+            pos += packer.size
+        return pos
+
+
+class ListEncoder:
+    # Lists of strings, HStructs or varints.
+
+    def __init__(self, elem_encoder, list_count: int, varint: bool = False):
+        self.elem_encoder = elem_encoder
+        self.list_count = list_count
+        self.varint = varint
+
+    def measure(self, value: List) -> int:
+        size = length_size(len(value), self.varint) if self.list_count == -1 else 0
+        measure = self.elem_encoder.measure
+        return size + sum(measure(elem) for elem in value)
+
+    def pack_into(self, buf: bytearray, pos: int, value: List) -> int:
+        if self.list_count == -1:
+            pos = pack_length_into(buf, pos, len(value), self.varint)
+        else:
+            assert len(value) == self.list_count, f"List must have exactly {self.list_count} elements, got {len(value)}."
+        pack_into = self.elem_encoder.pack_into
+        for elem in value:
+            pos = pack_into(buf, pos, elem)
+        return pos
+
+
+class ParallelListEncoder(ListEncoder):
+    # Vector of HStructs with an element offset table after the count.
+
+    def measure(self, value: List) -> int:
+        return super().measure(value) + OFFSET_TABLE_ENTRY_BYTE_SIZE * len(value)
+
+    def pack_into(self, buf: bytearray, pos: int, value: List) -> int:
+        pos = pack_length_into(buf, pos, len(value), self.varint)
+        table_pos = pos
+        pos += OFFSET_TABLE_ENTRY_BYTE_SIZE * len(value)
+        elems_start = pos
+        elem_ends: List[int] = []
+        pack_into = self.elem_encoder.pack_into
+        for elem in value:
+            pos = pack_into(buf, pos, elem)
+            elem_ends.append(pos - elems_start)
+        struct.pack_into(f"<{len(elem_ends)}Q", buf, table_pos, *elem_ends)
+        return pos
+
+
+class LazyEncoder:
+    # Byte size prefix in front of the wrapped field.
+
+    def __init__(self, field_encoder):
+        self.field_encoder = field_encoder
+
+    def measure(self, value) -> int:
+        return LENGTH_BYTE_SIZE + self.field_encoder.measure(value)
+
+    def pack_into(self, buf: bytearray, pos: int, value) -> int:
+        end_pos = self.field_encoder.pack_into(buf, pos + LENGTH_BYTE_SIZE, value)
+        LENGTH_STRUCT.pack_into(buf, pos, end_pos - pos - LENGTH_BYTE_SIZE)
+        return end_pos
+
+
+class StructEncoder:
+
+    def __init__(self, hstruct: HStruct):
+        self.hstruct = hstruct
+        self.field_names = {member.field_name for member in hstruct.members}
+        # Filled in by `compile_struct_encoder` so recursive lookups resolve.
+        self.fixed_runs: List[FixedRunEncoder] = []
+        self.steps: List[Tuple[Optional[str], object]] = []
+        self.fixed_size = 0
+
+    def check_fields(self, obj: Dict):
+        assert isinstance(obj, dict), f"`{self.hstruct.struct_name}` must be a JSON object."
+        if obj.keys() != self.field_names:
+            missing = self.field_names - obj.keys()
+            extra = obj.keys() - self.field_names
+            raise AssertionError(f"JSON doesn't match `{self.hstruct.struct_name}` schema. "
+                                 f"Missing fields: {sorted(missing)}. Unknown fields: {sorted(extra)}.")
+
+    def measure(self, obj: Dict) -> int:
+        self.check_fields(obj)
+        size = self.fixed_size
+        for name, encoder in self.steps:
+            if name is not None:
+                size += encoder.measure(obj[name])
+        return size
+
+    def pack_into(self, buf: bytearray, pos: int, obj: Dict) -> int:
+        for name, encoder in self.steps:
+            if name is None:
+                pos = encoder.pack_into(buf, pos, obj)
+            else:
+                pos = encoder.pack_into(buf, pos, obj[name])
+        return pos
+
+
+class PackedStructEncoder(StructEncoder):
+    # Fixed-size fields, then the offset table, then the variable-size fields.
+
+    def pack_into(self, buf: bytearray, pos: int, obj: Dict) -> int:
+        record_start = pos
+        for encoder in self.fixed_runs:
+            pos = encoder.pack_into(buf, pos, obj)
+
+        table_pos = pos
+        table: List[int] = []
+        table_packer = primitive_run_struct('Q', self.table_count)
+        pos += table_packer.size
+        for name, encoder in self.steps:
+            if name is None:
+                continue
+            table.append(pos - record_start)
+            pos = encoder.pack_into(buf, pos, obj[name])
+        if self.table_count > 0:
+            table.append(pos - record_start)
+            table_packer.pack_into(buf, table_pos, *table)
+        return pos
+
+
+def compile_field_encoder(layouts: Dict[str, StructLayout], field_type: DataType,
+                          cache: Dict[str, StructEncoder]):
+    # Fixed-size primitives and primitive arrays are handled by `FixedRunEncoder`,
+    # bitpacked bools by `BitFlagsEncoder`.
+    if field_type.is_bitpacked:
+        assert field_type.is_list_of_type, "Bitpacked bool outside of a group."
+        return BitListEncoder(field_type.list_count, field_type.is_varint)
+    if field_type.is_string:
+        elem_encoder = StringEncoder(field_type.is_varint)
+    elif field_varint_elems(field_type):
+        elem_encoder = VarintEncoder(field_type)
+    elif field_type.is_builtin_primitive:
+        assert field_type.is_list_of_type and field_type.list_count == -1, "Fixed-size field outside of a run."
+        return PrimitiveVectorEncoder(field_type)
+    else:
+        elem_encoder = compile_struct_encoder(layouts, field_type.type_name, cache)
+
+    if field_type.is_parallel:
+        return ParallelListEncoder(elem_encoder, field_type.list_count, field_type.is_varint)
+    if field_type.is_list_of_type:
+        return ListEncoder(elem_encoder, field_type.list_count, field_type.is_varint)
+    return elem_encoder
+
+
+def compile_struct_encoder(layouts: Dict[str, StructLayout], struct_name: str,
+                           cache: Optional[Dict[str, StructEncoder]] = None) -> StructEncoder:
+    # Compiles `struct_name` into a reusable encoder. Runs of adjacent
+    # fixed-size fields are merged into one `struct.Struct` pack call.
+    if cache is None:
+        cache = {}
+    if struct_name in cache:
+        return cache[struct_name]
+
+    assert struct_name in layouts, f"Unknown struct: {struct_name}"
+    layout = layouts[struct_name]
+    is_packed = struct_is_packed(layout.struct)
+    encoder = PackedStructEncoder(layout.struct) if is_packed else StructEncoder(layout.struct)
+    cache[struct_name] = encoder
+
+    if is_packed:
+        encoder.table_count = layout.table_count
+        encoder.fixed_size = encoder.table_count * OFFSET_TABLE_ENTRY_BYTE_SIZE
+
+    for group in layout.runs:
+        if field_is_fixed_size(group[0].field_type):
+            run_encoder = FixedRunEncoder(group)
+            encoder.fixed_runs.append(run_encoder)
+            encoder.steps.append((None, run_encoder))
+            encoder.fixed_size += run_encoder.size
+        elif field_is_bit_flag(group[0].field_type):
+            flags_encoder = BitFlagsEncoder(group)
+            encoder.steps.append((None, flags_encoder))
+            encoder.fixed_size += flags_encoder.size
+        else:
+            member = group[0]
+            field_encoder = compile_field_encoder(layouts, member.field_type, cache)
+            if member.field_type.is_lazy:
+                field_encoder = LazyEncoder(field_encoder)
+            encoder.steps.append((member.field_name, field_encoder))
+
+    return encoder
+
+
+def encode_record(encoder: StructEncoder, record: Dict) -> bytearray:
+    # Encodes `record` into a buffer preallocated to its measured size.
+    buf = bytearray(encoder.measure(record))
+    pos = encoder.pack_into(buf, 0, record)
+    assert pos == len(buf), f"Encoded {pos} bytes but measured {len(buf)}."
+    return buf
+
+
+def read_ndjson_batches(fname: str) -> Iterator[List[Dict]]:
+    # Yields records in batches of roughly `BATCH_FLUSH_BYTES` of input.
+    batch: List[Dict] = []
+    batch_bytes = 0
+    with open(fname, "r", encoding="utf-8") as f:
+        for line in f:
+            if len(line.strip()) == 0:
+                continue
+            batch.append(json.loads(line))
+            batch_bytes += len(line)
+            if batch_bytes >= BATCH_FLUSH_BYTES:
+                yield batch
+                batch = []
+                batch_bytes = 0
+    if len(batch) > 0:
+        yield batch
+
+
+def read_single_record(json_fname: str, ndjson: bool) -> Dict:
+    # A plain binary file holds exactly one root record, like `serialize_dump`
+    # writes and `serialize_load`/`bin_to_json.py` read.
+    if not ndjson:
+        with open(json_fname, "r", encoding="utf-8") as f:
+            return json.load(f)
+    records = list(islice(chain.from_iterable(read_ndjson_batches(json_fname)), 2))
+    assert len(records) == 1, \
+        f"`{json_fname}` has {'no records' if len(records) == 0 else 'more than one record'}, but a binary file " \
+        f"holds exactly one. Use `--records` to write a record file."
+    return records[0]
+
+
+def convert_file(encoder: StructEncoder, fingerprint: int, json_fname: str, bin_fname: str, ndjson: bool,
+                 codec: Optional[str], chunk_size: int):
+    # Read before the output is opened, so bad input doesn't leave a broken file behind.
+    record = read_single_record(json_fname, ndjson)
+    with open(bin_fname, "wb") as bin_file:
+        out = bin_file if codec is None else CompressedWriter(bin_file, codec_names_to_ids[codec], chunk_size)
+        out.write(struct.pack(SCHEMA_HEADER_FORMAT, SCHEMA_HEADER_MAGIC, fingerprint))
+        out.write(encode_record(encoder, record))
+        if out is not bin_file:
+            out.close()
+
+
+def convert_file_to_records(encoder: StructEncoder, fingerprint: int, json_fname: str, bin_fname: str, ndjson: bool):
+    if ndjson:
+        batches = read_ndjson_batches(json_fname)
+    else:
+        with open(json_fname, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        batches = [data if isinstance(data, list) else [data]]
+
+    with RecordFileWriter(bin_fname, fingerprint, append=False) as writer:
+        for batch in batches:
+            for record in batch:
+                writer.append_bytes(encode_record(encoder, record))
+
+
+def parse_args(argv: Optional[List[str]] = None):
+    parser = ArgumentParser()
+    parser.add_argument("-f", "--hstruct-file", dest="hstruct_fname", required=True,
+                        help="input .hstruct file to use as schema")
+    parser.add_argument("-d", "--json-data-file", dest="json_fnames", required=True, nargs="+",
+                        help="input JSON file(s) to convert to binary")
+    parser.add_argument("-o", "--bin-file", dest="bin_fname", default=None,
+                        help="output binary file (defaults to the input file with a .bin suffix)")
+    parser.add_argument("--ndjson", dest="ndjson", action="store_true",
+                        help="treat input as newline-delimited JSON, one record per line "
+                             "(implied for .ndjson/.jsonl files)")
+    parser.add_argument("--compress", dest="codec", default=None, choices=sorted(codec_names_to_ids),
+                        help="write a chunked compressed container (readable by `serialize_load`)")
+    parser.add_argument("--chunk-size", dest="chunk_size", type=int, default=DEFAULT_CHUNK_SIZE,
+                        help=f"uncompressed bytes per compressed chunk (default {DEFAULT_CHUNK_SIZE})")
+    parser.add_argument("--records", dest="records", action="store_true",
+                        help="write an indexed record file (`record_file.h`), one record per NDJSON line "
+                             "or per element of a top-level JSON array")
+    return parser.parse_args(argv)
+
+
+def convert_json_to_bin(encoder: StructEncoder, fingerprint: int, json_fnames: List[str], bin_fname: Optional[str] = None,
+                        ndjson: bool = False, codec: Optional[str] = None, chunk_size: int = DEFAULT_CHUNK_SIZE,
+                        records: bool = False) -> List[str]:
+    # Converts every file in `json_fnames`, returns the binary files written.
+    assert chunk_size > 0, f"Invalid chunk size: {chunk_size}"
+    assert not (records and codec is not None), "`--records` can't be combined with `--compress`."
+    assert codec is None or codec in codec_names_to_ids, f"Unknown codec: {codec}"
+    assert bin_fname is None or len(json_fnames) == 1, \
+        "`--bin-file` can only be used with a single input file."
+    bin_fnames: List[str] = []
+    for json_fname in json_fnames:
+        out_fname = bin_fname or str(Path(json_fname).with_suffix(".bin"))
+        is_ndjson = ndjson or Path(json_fname).suffix in (".ndjson", ".jsonl")
+        if records:
+            convert_file_to_records(encoder, fingerprint, json_fname, out_fname, is_ndjson)
+        else:
+            convert_file(encoder, fingerprint, json_fname, out_fname, is_ndjson, codec, chunk_size)
+        bin_fnames.append(out_fname)
+    return bin_fnames
+
+
+def main(argv: Optional[List[str]] = None):
+    args = parse_args(argv)
+    ir = load_schema_ir(args.hstruct_fname)
+    encoder = compile_struct_encoder(ir.layouts, ir.root_name)
+    convert_json_to_bin(encoder, ir.layouts[ir.root_name].fingerprint, args.json_fnames, args.bin_fname,
+                        args.ndjson, args.codec, args.chunk_size, args.records)
 
 if __name__ == '__main__':
     main()
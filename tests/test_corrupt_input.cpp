@@ -0,0 +1,359 @@
+// Feeds corrupt serializations to the generated readers, which have to throw
+// `std::out_of_range` instead of reading out of bounds or sizing anything by
+// a corrupt count. Best run under the sanitizers.
+//
+// Build (from repo root):
+//     g++ -std=c++20 -O1 -g -fsanitize=address,undefined -Igen tests/test_corrupt_input.cpp -o test_corrupt_input
+//     cl /std:c++20 /EHsc /Igen tests\test_corrupt_input.cpp
+#include <algorithm>
+#include <cstdio>
+#include <cstdlib>
+#include <cstring>
+#include <exception>
+#include <fstream>
+#include <stdexcept>
+#include <vector>
+#include "PackedSampleDataType.hstruct.h"
+#include "ParallelSampleDataType.hstruct.h"
+#include "SampleDataType.hstruct.h"
+#include "record_file.h"
+
+
+static int g_failure_count{ 0 };
+
+void expect(const char* label, bool ok)
+{
+    std::printf("%s  %s\n", ok ? "ok  " : "FAIL", label);
+    g_failure_count += ok ? 0 : 1;
+}
+
+template<typename Func>
+void expect_out_of_range(const char* label, Func&& func)
+{
+    try
+    {
+        func();
+    }
+    catch (const std::out_of_range&)
+    {
+        std::printf("ok    %s\n", label);
+        return;
+    }
+    catch (const std::exception& e)
+    {
+        std::printf("FAIL  %s: threw `%s` instead of std::out_of_range\n", label, e.what());
+        g_failure_count++;
+        return;
+    }
+    std::printf("FAIL  %s: didn't throw\n", label);
+    g_failure_count++;
+}
+
+// Offset of the only occurrence of `needle` in `bytes`.
+size_t find_bytes(const std::vector<uint8_t>& bytes, const std::vector<uint8_t>& needle)
+{
+    auto found{ std::search(bytes.begin(), bytes.end(), needle.begin(), needle.end()) };
+    if (found == bytes.end() || std::search(found + 1, bytes.end(), needle.begin(), needle.end()) != bytes.end())
+    {
+        std::printf("FAIL  test setup: pattern isn't unique\n");
+        std::exit(1);
+    }
+    return static_cast<size_t>(found - bytes.begin());
+}
+
+std::vector<uint8_t> u64_bytes(std::initializer_list<uint64_t> values)
+{
+    std::vector<uint8_t> bytes;
+    for (uint64_t value : values)
+    {
+        const uint8_t* first{ reinterpret_cast<const uint8_t*>(&value) };
+        bytes.insert(bytes.end(), first, first + sizeof(uint64_t));
+    }
+    return bytes;
+}
+
+// Copy of `bytes` with the `uint64_t` at `offset` replaced by `value`.
+std::vector<uint8_t> patched(std::vector<uint8_t> bytes, size_t offset, uint64_t value)
+{
+    std::memcpy(bytes.data() + offset, &value, sizeof(uint64_t));
+    return bytes;
+}
+
+// Counts that would wrap `count * sizeof(T)` around to a small byte size.
+static constexpr uint64_t k_corrupt_counts[]{ uint64_t{ 1 } << 62, (uint64_t{ 1 } << 61) + 1, UINT64_MAX };
+
+
+void test_view_list_counts()
+{
+    SampleDataType record{};
+    record.ipv4_addresses = { 0x11111111u, 0x22222222u };
+    std::vector<uint8_t> bytes;
+    record.serialize_to(bytes);
+    size_t count_offset{ find_bytes(bytes, { 2, 0, 0, 0, 0, 0, 0, 0, 0x11, 0x11, 0x11, 0x11 }) };
+
+    for (uint64_t count : k_corrupt_counts)
+    {
+        std::vector<uint8_t> corrupt{ patched(bytes, count_offset, count) };
+        expect_out_of_range("view primitive list count", [&]() {
+            SampleDataType_view view;
+            view.attach_file(corrupt);
+        });
+    }
+}
+
+void test_view_parallel_table_count()
+{
+    ParallelSampleDataType record;
+    record.children_objs.resize(1);
+    record.children_objs[0].name = "child";
+    std::vector<uint8_t> bytes;
+    record.serialize_to(bytes);
+    size_t count_offset{ find_bytes(bytes, u64_bytes({ 1, record.children_objs[0].serialized_size() })) };
+
+    for (uint64_t count : k_corrupt_counts)
+    {
+        std::vector<uint8_t> corrupt{ patched(bytes, count_offset, count) };
+        expect_out_of_range("view parallel table count", [&]() {
+            ParallelSampleDataType_view view;
+            view.attach_file(corrupt);
+        });
+    }
+}
+
+SampleDataType list_record()
+{
+    SampleDataType record{};
+    record.ipv4_addresses = { 0x11111111u, 0x22222222u };
+    record.tokens = { "tok" };
+    record.children_objs.resize(1);
+    record.children_objs[0].name = "child";
+    return record;
+}
+
+// Offsets of the `ipv4_addresses`, `tokens` and `children_objs` counts.
+std::vector<size_t> list_count_offsets(const std::vector<uint8_t>& bytes)
+{
+    return {
+        find_bytes(bytes, { 2, 0, 0, 0, 0, 0, 0, 0, 0x11, 0x11, 0x11, 0x11 }),
+        find_bytes(bytes, { 1, 0, 0, 0, 0, 0, 0, 0, 3, 0, 0, 0, 0, 0, 0, 0, 't', 'o', 'k' }),
+        find_bytes(bytes, { 1, 0, 0, 0, 0, 0, 0, 0, 5, 0, 0, 0, 0, 0, 0, 0, 'c', 'h', 'i', 'l', 'd' }),
+    };
+}
+
+void test_owned_list_counts()
+{
+    std::vector<uint8_t> bytes;
+    list_record().serialize_to(bytes);
+
+    for (size_t count_offset : list_count_offsets(bytes))
+    {
+        for (uint64_t count : k_corrupt_counts)
+        {
+            std::vector<uint8_t> corrupt{ patched(bytes, count_offset, count) };
+            expect_out_of_range("owned list count", [&]() {
+                SampleDataType record;
+                record.deserialize_from(corrupt);
+            });
+        }
+    }
+}
+
+void test_streamed_list_counts()
+{
+    std::vector<uint8_t> bytes;
+    list_record().serialize_to(bytes);
+    const char* fname{ "test_corrupt_input.tmp" };
+
+    for (size_t count_offset : list_count_offsets(bytes))
+    {
+        for (uint64_t count : k_corrupt_counts)
+        {
+            std::vector<uint8_t> corrupt{ patched(bytes, count_offset, count) };
+            {
+                std::ofstream file{ fname, std::ios::out | std::ios::trunc | std::ios::binary };
+                file.write(reinterpret_cast<const char*>(corrupt.data()), corrupt.size());
+            }
+            expect_out_of_range("streamed list count", [&]() {
+                SampleDataType record;
+                record.serialize_load_streamed(fname, 16);
+            });
+        }
+    }
+    std::remove(fname);
+}
+
+void test_owned_parallel_table_count()
+{
+    ParallelSampleDataType record;
+    record.children_objs.resize(1);
+    record.children_objs[0].name = "child";
+    std::vector<uint8_t> bytes;
+    record.serialize_to(bytes);
+    size_t count_offset{ find_bytes(bytes, u64_bytes({ 1, record.children_objs[0].serialized_size() })) };
+
+    for (uint64_t count : k_corrupt_counts)
+    {
+        std::vector<uint8_t> corrupt{ patched(bytes, count_offset, count) };
+        expect_out_of_range("owned parallel table count", [&]() {
+            ParallelSampleDataType loaded;
+            loaded.deserialize_from(corrupt);
+        });
+    }
+}
+
+void test_delta_list_count()
+{
+    SampleDataType prev{};
+    SampleDataType record{};
+    record.ipv4_addresses = { 0x11111111u, 0x22222222u };
+    SerialBuffer sb;
+    sb.mode = SerialBuffer::SBM_WRITE;
+    record.write_delta(prev, sb);
+    std::vector<uint8_t> bytes{ sb.buffer };
+    // The count, then a run of 2 changed elements after skipping none.
+    size_t count_offset{ find_bytes(bytes, { 2, 0, 0, 0, 0, 0, 0, 0, 0, 2, 0x11, 0x11, 0x11, 0x11 }) };
+
+    for (uint64_t count : k_corrupt_counts)
+    {
+        std::vector<uint8_t> corrupt{ patched(bytes, count_offset, count) };
+        expect_out_of_range("delta list count", [&]() {
+            SampleDataType applied;
+            SerialBuffer delta_sb;
+            delta_sb.attach_read_view(corrupt);
+            applied.apply_delta(delta_sb);
+        });
+    }
+}
+
+std::vector<uint8_t> packed_record()
+{
+    PackedSampleDataType record;
+    record.name = "packed";
+    record.ipv4_addresses = { 0x11111111u, 0x22222222u };
+    std::vector<uint8_t> bytes;
+    record.serialize_to(bytes);
+    return bytes;
+}
+
+void test_packed_truncated_record()
+{
+    std::vector<uint8_t> bytes{ packed_record() };
+    std::vector<uint8_t> truncated(bytes.begin(), bytes.begin() + 20);
+    expect_out_of_range("packed fixed field on truncated record", [&]() {
+        PackedSampleDataType::peek_is_enabled(truncated);
+    });
+    expect_out_of_range("packed fixed array on truncated record", [&]() {
+        PackedSampleDataType::peek_banana_indexes(truncated);
+    });
+    expect_out_of_range("packed slot on truncated record", [&]() {
+        PackedSampleDataType::peek_name(truncated);
+    });
+}
+
+void test_packed_offset_table()
+{
+    using Packed = PackedSampleDataType;
+    std::vector<uint8_t> bytes{ packed_record() };
+    size_t name_entry{ Packed::k_packed_fixed_size + Packed::k_slot_name * sizeof(uint64_t) };
+    // Start of `name`, start of `ipv4_addresses` and end of `ipv4_addresses`.
+    uint64_t offsets[3];
+    std::memcpy(offsets, bytes.data() + name_entry, sizeof(offsets));
+
+    std::vector<uint8_t> past_end{ patched(bytes, name_entry + sizeof(uint64_t), bytes.size() + 1) };
+    expect_out_of_range("packed slot ending past the record", [&]() {
+        Packed::peek_slot_bytes(past_end, Packed::k_slot_name);
+    });
+    std::vector<uint8_t> reversed{ patched(bytes, name_entry, offsets[1] + 1) };
+    expect_out_of_range("packed slot ending before it starts", [&]() {
+        Packed::peek_name(reversed);
+    });
+    // A slot too short for the string's length prefix.
+    std::vector<uint8_t> short_slot{ patched(bytes, name_entry + sizeof(uint64_t), offsets[0] + 2) };
+    expect_out_of_range("packed string slot shorter than its length", [&]() {
+        Packed::peek_name(short_slot);
+    });
+    std::vector<uint8_t> short_list{ patched(bytes, name_entry + sizeof(uint64_t), offsets[2] - 2) };
+    expect_out_of_range("packed list slot shorter than its count", [&]() {
+        Packed::peek_ipv4_addresses(short_list);
+    });
+}
+
+std::vector<uint8_t> read_file_bytes(const char* fname)
+{
+    std::ifstream file{ fname, std::ios::in | std::ios::binary };
+    return { std::istreambuf_iterator<char>{ file }, std::istreambuf_iterator<char>{} };
+}
+
+void write_file_bytes(const char* fname, const std::vector<uint8_t>& bytes)
+{
+    std::ofstream file{ fname, std::ios::out | std::ios::trunc | std::ios::binary };
+    file.write(reinterpret_cast<const char*>(bytes.data()), bytes.size());
+}
+
+void test_record_file()
+{
+    const char* fname{ "test_corrupt_input.hsr" };
+    std::remove(fname);  // Appenders append to what's there.
+    {
+        SampleDataType record{ list_record() };
+        RecordFileAppender<SampleDataType> appender;
+        appender.open(fname);
+        appender.append(record);
+        appender.close();
+    }
+    std::vector<uint8_t> bytes{ read_file_bytes(fname) };
+    size_t length_offset{ RecordFileIndex::k_header_size };
+    size_t count_offset{ bytes.size() - RecordFileIndex::k_footer_size };
+    size_t index_offset_offset{ count_offset + sizeof(uint64_t) };
+    uint64_t length;
+    std::memcpy(&length, bytes.data() + length_offset, sizeof(uint64_t));
+
+    // A record with a byte it doesn't decode, footer and all still in order.
+    std::vector<uint8_t> trailing{ patched(bytes, length_offset, length + 1) };
+    trailing.insert(trailing.begin() + length_offset + sizeof(uint64_t) + length, 0);
+    uint64_t index_offset;
+    std::memcpy(&index_offset, trailing.data() + index_offset_offset + 1, sizeof(uint64_t));
+    trailing = patched(trailing, index_offset_offset + 1, index_offset + 1);
+    write_file_bytes(fname, trailing);
+    {
+        RecordFileReader<SampleDataType> reader;
+        expect("record file with a trailing byte opens", reader.open(fname) && reader.size() == 1);
+        expect_out_of_range("record with a trailing byte", [&]() {
+            SampleDataType record;
+            reader.read(0, record);
+        });
+        expect_out_of_range("record index past the end", [&]() {
+            reader.record_bytes(1);
+        });
+    }
+
+    // Footers that don't add up are dropped for a scan of the records.
+    // The scan then stops at the record running past the end of the file.
+    write_file_bytes(fname, patched(bytes, length_offset, bytes.size()));
+    {
+        RecordFileReader<SampleDataType> reader;
+        expect("record length past the end falls back to a scan", reader.open(fname) && reader.size() == 0);
+    }
+    for (uint64_t count : k_corrupt_counts)
+    {
+        write_file_bytes(fname, patched(bytes, count_offset, count));
+        RecordFileReader<SampleDataType> reader;
+        expect("footer record count falls back to a scan", reader.open(fname) && reader.size() == 1);
+    }
+    std::remove(fname);
+}
+
+int main()
+{
+    test_view_list_counts();
+    test_view_parallel_table_count();
+    test_owned_list_counts();
+    test_streamed_list_counts();
+    test_owned_parallel_table_count();
+    test_delta_list_count();
+    test_packed_truncated_record();
+    test_packed_offset_table();
+    test_record_file();
+    std::printf("%d failures\n", g_failure_count);
+    return g_failure_count == 0 ? 0 : 1;
+}